@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+adhoctests/fake_clock_cls.py
+  Contains class FakeClock: a settable clock (and sleep) shared by the unit-tests of the classes
+    that take a clock (eg RetryScheduler, SlidingWindowRateLimiter, CpiMonthArrayCache, CpiExrMemoStore)
+
+  Example:
+    clock = FakeClock()
+    limiter = SlidingWindowRateLimiter(max_calls=3, window_in_sec=10, clock=clock, sleep=clock.sleep)
+    clock.now = 61.0  # time "passes"
+"""
+
+
+class FakeClock:
+
+  def __init__(self, now=0.0):
+    self.now = now
+    self.sleeps = []
+
+  def __call__(self):
+    return self.now
+
+  def sleep(self, seconds):
+    """
+    Records the wait & moves the clock forward (no real waiting)
+    """
+    self.sleeps.append(seconds)
+    self.now += seconds
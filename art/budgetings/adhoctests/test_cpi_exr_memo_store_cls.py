@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+art/budgetings/adhoctests/test_cpi_exr_memo_store_cls.py
+  Unit-tests for CpiExrMemoStore (persistence across instances, data-tied freshness & lru eviction) over a temporary file
+"""
+import datetime
+import os
+import tempfile
+import unittest
+import art.budgetings.cpi_exr_memo_store_cls as memost
+import adhoctests.fake_clock_cls as fakeclk
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.filepath = os.path.join(self.tmpdir.name, 'cache', memost.MEMO_FILENAME)
+    self.clock = fakeclk.FakeClock(now=1_000_000.0)
+
+  def tearDown(self):
+    self.tmpdir.cleanup()
+
+  def make_memo(self, **kwargs):
+    return memost.CpiExrMemoStore(filepath=self.filepath, clock=self.clock, **kwargs)
+
+  def test_1_entries_outlive_the_instance(self):
+    memo = self.make_memo()
+    memo.put('2023-04-28', 1, 301.836, 5.0007)
+    memo.put('2023-04-29', 1, None, 5.0007)  # incomplete: not memoized
+    memo.put('2023-04-30', 1, 301.836, 0.0)
+    memo.close()
+    rerun = self.make_memo()
+    self.assertEqual(1, rerun.preload(['2023-04-28', '2023-04-29', '2023-04-30'], 1))
+    self.assertEqual((301.836, 5.0007), rerun.get('2023-04-28', 1))
+    self.assertIsNone(rerun.get('2023-04-29', 1))
+    self.assertIsNone(rerun.get('2023-04-28', 2))  # another refmonth_minus_n
+    self.assertEqual(1, rerun.n_hits)
+    self.assertEqual(2, rerun.n_misses)
+    rerun.close()
+
+  def test_2_expired_entries_miss_n_are_dropped(self):
+    self.clock.now = datetime.datetime(2023, 4, 29, 9, 0).timestamp()  # 2023-04-28 is a recent date
+    memo = self.make_memo(ttl_in_sec=3600)
+    memo.put('2023-04-28', 1, 301.836, 5.0007)
+    memo.flush()
+    self.clock.now += 3601
+    self.assertIsNone(memo.get('2023-04-28', 1))
+    memo.flush()
+    self.assertEqual(0, memo.count_rows())
+    memo.close()
+
+  def test_3_least_recently_used_evicted_beyond_max_entries(self):
+    memo = self.make_memo(max_entries=2)
+    for day in (1, 2):
+      memo.put(f'2023-05-0{day}', 1, 300.0 + day, 5.0)
+      memo.flush()
+      self.clock.now += 1
+    memo.get('2023-05-01', 1)  # 2023-05-02 becomes the least recently used
+    memo.flush()
+    self.clock.now += 1
+    memo.put('2023-05-03', 1, 303.0, 5.0)
+    memo.flush()
+    memo.close()
+    rerun = self.make_memo(max_entries=2)
+    self.assertEqual(2, rerun.count_rows())
+    self.assertIsNotNone(rerun.get('2023-05-01', 1))
+    self.assertIsNone(rerun.get('2023-05-02', 1))
+    self.assertIsNotNone(rerun.get('2023-05-03', 1))
+    rerun.close()
+
+  def test_4_next_day_rerun_is_served_from_the_memo(self):
+    self.clock.now = datetime.datetime(2024, 6, 10, 9, 0).timestamp()
+    memo = self.make_memo()
+    memo.put('2023-04-28', 1, 301.836, 5.0007)  # a settled pair: kept indefinitely
+    memo.put('2024-06-07', 1, 313.0, 5.3)  # a recent date: its pair expires after the ttl
+    memo.close()
+    self.clock.now += 25 * 60 * 60  # the next day's run
+    rerun = self.make_memo()
+    self.assertEqual(1, rerun.preload(['2023-04-28', '2024-06-07'], 1))
+    self.assertEqual((301.836, 5.0007), rerun.get('2023-04-28', 1))
+    self.assertIsNone(rerun.get('2024-06-07', 1))
+    rerun.close()
+    self.clock.now += 365 * 24 * 60 * 60  # even a year later
+    rerun = self.make_memo()
+    self.assertEqual(1, rerun.count_rows())
+    self.assertEqual((301.836, 5.0007), rerun.get('2023-04-28', 1))
+    rerun.close()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+art/budgetings/budgets/pb/adhoctests/test_prices_processor.py
+  unit-tests for MoneCorrContext with a stub calculator standing in for CorrMonetWithinDatesCalculator
+    (one calculator per run, each price date computed once & Prices handing its context to its items)
+"""
+import datetime
+import unittest
+from unittest import mock
+import art.budgetings.budgets.pb.prices_processor as pp
+
+
+class StubCalculator:
+
+  def __init__(self, topdate=None):
+    self.topdate = topdate
+    self.calc_dates = []
+
+  def calc_composite_corr_mone_from_date(self, pdate):
+    self.calc_dates.append(pdate)
+    return 1.0 + pdate.day / 100
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    # PriceItem reads the NMs' metadata from a spreadsheet: not needed here
+    patcher = mock.patch.object(pp.nmi, 'AllNMsInfo')
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    self.calculators = []
+
+  def make_calculator(self, topdate=None):
+    calculator = StubCalculator(topdate)
+    self.calculators.append(calculator)
+    return calculator
+
+  def make_priceitem(self, pdate):
+    priceitem = pp.PriceItem()
+    priceitem.date = pdate
+    return priceitem
+
+  def test_1_one_calculator_per_run_n_each_date_once(self):
+    with mock.patch.object(pp, 'make_default_calculator', self.make_calculator):
+      prices = pp.Prices(pp.MoneCorrContext(topdate='2024-02-09'))
+      pdates = ['2023-04-28', '2023-05-02', '2023-04-28', '2023-05-02', '2023-04-28']
+      for i, pdate in enumerate(pdates):
+        prices.add_price_via_nm(1000 + i % 2, self.make_priceitem(pdate))
+      factors = [pi.mone_corr_mult_fact for items in prices.nn_n_priceitemlist_dict.values() for pi in items]
+    self.assertEqual(1, len(self.calculators))
+    self.assertEqual('2024-02-09', self.calculators[0].topdate)
+    self.assertEqual(1, prices.mone_corr_context.n_calculators_built)
+    self.assertEqual([datetime.date(2023, 4, 28), datetime.date(2023, 5, 2)], self.calculators[0].calc_dates)
+    self.assertEqual(2, prices.mone_corr_context.size)
+    self.assertEqual([1.28, 1.28, 1.28, 1.02, 1.02], factors)
+
+  def test_2_prices_hands_its_context_to_its_items(self):
+    calculator = StubCalculator()
+    context = pp.MoneCorrContext(calculator=calculator)
+    prices = pp.Prices(context)
+    priceitem = self.make_priceitem('2023-04-28')
+    prices.add_price_via_nm(1000, priceitem)
+    self.assertIs(context, priceitem.mone_corr_context)
+    self.assertEqual(1.28, priceitem.mone_corr_mult_fact)
+    self.assertEqual(0, context.n_calculators_built)  # the injected one is used
+    # an item already given a context keeps it
+    other_context = pp.MoneCorrContext(calculator=StubCalculator())
+    other_item = pp.PriceItem(mone_corr_context=other_context)
+    prices.add_price_via_nm(1001, other_item)
+    self.assertIs(other_context, other_item.mone_corr_context)
+
+
+if __name__ == '__main__':
+  unittest.main()
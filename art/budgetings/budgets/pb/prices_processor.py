@@ -10,12 +10,68 @@ import datetime
 import os
 from dateutil import relativedelta
 import pandas
-import commands.bcb_br.report.corr_monet_n_indices_calculator_from_dates as cmc  # cmc.CorrMonetWithinDatesCalculator
 import lib.datefs.introspect_dates as idt  # idt.for make_date_or_none()
 import art.budgetings.budgets.pb.nm_metadata_fetcher as nmi  # nmi.AllNMsInfo
 import art.budgetings.budgets.pb.net_gross_prices as ngp  # ngp.NetNGrossPrice
 import art.budgetings.budgets.pb.db_n_file_settings as dbs  # dbs.get_orcdados_batch_output_filepath_w_filename
 ICMS_GROSS_TO_NET = 0.16
+_default_mone_corr_context = None
+
+
+def make_default_calculator(topdate=None):
+  # imported here: the calculator module pulls in the db & the BCB/BLS fetch stack,
+  #   which a context injected with a calculator does not need
+  import art.budgetings.monecorr_n_indices_from_dates_calculator as cmc  # cmc.CorrMonetWithinDatesCalculator
+  return cmc.CorrMonetWithinDatesCalculator(topdate)
+
+
+class MoneCorrContext:
+  """
+  The monetary-correction context of a run, shared by all its price items:
+    => one calculator (by default a CorrMonetWithinDatesCalculator, whose construction resolves the top date
+       & the most recent exchange-rate date, ie a db or api lookup, and which keeps the top date's
+       cpi & exchange rate once fetched) or the one injected (anything with calc_composite_corr_mone_from_date())
+    => the multiplication factor memoized per price date, so that a price item costs a dict lookup
+  """
+
+  def __init__(self, topdate=None, calculator=None):
+    self.topdate = topdate
+    self._calculator = calculator
+    self.n_calculators_built = 0
+    self.factor_per_date = {}
+
+  @property
+  def calculator(self):
+    if self._calculator is None:
+      self._calculator = make_default_calculator(self.topdate)
+      self.n_calculators_built += 1
+    return self._calculator
+
+  def get_mult_fact_for_date(self, pdate):
+    pdate = idt.make_date_or_none(pdate)
+    if pdate not in self.factor_per_date:
+      self.factor_per_date[pdate] = self.calculator.calc_composite_corr_mone_from_date(pdate)
+    return self.factor_per_date[pdate]
+
+  @property
+  def size(self):
+    return len(self.factor_per_date)
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    topdate = {self.topdate} | calculator built = {self._calculator is not None} | dates memoized = {self.size}
+    """
+    return outstr
+
+
+def get_default_mone_corr_context():
+  """
+  Returns the process-wide context (for a PriceItem not injected with one)
+  """
+  global _default_mone_corr_context
+  if _default_mone_corr_context is None:
+    _default_mone_corr_context = MoneCorrContext()
+  return _default_mone_corr_context
 
 
 def show_qtd_of_prices_per_nm(prices):
@@ -32,10 +88,15 @@ def show_qtd_of_prices_per_nm(prices):
 
 class Prices:
 
-  def __init__(self):
+  def __init__(self, mone_corr_context=None):
     self.nn_n_priceitemlist_dict = {}
+    self.mone_corr_context = mone_corr_context
+    if self.mone_corr_context is None:
+      self.mone_corr_context = MoneCorrContext()
 
   def add_price_via_nm(self, nmcode, priceitem):
+    if priceitem.mone_corr_context is None:
+      priceitem.mone_corr_context = self.mone_corr_context
     if nmcode in self.nn_n_priceitemlist_dict:
       self.nn_n_priceitemlist_dict[nmcode].append(priceitem)
     else:
@@ -189,7 +250,7 @@ class PriceItem:
     'supplier',   'sapreq',  'url',
   ]
 
-  def __init__(self):
+  def __init__(self, mone_corr_context=None):
     self._seq = None  # a sequencial number
     self.nmcode = None  # the material item code
     self.nm_alt = None  # an alternative material item code
@@ -207,6 +268,7 @@ class PriceItem:
     self.fname = None  # xlsx data filename
     self._sapreq = None  # if price comes from a pedido-sap, this number comes in here
     self.nminfo = nmi.AllNMsInfo()
+    self.mone_corr_context = mone_corr_context  # a MoneCorrContext shared by the run's items
 
   @property
   def seq(self):
@@ -439,10 +501,11 @@ class PriceItem:
   def set_n_calc_mult_fact_for_mone_corr(self):
     """
     Calculates the multication factor for monetary correction
-    Calls the "multiplication factor" get-function giving price's date
+    Asks the shared context for the price date's factor (computed once per date within a run)
     """
-    cmclc = cmc.CorrMonetWithinDatesCalculator()
-    self._mone_corr_mult_fact = cmclc.calc_composite_corr_mone_from_date(self.date)
+    if self.mone_corr_context is None:
+      self.mone_corr_context = get_default_mone_corr_context()
+    self._mone_corr_mult_fact = self.mone_corr_context.get_mult_fact_for_date(self.date)
 
   @classmethod
   def get_stat_col_list(cls):
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+art/budgetings/calc/batch_monet_corr_calc.py
+  Contains class BatchMonetCorrCalculator, the array counterpart of MonetCorrCalculator
+    (@see multiplication_factor_calc.py for the calculation formula):
+    it takes a whole array of initial dates and either one target date or an array of them
+    and returns the DATAFRAME_COLUMNS frame (one row per initial date) computed with NumPy.
+
+  The indices are looked up in bulk, each distinct date once:
+    => the CPI (M-2 convention by default, M-1 with cpi_month_shift=1) from the month array cache
+       (@see lib/indices/bls_us/bls_cpi_month_array_cache_cls.py)
+    => the exchange rate (the sell price) from the in-memory exchange-rate index
+       (@see lib/indices/bcb_br/bcb_exchrate_index_cls.py), as-of the date,
+       ie a weekend or holliday takes the previous business day's quote;
+       the as-of quote may be at most max_asof_days (default DEFAULT_MAX_ASOF_DAYS) before the date:
+       a date past the db's last row (or within a gap) gets NaN, not a weeks-old quote
+
+  Then, as in MonetCorrCalculator:
+    mult = (1 + cpi variation) * (1 + exrate variation)
+    mul1 = mult floored at 1
+  a missing CPI counting as no CPI variation (factor 1) and a missing exchange rate making mult NaN.
+
+  Example:
+    calc = BatchMonetCorrCalculator(['2023-04-28', '2023-06-01'], '2023-12-05')
+    calc.df  # columns dt_i, cpi_i, exr_i, dt_f, cpi_f, exr_f, mult, mul1
+"""
+import datetime
+import numpy as np
+import pandas as pd
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+import lib.indices.bcb_br.bcb_exchrate_index_cls as exridx  # exridx.get_exchrate_index()
+import lib.indices.bls_us.bls_cpi_month_array_cache_cls as cpicache  # cpicache.get_cpi_cache()
+DATAFRAME_COLUMNS = ['dt_i', 'cpi_i', 'exr_i', 'dt_f', 'cpi_f', 'exr_f', 'mult', 'mul1']
+DEFAULT_CPI_MONTH_SHIFT = 2  # the M-2 convention
+DEFAULT_MAX_ASOF_DAYS = 7  # a long holliday weekend (eg Carnival: friday to wednesday) stays within it
+ORDINAL_OF_EPOCH = datetime.date(1970, 1, 1).toordinal()  # datetime64[D] counts days from 1970-01-01
+
+
+def convert_each_to_datetime64_days(arr: np.ndarray) -> np.ndarray:
+  try:
+    # the fast path: one numpy conversion when all elements are dates or 'yyyy-mm-dd' strings
+    return arr.astype('datetime64[D]')
+  except (TypeError, ValueError):
+    pass
+  # the slow path: each element through the repo's date conversion (eg '20230428' or a datetime.datetime)
+  days = [cnv.make_date_or_none(d) for d in arr.ravel()]
+  return np.asarray(days, dtype='datetime64[D]').reshape(arr.shape)
+
+
+def to_datetime64_days(dates) -> np.ndarray:
+  """
+  Dates, datetimes, 'yyyy-mm-dd' strings or datetime64's to a datetime64[D] array (NaT for an invalid one)
+  """
+  arr = np.asarray(dates)
+  if arr.dtype.kind == 'M':
+    return arr.astype('datetime64[D]')
+  if arr.dtype.kind != 'O':
+    return convert_each_to_datetime64_days(arr)
+  # converting python objects is the slow part: each distinct one is converted once (a price list repeats dates)
+  codes, uniques = pd.factorize(arr.ravel())
+  days = convert_each_to_datetime64_days(np.asarray(uniques, dtype=object))
+  out = np.full(codes.shape, np.datetime64('NaT'), dtype='datetime64[D]')
+  out[codes >= 0] = days[codes[codes >= 0]]  # code -1 is a None
+  return out.reshape(arr.shape)
+
+
+def lookup_asof_positions(index: exridx.ExchRateIndex, days: np.ndarray, max_asof_days: int | None = None) -> np.ndarray:
+  """
+  The position (in the index's arrays) of the latest quote on or before each day
+    -1 for NaT, before the first quote or if that quote is more than max_asof_days before the day
+  """
+  if max_asof_days is None:
+    max_asof_days = DEFAULT_MAX_ASOF_DAYS
+  ordinals = np.asarray(index.ordinals, dtype=np.int64)
+  positions = np.full(days.shape, -1, dtype=np.int64)
+  valid = ~np.isnat(days)
+  if ordinals.size == 0 or not valid.any():
+    return positions
+  day_ordinals = days[valid].astype(np.int64) + ORDINAL_OF_EPOCH
+  found = np.searchsorted(ordinals, day_ordinals, side='right') - 1
+  too_old = day_ordinals - ordinals[np.maximum(found, 0)] > max_asof_days
+  positions[valid] = np.where(too_old, -1, found)
+  return positions
+
+
+def lookup_asof_sellprices(index: exridx.ExchRateIndex, days: np.ndarray, max_asof_days: int | None = None) -> np.ndarray:
+  """
+  The sell price of the as-of quote of each day (NaN if none, @see lookup_asof_positions)
+  """
+  positions = lookup_asof_positions(index, days, max_asof_days)
+  sellprices = np.asarray(index.sellints, dtype=np.float64) / exridx.INTPRICE_MULTIPLIER
+  out = np.full(days.shape, np.nan)
+  found = positions >= 0
+  out[found] = sellprices[positions[found]]
+  return out
+
+
+def treat_dates_ini_n_fim(datesini, datesfim=None) -> tuple[np.ndarray, np.ndarray]:
+  """
+  datesini becomes a datetime64[D] array; datesfim (default today) one of the same size
+    an invalid initial date, an invalid final date or an initial date after its final date
+    raise ValueError (as in MonetCorrCalculator)
+  """
+  days_ini = to_datetime64_days(np.atleast_1d(datesini))
+  if datesfim is None:
+    datesfim = datetime.date.today()
+  days_fim = to_datetime64_days(np.atleast_1d(datesfim))
+  if days_fim.size == 1:
+    days_fim = np.repeat(days_fim, days_ini.size)
+  if days_fim.size != days_ini.size:
+    error_msg = f'Error: {days_fim.size} final dates for {days_ini.size} initial dates.'
+    raise ValueError(error_msg)
+  for name, days in (('dateini', days_ini), ('datefim', days_fim)):
+    invalid = np.flatnonzero(np.isnat(days))
+    if invalid.size > 0:
+      error_msg = f'Error: {invalid.size} invalid {name}(s), the first one at row {invalid[0]}.'
+      raise ValueError(error_msg)
+  inverted = np.flatnonzero(days_ini > days_fim)
+  if inverted.size > 0:
+    i = inverted[0]
+    error_msg = f'Error: dateini {days_ini[i]} is greater than datefim {days_fim[i]} at row {i}.'
+    raise ValueError(error_msg)
+  return days_ini, days_fim
+
+
+class BatchMonetCorrCalculator:
+
+  def __init__(
+      self,
+      datesini,
+      datesfim=None,
+      cpi_month_shift: int | None = None,
+      cpi_cache: cpicache.CpiMonthArrayCache | None = None,
+      exchrate_index: exridx.ExchRateIndex | None = None,
+      seriesid: str | None = None,
+      max_asof_days: int | None = None,
+    ):
+    self.datesini = datesini
+    self.datesfim = datesfim
+    self.cpi_month_shift = cpi_month_shift
+    self.cpi_cache = cpi_cache
+    self.exchrate_index = exchrate_index
+    self.seriesid = seriesid
+    self.max_asof_days = max_asof_days
+    self._df = None
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    self.datesini, self.datesfim = treat_dates_ini_n_fim(self.datesini, self.datesfim)
+    if self.cpi_month_shift is None:
+      self.cpi_month_shift = DEFAULT_CPI_MONTH_SHIFT
+    if self.cpi_cache is None:
+      self.cpi_cache = cpicache.get_cpi_cache()
+    if self.exchrate_index is None:
+      self.exchrate_index = exridx.get_exchrate_index(refresh=True)
+    if self.max_asof_days is None:
+      self.max_asof_days = DEFAULT_MAX_ASOF_DAYS
+
+  @property
+  def size(self) -> int:
+    return self.datesini.size
+
+  def lookup_cpis_n_exrates(self, days: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Looks up each distinct day once then spreads the results back over days
+    """
+    uniq_days, inverse = np.unique(days, return_inverse=True)
+    cpis = self.cpi_cache.cpi_m_minus_n(uniq_days, self.cpi_month_shift, self.seriesid)
+    exrates = lookup_asof_sellprices(self.exchrate_index, uniq_days, self.max_asof_days)
+    return cpis[inverse], exrates[inverse]
+
+  def calc_df(self) -> pd.DataFrame:
+    cpi_i, exr_i = self.lookup_cpis_n_exrates(self.datesini)
+    cpi_f, exr_f = self.lookup_cpis_n_exrates(self.datesfim)
+    with np.errstate(divide='ignore', invalid='ignore'):
+      cpi_factor = cpi_f / cpi_i
+      exr_factor = exr_f / exr_i
+    cpi_factor = np.where(np.isnan(cpi_factor), 1.0, cpi_factor)
+    mult = cpi_factor * exr_factor
+    mul1 = np.where(mult < 1.0, 1.0, mult)  # NaN stays NaN
+    return pd.DataFrame({
+      'dt_i': self.datesini.astype(object),  # datetime.date's, as in MonetCorrCalculator.df
+      'cpi_i': cpi_i,
+      'exr_i': exr_i,
+      'dt_f': self.datesfim.astype(object),
+      'cpi_f': cpi_f,
+      'exr_f': exr_f,
+      'mult': mult,
+      'mul1': mul1,
+    }, columns=DATAFRAME_COLUMNS)
+
+  @property
+  def df(self) -> pd.DataFrame:
+    if self._df is None:
+      self._df = self.calc_df()
+    return self._df
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    rows = {self.size} | cpi shift = M-{self.cpi_month_shift} | max as-of days = {self.max_asof_days}
+    distinct initial dates = {np.unique(self.datesini).size} | distinct final dates = {np.unique(self.datesfim).size}
+    """
+    return outstr
+
+
+def adhoctest():
+  calc = BatchMonetCorrCalculator(['2023-04-28', '2023-06-01'], '2023-12-05')
+  print(calc)
+  print(calc.df.to_string())
+
+
+def process():
+  pass
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
@@ -60,6 +60,7 @@ import lib.datefs.introspect_dates as intr
 import lib.datefs.read_write_datelist_files_fs as rwdl
 import lib.datefs.argparse as ap  # ap.get_args
 import art.budgetings.calc.multiplication_factor_calc as mfcalc
+import art.budgetings.calc.monet_corr_factor_table_cls as fctable  # fctable.MonetCorrFactorTable
 # .get_date_n_price_tuplelist
 import art.budgetings.calc.mone_corr_fs.adhoctests.datamass_for_multfactortable as prices_dmass
 
@@ -124,10 +125,8 @@ class DatePriceRecordsMonetCorrCalculator:
   def trans_dates_into_df(self):
     if self.datelist is None:
       return
-    self._df = pd.DataFrame(columns=mfcalc.DATAFRAME_COLUMNS)
-    for i, pdate in enumerate(self.datelist):
-      mcc = mfcalc.MonetCorrCalculator(pdate, self.refdate, i)
-      self._df.loc[i] = mcc.df.loc[i]
+    # all dates at once: the stored factors read in bulk, only the missing ones computed (indices looked up in bulk)
+    self._df = fctable.MonetCorrFactorTable().get_factors_df(self.datelist, self.refdate)
 
   def put_prices_from_date_price_ntlist_into_df(self, dates_n_prices_ntlist):
     """
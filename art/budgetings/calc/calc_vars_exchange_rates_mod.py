@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import sys
 import art.inflmeas.bcb_br.exrate.currency_exchange_rate_model as mmod
-import lib.db.conn_sa as confs
+import lib.db.sqlalch.sqlalchemy_connection_clsmod as confs  # confs.get_sa_session()
 import lib.indices.bcb_br.bcb_cotacao_fetcher_from_db_or_api as preapi
 import lib.datefs.years_date_functions as dtfs
 
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+art/budgetings/calc/mone_corr_fs/adhoctests/test_batch_monet_corr_calc.py
+  Unit-tests for BatchMonetCorrCalculator over an in-memory CPI table & exchange-rate index
+"""
+import datetime
+import sqlite3
+import time
+import unittest
+import numpy as np
+import art.budgetings.calc.batch_monet_corr_calc as batchcalc
+import lib.indices.bcb_br.bcb_exchrate_index_cls as exridx
+import lib.indices.bls_us.bls_cpi_month_array_cache_cls as cpicache
+
+
+def make_cpi_cache(cpis_per_refmonth):
+  conn = sqlite3.connect(':memory:')
+  conn.execute(
+    f"CREATE TABLE {cpicache.BLS_CPI_TABLENAME} (seriesid TEXT, refmonthdate date, acc_index real, "
+    f"created_at datetime, modified_at datetime);"
+  )
+  conn.executemany(
+    f"INSERT INTO {cpicache.BLS_CPI_TABLENAME} VALUES ('CUUR0000SA0', ?, ?, 'c', 'm');",
+    list(cpis_per_refmonth.items())
+  )
+  return cpicache.CpiMonthArrayCache(conn=conn)
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    # the same data as the first hypothesis in test_multiplication_factor_calc.py
+    self.cpi_cache = make_cpi_cache({'2023-02-01': 300.84, '2023-10-01': 307.671})
+    self.index = exridx.ExchRateIndex('BRL', 'USD')
+    self.index.upsert_quote('2023-04-28', 4.9985, 5.0007)
+    self.index.upsert_quote('2023-12-05', 4.9510, 4.9522)
+
+  def make_calc(self, datesini, datesfim, **kwargs):
+    return batchcalc.BatchMonetCorrCalculator(
+      datesini, datesfim, cpi_cache=self.cpi_cache, exchrate_index=self.index, **kwargs
+    )
+
+  def test_1_same_factor_as_the_scalar_calculator(self):
+    df = self.make_calc(['2023-04-28'], '2023-12-05').df
+    self.assertEqual(batchcalc.DATAFRAME_COLUMNS, list(df.columns))
+    row = df.iloc[0]
+    self.assertEqual(datetime.date(2023, 4, 28), row['dt_i'])
+    self.assertEqual(datetime.date(2023, 12, 5), row['dt_f'])
+    self.assertAlmostEqual(300.84, row['cpi_i'])
+    self.assertAlmostEqual(307.671, row['cpi_f'])
+    self.assertAlmostEqual(5.0007, row['exr_i'])
+    self.assertAlmostEqual(4.9522, row['exr_f'])
+    self.assertAlmostEqual(1.012788, row['mult'], 6)
+    self.assertAlmostEqual(1.012788, row['mul1'], 6)
+
+  def test_2_asof_exrate_n_missing_values(self):
+    # 2023-04-30 is a sunday: as-of takes friday's quote; 2023-04-01 is before the first quote
+    df = self.make_calc(['2023-04-30', '2023-04-01'], ['2023-12-05', '2023-12-05']).df
+    self.assertAlmostEqual(5.0007, df['exr_i'].iloc[0])
+    self.assertTrue(np.isnan(df['exr_i'].iloc[1]))
+    self.assertTrue(np.isnan(df['mult'].iloc[1]))
+    self.assertTrue(np.isnan(df['mul1'].iloc[1]))
+    # M-1: 2023-03 has no cpi, the cpi factor counts as 1
+    df = self.make_calc(['2023-04-28'], '2023-12-05', cpi_month_shift=1).df
+    self.assertTrue(np.isnan(df['cpi_i'].iloc[0]))
+    self.assertAlmostEqual(4.9522 / 5.0007, df['mult'].iloc[0])
+    self.assertEqual(1.0, df['mul1'].iloc[0])
+
+  def test_3_invalid_or_inverted_dates_raise(self):
+    self.assertRaises(ValueError, self.make_calc, ['2023-04-28', 'foo'], '2023-12-05')
+    self.assertRaises(ValueError, self.make_calc, ['2024-01-01'], '2023-12-05')
+    self.assertRaises(ValueError, self.make_calc, ['2023-04-28', '2023-05-02'], ['2023-12-05'] * 3)
+
+  def test_4_hundred_thousand_rows_under_a_second(self):
+    base = np.datetime64('2023-04-28')
+    datesini = base + np.arange(100_000) % 200
+    start = time.perf_counter()
+    df = self.make_calc(datesini, '2023-12-05').df
+    elapsed = time.perf_counter() - start
+    self.assertEqual(100_000, len(df))
+    self.assertAlmostEqual(1.012788, df['mult'].iloc[0], 6)
+    self.assertLess(elapsed, 1.0)
+
+  def test_5_asof_quote_is_capped(self):
+    # the db's last quote is 2023-12-05: a week later is within the cap, three weeks later is not
+    df = self.make_calc(['2023-04-28', '2023-04-28'], ['2023-12-12', '2023-12-26']).df
+    self.assertAlmostEqual(4.9522, df['exr_f'].iloc[0])
+    self.assertTrue(np.isnan(df['exr_f'].iloc[1]))
+    self.assertTrue(np.isnan(df['mult'].iloc[1]))
+    df = self.make_calc(['2023-04-28'], '2023-12-26', max_asof_days=30).df
+    self.assertAlmostEqual(4.9522, df['exr_f'].iloc[0])
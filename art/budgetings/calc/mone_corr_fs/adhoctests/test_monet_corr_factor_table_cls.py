@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+art/budgetings/calc/mone_corr_fs/adhoctests/test_monet_corr_factor_table_cls.py
+  Unit-tests for MonetCorrFactorTable (its lazy fill, bulk reads & trigger invalidation) over an in-memory db
+"""
+import sqlite3
+import unittest
+import numpy as np
+import art.budgetings.calc.monet_corr_factor_table_cls as fctable
+import lib.indices.bcb_br.bcb_exchrate_index_cls as exridx
+import lib.indices.bls_us.bls_cpi_month_array_cache_cls as cpicache
+
+
+def make_conn():
+  conn = sqlite3.connect(':memory:')
+  conn.execute(
+    f"CREATE TABLE {cpicache.BLS_CPI_TABLENAME} (seriesid TEXT, refmonthdate date, acc_index real, "
+    f"created_at datetime, modified_at datetime);"
+  )
+  conn.executemany(
+    f"INSERT INTO {cpicache.BLS_CPI_TABLENAME} VALUES ('CUUR0000SA0', ?, ?, 'c', 'm');",
+    [('2023-02-01', 300.84), ('2023-03-01', 301.836), ('2023-10-01', 307.671)]
+  )
+  conn.execute(
+    f"CREATE TABLE {exridx.ExchRateIndex.tablename} (curr_num char(3), curr_den char(3), buypriceint int, "
+    f"sellpriceint int, refdate date, quotestime datetime, updated_at datetime);"
+  )
+  conn.executemany(
+    f"INSERT INTO {exridx.ExchRateIndex.tablename} VALUES ('BRL', 'USD', ?, ?, ?, null, 'u');",
+    [(49985, 50007, '2023-04-28'), (49510, 49522, '2023-12-05')]
+  )
+  conn.commit()
+  return conn
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.conn = make_conn()
+    self.cpi_cache = cpicache.CpiMonthArrayCache(conn=self.conn)
+    self.index = exridx.ExchRateIndex('BRL', 'USD')
+    self.datesini = ['2023-04-28', '2023-04-30', '2023-05-02', '2023-04-28']
+    self.synced_pairs = []
+
+  def tearDown(self):
+    self.conn.close()
+
+  def make_table(self, exrate_syncer=None):
+    return fctable.MonetCorrFactorTable(
+      conn=self.conn, cpi_cache=self.cpi_cache, exchrate_index=self.index,
+      exrate_syncer=exrate_syncer or self.synced_pairs.append,
+    )
+
+  def test_1_first_run_computes_rerun_only_reads(self):
+    table = self.make_table()
+    self.assertTrue(table.is_persistent)
+    df = table.get_factors_df(self.datesini, '2023-12-05')
+    self.assertEqual(4, len(df))
+    self.assertEqual(3, table.n_computed)  # the repeated pair is computed once
+    self.assertAlmostEqual(1.012788, df['mult'].iloc[0], 6)
+    self.assertAlmostEqual(df['mult'].iloc[0], df['mult'].iloc[1])  # a sunday takes friday's quote
+    self.assertEqual(3, table.count_rows())
+    n_queries = self.cpi_cache.n_queries
+    rerun = self.make_table()
+    df2 = rerun.get_factors_df(self.datesini, '2023-12-05')
+    self.assertEqual(0, rerun.n_computed)
+    self.assertEqual(n_queries, self.cpi_cache.n_queries)  # no index lookup at all
+    self.assertTrue(np.allclose(df['mult'], df2['mult']))
+    self.assertEqual(df['dt_i'].tolist(), df2['dt_i'].tolist())
+
+  def test_2_cpi_change_invalidates_its_months_only(self):
+    table = self.make_table()
+    table.get_factors_df(self.datesini, '2023-12-05')
+    # 2023-03 is M-2 of 2023-05-02 only
+    self.conn.execute(
+      f"UPDATE {cpicache.BLS_CPI_TABLENAME} SET acc_index = 302.0 WHERE refmonthdate = '2023-03-01';"
+    )
+    self.assertEqual(2, table.count_rows())
+    table.n_computed = 0
+    df = table.get_factors_df(['2023-05-02'], '2023-12-05')
+    self.assertEqual(1, table.n_computed)
+    self.assertAlmostEqual(302.0, df['cpi_i'].iloc[0])
+
+  def test_3_quote_change_invalidates_within_asof_spans(self):
+    table = self.make_table()
+    table.get_factors_df(self.datesini, '2023-12-05')
+    # a quote after 2023-12-05 changes no factor
+    self.conn.execute(
+      f"INSERT INTO {exridx.ExchRateIndex.tablename} VALUES ('BRL', 'USD', 48000, 48100, '2023-12-06', null, 'u');"
+    )
+    self.assertEqual(3, table.count_rows())
+    # a quote on 2023-05-02 changes only the as-of quote of 2023-05-02
+    self.conn.execute(
+      f"INSERT INTO {exridx.ExchRateIndex.tablename} VALUES ('BRL', 'USD', 49000, 49100, '2023-05-02', null, 'u');"
+    )
+    self.assertEqual(2, table.count_rows())
+    table.n_computed = 0
+    df = table.get_factors_df(['2023-05-02', '2023-04-28'], '2023-12-05')
+    self.assertEqual(1, table.n_computed)
+    self.assertAlmostEqual(4.91, df['exr_i'].iloc[0])
+    self.assertAlmostEqual(5.0007, df['exr_i'].iloc[1])
+
+  def test_4_triggers_search_indexes(self):
+    self.make_table()
+    sqls = [
+      "SELECT * FROM monet_corr_factors WHERE curr_num = 'BRL' and curr_den = 'USD' and "
+      "dt_f >= '2023-05-02' and COALESCE(exr_refdate_f, '') <= '2023-05-02';",
+      "SELECT * FROM monet_corr_factors WHERE cpi_seriesid = 'CUUR0000SA0' and cpi_refmonth_i = '2023-03-01';",
+    ]
+    for sql in sqls:
+      plan = ' '.join(row[-1] for row in self.conn.execute('EXPLAIN QUERY PLAN ' + sql))
+      self.assertIn('USING INDEX', plan)
+      self.assertNotIn('SCAN', plan)
+
+  def test_5_day_past_the_last_quote_is_synced_first(self):
+    def sync_quote_in(currency_pair):
+      self.synced_pairs.append(currency_pair)
+      self.conn.execute(
+        f"INSERT INTO {exridx.ExchRateIndex.tablename} VALUES ('BRL', 'USD', 48000, 48100, '2024-01-10', null, 'u');"
+      )
+    table = self.make_table(exrate_syncer=sync_quote_in)
+    df = table.get_factors_df(['2023-04-28'], '2024-01-10')  # the db's last quote is 2023-12-05
+    self.assertEqual([('BRL', 'USD')], self.synced_pairs)
+    self.assertEqual(1, table.n_syncs)
+    self.assertAlmostEqual(4.81, df['exr_f'].iloc[0])
+    # with no quote to be synced in, the factor is NaN (not one taken from a weeks-old quote)
+    table = self.make_table()
+    df = table.get_factors_df(['2023-04-28'], '2024-02-20')
+    self.assertTrue(np.isnan(df['mult'].iloc[0]))
@@ -12,6 +12,10 @@ year y1 |     |     |
 year y2 |     |     |
 --------|-----|-----|----
   (...)
+
+The grid comes from one db query (@see CpiYearMonthGrid in lib/indices/bls_us/cpi_year_month_grid_cls.py),
+  cached on disk while the series doesn't change; with_variations=True (CLI -v) adds to the output Excel file
+  two more sheets: the month-over-month and the 12-month variations.
 """
 import argparse
 import datetime
@@ -19,24 +23,26 @@ from dateutil.relativedelta import relativedelta
 import os.path
 import lib.datefs.years_date_functions as dtfs
 import pandas as pd
-import commands.fetch.bls_us.read_cpis_from_db as dbr  # get_as_df_all_available_cpi_baselineindices_in_db
+import art.inflmeas.bls_us.classes.cpis_classmod as cpis_cls  # cpis_cls.REGISTERED_SERIESIDS
+import lib.indices.bls_us.cpi_year_month_grid_cls as cpigrid
 import settings as sett
-import commands.fetch.bls_us.read_cpis_from_db as rcpi
 
 
 class Tabulator:
 
-  def __init__(self, startyear=None, endyear=None, seriesid=None):
+  def __init__(self, startyear=None, endyear=None, seriesid=None, with_variations=False):
     self.startyear = startyear
     self.endyear = endyear
     self.startrefmonth = None
     self.endrefmonth = None
-    self.seriesid = seriesid or rcpi.DEFAULT_SERIESID
+    self.seriesid = seriesid or cpigrid.DEFAULT_SERIESID
+    self.with_variations = with_variations
     self._month3letter_colindices = None
     self._year_rowindices = None
-    self.namedtuplerows = None
-    self.cpisdictlist_prep_for_df = None
+    self.gridmaker = cpigrid.CpiYearMonthGrid(self.seriesid)
     self.df = None
+    self.mom_df = None
+    self.yoy_df = None
     self.been_processed = False
     self.scripts_start_time = None  # set on method "process" (ie process_create_df())
     self.savefile_report_msg = None
@@ -44,22 +50,28 @@ class Tabulator:
     self.treat_years()
 
   def treat_years(self):
+    """
+    Years default to the series' first & last ones in db; refmonths are the first & last months having a cpi
+    """
+    self.gridmaker.load()
     try:
       self.startyear = int(self.startyear)
     except (TypeError, ValueError):
-      self.startyear = dbr.get_older_available_year_in_cpi_db(self.seriesid)
+      self.startyear = self.gridmaker.startyear
     try:
       self.endyear = int(self.endyear)
     except (TypeError, ValueError):
-      self.endyear = dbr.get_newer_available_year_in_cpi_db(self.seriesid)
-    self.startrefmonth = dbr.get_older_available_refmonthdate_in_cpi_db(self.seriesid)
-    self.endrefmonth = dbr.get_newer_available_refmonthdate_in_cpi_db(self.seriesid)
-    if self.startrefmonth.year != self.startyear:
-      error_msg = f'startrefmonth.year {self.startrefmonth.year} != startyear {self.startyear}'
+      self.endyear = self.gridmaker.endyear
+    if self.startyear is None or self.endyear is None:
+      error_msg = f'no cpi for seriesid {self.seriesid} in db'
       raise ValueError(error_msg)
-    if self.endrefmonth.year != self.endyear:
-      error_msg = f'endrefmonth.year {self.endrefmonth.year} != endyear {self.endyear}'
+    cpi_months = self.gridmaker.slice_years(self.startyear, self.endyear).stack()  # (year, mon) rows without NaN
+    if cpi_months.empty:
+      error_msg = f'no cpi for seriesid {self.seriesid} within years {self.startyear} and {self.endyear}'
       raise ValueError(error_msg)
+    (year_ini, mon_ini), (year_fim, mon_fim) = cpi_months.index[0], cpi_months.index[-1]
+    self.startrefmonth = datetime.date(year_ini, self.month3letter_colindices.index(mon_ini) + 1, 1)
+    self.endrefmonth = datetime.date(year_fim, self.month3letter_colindices.index(mon_fim) + 1, 1)
 
   @property
   def n_years(self):
@@ -117,49 +129,14 @@ class Tabulator:
       self._year_rowindices = [year for year in range(self.startyear, self.endyear+1)]
     return self._year_rowindices
 
-  def accumulate_all_years_ntlist_for_df(self):
-    """
-    Accumulates all monthly cpis year by year, within startyear and endyear
-    """
-    self.namedtuplerows = []
-    for year in range(self.startyear, self.endyear+1):
-      ntlist = dbr.get_cpis_n_refmonths_as_ntlist_fromdb_by_year_n_series(year, self.seriesid)
-      self.namedtuplerows.append(ntlist)
-
-  def mount_all_years_dictlist_to_prep_for_df(self):
-    """
-    Once all data structures above are ready, df (DataFrame) may be instantiated from
-      an "on-the-fly" dict montage that will create an NxN matrix for df
-    The result will be similar to:
-      The tabulation chosen is the following
-       ys/ ms | jan | feb | mar  (...)
-      --------|-----|-----|----
-      year y1 |     |     |
-      --------|-----|-----|----
-      year y2 |     |     |
-      --------|-----|-----|----
-        (...)
-    """
-    self.cpisdictlist_prep_for_df = []
-    for i, year in enumerate(range(self.startyear, self.endyear + 1)):
-      cpis = [nt.cpi for nt in self.namedtuplerows[i]]  # list came ordered ASC from db
-      # print('year', year, 'cpis', cpis)
-      cpi_arr_size = len(cpis)
-      cpisdict = {self.month3letter_colindices[i]: cpis[i] for i in range(0, cpi_arr_size)}
-      # print('cpisdict', cpisdict)
-      self.cpisdictlist_prep_for_df.append(cpisdict)
-
-  def create_df_from_prepared_dictlist(self):
+  def create_df_from_grid(self):
     """
-    Instantiates the instance's DataFrame object.
-      It needs the preparation from the method mount_all_years_dictlist_to_prep_for_df() above
+    Slices the instance's DataFrame objects (the cpi grid and, if asked, its variations) to the year range
     """
-    self.df = pd.DataFrame(
-      self.cpisdictlist_prep_for_df,
-      columns=self.month3letter_colindices,
-      index=self.year_rowindices,
-    )
-    # print(self.df.to_string())
+    self.df = self.gridmaker.slice_years(self.startyear, self.endyear)
+    if self.with_variations:
+      self.mom_df = self.gridmaker.mom_grid.loc[self.startyear:self.endyear]
+      self.yoy_df = self.gridmaker.yoy_grid.loc[self.startyear:self.endyear]
 
   def save_df_to_excel(self):
     if os.path.exists(self.output_excel_filepath):
@@ -171,16 +148,18 @@ class Tabulator:
       print(scrmsg)
     else:
       self.savefile_report_msg = f'file saved {datetime.datetime.now()}'
-      self.df.to_excel(self.output_excel_filepath)
+      with pd.ExcelWriter(self.output_excel_filepath) as writer:
+        self.df.to_excel(writer, sheet_name='cpi')
+        if self.with_variations:
+          self.mom_df.to_excel(writer, sheet_name='month-over-month')
+          self.yoy_df.to_excel(writer, sheet_name='12-month')
       scrmsg = f"""Saved [{self.output_excel_filename}],
       Folder: [{self.output_excel_folderpath}]"""
       print(scrmsg)
 
   def process_create_df(self):
     self.scripts_start_time = datetime.datetime.now()
-    self.accumulate_all_years_ntlist_for_df()
-    self.mount_all_years_dictlist_to_prep_for_df()
-    self.create_df_from_prepared_dictlist()
+    self.create_df_from_grid()
     self.save_df_to_excel()
     self.been_processed = True
     scripts_end_time = datetime.datetime.now()
@@ -195,6 +174,7 @@ class Tabulator:
     From {self.startrefmonth} to {self.endrefmonth} | seriesid {self.seriesid}
     Number of years {self.n_years} | number of months (data points) {self.n_months}
     been processed = {self.been_processed} | duration = {self.runduration}
+    grid from disk cache = {self.gridmaker.from_cache} | with variations = {self.with_variations}
     Output Excel Filename: [{self.output_excel_filename}] | {self.savefile_report_msg}
     Folder in which output Excel file is located: [{self.output_excel_folderpath}] 
     """
@@ -213,30 +193,34 @@ def adhoctest():
   print(tab.df.to_string())
 
 
-def get_seriesid_from_cli():
+def get_args_from_cli():
   """
-  The argument expected is either of the two below:
+  The seriesid argument expected is either of the two below:
     cur_seriesid = 'CUUR0000SA0'
     sur_seriesid = 'SUUR0000SA0'
   iF none is given, the first one above is DEFAULT.
+  Option -v adds the month-over-month & 12-month variation sheets
   """
   parser = argparse.ArgumentParser()
-  helpstr = f"the CPI seriesid, it's either {rcpi.available_cpi_seriesid_list}"
+  helpstr = f"the CPI seriesid, it's either {cpis_cls.REGISTERED_SERIESIDS}"
   parser.add_argument(
     '-s', '--seriesid', metavar='seriesid', type=str, nargs=1,
     help=helpstr,
   )
+  parser.add_argument(
+    '-v', '--variations', action='store_true',
+    help='also tabulates the month-over-month & 12-month variations',
+  )
   args = parser.parse_args()
   seriesid = args.seriesid
-  if isinstance(seriesid, list) and len(seriesid) > 0:
-    seriesid = seriesid[0] if seriesid[0] else rcpi.available_cpi_seriesid_list or None
-    return seriesid
-  return None
+  if isinstance(seriesid, list) and len(seriesid) > 0 and seriesid[0]:
+    return seriesid[0], args.variations
+  return None, args.variations
 
 
 def process():
-  seriesid = get_seriesid_from_cli() or rcpi.DEFAULT_SERIESID
-  tab = Tabulator(None, None, seriesid)
+  seriesid, with_variations = get_args_from_cli()
+  tab = Tabulator(None, None, seriesid or cpigrid.DEFAULT_SERIESID, with_variations)
   tab.process_create_df()
 
 
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+art/budgetings/calc/monet_corr_factor_table_cls.py
+  Contains class MonetCorrFactorTable: the monetary-correction factors (@see batch_monet_corr_calc.py)
+    materialized in the app's sqlite db (table monet_corr_factors) keyed by (protocol, dt_i, dt_f)
+
+  The protocol names how a factor is computed, eg "cpi CUUR0000SA0 M-2 x exr BRL/USD asof-sell v1",
+    so that factors of different conventions (or of a future formula version) never mix.
+
+  Factors are read in bulk (one query per chunk of target dates) and only the missing (dt_i, dt_f) pairs
+    are computed (by BatchMonetCorrCalculator) and then inserted. So, rerunning a budget whose dates
+    & indices haven't changed makes no index lookup at all (not even the CPI or exchange-rate loading).
+
+  Each factor row records what it depends on:
+    => the CPI months it looked up (cpi_refmonth_i & cpi_refmonth_f, for its seriesid)
+    => the exchange-rate quote dates it took as-of (exr_refdate_i & exr_refdate_f, for its currency pair)
+  and triggers on the CPI & exchange-rate tables delete exactly the factors a changed row could alter:
+    => a CPI row inserted, updated or deleted: the factors that looked up its month
+    => a quote on day D inserted, updated or deleted: the factors with exr_refdate <= D <= dt
+       (the as-of quote of dt may now be another one)
+
+  If the CPI or the exchange-rate table does not exist (yet), the triggers can't be installed
+    and the factors are computed without being stored.
+
+  Before missing factors are computed, a day without an as-of quote (within the batch calculator's cap),
+    eg one past the db's last row, has the exchange-rate gaps filled first
+    (by default ExchRateGapSyncer: the period API, saved into the db), so that the factor is not stored as NaN
+    while the quote is a fetch away.
+
+  Example:
+    table = MonetCorrFactorTable()
+    df = table.get_factors_df(['2023-04-28', '2023-06-01'], '2023-12-05')  # the DATAFRAME_COLUMNS frame
+"""
+import datetime
+import numpy as np
+import pandas as pd
+import settings as sett
+import art.budgetings.calc.batch_monet_corr_calc as batchcalc
+import lib.indices.bcb_br.bcb_exchrate_index_cls as exridx
+import lib.indices.bls_us.bls_cpi_month_array_cache_cls as cpicache
+FACTOR_TABLENAME = 'monet_corr_factors'
+PROTOCOL_VERSION = 2  # v2: the as-of quote capped at batchcalc.DEFAULT_MAX_ASOF_DAYS
+MAX_PARAMS_PER_QUERY = 500  # below sqlite's default limit of host parameters
+FACTOR_FIELDNAMES = [
+  'protocol', 'dt_i', 'dt_f', 'cpi_seriesid', 'curr_num', 'curr_den',
+  'cpi_refmonth_i', 'cpi_refmonth_f', 'exr_refdate_i', 'exr_refdate_f',
+  'cpi_i', 'exr_i', 'cpi_f', 'exr_f', 'mult', 'mul1', 'created_at',
+]
+
+
+def make_protocol(seriesid: str, cpi_month_shift: int, curr_num: str, curr_den: str) -> str:
+  return f"cpi {seriesid} M-{cpi_month_shift} x exr {curr_num}/{curr_den} asof-sell v{PROTOCOL_VERSION}"
+
+
+def sync_exrate_gaps(currency_pair: tuple[str, str]):
+  # imported here: the syncer's default fetch reaches the remote API
+  import lib.indices.bcb_br.bcb_exchrate_gap_sync_cls as gapsync
+  syncer = gapsync.ExchRateGapSyncer(currency_pairs=[currency_pair])
+  syncer.process()
+
+
+def to_strdates(days: np.ndarray) -> list:
+  """
+  datetime64[D]'s as 'yyyy-mm-dd' strings (None for NaT)
+  """
+  return [None if d == 'NaT' else d for d in np.datetime_as_string(days, unit='D').tolist()]
+
+
+class MonetCorrFactorTable:
+
+  tablename = FACTOR_TABLENAME
+  cpi_tablename = cpicache.BLS_CPI_TABLENAME
+  exr_tablename = exridx.ExchRateIndex.tablename
+
+  def __init__(
+      self,
+      conn=None,
+      cpi_month_shift: int | None = None,
+      seriesid: str | None = None,
+      cpi_cache: cpicache.CpiMonthArrayCache | None = None,
+      exchrate_index: exridx.ExchRateIndex | None = None,
+      exrate_syncer=None,
+    ):
+    """
+      exrate_syncer(currency_pair) fills the db's exchange-rate gaps (default sync_exrate_gaps)
+    """
+    self.conn = conn
+    self.cpi_month_shift = cpi_month_shift
+    self.seriesid = seriesid
+    self.cpi_cache = cpi_cache
+    self.exchrate_index = exchrate_index
+    self.exrate_syncer = exrate_syncer
+    self.n_read = 0
+    self.n_computed = 0
+    self.n_syncs = 0
+    self.is_persistent = False
+    self.treat_attrs()
+    self.create_table_n_triggers_if_not_exist()
+
+  def treat_attrs(self):
+    if self.conn is None:
+      self.conn = sett.get_sqlite_connection()
+    if self.cpi_month_shift is None:
+      self.cpi_month_shift = batchcalc.DEFAULT_CPI_MONTH_SHIFT
+    if self.seriesid is None:
+      self.seriesid = cpicache.DEFAULT_SERIESID
+    if self.exrate_syncer is None:
+      self.exrate_syncer = sync_exrate_gaps
+
+  @property
+  def currency_pair(self) -> tuple[str, str]:
+    if self.exchrate_index is not None:
+      return self.exchrate_index.currency_pair
+    return exridx.pkg.DEFAULT_CURR_NUM, exridx.pkg.DEFAULT_CURR_DEN
+
+  @property
+  def protocol(self) -> str:
+    return make_protocol(self.seriesid, self.cpi_month_shift, *self.currency_pair)
+
+  def does_table_exist(self, tablename: str) -> bool:
+    sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' and name = ?;"
+    return self.conn.execute(sql, (tablename,)).fetchone() is not None
+
+  def make_trigger_sqls(self) -> list[str]:
+    """
+    One DELETE per side (_i & _f) instead of an OR of both: each one then searches its own index
+      (an OR of ranges over two columns makes sqlite scan the whole table, once per quote or cpi row written)
+    Each trigger is dropped & recreated, so that a db having an older version of it gets the current one
+    """
+    t, cpit, exrt = self.tablename, self.cpi_tablename, self.exr_tablename
+    sqls = []
+    for event, rows in (('INSERT', ('NEW',)), ('UPDATE OF seriesid, refmonthdate, acc_index', ('OLD', 'NEW')),
+                        ('DELETE', ('OLD',))):
+      deletes = ''.join(f"""
+        DELETE FROM {t} WHERE cpi_seriesid = {r}.seriesid and
+          cpi_refmonth_{side} = substr({r}.refmonthdate, 1, 7) || '-01';""" for r in rows for side in ('i', 'f'))
+      name = f"{t}_on_{cpit}_{event.split()[0].lower()}"
+      sqls.append(f"DROP TRIGGER IF EXISTS {name};")
+      sqls.append(f"""
+      CREATE TRIGGER {name}
+        AFTER {event} ON {cpit}
+      BEGIN{deletes}
+      END;""")
+    for event, rows in (('INSERT', ('NEW',)), ('UPDATE OF curr_num, curr_den, refdate, sellpriceint', ('OLD', 'NEW')),
+                        ('DELETE', ('OLD',))):
+      deletes = ''.join(f"""
+        DELETE FROM {t} WHERE curr_num = {r}.curr_num and curr_den = {r}.curr_den and
+          dt_{side} >= substr({r}.refdate, 1, 10) and COALESCE(exr_refdate_{side}, '') <= substr({r}.refdate, 1, 10);"""
+                        for r in rows for side in ('i', 'f'))
+      name = f"{t}_on_{exrt}_{event.split()[0].lower()}"
+      sqls.append(f"DROP TRIGGER IF EXISTS {name};")
+      sqls.append(f"""
+      CREATE TRIGGER {name}
+        AFTER {event} ON {exrt}
+      BEGIN{deletes}
+      END;""")
+    return sqls
+
+  def create_table_n_triggers_if_not_exist(self):
+    t = self.tablename
+    with self.conn:
+      self.conn.execute(f"""
+      CREATE TABLE IF NOT EXISTS {t} (
+        protocol TEXT NOT NULL,
+        dt_i date NOT NULL,
+        dt_f date NOT NULL,
+        cpi_seriesid varchar(12),
+        curr_num char(3),
+        curr_den char(3),
+        cpi_refmonth_i date,
+        cpi_refmonth_f date,
+        exr_refdate_i date,
+        exr_refdate_f date,
+        cpi_i real, exr_i real, cpi_f real, exr_f real, mult real, mul1 real,
+        created_at datetime,
+        PRIMARY KEY (protocol, dt_f, dt_i)
+      )""")
+      # the indexes the triggers' DELETEs search (@see make_trigger_sqls)
+      for suffix, cols in (
+          ('cpi_i', 'cpi_seriesid, cpi_refmonth_i'), ('cpi_f', 'cpi_seriesid, cpi_refmonth_f'),
+          ('exr_i', 'curr_num, curr_den, dt_i'), ('exr_f', 'curr_num, curr_den, dt_f')):
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_{suffix} ON {t} ({cols});")
+      for suffix in ('cpi_refmonth_i', 'cpi_refmonth_f', 'dt_i'):  # the former single-column ones
+        self.conn.execute(f"DROP INDEX IF EXISTS {t}_{suffix};")
+      self.is_persistent = self.does_table_exist(self.cpi_tablename) and self.does_table_exist(self.exr_tablename)
+      if self.is_persistent:
+        for sql in self.make_trigger_sqls():
+          self.conn.execute(sql)
+
+  def read_factors(self, strdates_fim: list) -> pd.DataFrame:
+    """
+    The stored factors of this protocol for the given target dates (one query per chunk of them)
+    """
+    frames = []
+    fieldnames = ', '.join(batchcalc.DATAFRAME_COLUMNS)
+    for i in range(0, len(strdates_fim), MAX_PARAMS_PER_QUERY):
+      chunk = strdates_fim[i:i + MAX_PARAMS_PER_QUERY]
+      sql = f"""
+      SELECT {fieldnames} FROM {self.tablename}
+        WHERE
+          protocol = ? and dt_f IN ({', '.join('?' * len(chunk))});
+      """
+      rows = self.conn.execute(sql, [self.protocol] + chunk).fetchall()
+      frames.append(pd.DataFrame(rows, columns=batchcalc.DATAFRAME_COLUMNS))
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=batchcalc.DATAFRAME_COLUMNS)
+    return df.astype({col: float for col in batchcalc.DATAFRAME_COLUMNS if col not in ('dt_i', 'dt_f')})
+
+  def make_calculator(self, datesini, datesfim) -> batchcalc.BatchMonetCorrCalculator:
+    """
+    The indices are reloaded first: a factor missing here may be one its triggers just deleted
+      (a full reload, unlike refresh_from_db(), also sees deleted quotes)
+    A day without an as-of quote has the exchange-rate gaps synced (then the index reloaded) before computing
+    """
+    if self.cpi_cache is None:
+      self.cpi_cache = cpicache.get_cpi_cache()
+    self.cpi_cache.invalidate(self.seriesid)
+    if self.exchrate_index is None:
+      self.exchrate_index = exridx.get_exchrate_index()
+    self.exchrate_index.load_from_db(self.conn)
+    all_days = np.concatenate((np.atleast_1d(datesini), np.atleast_1d(datesfim)))
+    if (batchcalc.lookup_asof_positions(self.exchrate_index, all_days) < 0).any():
+      self.exrate_syncer(self.currency_pair)
+      self.n_syncs += 1
+      self.exchrate_index.load_from_db(self.conn)
+    return batchcalc.BatchMonetCorrCalculator(
+      datesini, datesfim, self.cpi_month_shift, self.cpi_cache, self.exchrate_index, self.seriesid
+    )
+
+  def find_asof_quote_days(self, days: np.ndarray) -> np.ndarray:
+    """
+    The day of the quote each day takes as-of (NaT if none): the exchange-rate row the factor depends on
+    """
+    positions = batchcalc.lookup_asof_positions(self.exchrate_index, days)
+    quote_ordinals = np.asarray(self.exchrate_index.ordinals, dtype=np.int64)
+    out = np.full(days.shape, np.datetime64('NaT'), dtype='datetime64[D]')
+    found = positions >= 0
+    out[found] = (quote_ordinals[positions[found]] - batchcalc.ORDINAL_OF_EPOCH).astype('datetime64[D]')
+    return out
+
+  def compute_n_store(self, days_ini: np.ndarray, days_fim: np.ndarray) -> pd.DataFrame:
+    calc = self.make_calculator(days_ini, days_fim)
+    df = calc.df
+    self.n_computed += len(df)
+    if not self.is_persistent:
+      return df
+    months_ini = (days_ini.astype('datetime64[M]') - self.cpi_month_shift).astype('datetime64[D]')
+    months_fim = (days_fim.astype('datetime64[M]') - self.cpi_month_shift).astype('datetime64[D]')
+    refdates_ini, refdates_fim = self.find_asof_quote_days(days_ini), self.find_asof_quote_days(days_fim)
+    curr_num, curr_den = self.currency_pair
+    now = str(datetime.datetime.now())
+    n = len(df)
+    columns = [
+      [self.protocol] * n, to_strdates(days_ini), to_strdates(days_fim), [self.seriesid] * n,
+      [curr_num] * n, [curr_den] * n, to_strdates(months_ini), to_strdates(months_fim),
+      to_strdates(refdates_ini), to_strdates(refdates_fim),
+    ] + [
+      [None if np.isnan(v) else v for v in df[col].tolist()]
+      for col in ('cpi_i', 'exr_i', 'cpi_f', 'exr_f', 'mult', 'mul1')
+    ] + [[now] * n]
+    sql = f"""
+    INSERT OR REPLACE INTO {self.tablename} ({', '.join(FACTOR_FIELDNAMES)})
+      VALUES ({', '.join('?' * len(FACTOR_FIELDNAMES))});
+    """
+    with self.conn:
+      self.conn.executemany(sql, zip(*columns))
+    return df
+
+  def get_factors_df(self, datesini, datesfim=None) -> pd.DataFrame:
+    """
+    The DATAFRAME_COLUMNS frame (row i for datesini[i]): stored factors read in bulk, missing ones computed & stored
+    """
+    days_ini, days_fim = batchcalc.treat_dates_ini_n_fim(datesini, datesfim)
+    strdates_ini, strdates_fim = to_strdates(days_ini), to_strdates(days_fim)
+    wanted = pd.DataFrame({'dt_i': strdates_ini, 'dt_f': strdates_fim})
+    pairs = wanted.drop_duplicates(ignore_index=True)
+    stored = self.read_factors(sorted(set(strdates_fim))) if self.is_persistent else None
+    if stored is not None and len(stored) > 0:
+      stored['dt_i'], stored['dt_f'] = stored['dt_i'].astype(str), stored['dt_f'].astype(str)
+      found = pairs.merge(stored, on=['dt_i', 'dt_f'], how='inner')
+    else:
+      found = pd.DataFrame(columns=batchcalc.DATAFRAME_COLUMNS)
+    self.n_read += len(found)
+    missing = pairs.merge(found[['dt_i', 'dt_f']], on=['dt_i', 'dt_f'], how='left', indicator=True)
+    missing = missing[missing['_merge'] == 'left_only']
+    frames = [found[batchcalc.DATAFRAME_COLUMNS]] if len(found) > 0 else []
+    if len(missing) > 0:
+      computed = self.compute_n_store(
+        missing['dt_i'].to_numpy().astype('datetime64[D]'), missing['dt_f'].to_numpy().astype('datetime64[D]')
+      )
+      computed['dt_i'] = to_strdates(missing['dt_i'].to_numpy().astype('datetime64[D]'))
+      computed['dt_f'] = to_strdates(missing['dt_f'].to_numpy().astype('datetime64[D]'))
+      frames.append(computed)
+    factors = pd.concat(frames, ignore_index=True)
+    df = wanted.merge(factors, on=['dt_i', 'dt_f'], how='left')[batchcalc.DATAFRAME_COLUMNS]
+    df['dt_i'] = days_ini.astype(object)  # datetime.date's, as in MonetCorrCalculator.df
+    df['dt_f'] = days_fim.astype(object)
+    return df
+
+  def clear(self):
+    with self.conn:
+      self.conn.execute(f"DELETE FROM {self.tablename} WHERE protocol = ?;", (self.protocol,))
+
+  def count_rows(self) -> int:
+    sql = f"SELECT count(*) FROM {self.tablename} WHERE protocol = ?;"
+    return self.conn.execute(sql, (self.protocol,)).fetchone()[0]
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    protocol = [{self.protocol}] | persistent = {self.is_persistent} | rows = {self.count_rows()}
+    factors read = {self.n_read} | factors computed = {self.n_computed} | exchange-rate syncs = {self.n_syncs}
+    """
+    return outstr
+
+
+def adhoctest():
+  table = MonetCorrFactorTable()
+  print(table.get_factors_df(['2023-04-28', '2023-06-01'], '2023-12-05').to_string())
+  print(table)
+
+
+def process():
+  pass
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
@@ -64,15 +64,27 @@ import fs.datefs.introspect_dates as intr  # for make_refmonth_date_from_str
 """
 import copy
 import datetime
+import math
 import pandas as pd
 from dateutil.relativedelta import relativedelta
 import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
 import lib.indices.bcb_br.bcb_cotacao_fetcher_from_db_or_api as ftchr  # ftchr.BCBCotacaoFetcher
-import commands.fetch.bls_us.read_cpis_from_db_fs as cpi  # cpi_us.get_cpi_baselineindex_for_refmonth_in_db
-DATAFRAME_COLUMNS = ['dt_i', 'cpi_i', 'exr_i', 'dt_f', 'cpi_f', 'exr_f', 'mult', 'mul1']
+import lib.indices.bls_us.bls_cpi_month_array_cache_cls as cpicache  # cpicache.get_cpi_cache().cpi_at()
+import art.budgetings.calc.batch_monet_corr_calc as batchcalc  # for many dates: batchcalc.BatchMonetCorrCalculator
+DATAFRAME_COLUMNS = batchcalc.DATAFRAME_COLUMNS
 DECIMAL_PLACES_FOR_EQ = 4
 
 
+def get_cached_cpi_on_refmonth_or_none(refmonthdate):
+  """
+  The CPI from the in-memory month array (@see bls_cpi_month_array_cache_cls.py): no db query after the warm-up
+    Its source is table bls_us_indices (acc_index), not the baselineindex of idxind_monthly_indices
+    the former read_cpis_from_db_fs helper read
+  """
+  cpi_value = cpicache.get_cpi_cache().cpi_at([refmonthdate])[0]
+  return None if math.isnan(cpi_value) else float(cpi_value)
+
+
 class MonetCorrCalculator:
   def __init__(self, dateini, datefim, rowindexfordf=0, cpi_ini=None, cpi_fim=None, exrate_ini=None, exrate_fim=None):
     self.rowindexfordf = rowindexfordf
@@ -177,7 +189,7 @@ class MonetCorrCalculator:
   @property
   def cpi_ini(self):
     if self._cpi_ini is None:
-      self._cpi_ini = cpi.get_cpi_baselineindex_for_refmonth_in_db(self.dateini_m2)
+      self._cpi_ini = get_cached_cpi_on_refmonth_or_none(self.dateini_m2)
       if self._cpi_ini is None:
         return None
     return self._cpi_ini
@@ -185,7 +197,7 @@ class MonetCorrCalculator:
   @property
   def cpi_fim(self):
     if self._cpi_fim is None:
-      self._cpi_fim = cpi.get_cpi_baselineindex_for_refmonth_in_db(self.datefim_m2)
+      self._cpi_fim = get_cached_cpi_on_refmonth_or_none(self.datefim_m2)
       if self._cpi_fim is None:
         return None
     return self._cpi_fim
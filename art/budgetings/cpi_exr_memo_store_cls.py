@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+art/budgetings/cpi_exr_memo_store_cls.py
+  Contains class CpiExrMemoStore: a small sqlite file (in the data folder's cache subfolder) that keeps,
+    across runs, the (cpi, exr) pairs CorrMonetWithinDatesCalculator fetches per date
+    (@see monecorr_n_indices_from_dates_calculator.py, its cpi_exr_per_date_dict)
+
+  An entry is keyed by (date, refmonth_minus_n). The topdate is not part of the key:
+    a date's cpi & exchange rate don't depend on it, and a daily rerun (a new topdate every day)
+    would otherwise miss every entry.
+
+  Freshness follows the data, not the clock alone:
+    => only complete pairs are stored (a date whose cpi is not yet published or whose quote is not yet
+       available is fetched again on the next run)
+    => a pair stored when its date was more than recent_days (default 3) in the past is settled:
+       its cpi month is published & its quote is final, so it is kept indefinitely
+    => a pair of a recent date (its quote or cpi may still be revised) expires ttl_in_sec after it was stored
+       (default 6 hours)
+  Size:
+    => at most max_entries rows; beyond that, the least recently used ones are evicted
+       (a hit renews an entry's last-used time)
+
+  Reads are in bulk (preload() takes all the run's dates in one query per chunk) and writes
+    (new entries & last-used times) are buffered until flush().
+
+  Example:
+    memo = CpiExrMemoStore()
+    memo.preload(dates, 1)
+    pair = memo.get(date, 1)  # (cpi, exr) or None
+    memo.put(date, 1, cpi, exr)
+    memo.flush()
+"""
+import datetime
+import os
+import sqlite3
+import time
+import settings as sett
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+MEMO_TABLENAME = 'cpi_exr_memo'
+MEMO_FILENAME = 'cpi_exr_memo.sqlite'
+CACHE_FOLDERNAME = 'cache'
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_RECENT_DAYS = 3
+DEFAULT_TTL_IN_SEC = 6 * 60 * 60  # for the pairs of recent dates only
+MAX_PARAMS_PER_QUERY = 500  # below sqlite's default limit of host parameters
+
+
+class CpiExrMemoStore:
+
+  tablename = MEMO_TABLENAME
+
+  def __init__(
+      self,
+      filepath: str | None = None,
+      max_entries: int | None = None,
+      ttl_in_sec: float | None = None,
+      recent_days: int | None = None,
+      clock=None,
+    ):
+    self.filepath = filepath
+    self.max_entries = max_entries
+    self.ttl_in_sec = ttl_in_sec
+    self.recent_days = recent_days
+    self.clock = clock or time.time  # wall-clock: the entries outlive the process
+    self.conn = None
+    self.n_hits = 0
+    self.n_misses = 0
+    self._entry_per_key = {}  # (strdate, refmonth_minus_n) -> (cpi, exr, stored_at)
+    self._puts = {}
+    self._touches = set()
+    self.treat_attrs()
+    self.open()
+
+  def treat_attrs(self):
+    if self.filepath is None:
+      self.filepath = os.path.join(sett.get_datafolder_abspath(), CACHE_FOLDERNAME, MEMO_FILENAME)
+    if self.max_entries is None or self.max_entries < 1:
+      self.max_entries = DEFAULT_MAX_ENTRIES
+    if self.ttl_in_sec is None or self.ttl_in_sec < 0:
+      self.ttl_in_sec = DEFAULT_TTL_IN_SEC
+    if self.recent_days is None or self.recent_days < 0:
+      self.recent_days = DEFAULT_RECENT_DAYS
+
+  def open(self):
+    if self.filepath != ':memory:':
+      os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+    self.conn = sqlite3.connect(self.filepath)
+    with self.conn:
+      self.conn.execute(f"""
+      CREATE TABLE IF NOT EXISTS {self.tablename} (
+        refdate date NOT NULL,
+        refmonth_minus_n int NOT NULL,
+        cpi real NOT NULL,
+        exr real NOT NULL,
+        stored_at real NOT NULL,
+        used_at real NOT NULL,
+        PRIMARY KEY (refdate, refmonth_minus_n)
+      )""")
+      self.conn.execute(f"CREATE INDEX IF NOT EXISTS {self.tablename}_used_at ON {self.tablename} (used_at);")
+
+  @staticmethod
+  def make_key(pdate, refmonth_minus_n: int) -> tuple[str, int] | None:
+    pdate = cnv.make_date_or_none(pdate)
+    return None if pdate is None else (str(pdate), int(refmonth_minus_n))
+
+  def is_settled(self, strdate: str, stored_at: float) -> bool:
+    """
+    Whether the pair was stored when its date was no longer recent (then it's final)
+    """
+    stored_on = datetime.date.fromtimestamp(stored_at)
+    return (stored_on - datetime.date.fromisoformat(strdate)).days > self.recent_days
+
+  def is_fresh(self, strdate: str, stored_at: float) -> bool:
+    return self.is_settled(strdate, stored_at) or self.clock() - stored_at < self.ttl_in_sec
+
+  def preload(self, pdates, refmonth_minus_n: int) -> int:
+    """
+    Reads the fresh entries of pdates in bulk, returning how many were found
+    """
+    strdates = sorted({key[0] for key in (self.make_key(d, refmonth_minus_n) for d in pdates) if key is not None})
+    n_found = 0
+    for i in range(0, len(strdates), MAX_PARAMS_PER_QUERY):
+      chunk = strdates[i:i + MAX_PARAMS_PER_QUERY]
+      sql = f"""
+      SELECT refdate, cpi, exr, stored_at FROM {self.tablename}
+        WHERE
+          refmonth_minus_n = ? and refdate IN ({', '.join('?' * len(chunk))});
+      """
+      for strdate, cpi, exr, stored_at in self.conn.execute(sql, [int(refmonth_minus_n)] + chunk):
+        if self.is_fresh(strdate, stored_at):
+          self._entry_per_key[(strdate, int(refmonth_minus_n))] = (cpi, exr, stored_at)
+          n_found += 1
+    return n_found
+
+  def get(self, pdate, refmonth_minus_n: int) -> tuple[float, float] | None:
+    """
+    The memoized (cpi, exr) of pdate or None (missing or expired)
+    """
+    key = self.make_key(pdate, refmonth_minus_n)
+    if key is None:
+      return None
+    if key not in self._entry_per_key:
+      sql = f"SELECT cpi, exr, stored_at FROM {self.tablename} WHERE refdate = ? and refmonth_minus_n = ?;"
+      row = self.conn.execute(sql, key).fetchone()
+      if row is not None:
+        self._entry_per_key[key] = row
+    entry = self._entry_per_key.get(key)
+    if entry is None or not self.is_fresh(key[0], entry[2]):
+      self.n_misses += 1
+      return None
+    self.n_hits += 1
+    self._touches.add(key)
+    return entry[0], entry[1]
+
+  def put(self, pdate, refmonth_minus_n: int, cpi, exr):
+    """
+    Memoizes a complete pair only (a missing cpi or exchange rate is to be fetched again)
+    """
+    key = self.make_key(pdate, refmonth_minus_n)
+    if key is None or cpi is None or not exr:
+      return
+    entry = (float(cpi), float(exr), self.clock())
+    self._entry_per_key[key] = entry
+    self._puts[key] = entry
+
+  def flush(self):
+    """
+    Writes the buffered entries & last-used times, then drops the expired (not settled) entries
+      and the least recently used ones beyond max_entries
+    """
+    now = self.clock()
+    with self.conn:
+      self.conn.executemany(
+        f"INSERT OR REPLACE INTO {self.tablename} VALUES (?, ?, ?, ?, ?, ?);",
+        [(strdate, n, cpi, exr, stored_at, now) for (strdate, n), (cpi, exr, stored_at) in self._puts.items()]
+      )
+      self.conn.executemany(
+        f"UPDATE {self.tablename} SET used_at = ? WHERE refdate = ? and refmonth_minus_n = ?;",
+        [(now, strdate, n) for strdate, n in self._touches - self._puts.keys()]
+      )
+      self.conn.execute(f"""
+      DELETE FROM {self.tablename} WHERE
+        stored_at <= ? and
+        julianday(date(stored_at, 'unixepoch', 'localtime')) - julianday(refdate) <= ?;
+      """, (now - self.ttl_in_sec, self.recent_days))
+      self.conn.execute(f"""
+      DELETE FROM {self.tablename} WHERE rowid IN (
+        SELECT rowid FROM {self.tablename} ORDER BY used_at DESC LIMIT -1 OFFSET ?
+      );""", (self.max_entries,))
+    self._puts.clear()
+    self._touches.clear()
+
+  def count_rows(self) -> int:
+    return self.conn.execute(f"SELECT count(*) FROM {self.tablename};").fetchone()[0]
+
+  def close(self):
+    if self.conn is not None:
+      self.flush()
+      self.conn.close()
+      self.conn = None
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    file = [{self.filepath}] | rows = {self.count_rows() if self.conn is not None else '(closed)'}
+    max entries = {self.max_entries} | recent days = {self.recent_days}
+    ttl (recent dates) = {datetime.timedelta(seconds=self.ttl_in_sec)}
+    hits = {self.n_hits} | misses = {self.n_misses}
+    """
+    return outstr
+
+
+def adhoctest():
+  memo = CpiExrMemoStore(filepath=':memory:')
+  memo.put('2023-04-28', 1, 301.836, 5.0007)
+  memo.flush()
+  print(memo.get('2023-04-28', 1), memo.get('2023-04-27', 1))
+  print(memo)
+
+
+def process():
+  memo = CpiExrMemoStore()
+  print(memo)
+  memo.close()
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
@@ -31,6 +31,10 @@ In datafile.dat:
 EOF
 
 The output will be the money correcting/updating indices
+
+The (cpi, exr) pairs fetched per date are also kept across runs in a memo store
+  (@see art/budgetings/cpi_exr_memo_store_cls.py), so that a daily rerun over the same datesfile
+  fetches only the dates it hasn't seen (or whose memo entries have expired)
 """
 from collections import namedtuple
 import datetime
@@ -41,6 +45,7 @@ import lib.indices.bcb_br.bcb_cotacao_fetcher_from_db_or_api as bcbfetch  # bcbf
 import lib.datefs.introspect_dates as idt  # idt.for make_date_or_none()
 import lib.datefs.refmonths_mod as rfm  # rfm.calc_refmonth_minus_n()
 import lib.datefs.read_write_datelist_files_fs as rwdt
+import art.budgetings.cpi_exr_memo_store_cls as memost  # memost.CpiExrMemoStore
 import commands.fetch.bls_us.read_cpis_from_db as ftcpi  # ftcpi.get_cpi_baselineindex_for_refmonth_m2_in_db
 from prettytable import PrettyTable
 DEFAULT_DATESFILENAME = 'datesfile.dat'
@@ -60,8 +65,9 @@ def get_dates_from_strdates_file():
 
 
 class CorrMonetWithinDatesCalculator:
-  def __init__(self, topdate=None, allow_cpi_fallback_to_m_minus_2=False):
+  def __init__(self, topdate=None, allow_cpi_fallback_to_m_minus_2=False, memo_store=None):
     self.allow_cpi_fallback_to_m_minus_2 = allow_cpi_fallback_to_m_minus_2
+    self.memo_store = memo_store  # a memost.CpiExrMemoStore (None: no memo across runs)
     self.topdate = idt.make_date_or_none(topdate)
     self.topdate = datetime.date.today() if self.topdate is None else self.topdate
     self.workdates = []
@@ -191,6 +197,12 @@ class CorrMonetWithinDatesCalculator:
     if pdate is None:
       errmsg = 'pdate is not a valid date (None) is add_cpi_n_exr_on_date()'
       raise ValueError(errmsg)
+    memoized = None if self.memo_store is None else self.memo_store.get(pdate, self.refmonth_minus_n)
+    if memoized is not None:
+      cpi, exr = memoized
+      self.cpi_exr_per_date_dict[pdate] = nt_cpi_n_exr(cpi=cpi, exr=exr)
+      return
+    is_fallback = False
     cpi = ftcpi.get_cpi_baselineindex_for_refmonth_in_db(pdate)
     # exr = self.get_exrate_sellquote_w_date_n_currencypair(pdate)
     if cpi is None:
@@ -198,10 +210,14 @@ class CorrMonetWithinDatesCalculator:
         # consider M-2 instead of M-1
         self.refmonth_minus_n = 2
         cpi = ftcpi.get_cpi_baselineindex_for_refmonth_in_db(self.m_minus_2_refmonthdate)
+        is_fallback = True
     exr = self.get_exchangerate_via_bcb_on(pdate)
     exr = 0.0 if exr is None else exr
     nt_cpi_n_exr_o = nt_cpi_n_exr(cpi=cpi, exr=exr)
     self.cpi_exr_per_date_dict[pdate] = nt_cpi_n_exr_o
+    if self.memo_store is not None and not is_fallback:
+      # a fallback cpi is the topdate's M-2, not pdate's own: it's not memoized
+      self.memo_store.put(pdate, self.refmonth_minus_n, cpi, exr)
 
   def get_triple_cpivar_cpiini_cpifim_on_date(self, pdate):
     cpi_i = self.get_n_store_cpi_according_to_minus_n_refmonth(pdate)
@@ -308,9 +324,13 @@ class CorrMonetWithinDatesCalculator:
   def process_datesfile(self):
     self.workdates = get_dates_from_strdates_file()
     self.workdates = sorted(set(self.workdates))
+    if self.memo_store is None:
+      self.memo_store = memost.CpiExrMemoStore()
+    self.memo_store.preload(self.workdates + [self.topdate], self.refmonth_minus_n)
     for pdate in self.workdates:
       self.add_cpi_n_exr_on_date(pdate)
     self.process()
+    self.memo_store.flush()
 
   def process(self):
     output_list = []
@@ -344,6 +364,7 @@ class CorrMonetWithinDatesCalculator:
     outstr = f"""{self.__class__.__name__}  refmonth_minus_n={self.refmonth_minus_n}
     final exchange date = {self.topdate} | fallback_to_m2 = {self.allow_cpi_fallback_to_m_minus_2}
     final_cpi_refmonth = {self.cpi_refmonth} | dates processed = {self.size}
+    memo hits = {self.memo_store.n_hits if self.memo_store else 0} | memo misses = {self.memo_store.n_misses if self.memo_store else 0}
     {self.workdates}
     """
     return outstr
@@ -5,7 +5,7 @@ models/geoplaces/ceps_via_awesomeapi.py
 
 https://docs.awesomeapi.com.br/api-cep
 """
-import requests
+import lib.netfs.retry_scheduler as retsch
 import lib.textfs.strfs as sfs
 CEP_TEST = '20550045'
 
@@ -27,7 +27,7 @@ class CepViaAwesomeApi:
       print(scrmsg)
       return None
     url = self.API_URL_TO_INTERPOL_W_CEP.format(cep=cep)
-    res = requests.get(url)
+    res = retsch.request_with_retry('GET', url)
     if res.status_code == 200:
       self.n_statuscode_200 += 1
       json_r = res.json()
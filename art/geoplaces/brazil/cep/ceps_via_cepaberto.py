@@ -31,6 +31,7 @@ Exemplos de uso, em várias linguagens *, no repo git abaixo:
 """
 import json
 import requests
+import lib.netfs.retry_scheduler as retsch
 import lib.textfs.strfs as sfs
 import settings as sett
 
@@ -113,7 +114,7 @@ class CepViaCepAberto:
     headers = {'Authorization': f'Token token={sett.CEPABERTO_API_TOKEN}'}
     print('Accessing API', url)
     try:
-      response = requests.get(url, headers=headers)
+      response = retsch.request_with_retry('GET', url, headers=headers)
       json_o = response.json()
       self.n_statuscode_200 += 1
       return json_o
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+art/inflmeas/bcb_br/dataverif/adhoctests/test_verif_quotes_repeat_in_seq.py
+  unit-tests for QuoteSeriesVerifier over an in-memory sqlite db
+    (the repeat, inversion, jump & missing-day checks and a whole-history timing)
+"""
+import datetime
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+import lib.indices.bcb_br.bcb_business_calendar_cls as bizcal
+import art.inflmeas.bcb_br.dataverif.verif_quotes_repeat_in_seq as verif
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.calendar = bizcal.BcbBusinessCalendar(
+      horizon_date='2025-12-31', calendar_filepath=os.path.join(self.tmpdir.name, 'calendar.json')
+    )
+    self.conn = sqlite3.connect(':memory:')
+    self.conn.execute("""CREATE TABLE currencies_exchangerates (
+      id INTEGER PRIMARY KEY, curr_num char(3), curr_den char(3), buypriceint INTEGER, sellpriceint INTEGER,
+      refdate DATE, quotestime TIME, created_at timestamp, updated_at timestamp)""")
+
+  def tearDown(self):
+    self.conn.close()
+    self.tmpdir.cleanup()
+
+  def insert(self, pdate, buyint, sellint, curr_den='USD'):
+    self.conn.execute(
+      "INSERT INTO currencies_exchangerates (curr_num, curr_den, buypriceint, sellpriceint, refdate) "
+      "VALUES ('BRL', ?, ?, ?, ?)", (curr_den, buyint, sellint, str(pdate)))
+
+  def make_verifier(self):
+    return verif.QuoteSeriesVerifier(business_calendar=self.calendar, conn=self.conn)
+
+  def test_1_each_check_is_flagged(self):
+    rows = [
+      ('2024-01-02', 49000, 49010),
+      ('2024-01-03', 49100, 49110),
+      ('2024-01-04', 49100, 49110),  # repeat
+      ('2024-01-05', 49200, 49150),  # inversion
+      # 2024-01-08 missing
+      ('2024-01-09', 56000, 56010),  # jump
+      ('2024-01-10', 56100, 56110),
+    ]
+    for pdate, buyint, sellint in rows:
+      self.insert(pdate, buyint, sellint)
+    self.insert('2024-01-01', None, None)  # a holliday row is neither a quote nor a missing day
+    self.insert('2024-01-03', 10000, 10000, curr_den='EUR')  # another pair is not read
+    verifier = self.make_verifier()
+    findings = verifier.verify()
+    expected = [
+      (datetime.date(2024, 1, 4), verif.CHECK_REPEAT),
+      (datetime.date(2024, 1, 5), verif.CHECK_INVERSION),
+      (datetime.date(2024, 1, 8), verif.CHECK_MISSING),
+      (datetime.date(2024, 1, 9), verif.CHECK_JUMP),
+    ]
+    self.assertEqual(expected, [(f.refdate, f.check) for f in findings])
+    counts = verifier.count_per_check()
+    self.assertEqual({'repeat': 1, 'inversion': 1, 'jump': 1, 'missing': 1}, counts)
+    self.assertEqual(7, verifier.size)
+    self.assertEqual(4.92, findings[1].buyprice)
+    self.assertIn('2024-01-08 | missing', str(verifier))
+
+  def test_2_empty_series(self):
+    verifier = self.make_verifier()
+    self.assertEqual([], verifier.verify())
+    self.assertEqual(0, verifier.count_per_check()[verif.CHECK_MISSING])
+
+  def test_3_whole_history_is_audited_fast(self):
+    bdays = self.calendar.business_day_ordinals_between('2000-01-03', '2024-12-31')
+    buyints = 20000 + (bdays - bdays[0]) % 997
+    self.conn.executemany(
+      "INSERT INTO currencies_exchangerates (curr_num, curr_den, buypriceint, sellpriceint, refdate) "
+      "VALUES ('BRL', 'USD', ?, ?, ?)",
+      [(int(b), int(b) + 10, str(datetime.date.fromordinal(int(o)))) for o, b in zip(bdays, buyints)]
+    )
+    verifier = self.make_verifier()
+    start = time.perf_counter()
+    verifier.verify()
+    self.assertLess(time.perf_counter() - start, 1.0)
+    self.assertEqual(bdays.size, verifier.size)
+    self.assertEqual(0, verifier.count_per_check()[verif.CHECK_MISSING])
+
+
+if __name__ == '__main__':
+  unittest.main()
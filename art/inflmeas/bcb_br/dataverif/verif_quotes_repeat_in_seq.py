@@ -1,16 +1,220 @@
 #!/usr/bin/env python3
 """
 verif_quotes_repeat_in_seq.py
-  This script lists out all quotes have the same value at
+  This script lists out the suspicious quotes of a currency pair series (default BRL/USD)
+    by auditing its whole history (as stored in table currencies_exchangerates) at once.
+
+  The series is read with one SELECT into NumPy arrays and each check is a vectorized mask:
+    => repeat: buy & sell are the same as on the previous quoted day (eg a copy-paste or a stale API answer)
+    => inversion: buy > sell
+    => jump: the buy price changed, day over day, by more than jump_threshold (a fraction, default 5%)
+    => missing: a business day (@see bcb_business_calendar_cls.py) in the series' date range without a row
+       (hollidays are rows with null prices, so they are not missing)
+
+  The result is a report table (one VerifFinding per flagged day & check) sorted by date.
+
+  Example:
+    verifier = QuoteSeriesVerifier()
+    verifier.verify()
+    print(verifier)  # the counts per check & the report table
 """
+import collections as coll
+import datetime
+import time
+import numpy as np
+import settings as sett
+import art.inflmeas.bcb_br.classes as pkg  # pkg.EXCHRATE_DBTABLENAME, pkg.n_decplaces_for_div_intprices
+import lib.indices.bcb_br.bcb_business_calendar_cls as bizcal
+VerifFinding = coll.namedtuple('VerifFinding', 'refdate check buyprice sellprice detail')
+CHECK_REPEAT = 'repeat'
+CHECK_INVERSION = 'inversion'
+CHECK_JUMP = 'jump'
+CHECK_MISSING = 'missing'
+CHECKS = [CHECK_REPEAT, CHECK_INVERSION, CHECK_JUMP, CHECK_MISSING]
+DEFAULT_JUMP_THRESHOLD = 0.05
+INTPRICE_DIVISOR = 10 ** pkg.n_decplaces_for_div_intprices
+
+
+class QuoteSeriesVerifier:
+
+  tablename = pkg.EXCHRATE_DBTABLENAME
+
+  def __init__(
+      self,
+      curr_num: str | None = None,
+      curr_den: str | None = None,
+      jump_threshold: float | None = None,
+      business_calendar: bizcal.BcbBusinessCalendar | None = None,
+      conn=None,
+    ):
+    self.curr_num = curr_num or pkg.DEFAULT_CURR_NUM
+    self.curr_den = curr_den or pkg.DEFAULT_CURR_DEN
+    self.jump_threshold = jump_threshold
+    self.business_calendar = business_calendar
+    self.conn = conn
+    # the series: one entry per stored row, price 0 & is_null True for the holliday rows
+    self.ordinals = np.empty(0, dtype=np.int64)
+    self.buyints = np.empty(0, dtype=np.int64)
+    self.sellints = np.empty(0, dtype=np.int64)
+    self.is_null = np.empty(0, dtype=bool)
+    self.masks = {}
+    self.missing_ordinals = np.empty(0, dtype=np.int64)
+    self.findings = []
+    self.elapsed_in_sec = 0.0
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.jump_threshold is None:
+      self.jump_threshold = DEFAULT_JUMP_THRESHOLD
+    if self.business_calendar is None:
+      self.business_calendar = bizcal.get_business_calendar()
+
+  @property
+  def size(self) -> int:
+    return self.ordinals.size
+
+  def load_arrays(self, ordinals, buyints, sellints):
+    """
+    Sets the series from parallel sequences (None prices meaning a holliday row), sorting them by date
+    """
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    buy_objs = np.asarray(buyints, dtype=object)
+    sell_objs = np.asarray(sellints, dtype=object)
+    is_null = np.equal(buy_objs, None) | np.equal(sell_objs, None)
+    order = np.argsort(ordinals, kind='stable')
+    self.ordinals = ordinals[order]
+    self.is_null = is_null[order]
+    self.buyints = np.where(is_null, 0, buy_objs).astype(np.int64)[order]
+    self.sellints = np.where(is_null, 0, sell_objs).astype(np.int64)[order]
+
+  def load_from_db(self):
+    close_conn = self.conn is None
+    conn = sett.get_sqlite_connection() if self.conn is None else self.conn
+    sql = f"""
+    SELECT julianday(refdate), buypriceint, sellpriceint FROM {self.tablename}
+      WHERE
+        curr_num = ? and curr_den = ?
+      ORDER BY
+        refdate;
+    """
+    try:
+      rows = conn.execute(sql, (self.curr_num, self.curr_den)).fetchall()
+    finally:
+      if close_conn:
+        conn.close()
+    if len(rows) == 0:
+      self.load_arrays([], [], [])
+      return
+    julians, buyints, sellints = zip(*rows)
+    # julian day 1721425.5 is 0001-01-01 00:00, ie ordinal 1
+    ordinals = np.asarray(julians, dtype=np.float64) - 1721424.5
+    self.load_arrays(np.rint(ordinals), buyints, sellints)
+
+  def calc_masks(self):
+    """
+    Computes, over the quoted days (the non-null rows), one boolean mask per price check
+    """
+    quoted = ~self.is_null
+    buy, sell = self.buyints[quoted], self.sellints[quoted]
+    repeat = np.zeros(buy.size, dtype=bool)
+    jump = np.zeros(buy.size, dtype=bool)
+    if buy.size > 1:
+      repeat[1:] = (buy[1:] == buy[:-1]) & (sell[1:] == sell[:-1])
+      with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.abs(buy[1:] / buy[:-1] - 1.0)
+      jump[1:] = np.nan_to_num(change, nan=0.0, posinf=np.inf) > self.jump_threshold
+    self.masks = {
+      CHECK_REPEAT: repeat,
+      CHECK_INVERSION: buy > sell,
+      CHECK_JUMP: jump,
+    }
+    return self.masks
+
+  def calc_missing_ordinals(self):
+    """
+    The business days in [first row, last row] that have no row at all
+    """
+    if self.size == 0:
+      self.missing_ordinals = np.empty(0, dtype=np.int64)
+      return self.missing_ordinals
+    first = datetime.date.fromordinal(int(self.ordinals[0]))
+    last = datetime.date.fromordinal(int(self.ordinals[-1]))
+    bdays = self.business_calendar.business_day_ordinals_between(first, last)
+    self.missing_ordinals = np.setdiff1d(bdays, self.ordinals)
+    return self.missing_ordinals
+
+  def make_findings(self):
+    quoted = ~self.is_null
+    q_ordinals, buy, sell = self.ordinals[quoted], self.buyints[quoted], self.sellints[quoted]
+    findings = []
+    for check, mask in self.masks.items():
+      for i in np.flatnonzero(mask):
+        if check == CHECK_REPEAT:
+          detail = f"same as {datetime.date.fromordinal(int(q_ordinals[i - 1]))}"
+        elif check == CHECK_JUMP:
+          detail = f"{buy[i] / buy[i - 1] - 1:+.2%} from {datetime.date.fromordinal(int(q_ordinals[i - 1]))}"
+        else:
+          detail = f"buy exceeds sell by {(buy[i] - sell[i]) / INTPRICE_DIVISOR}"
+        findings.append(VerifFinding(
+          refdate=datetime.date.fromordinal(int(q_ordinals[i])), check=check,
+          buyprice=buy[i] / INTPRICE_DIVISOR, sellprice=sell[i] / INTPRICE_DIVISOR, detail=detail
+        ))
+    for ordinal in self.missing_ordinals:
+      findings.append(VerifFinding(
+        refdate=datetime.date.fromordinal(int(ordinal)), check=CHECK_MISSING,
+        buyprice=None, sellprice=None, detail='business day without a row'
+      ))
+    findings.sort(key=lambda f: (f.refdate, CHECKS.index(f.check)))
+    self.findings = findings
+    return findings
+
+  def verify(self, reload: bool = True) -> list[VerifFinding]:
+    """
+    Runs all checks (reading the series from the db unless reload=False), returning the report table
+    """
+    start = time.perf_counter()
+    if reload:
+      self.load_from_db()
+    self.calc_masks()
+    self.calc_missing_ordinals()
+    self.make_findings()
+    self.elapsed_in_sec = time.perf_counter() - start
+    return self.findings
+
+  def count_per_check(self) -> dict:
+    counts = {check: int(np.count_nonzero(mask)) for check, mask in self.masks.items()}
+    counts[CHECK_MISSING] = int(self.missing_ordinals.size)
+    return counts
+
+  def gen_report_lines(self):
+    yield f"{'refdate':<10} | {'check':<9} | {'buy':>9} | {'sell':>9} | detail"
+    for f in self.findings:
+      buy = '' if f.buyprice is None else f'{f.buyprice:.4f}'
+      sell = '' if f.sellprice is None else f'{f.sellprice:.4f}'
+      yield f"{str(f.refdate):<10} | {f.check:<9} | {buy:>9} | {sell:>9} | {f.detail}"
+
+  def __str__(self):
+    date_ini = datetime.date.fromordinal(int(self.ordinals[0])) if self.size > 0 else None
+    date_fim = datetime.date.fromordinal(int(self.ordinals[-1])) if self.size > 0 else None
+    report = '\n'.join(self.gen_report_lines())
+    outstr = f"""{self.__class__.__name__}
+    currency pair = {self.curr_num}/{self.curr_den} | rows = {self.size} | from {date_ini} to {date_fim}
+    jump threshold = {self.jump_threshold:.2%} | counts = {self.count_per_check()}
+    elapsed = {self.elapsed_in_sec:.3f}s
+{report}
+    """
+    return outstr
 
 
-def read_from_start():
-  pass
+def read_from_start(curr_num=None, curr_den=None, jump_threshold=None) -> QuoteSeriesVerifier:
+  verifier = QuoteSeriesVerifier(curr_num, curr_den, jump_threshold)
+  verifier.verify()
+  return verifier
 
 
 def process():
-  pass
+  verifier = read_from_start()
+  print(verifier)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+art/inflmeas/bcb_br/fetch/remote/adhoctests/test_db_retrieve_bcbexchangerates.py
+  unit-tests for BCBExchangeRatesRetriever's array backing over an in-memory sqlite db
+    (searchsorted range slices as views, the dict output & the no-copy DataFrame)
+"""
+import datetime
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import art.inflmeas.bcb_br.fetch.remote.db_retrieve_bcbexchangerates as retr
+
+
+class InMemoryRetriever(retr.BCBExchangeRatesRetriever):
+
+  def __init__(self, conn, **kwargs):
+    self.inmemory_conn = conn
+    super().__init__(**kwargs)
+
+  def get_conn(self):
+    self.conn = self.inmemory_conn
+    return self.conn
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.conn = sqlite3.connect(':memory:')
+    self.conn.execute("""CREATE TABLE currencies_exchangerates (
+      id INTEGER PRIMARY KEY, curr_num char(3), curr_den char(3), buypriceint INTEGER, sellpriceint INTEGER,
+      refdate DATE, quotestime TIME, created_at timestamp, updated_at timestamp)""")
+    rows = [
+      ('2023-12-04', 49085, 49090), ('2023-12-05', 49516, 49522), ('2023-12-06', 49025, 49031),
+      ('2023-12-07', 48943, 48949), ('2023-12-08', None, None), ('2023-12-11', 49200, 49210),
+    ]
+    self.conn.executemany("INSERT INTO currencies_exchangerates (curr_num, curr_den, buypriceint, sellpriceint, "
+                          "refdate) VALUES ('BRL', 'USD', ?, ?, ?)", [(b, s, d) for d, b, s in rows])
+    self.retriever = InMemoryRetriever(self.conn, date_fr='2023-12-01', date_to='2023-12-31')
+    self.retriever.do_select()
+
+  def tearDown(self):
+    self.conn.close()
+
+  def test_1_arrays_n_exact_lookup(self):
+    self.assertEqual(5, self.retriever.n_found_recs)  # the null-price row is left out
+    self.assertEqual(datetime.date(2023, 12, 4), self.retriever.first_date_in_run)
+    self.assertEqual(datetime.date(2023, 12, 11), self.retriever.last_date_in_run)
+    self.assertEqual((4.9516, 4.9522), self.retriever.get_buyprice_n_sellprice_tuple_on_date('2023-12-05'))
+    self.assertEqual((None, None), self.retriever.get_buyprice_n_sellprice_tuple_on_date('2023-12-08'))
+
+  def test_2_range_slices_are_views(self):
+    ordinals, prices = self.retriever.get_arrays_between_daterange(('2023-12-05', '2023-12-08'))
+    self.assertEqual(3, ordinals.size)
+    self.assertTrue(np.shares_memory(prices, self.retriever.prices))
+    pdict = self.retriever.get_date_n_tupleprices_dict_between_daterange(('2023-12-07', '2023-12-04'))
+    self.assertEqual([datetime.date(2023, 12, d) for d in (4, 5, 6, 7)], list(pdict.keys()))
+    self.assertEqual((4.8943, 4.8949), pdict[datetime.date(2023, 12, 7)])
+    pdict = self.retriever.get_date_n_tupleprices_dict_between_daterange((None, '2023-12-05'))
+    self.assertEqual(2, len(pdict))
+
+  def test_3_dataframe_without_copy(self):
+    df = self.retriever.get_dataframe_between_daterange(('2023-12-06', '2023-12-31'))
+    self.assertEqual(['buyprice', 'sellprice'], list(df.columns))
+    self.assertEqual(3, len(df))
+    self.assertEqual(4.9025, df.loc['2023-12-06', 'buyprice'])
+    self.assertTrue(np.shares_memory(df.to_numpy(), self.retriever.prices))
+
+  def test_4_colstore_read_matches_the_sql_select(self):
+    with tempfile.TemporaryDirectory() as tmpdirname:
+      retriever = InMemoryRetriever(
+        self.conn, date_fr='2023-12-05', date_to='2023-12-31', use_colstore=True, colstore_folderpath=tmpdirname
+      )
+      retriever.do_select()
+      self.assertEqual(4, retriever.n_found_recs)
+      self.assertEqual((4.9516, 4.9522), retriever.get_buyprice_n_sellprice_tuple_on_date('2023-12-05'))
+      self.assertTrue(np.array_equal(self.retriever.prices[1:], retriever.prices))
+      # a quote written after the store was made is read too (the stale store is regenerated)
+      self.conn.execute("INSERT INTO currencies_exchangerates (curr_num, curr_den, buypriceint, sellpriceint, "
+                        "refdate) VALUES ('BRL', 'USD', 49300, 49310, '2023-12-12')")
+      retriever.do_select()
+      self.assertEqual((4.93, 4.931), retriever.get_buyprice_n_sellprice_tuple_on_date('2023-12-12'))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -10,6 +10,14 @@ Input is available as:
    => the days in a month (using a refmonthdate as parameter)
    => etc.
 
+Date ranges and refmonths are fetched by period (one API call per year-window
+  via the period endpoint) unless -dd (--daybyday) is given.
+
+-sy (--sync) fetches only the gaps (business days without a row) since the last sync
+  (@see bcb_exchrate_gap_sync_cls.py), -fs (--fullsync) rescans the whole history
+  and -sn (--since) starts the scan from a given date (or earlier, from the day after the last sync's
+  high-water date if that one comes first).
+
 import config
 import sys
 """
@@ -21,6 +29,9 @@ import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
 import lib.datefs.refmonths_mod as rfm
 import lib.datefs.dategenerators as gendt
 import lib.indices.bcb_br.bcb_cotacao_fetcher_from_db_or_api as bcbf  # bcbfetch.BCBCotacaoFetcher
+import lib.indices.bcb_br.bcb_api_db_or_txt_fetch_cls as fetchcls
+import lib.indices.bcb_br.bcb_remote_api_fin_cls as apicls
+import lib.indices.bcb_br.bcb_exchrate_gap_sync_cls as gapsync
 
 
 def get_args():
@@ -54,6 +65,27 @@ def get_args():
     help="a daterange has two dates, each in format yyyy-mm-dd, "
          "and represents all days in-between dateini and datefim for input to the script",
   )
+  parser.add_argument(
+    '-dd', '--daybyday', action="store_true",
+    help="fetches dateranges & refmonths one date at a time instead of one API call per period",
+  )
+  parser.add_argument(
+    '-cc', '--concurrency', metavar='concurrency', type=int, default=None,
+    help="the maximum number of concurrent API requests when fetching datelists (default 8)",
+  )
+  parser.add_argument(
+    '-sy', '--sync', action="store_true",
+    help="fetches only the business days missing in db since the last sync (the incremental sync)",
+  )
+  parser.add_argument(
+    '-fs', '--fullsync', action="store_true",
+    help="as --sync but rescanning the whole history for gaps",
+  )
+  parser.add_argument(
+    '-sn', '--since', metavar='since', type=str, nargs=1,
+    help="a date in format yyyy-mm-dd from which --sync or --fullsync scans for gaps "
+         "(--sync starts at the earlier of it and the day after the last sync's high-water date)",
+  )
   args = parser.parse_args()
   print('args =>', args)
   return args
@@ -80,6 +112,7 @@ class Dispatcher:
     self.n_rolls = 0
     self.n_funcapply = 0
     self.today = datetime.date.today()
+    self.max_concurrency = getattr(args, 'concurrency', None)
 
   def are_args_empty(self):
     """
@@ -107,7 +140,12 @@ class Dispatcher:
 
   def _roll_dates(self, plist):
     """
+    The dates missing in DB are first fetched concurrently (@see BcbAsyncCotacaoClient),
+      so that the BCBCotacaoFetcher loop below finds them locally
     """
+    plist = list(plist)
+    pastdates = [pdate for pdate in plist if pdate <= self.today]
+    bcbf.prefetch_missing_cotacoes_concurrently_n_dbsaveit(pastdates, max_concurrency=self.max_concurrency)
     for pdate in plist:
       if pdate > self.today:
         print('Cannot process pdate %s is greater than today %s' % (pdate, self.today))
@@ -118,7 +156,39 @@ class Dispatcher:
       print(fetcher)
     return self.n_rolls
 
+  @property
+  def byperiod(self) -> bool:
+    return not getattr(self.args, 'daybyday', False)
+
+  def _roll_daterange(self, dateini, datefim):
+    """
+    Fetches [dateini, datefim] via the period API (one call per year-window),
+      saves it to DB and writes its prettyprint text
+    """
+    results = fetchcls.fetch_cotacoes_via_the_api_for_daterange_n_dbsaveit(dateini, datefim)
+    self.n_rolls += len(results)
+    if len(results) > 0:
+      datatext = apicls.get_pretryprint_txtrepresentation_from_bcb_api1_list(results)
+      datafilename = f'exchange_rate_quotes_from_{dateini}_to_{datefim}.log'
+      apicls.write_txtdata_file(datatext, datafilename=datafilename)
+    return self.n_rolls
+
+  @property
+  def is_sync(self) -> bool:
+    return getattr(self.args, 'sync', False) or getattr(self.args, 'fullsync', False)
+
+  def _sync_gaps(self):
+    since = getattr(self.args, 'since', None)
+    since = None if since is None else since[0]
+    syncer = gapsync.ExchRateGapSyncer(full=getattr(self.args, 'fullsync', False), since=since)
+    n_fetched = syncer.process()
+    print(syncer)
+    self.n_rolls += n_fetched
+    return self.n_rolls
+
   def dispatch(self):
+    if self.is_sync:
+      return self._sync_gaps()
     if self.args.daterange:
       dateini = cnv.make_date_or_none(self.args.daterange[0])
       datefim = cnv.make_date_or_none(self.args.daterange[1])
@@ -129,6 +199,8 @@ class Dispatcher:
         return 0
       if datefim > self.today:
         datefim = self.today
+      if self.byperiod:
+        return self._roll_daterange(dateini, datefim)
       plist = gendt.gen_dailydates_or_empty_bw_ini_fim_opt_order(dateini, datefim)
       return self.apply(plist)
     if self.args.datelist:
@@ -143,6 +215,10 @@ class Dispatcher:
       if refmonthdate is None:
         print("refmonthdate is None ie it's invalid. Returning.")
         return 0
+      if self.byperiod:
+        dateini, datefim = rfm.spawn_inidate_n_fimdate_fr_refmonth(refmonthdate)
+        datefim = self.today if datefim > self.today else datefim
+        return self._roll_daterange(dateini, datefim)
       plist = gendt.gen_dailydates_for_refmonth_or_empty_opt_order_coff_accfut(refmonthdate)
       return self.apply(plist)
     if self.args.date:
@@ -163,7 +239,7 @@ def process():
   args = get_args()
   print('Dispatching', args)
   dispatcher = Dispatcher(args)
-  if dispatcher.are_args_empty():
+  if not dispatcher.is_sync and dispatcher.are_args_empty():
     today = datetime.date.today()
     yesterday = datetime.date.today() - relativedelta(days=1)
     date_1wb_yesterday = yesterday - relativedelta(days=7)
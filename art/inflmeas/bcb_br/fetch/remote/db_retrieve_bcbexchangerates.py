@@ -3,6 +3,14 @@
 art/bcb_br/fetch/prettyprint/db_retrieve_bcbexchangerates.py
   Retrieves BCB exchange rates stores in the local Sqlite-DB
 
+  The retrieved quotes are kept as sorted NumPy arrays (the date ordinals and a 2-column
+    buyprice/sellprice array) so that a date range is found with np.searchsorted (O(log n))
+    and is returned as views over these arrays, the dict & pandas outputs being built from them.
+
+  With use_colstore, the quotes are read from the pair's memory-mapped columnar store
+    (@see bcb_exchrate_colstore_cls.py), regenerated from the db first if it's stale,
+    instead of by the SQL range select (a multi-year read becomes a slice of a mmap).
+
 import fs.datefs.convert_to_date_wo_intr_sep_posorder as cnv
 import settings as sett
 """
@@ -10,11 +18,15 @@ import argparse
 import datetime
 import sqlite3
 from dateutil.relativedelta import relativedelta
+import numpy as np
+import pandas as pd
 # import fs.indices.bcb_br.bcb_cotacao_fetcher_from_db_or_api as fin
 import lib.datefs.convert_to_date_wo_intr_sep_posorder as dtfs
 import os
 import settings as sett
 import lib.indices.bcb_br.bcbparams as bcbparams
+import lib.indices.bcb_br.bcb_exchrate_colstore_cls as colst  # colst.open_colstore_or_regenerate
+import lib.numberfs.fixedpoint_prices_cls as fxp
 # import fs.datefs.convert_to_datetime_wo_intr_sep_posorder as cvdt
 url_base = bcbparams.url_base
 url_query_interpol = bcbparams.url_query_interpol
@@ -29,6 +41,11 @@ DEFAULT_DATEFILENAME = bcbparams.DEFAULT_DATEFILENAME
 DEFAULT_CURRENCY_FROM = bcbparams.DEFAULT_CURRENCY_FROM
 DEFAULT_CURRENCY_TO = bcbparams.DEFAULT_CURRENCY_TO
 REGISTERED_CURRENCIES_3LETTER = bcbparams.REGISTERED_CURRENCIES_3LETTER
+JULIANDAY_OF_ORDINAL_ZERO = 1721424.5  # julianday('0001-01-01') is 1721425.5 and its ordinal is 1
+UNIX_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+PRICE_COLUMNS = ['buyprice', 'sellprice']
+DB_PRICE_SCALE = 4  # the db's buypriceint & sellpriceint are int(price * 10**4)
+INVERTED_PRICE_SCALE = 8  # 1/n of a ~5.0 price needs more than 4 decimal places (eg 1/4.9713 = 0.20115463)
 # import fs.datefs.dategenerators as gendt
 # import fs.datefs.read_write_datelist_files_fs as rwdt
 # sqlite3.register_adapter(dateconverter, 'datetime.date'):
@@ -101,9 +118,11 @@ class BCBExchangeRatesRetriever:
       self,
       curr_fr=None, curr_to=None,
       date_fr=None, date_to=None,
-      datafolderpath=None, datafilename=None, p_datafilepath=None
+      datafolderpath=None, datafilename=None, p_datafilepath=None,
+      use_colstore=False, colstore_folderpath=None,
     ):
     self.curr_fr, self.curr_to = curr_fr, curr_to
+    self.use_colstore, self.colstore_folderpath = use_colstore, colstore_folderpath
     self.date_fr, self.date_to = date_fr, date_to
     self.datafolderpath, self.datafilename, self.p_datafilepath = datafolderpath, datafilename, p_datafilepath
     self.datesreader = None
@@ -119,7 +138,13 @@ class BCBExchangeRatesRetriever:
     self.yearrange = None
     self.has_read_datefile = False
     self.conn = None
-    self.date_n_tupleprices_dict = {}
+    # the quotes as sorted arrays: ordinals[i] is the date of prices[i] = (buyprice, sellprice)
+    self.ordinals = np.empty(0, dtype=np.int64)
+    self.prices = np.empty((0, 2), dtype=np.float64)
+    # the same quotes as fixed-point ints (the db's own representation, 1/n'ed at scale 8 for a flipped pair)
+    self.buyfx = fxp.FixedPointPrices(np.empty(0, dtype=np.int64), DB_PRICE_SCALE)
+    self.sellfx = fxp.FixedPointPrices(np.empty(0, dtype=np.int64), DB_PRICE_SCALE)
+    self._date_n_tupleprices_dict = None
     self.treat_attrs()
 
   def treat_attrs(self):
@@ -171,15 +196,32 @@ class BCBExchangeRatesRetriever:
 
   @property
   def dates_in_run(self):
-    return self.date_n_tupleprices_dict.keys()
+    return [datetime.date.fromordinal(int(ordinal)) for ordinal in self.ordinals]
 
   @property
   def first_date_in_run(self):
-    return min(self.dates_in_run)
+    return datetime.date.fromordinal(int(self.ordinals[0])) if self.ordinals.size > 0 else None
 
   @property
   def last_date_in_run(self):
-    return max(self.dates_in_run)
+    return datetime.date.fromordinal(int(self.ordinals[-1])) if self.ordinals.size > 0 else None
+
+  @property
+  def buyprices(self) -> np.ndarray:
+    return self.prices[:, 0]
+
+  @property
+  def sellprices(self) -> np.ndarray:
+    return self.prices[:, 1]
+
+  @property
+  def date_n_tupleprices_dict(self) -> dict:
+    """
+    The quotes as {date: (buyprice, sellprice)} in date order (built once from the arrays)
+    """
+    if self._date_n_tupleprices_dict is None:
+      self._date_n_tupleprices_dict = self.make_date_n_tupleprices_dict(slice(None))
+    return self._date_n_tupleprices_dict
 
   @property
   def datefilefolderpath(self):
@@ -240,10 +282,11 @@ class BCBExchangeRatesRetriever:
 
   def make_sql_select(self) -> str:
     sql = f"""
-    SELECT buypriceint, sellpriceint, refdate from {self.TABLENAME}
+    SELECT julianday(refdate), buypriceint, sellpriceint from {self.TABLENAME}
       WHERE
         curr_num = ? and curr_den = ? and
-        refdate >= ? and refdate <= ?
+        refdate >= ? and refdate <= ? and
+        buypriceint IS NOT NULL and sellpriceint IS NOT NULL
       ORDER BY
         refdate; 
     """
@@ -255,6 +298,10 @@ class BCBExchangeRatesRetriever:
       i.e., the currency 3-letter code that comes alphabetically before is stored in the curr_num
       and then the curr_den
     Because of that, the method should check if the inverse division (1/n) should take place
+
+    The rows (null-price ones, ie hollidays, are left out by the query) become the sorted arrays
+      self.ordinals & self.buyfx/self.sellfx (fixed-point) in one go,
+      the float self.prices being made from these once, at the end
     """
     conn = self.get_conn()
     cursor = conn.cursor()
@@ -269,39 +316,54 @@ class BCBExchangeRatesRetriever:
       # invert position and flag it
       curr1 = self.curr_to
       curr2 = self.curr_fr
-    tuplevalues = (curr1, curr2, self.date_fr, self.date_to)
-    cursor.execute(sql, tuplevalues)
-    rows = cursor.fetchall()
-    for record in rows:
-      try:
-        buyprice = float(record[0])/10000
-        sellprice = float(record[1])/10000
-        refdate = dtfs.make_date_or_none(record[2])
-        if from_to_inverted_position:
-          buyprice = 1/buyprice
-          sellprice = 1/sellprice
-        self.date_n_tupleprices_dict.update({refdate: (buyprice, sellprice)})
-      except (TypeError, ValueError):
-        pass
+    if self.use_colstore:
+      self.ordinals, buyints, sellints = self.select_via_colstore(conn, curr1, curr2)
+    else:
+      tuplevalues = (curr1, curr2, str(self.date_fr), str(self.date_to))
+      cursor.execute(sql, tuplevalues)
+      rows = cursor.fetchall()
+      julians, buyints, sellints = zip(*rows) if len(rows) > 0 else ((), (), ())
+      self.ordinals = np.rint(np.asarray(julians, dtype=np.float64) - JULIANDAY_OF_ORDINAL_ZERO).astype(np.int64)
+    self.buyfx = fxp.FixedPointPrices(np.asarray(buyints, dtype=np.int64), DB_PRICE_SCALE)
+    self.sellfx = fxp.FixedPointPrices(np.asarray(sellints, dtype=np.int64), DB_PRICE_SCALE)
+    if from_to_inverted_position:
+      self.buyfx = self.buyfx.invert(scale=INVERTED_PRICE_SCALE)
+      self.sellfx = self.sellfx.invert(scale=INVERTED_PRICE_SCALE)
+    self.prices = np.column_stack((self.buyfx.to_floats(), self.sellfx.to_floats()))
+    self._date_n_tupleprices_dict = None
+
+  def select_via_colstore(self, conn, curr_num, curr_den) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the (ordinals, buyints, sellints) of date_fr..date_to from the pair's columnar store
+      (copies: the store is closed right after)
+    """
+    store = colst.open_colstore_or_regenerate(curr_num, curr_den, self.colstore_folderpath, conn=conn)
+    try:
+      sl = store.find_range_slice(self.date_fr, self.date_to)
+      return tuple(column[sl].astype(np.int64) for column in (store.ordinals, store.buyints, store.sellints))
+    finally:
+      store.close()
+
+  def find_index_on_date(self, pdate) -> int | None:
+    pdate = dtfs.make_date_or_none(pdate)
+    if pdate is None:
+      return None
+    ordinal = pdate.toordinal()
+    i = int(np.searchsorted(self.ordinals, ordinal))
+    if i < self.ordinals.size and self.ordinals[i] == ordinal:
+      return i
+    return None
 
   def get_buyprice_n_sellprice_tuple_on_date(self, pdate) -> tuple:
-    if pdate in self.date_n_tupleprices_dict.keys():
-      pricetuple = self.date_n_tupleprices_dict[pdate]
-      return pricetuple
-    return None, None
+    i = self.find_index_on_date(pdate)
+    if i is None:
+      return None, None
+    return float(self.prices[i, 0]), float(self.prices[i, 1])
 
-  def get_date_n_tupleprices_dict_between_daterange(self, p_daterange: tuple = None):
+  def find_range_slice(self, p_daterange: tuple = None) -> slice:
     """
-    From https://realpython.com/sort-python-dictionary/
-      # Sort by key
-      dict(sorted(people.items()))
-        {1: 'Jill', 2: 'Jack', 3: 'Jim', 4: 'Jane'}
-
-      # Sort by value
-      dict(sorted(people.items(), key=lambda item: item[1]))
-        {2: 'Jack', 4: 'Jane', 1: 'Jill', 3: 'Jim'}
-
-    pdict = {k: pdict[k] for k in pdict if inidate <= k <= fimdate else None}
+    Returns the slice (over self.ordinals & self.prices) of the quotes in the daterange (O(log n))
+      the daterange defaults to (date_fr, date_to) & a None date to the first/last date in run
     """
     if p_daterange is None or len(p_daterange) == 0:
       daterange = self.date_fr, self.date_to
@@ -309,17 +371,44 @@ class BCBExchangeRatesRetriever:
       daterange = p_daterange
     inidate, fimdate = daterange
     inidate = dtfs.make_date_or_none(inidate)
-    if inidate is None:
-      inidate = self.first_date_in_run
     fimdate = dtfs.make_date_or_none(fimdate)
-    if fimdate is None:
-      fimdate = self.last_date_in_run
-    # remind that date_tupleprices_dict.items() has elements with
-    # k[0] (the key) the date and k[1] (the value) the tuple (buyprice, sellprice)
-    pdict = filter(lambda k: inidate <= k[0] <= fimdate, self.date_n_tupleprices_dict.items())
-    pdict = dict(pdict)
-    pdict = dict(sorted(pdict.items()))
-    return pdict
+    if inidate is not None and fimdate is not None:
+      inidate, fimdate = dtfs.swap_dates_if_first_is_greater_than_second(inidate, fimdate)
+    i_ini = 0 if inidate is None else int(np.searchsorted(self.ordinals, inidate.toordinal(), side='left'))
+    i_fim = self.ordinals.size if fimdate is None else int(
+      np.searchsorted(self.ordinals, fimdate.toordinal(), side='right')
+    )
+    return slice(i_ini, i_fim)
+
+  def get_arrays_between_daterange(self, p_daterange: tuple = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (ordinals, prices) for the daterange as views (no copy) over the retriever's arrays
+    """
+    sl = self.find_range_slice(p_daterange)
+    return self.ordinals[sl], self.prices[sl]
+
+  def make_date_n_tupleprices_dict(self, sl: slice) -> dict:
+    ordinals, prices = self.ordinals[sl], self.prices[sl]
+    return {
+      datetime.date.fromordinal(ordinal): (buyprice, sellprice)
+      for ordinal, (buyprice, sellprice) in zip(ordinals.tolist(), prices.tolist())
+    }
+
+  def get_date_n_tupleprices_dict_between_daterange(self, p_daterange: tuple = None):
+    """
+    Returns {date: (buyprice, sellprice)} (in date order) for the daterange,
+      which is found by np.searchsorted over the sorted dates (no filtering nor re-sorting)
+    """
+    return self.make_date_n_tupleprices_dict(self.find_range_slice(p_daterange))
+
+  def get_dataframe_between_daterange(self, p_daterange: tuple = None) -> pd.DataFrame:
+    """
+    Returns the daterange's quotes as a DataFrame (columns buyprice & sellprice, a DatetimeIndex 'refdate')
+      whose values are a view over self.prices (not a copy): don't write into it
+    """
+    ordinals, prices = self.get_arrays_between_daterange(p_daterange)
+    index = pd.DatetimeIndex((ordinals - UNIX_EPOCH_ORDINAL).astype('datetime64[D]'), name='refdate')
+    return pd.DataFrame(prices, index=index, columns=PRICE_COLUMNS, copy=False)
 
   def process(self):
     self.do_select()
@@ -333,11 +422,7 @@ class BCBExchangeRatesRetriever:
 
   @property
   def n_found_recs(self) -> int:
-    try:
-      return len(self.date_n_tupleprices_dict.keys())
-    except AttributeError:
-      pass
-    return 0
+    return int(self.ordinals.size)
 
   def buy_sell_prices_quote_wholedaterange_str(self):
     outstr = "Buy | Sell price quotes:\n"
@@ -382,7 +467,8 @@ def process():
   """
   retriever = BCBExchangeRatesRetriever(
     date_fr='2017-10-1',
-    date_to='2024-10-31'
+    date_to='2024-10-31',
+    use_colstore=True,  # a multi-year read
   )
   retriever.process()
   inidate, fimdate = '2023-12-04', '2023-12-07'
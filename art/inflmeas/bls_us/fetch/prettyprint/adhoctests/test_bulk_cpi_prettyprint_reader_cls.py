@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+art/inflmeas/bls_us/fetch/prettyprint/adhoctests/test_bulk_cpi_prettyprint_reader_cls.py
+  unit-tests for BulkCPIPrettyPrintReader over prettyprint year files written to a temp folder
+"""
+import datetime
+import os
+import tempfile
+import unittest
+import prettytable
+import art.inflmeas.bls_us.fetch.prettyprint.bulk_cpi_prettyprint_reader_cls as bulkr
+
+
+def write_year_file(folderpath, seriesid, year, n_months=12, footnote=''):
+  table = prettytable.PrettyTable(['seriesID', 'year', 'period', 'value', 'footnotes'])
+  for month in range(n_months, 0, -1):
+    table.add_row([seriesid, year, f'M{month:02d}', f'{year - 1700}.{month:03d}', footnote])
+  table.add_row([seriesid, year, 'M13', '999.999', ''])  # the annual average is not a month
+  with open(os.path.join(folderpath, f'{year} {seriesid} prettyprint.txt'), 'w') as fd:
+    fd.write(table.get_string())
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.blsfolder = os.path.join(self.tmpdir.name, bulkr.DEFAULT_BLS_CPI_FOLDERNAME)
+    os.makedirs(self.blsfolder)
+    for year in range(1990, 2024):
+      write_year_file(self.blsfolder, 'CUUR0000SA0', year)
+    write_year_file(self.blsfolder, 'CUUR0000SA0', 2024, n_months=2, footnote='preliminary')
+    write_year_file(self.blsfolder, 'SUUR0000SA0', 2024)
+    open(os.path.join(self.blsfolder, '2025 CUUR0000SA0 prettyprint.txt'), 'w').close()  # an empty file
+
+  def tearDown(self):
+    self.tmpdir.cleanup()
+
+  def test_1_parse_bytes(self):
+    data = b"""+---+
+| CUUR0000SA0 | 2025 |  M02   | 319.082 |           |
+| SUUR0000SA0 | 2025 |  M02   | 171.500 |           |
+| CUUR0000SA0 | 2025 |  M01   | 317.671 | prelim    |
+| CUUR0000SA0 | 2025 |  M13   | 318.000 |           |"""
+    ordinals, values, footnotes = bulkr.parse_prettyprint_bytes_into_columns(data, 'CUUR0000SA0')
+    self.assertEqual([2025 * 12 + 1, 2025 * 12], ordinals.tolist())
+    self.assertEqual([319.082, 317.671], values.tolist())
+    self.assertEqual(['', 'prelim'], footnotes)
+
+  def test_2_load_all_years_in_parallel(self):
+    reader = bulkr.BulkCPIPrettyPrintReader('CUUR0000SA0', self.tmpdir.name, max_workers=4)
+    reader.load()
+    self.assertEqual(36, len(reader.filepaths))  # 1990..2025, the SUUR file is not this series'
+    self.assertEqual(34 * 12 + 2, reader.size)
+    self.assertTrue((reader.month_ordinals[1:] > reader.month_ordinals[:-1]).all())
+    self.assertEqual(1990, reader.years[0])
+    self.assertEqual(324.002, reader.cpi_on_refmonth('2024-02-01'))
+    self.assertIsNone(reader.cpi_on_refmonth('2024-03-01'))
+    # CPIDatum objects are only built on demand
+    self.assertEqual({}, reader._cpidatums_per_ordinal)
+    cpidatum = reader.get_cpidatum(datetime.date(2024, 1, 1))
+    self.assertEqual(324.001, cpidatum.acc_index)
+    self.assertEqual('preliminary', cpidatum.footnotes)
+    self.assertIs(cpidatum, reader.get_cpidatum('2024-01-01'))
+    self.assertEqual(1, len(reader._cpidatums_per_ordinal))
+    self.assertEqual(datetime.date(1990, 1, 1), next(reader.gen_cpidatum_monthly_asc()).refmonthdate)
+
+  def test_3_repeated_month_keeps_the_last_read(self):
+    reader = bulkr.BulkCPIPrettyPrintReader('CUUR0000SA0', self.tmpdir.name)
+    reader.set_columns(
+      bulkr.np.array([5, 3, 5, 4]), bulkr.np.array([1.0, 2.0, 3.0, 4.0]), ['a', 'b', 'c', 'd']
+    )
+    self.assertEqual([3, 4, 5], reader.month_ordinals.tolist())
+    self.assertEqual([2.0, 4.0, 3.0], reader.acc_indices.tolist())
+    self.assertEqual(['b', 'd', 'c'], reader.footnotes)
+
+
+if __name__ == '__main__':
+  unittest.main()
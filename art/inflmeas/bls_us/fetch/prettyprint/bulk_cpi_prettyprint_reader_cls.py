@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+art/inflmeas/bls_us/fetch/prettyprint/bulk_cpi_prettyprint_reader_cls.py
+  Contains class BulkCPIPrettyPrintReader which reads all the year prettyprint files of a CPI series
+    (eg "2025 CUUR0000SA0 prettyprint.txt" in the bls_cpi_data folder) into column arrays.
+
+  The files are like (@see read_cpis_from_prettyprintdb.py):
+    +-------------+------+--------+---------+-----------+
+    |   seriesID  | year | period |  value  | footnotes |
+    +-------------+------+--------+---------+-----------+
+    | CUUR0000SA0 | 2025 |  M02   | 319.082 |           |
+    | CUUR0000SA0 | 2025 |  M01   | 317.671 |           |
+    +-------------+------+--------+---------+-----------+
+
+  Each file is mmap'ed whole and parsed by one compiled (bytes) regex, whose matches become
+    NumPy columns in one go (no per-line split/strip nor per-line object),
+    and the year files are read in parallel by a thread pool.
+
+  The result is kept as sorted columns:
+    => month_ordinals: year*12 + month - 1
+    => acc_indices: the CPI values (float64)
+    => footnotes: the footnotes' text (str)
+  and CPIDatum objects are built only when asked for (get_cpidatum(), gen_cpidatum_monthly_asc()).
+
+  Example:
+    reader = BulkCPIPrettyPrintReader('CUUR0000SA0')
+    reader.load()
+    reader.cpi_on_refmonth('2024-01-01')  # 308.417
+"""
+import concurrent.futures
+import datetime
+import mmap
+import os
+import re
+import time
+import numpy as np
+import settings as sett
+import art.inflmeas.bls_us.classes.cpis_classmod as cpis_cls  # cpis_cls.CPIDatum
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+DEFAULT_BLS_CPI_FOLDERNAME = 'bls_cpi_data'
+DEFAULT_MAX_WORKERS = 8
+# one table row: | seriesID | year | Mmm | value | footnotes | (M13, the annual average, is left out)
+cmpld_prettyprint_line_pattern = re.compile(
+  rb'^\|\s*(?P<seriesid>[A-Z0-9]+)\s*\|\s*(?P<year>\d{4})\s*\|\s*M(?P<month>0[1-9]|1[0-2])\s*'
+  rb'\|\s*(?P<value>\d+(?:\.\d*)?)\s*\|(?P<footnotes>[^|\r\n]*)\|',
+  re.MULTILINE
+)
+prettyprint_filename_repattern = r'^(\d{{4}}) {seriesid} prettyprint\.txt$'
+
+
+def parse_prettyprint_bytes_into_columns(data, seriesid: str | None = None):
+  """
+  Returns (month_ordinals, acc_indices, footnotes) for the rows of seriesid (of any series if None)
+    data is bytes or a bytes-like buffer (eg an mmap)
+  """
+  matches = cmpld_prettyprint_line_pattern.findall(data)
+  if seriesid is not None:
+    b_seriesid = seriesid.encode()
+    matches = [m for m in matches if m[0] == b_seriesid]
+  if len(matches) == 0:
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), []
+  _, years, months, values, footnotes = zip(*matches)
+  # the bytes columns are converted by numpy itself (no per-row int()/float() call)
+  month_ordinals = np.array(years).astype(np.int64) * 12 + np.array(months).astype(np.int64) - 1
+  acc_indices = np.array(values).astype(np.float64)
+  return month_ordinals, acc_indices, [f.strip().decode() for f in footnotes]
+
+
+def read_prettyprint_file_into_columns(filepath: str, seriesid: str | None = None):
+  """
+  The regex runs over the mmap'ed file itself (no copy of the file into a bytes object)
+  """
+  with open(filepath, 'rb') as fd:
+    if os.fstat(fd.fileno()).st_size == 0:
+      return parse_prettyprint_bytes_into_columns(b'', seriesid)
+    with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+      return parse_prettyprint_bytes_into_columns(mm, seriesid)
+
+
+def convert_month_ordinal_to_refmonthdate(month_ordinal: int) -> datetime.date:
+  return datetime.date(month_ordinal // 12, month_ordinal % 12 + 1, 1)
+
+
+class BulkCPIPrettyPrintReader:
+
+  def __init__(self, seriesid: str | None = None, datafolder_abspath: str | None = None, max_workers: int | None = None):
+    self.seriesid = seriesid
+    self.datafolder_abspath = datafolder_abspath
+    self.max_workers = max_workers
+    self.filepaths = []
+    self.month_ordinals = np.empty(0, dtype=np.int64)
+    self.acc_indices = np.empty(0, dtype=np.float64)
+    self.footnotes = []
+    self.elapsed_in_sec = 0.0
+    self._cpidatums_per_ordinal = {}
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.seriesid is None or self.seriesid not in cpis_cls.REGISTERED_SERIESIDS:
+      self.seriesid = cpis_cls.DEFAULT_SERIESID
+    if self.datafolder_abspath is None:
+      self.datafolder_abspath = sett.get_datafolder_abspath()
+    if self.max_workers is None or self.max_workers < 1:
+      self.max_workers = DEFAULT_MAX_WORKERS
+
+  @property
+  def bls_folderpath(self):
+    return os.path.join(self.datafolder_abspath, DEFAULT_BLS_CPI_FOLDERNAME)
+
+  @property
+  def size(self) -> int:
+    return self.month_ordinals.size
+
+  def find_prettyprint_files(self) -> list[str]:
+    if not os.path.isdir(self.bls_folderpath):
+      self.filepaths = []
+      return self.filepaths
+    recmpld = re.compile(prettyprint_filename_repattern.format(seriesid=re.escape(self.seriesid)))
+    filenames = sorted(fn for fn in os.listdir(self.bls_folderpath) if recmpld.match(fn))
+    self.filepaths = [os.path.join(self.bls_folderpath, fn) for fn in filenames]
+    return self.filepaths
+
+  def load(self):
+    """
+    Reads all year files (in parallel) into the sorted columns
+    """
+    start = time.perf_counter()
+    self.find_prettyprint_files()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+      results = list(executor.map(lambda fp: read_prettyprint_file_into_columns(fp, self.seriesid), self.filepaths))
+    self.set_columns(
+      np.concatenate([r[0] for r in results]) if results else np.empty(0, dtype=np.int64),
+      np.concatenate([r[1] for r in results]) if results else np.empty(0, dtype=np.float64),
+      [f for r in results for f in r[2]],
+    )
+    self.elapsed_in_sec = time.perf_counter() - start
+
+  def set_columns(self, month_ordinals, acc_indices, footnotes):
+    """
+    Sorts the columns by month, a repeated month keeping its last read row
+    """
+    # unique over the reversed arrays picks each month's last occurrence
+    rev_ordinals = month_ordinals[::-1]
+    _, rev_first = np.unique(rev_ordinals, return_index=True)
+    keep = month_ordinals.size - 1 - rev_first
+    self.month_ordinals = month_ordinals[keep]
+    self.acc_indices = acc_indices[keep]
+    self.footnotes = [footnotes[i] for i in keep.tolist()]
+    self._cpidatums_per_ordinal = {}
+
+  def find_index_on_refmonth(self, refmonthdate) -> int | None:
+    refmonthdate = cnv.make_date_or_none(refmonthdate)
+    if refmonthdate is None:
+      return None
+    ordinal = refmonthdate.year * 12 + refmonthdate.month - 1
+    i = int(np.searchsorted(self.month_ordinals, ordinal))
+    if i < self.size and self.month_ordinals[i] == ordinal:
+      return i
+    return None
+
+  def cpi_on_refmonth(self, refmonthdate) -> float | None:
+    i = self.find_index_on_refmonth(refmonthdate)
+    return None if i is None else float(self.acc_indices[i])
+
+  @property
+  def refmonthdates(self) -> list[datetime.date]:
+    return [convert_month_ordinal_to_refmonthdate(o) for o in self.month_ordinals.tolist()]
+
+  @property
+  def years(self) -> list[int]:
+    return np.unique(self.month_ordinals // 12).tolist()
+
+  def get_cpidatum_at(self, i: int) -> cpis_cls.CPIDatum:
+    ordinal = int(self.month_ordinals[i])
+    cpidatum = self._cpidatums_per_ordinal.get(ordinal)
+    if cpidatum is None:
+      refmonthdate = convert_month_ordinal_to_refmonthdate(ordinal)
+      cpidatum = cpis_cls.CPIDatum(
+        seriesid=self.seriesid, year=refmonthdate.year, refmonthdate=refmonthdate,
+        acc_index=float(self.acc_indices[i]), footnootes=self.footnotes[i]
+      )
+      self._cpidatums_per_ordinal[ordinal] = cpidatum
+    return cpidatum
+
+  def get_cpidatum(self, refmonthdate) -> cpis_cls.CPIDatum | None:
+    i = self.find_index_on_refmonth(refmonthdate)
+    return None if i is None else self.get_cpidatum_at(i)
+
+  def gen_cpidatum_monthly_asc(self):
+    for i in range(self.size):
+      yield self.get_cpidatum_at(i)
+
+  @property
+  def refmonths_n_cpis_dict(self) -> dict:
+    """
+    The {refmonthdate: CPIDatum} dict of CPIPrettyPrintReader (builds every CPIDatum)
+    """
+    return {cpidatum.refmonthdate: cpidatum for cpidatum in self.gen_cpidatum_monthly_asc()}
+
+  def __str__(self):
+    first = convert_month_ordinal_to_refmonthdate(int(self.month_ordinals[0])) if self.size > 0 else None
+    last = convert_month_ordinal_to_refmonthdate(int(self.month_ordinals[-1])) if self.size > 0 else None
+    outstr = f"""{self.__class__.__name__}
+    seriesid = {self.seriesid} | files = {len(self.filepaths)} | workers = {self.max_workers}
+    nº of indices = {self.size} | from {first} to {last}
+    elapsed = {self.elapsed_in_sec:.3f}s
+    bls folder = [{self.bls_folderpath}]
+    """
+    return outstr
+
+
+def adhoctest():
+  data = b"""| CUUR0000SA0 | 2025 |  M02   | 319.082 |           |
+| CUUR0000SA0 | 2025 |  M01   | 317.671 |           |"""
+  print(parse_prettyprint_bytes_into_columns(data))
+
+
+def process():
+  reader = BulkCPIPrettyPrintReader()
+  reader.load()
+  print(reader)
+
+
+if __name__ == '__main__':
+  """
+  adhoctest()
+  """
+  process()
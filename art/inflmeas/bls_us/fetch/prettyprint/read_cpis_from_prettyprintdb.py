@@ -11,6 +11,7 @@ The data the script extracts is like the following pretty-print text table:
 | CUUR0000SA0 | 2025 |  M01   | 317.671 |           |
 +-------------+------+--------+---------+-----------+
 """
+import concurrent.futures
 import datetime
 # import datetime
 import os
@@ -23,6 +24,7 @@ import settings as sett
 from commands.fetch.bls_us.read_cpis_from_db import DEFAULT_SERIESID
 from commands.fetch.bls_us.read_cpis_from_db import KNOWN_SERIESID
 import lib.datefs.refmonths_mod as rmd
+import art.inflmeas.bls_us.fetch.prettyprint.bulk_cpi_prettyprint_reader_cls as bulkr
 tablename = 'idxind_monthly_indices'
 prettyprint_file_pattern = r'^(\d{4}\s{1}[a-zA-Z0-9]+?\s{1}prettyprint\.txt)$'
 cmpld_prettyprint_file_pattern = re.compile(prettyprint_file_pattern)
@@ -113,17 +115,23 @@ class CPIPrettyPrintReader:
 
   def read_text_datafilepath(self, pp_filepath: os.path) -> None:
     """
+    Parses the whole file with one compiled regex (@see bulk_cpi_prettyprint_reader_cls.py)
     """
     if not os.path.isfile(pp_filepath):
       return None
-    fd = open(pp_filepath, "r")
-    line = fd.readline()
-    while line:
-      line = line.strip(' \t\r\n')
-      self.read_line_into_cpidatum(line)
-      line = fd.readline()
+    columns = bulkr.read_prettyprint_file_into_columns(pp_filepath, self.seriesid)
+    self.add_columns_as_cpidatums(*columns)
     return None
 
+  def add_columns_as_cpidatums(self, month_ordinals, acc_indices, footnotes) -> None:
+    for month_ordinal, acc_index, footnote in zip(month_ordinals.tolist(), acc_indices.tolist(), footnotes):
+      refmonthdate = bulkr.convert_month_ordinal_to_refmonthdate(month_ordinal)
+      cpidatum = cpis_cls.CPIDatum(
+        seriesid=self.seriesid, year=refmonthdate.year, refmonthdate=refmonthdate,
+        acc_index=acc_index, footnootes=footnote
+      )
+      self.refmonths_n_cpis_dict.update({refmonthdate: cpidatum})
+
   def read_text_datafilename(self, prettyprint_filename):
     prettyprint_filepath = self.get_prettyprintfilepath_fr_filename(prettyprint_filename)
     return self.read_text_datafilepath(prettyprint_filepath)
@@ -137,11 +145,14 @@ class CPIPrettyPrintReader:
     return self.refmonths_n_cpis_dict
 
   def read_prettyprint_files(self):
-    for i, prettyprint_filename in enumerate(self.found_datafilenames):
-      # seq = i + 1
-      # scrmsg = f"{seq} -> reading prettyprint file {prettyprint_filename}"
-      # print(scrmsg)
-      self.read_text_datafilename(prettyprint_filename)
+    """
+    The year files are read & parsed in parallel (a thread pool), then added in filename order
+    """
+    filepaths = [self.get_prettyprintfilepath_fr_filename(fn) for fn in self.found_datafilenames]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=bulkr.DEFAULT_MAX_WORKERS) as executor:
+      all_columns = list(executor.map(lambda fp: bulkr.read_prettyprint_file_into_columns(fp, self.seriesid), filepaths))
+    for columns in all_columns:
+      self.add_columns_as_cpidatums(*columns)
 
   def find_prettyprint_files(self):
     filenames = os.listdir(self.bls_folderpath)
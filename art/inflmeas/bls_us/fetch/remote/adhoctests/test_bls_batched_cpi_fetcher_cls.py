@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+art/inflmeas/bls_us/fetch/remote/adhoctests/test_bls_batched_cpi_fetcher_cls.py
+  unit-tests for the BLS request chunking & BatchedCPIFetcher with a fake poster (no network)
+"""
+import json
+import os
+import tempfile
+import threading
+import unittest
+import art.inflmeas.bls_us.fetch.remote.bls_batched_cpi_fetcher_cls as batchf
+import lib.indices.bls_us.bls_json_manifest_cls as manif
+
+
+class FakeBlsPoster:
+  """
+  Answers as the BLS API does: one series entry per seriesid with 12 monthly items per year
+    (a year in fail_years makes the whole request come back as not processed)
+  """
+
+  def __init__(self, fail_years=()):
+    self.fail_years = set(fail_years)
+    self.payloads = []
+    self._lock = threading.Lock()
+
+  def __call__(self, url, payload):
+    with self._lock:
+      self.payloads.append((url, payload))
+    year_fr, year_to = int(payload['startyear']), int(payload['endyear'])
+    if any(year_fr <= y <= year_to for y in self.fail_years):
+      return {'status': 'REQUEST_NOT_PROCESSED', 'message': ['threshold reached'], 'Results': {}}
+    series = []
+    for seriesid in payload['seriesid']:
+      data = [
+        {'year': str(y), 'period': f'M{m:02d}', 'value': f'{y - 1900}.{m:03d}', 'footnotes': [{}]}
+        for y in range(year_to, year_fr - 1, -1) for m in range(12, 0, -1)
+      ]
+      series.append({'seriesID': seriesid, 'data': data})
+    return {'status': 'REQUEST_SUCCEEDED', 'message': [], 'Results': {'series': series}}
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+
+  def tearDown(self):
+    self.tmpdir.cleanup()
+
+  def test_1_chunks(self):
+    self.assertEqual([(1913, 1922), (1923, 1932), (1933, 1935)], batchf.split_years_into_ranges(1913, 1935, 10))
+    seriesids = ['CUUR0000SA0', 'SUUR0000SA0']
+    self.assertEqual(12, len(batchf.make_request_chunks(seriesids, 1913, 2025, api_version=1)))
+    chunks = batchf.make_request_chunks(seriesids, 1913, 2025, api_version=2)
+    self.assertEqual(6, len(chunks))
+    self.assertEqual(batchf.BlsRequestChunk(tuple(seriesids), 2013, 2025), chunks[-1])
+    many = [f'S{i:03d}' for i in range(60)]
+    self.assertEqual(3 * 2, len(batchf.make_request_chunks(many, 2006, 2025, api_version=1)))
+
+  def test_2_merge_into_per_year_files(self):
+    poster = FakeBlsPoster()
+    fetcher = batchf.BatchedCPIFetcher(
+      ['CUUR0000SA0', 'SUUR0000SA0'], 2001, 2024, registrationkey='akey', poster=poster,
+      bls_cpi_datafolder=self.tmpdir.name
+    )
+    fetcher.process()
+    self.assertEqual(2, len(poster.payloads))  # 24 years in 20-year chunks, both series together
+    url, payload = poster.payloads[0]
+    self.assertEqual(batchf.BLS_API_V2_URL, url)
+    self.assertEqual('akey', payload['registrationkey'])
+    self.assertEqual(2 * 24 * 2, len(fetcher.saved_filenames))
+    jsonpath = os.path.join(self.tmpdir.name, '2011 SUUR0000SA0 prettyprint.json')
+    with open(jsonpath) as fd:
+      response = json.load(fd)
+    self.assertEqual('REQUEST_SUCCEEDED', response['status'])
+    data = response['Results']['series'][0]['data']
+    self.assertEqual(12, len(data))
+    self.assertEqual({'2011'}, {item['year'] for item in data})
+    with open(os.path.join(self.tmpdir.name, '2011 SUUR0000SA0 prettyprint.txt')) as fd:
+      text = fd.read()
+    self.assertIn('111.012', text)
+    manifest = manif.BlsJsonManifest(self.tmpdir.name)
+    self.assertEqual([], manifest.find_years_to_refetch('SUUR0000SA0', 2001, 2024))
+    manifest.close()
+
+  def test_3_a_failed_chunk_writes_no_files_for_its_years(self):
+    poster = FakeBlsPoster(fail_years=[2005])
+    fetcher = batchf.BatchedCPIFetcher(
+      ['CUUR0000SA0'], 1995, 2014, registrationkey=None, poster=poster, bls_cpi_datafolder=self.tmpdir.name
+    )
+    fetcher.process()
+    self.assertEqual(batchf.BLS_API_V1_URL, poster.payloads[0][0])
+    self.assertEqual(2, fetcher.n_requests)
+    self.assertEqual([batchf.BlsRequestChunk(('CUUR0000SA0',), 2005, 2014)], fetcher.failed_chunks)
+    self.assertIn('threshold reached', fetcher.messages)
+    filenames = set(os.listdir(self.tmpdir.name))
+    self.assertIn('2004 CUUR0000SA0 prettyprint.json', filenames)
+    self.assertNotIn('2005 CUUR0000SA0 prettyprint.json', filenames)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+art/inflmeas/bls_us/fetch/remote/bls_batched_cpi_fetcher_cls.py
+  Contains class BatchedCPIFetcher that fetches a [year_fr, year_to] x seriesid-list block of BLS CPI data
+    in the fewest API requests the BLS API allows, issuing them concurrently under the API's rate limit.
+
+  The BLS API limits (@see https://www.bls.gov/developers/api_faqs.htm) per request are:
+    => version 1 (open): 25 series & 10 years
+    => version 2 (with a registration key, @see settings.BLS_API_REGISTRATIONKEY): 50 series & 20 years
+  and, for both, at most 50 requests per 10 seconds.
+
+  So, for example, refreshing the two known series (CUUR0000SA0 & SUUR0000SA0) since 1913
+    is 6 requests with a v2 key (12 with v1) instead of one request per year & series.
+
+  The responses are merged and then split into the per-year outputs the other BLS scripts read
+    (@see Fetcher in art/inflmeas/bls_us/store/cpi_apifetcher_to_prettyprint_cls.py),
+    in the data folder's bls_cpi_data subfolder:
+      => "{year} {seriesid} prettyprint.json" a BLS-like response (status REQUEST_SUCCEEDED) for the one year
+      => "{year} {seriesid} prettyprint.txt" its prettyprint table
+    each one written atomically (tmp file + os.replace()), so a refresh overwrites them,
+    the json ones being recorded in the folder's manifest (@see lib/indices/bls_us/bls_json_manifest_cls.py).
+
+  Example:
+    fetcher = BatchedCPIFetcher(['CUUR0000SA0', 'SUUR0000SA0'], 1913, 2025)
+    fetcher.process()
+    print(fetcher)  # chunks, requests issued, files written
+"""
+import collections as coll
+import concurrent.futures
+import datetime
+import json
+import os
+import time
+import settings as sett
+import art.inflmeas.bls_us.classes as pkg  # pkg.REGISTERED_SERIESID
+import art.inflmeas.bls_us.fetch.remote.cpi_rest_api_fetcher_fs as ftchfs
+import lib.indices.bls_us.bls_json_manifest_cls as manif
+import lib.netfs.rate_limiter as ratelim
+import lib.netfs.retry_scheduler as retsch
+BLS_API_V1_URL = 'https://api.bls.gov/publicAPI/v1/timeseries/data/'
+BLS_API_V2_URL = 'https://api.bls.gov/publicAPI/v2/timeseries/data/'
+# api version: (max series per request, max years per request)
+BLS_API_LIMITS = {1: (25, 10), 2: (50, 20)}
+BLS_API_MAX_REQUESTS_PER_WINDOW = 50
+BLS_API_WINDOW_IN_SEC = 10.0
+BLS_FIRST_CPI_YEAR = 1913
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_BLS_CPI_FOLDERNAME = 'bls_cpi_data'
+REQUEST_SUCCEEDED = 'REQUEST_SUCCEEDED'
+BlsRequestChunk = coll.namedtuple('BlsRequestChunk', 'seriesids year_fr year_to')
+
+
+def split_years_into_ranges(year_fr: int, year_to: int, max_years: int) -> list[tuple[int, int]]:
+  """
+  Example: (1913, 1935, 10) => [(1913, 1922), (1923, 1932), (1933, 1935)]
+  """
+  return [(y, min(y + max_years - 1, year_to)) for y in range(year_fr, year_to + 1, max_years)]
+
+
+def make_request_chunks(seriesids: list, year_fr: int, year_to: int, api_version: int = 1) -> list[BlsRequestChunk]:
+  """
+  The largest (seriesids x years) blocks the api version allows covering seriesids x [year_fr, year_to]
+  """
+  max_series, max_years = BLS_API_LIMITS[api_version]
+  series_groups = [tuple(seriesids[i:i + max_series]) for i in range(0, len(seriesids), max_series)]
+  return [
+    BlsRequestChunk(group, fr, to)
+    for group in series_groups
+    for fr, to in split_years_into_ranges(year_fr, year_to, max_years)
+  ]
+
+
+def post_payload_to_bls(url: str, payload: dict) -> dict:
+  res = retsch.request_with_retry('POST', url, data=json.dumps(payload), headers=ftchfs.DEFAULT_HTTP_HEADERS)
+  return json.loads(res.text)
+
+
+def write_text_atomically(filepath: str, text: str):
+  tmp_filepath = filepath + '.tmp'
+  with open(tmp_filepath, 'w') as fd:
+    fd.write(text)
+  os.replace(tmp_filepath, filepath)
+
+
+class BatchedCPIFetcher:
+
+  json_filename_interpol = "{year} {seriesid} prettyprint.json"
+  prettyprint_filename_interpol = "{year} {seriesid} prettyprint.txt"
+
+  def __init__(
+      self,
+      seriesids: list | None = None,
+      year_fr: int | None = None,
+      year_to: int | None = None,
+      registrationkey: str | None = None,
+      max_workers: int | None = None,
+      rate_limiter: ratelim.SlidingWindowRateLimiter | None = None,
+      poster=None,
+      bls_cpi_datafolder: str | None = None,
+    ):
+    self.seriesids = seriesids
+    self.year_fr = year_fr
+    self.year_to = year_to
+    self.registrationkey = registrationkey
+    self.max_workers = max_workers
+    self.rate_limiter = rate_limiter
+    self.poster = poster
+    self.bls_cpi_datafolder = bls_cpi_datafolder
+    self.today = datetime.date.today()
+    self.chunks = []
+    self.failed_chunks = []
+    self.messages = []
+    self.n_requests = 0
+    # the merged data: {(seriesid, year): [the BLS data items]}
+    self.items_per_seriesid_year = coll.defaultdict(list)
+    self.saved_filenames = []
+    self.processing_duration = None
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.seriesids is None or len(self.seriesids) == 0:
+      self.seriesids = list(pkg.REGISTERED_SERIESID)
+    elif isinstance(self.seriesids, str):
+      self.seriesids = [self.seriesids]
+    self.seriesids = list(dict.fromkeys(self.seriesids))  # dedup keeping order
+    self.year_to = self.today.year if self.year_to is None else min(int(self.year_to), self.today.year)
+    self.year_fr = self.year_to if self.year_fr is None else max(int(self.year_fr), BLS_FIRST_CPI_YEAR)
+    if self.year_fr > self.year_to:
+      errmsg = f"Error: from-year {self.year_fr} is greater than to-year {self.year_to} in BatchedCPIFetcher."
+      raise ValueError(errmsg)
+    if self.registrationkey is None:
+      self.registrationkey = sett.BLS_API_REGISTRATIONKEY
+    if self.max_workers is None or self.max_workers < 1:
+      self.max_workers = DEFAULT_MAX_WORKERS
+    if self.rate_limiter is None:
+      self.rate_limiter = ratelim.SlidingWindowRateLimiter(BLS_API_MAX_REQUESTS_PER_WINDOW, BLS_API_WINDOW_IN_SEC)
+    if self.poster is None:
+      self.poster = post_payload_to_bls
+    if self.bls_cpi_datafolder is None:
+      self.bls_cpi_datafolder = os.path.join(sett.get_datafolder_abspath(), DEFAULT_BLS_CPI_FOLDERNAME)
+
+  @property
+  def api_version(self) -> int:
+    return 1 if self.registrationkey is None else 2
+
+  @property
+  def api_url(self) -> str:
+    return BLS_API_V1_URL if self.api_version == 1 else BLS_API_V2_URL
+
+  def make_payload(self, chunk: BlsRequestChunk) -> dict:
+    payload = {
+      'seriesid': list(chunk.seriesids),
+      'startyear': str(chunk.year_fr),
+      'endyear': str(chunk.year_to),
+    }
+    if self.registrationkey is not None:
+      payload['registrationkey'] = self.registrationkey
+    return payload
+
+  def fetch_chunk(self, chunk: BlsRequestChunk) -> dict:
+    """
+    Runs in a worker thread: waits for the rate limiter then posts the chunk's request
+    """
+    self.rate_limiter.acquire()
+    return self.poster(self.api_url, self.make_payload(chunk))
+
+  def merge_response(self, chunk: BlsRequestChunk, response: dict):
+    if not isinstance(response, dict) or response.get('status') != REQUEST_SUCCEEDED:
+      self.failed_chunks.append(chunk)
+      self.messages.extend(response.get('message', []) if isinstance(response, dict) else [str(response)])
+      return
+    self.messages.extend(response.get('message', []))
+    for series in response.get('Results', {}).get('series', []):
+      seriesid = series.get(ftchfs.DICTKEY_SERIESID_K)
+      for item in series.get('data', []):
+        self.items_per_seriesid_year[(seriesid, int(item['year']))].append(item)
+
+  def fetch_all_chunks(self):
+    """
+    Issues the chunks' requests concurrently (paced by the rate limiter) merging each response as it arrives
+    """
+    self.chunks = make_request_chunks(self.seriesids, self.year_fr, self.year_to, self.api_version)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+      future_to_chunk = {executor.submit(self.fetch_chunk, chunk): chunk for chunk in self.chunks}
+      for future in concurrent.futures.as_completed(future_to_chunk):
+        chunk = future_to_chunk[future]
+        self.n_requests += 1
+        try:
+          response = future.result()
+        except (OSError, ValueError) as e:
+          # ConnectionError (an OSError) after the retries or a non-json answer (ValueError)
+          response = f"chunk {chunk} failed: {e}"
+        self.merge_response(chunk, response)
+
+  def make_year_response(self, seriesid: str, year: int) -> dict:
+    """
+    A BLS-like response for one series & year (as if fetched by the one-year Fetcher)
+    """
+    items = sorted(self.items_per_seriesid_year[(seriesid, year)], key=lambda item: item['period'], reverse=True)
+    return {
+      'status': REQUEST_SUCCEEDED,
+      'message': [],
+      'Results': {'series': [{ftchfs.DICTKEY_SERIESID_K: seriesid, 'data': items}]},
+    }
+
+  def save_per_year_files(self):
+    os.makedirs(self.bls_cpi_datafolder, exist_ok=True)
+    self.saved_filenames = []
+    manifest = manif.BlsJsonManifest(self.bls_cpi_datafolder)
+    for seriesid, year in sorted(self.items_per_seriesid_year):
+      response = self.make_year_response(seriesid, year)
+      json_filename = self.json_filename_interpol.format(year=year, seriesid=seriesid)
+      manifest.save_response(seriesid, year, response, os.path.join(self.bls_cpi_datafolder, json_filename))
+      pprint = ftchfs.convert_json_response_to_pretyprint(response)
+      pprint_filename = self.prettyprint_filename_interpol.format(year=year, seriesid=seriesid)
+      write_text_atomically(os.path.join(self.bls_cpi_datafolder, pprint_filename), pprint.get_string())
+      self.saved_filenames += [json_filename, pprint_filename]
+    manifest.close()
+
+  def process(self):
+    start = time.time()
+    self.fetch_all_chunks()
+    self.save_per_year_files()
+    self.processing_duration = time.time() - start
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    seriesids = {self.seriesids} | years = [{self.year_fr}, {self.year_to}] | api v{self.api_version}
+    chunks = {len(self.chunks)} | requests = {self.n_requests} | failed = {len(self.failed_chunks)}
+    series-years merged = {len(self.items_per_seriesid_year)} | files saved = {len(self.saved_filenames)}
+    run duration = {self.processing_duration}
+    datafolder = [{self.bls_cpi_datafolder}]
+    """
+    return outstr
+
+
+def adhoctest():
+  for api_version in BLS_API_LIMITS:
+    chunks = make_request_chunks(pkg.REGISTERED_SERIESID, BLS_FIRST_CPI_YEAR, datetime.date.today().year, api_version)
+    print(f'api v{api_version}: {len(chunks)} requests', chunks)
+
+
+def process():
+  fetcher = BatchedCPIFetcher(year_fr=BLS_FIRST_CPI_YEAR)
+  fetcher.process()
+  print(fetcher)
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
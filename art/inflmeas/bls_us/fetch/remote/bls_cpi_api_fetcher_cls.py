@@ -26,6 +26,7 @@ import os.path
 import time
 import settings as cfg
 import art.inflmeas.bls_us.fetch.remote.cpi_rest_api_fetcher_fs as ftchfs  # .fetch_json_response_w_restapi_reqdictdata
+import art.inflmeas.bls_us.fetch.remote.bls_batched_cpi_fetcher_cls as batchf
 
 
 class BLSAPISeriesDataFetcher:
@@ -110,6 +111,7 @@ class YearRangeCPIFetcher:
     self.response_json_data = None
     self.seriesidlist = seriesidlist
     self.series_jsondumpfiles_saved = []
+    self.batched_fetcher = None
     self._json_outfilename = None
 
   @property
@@ -155,7 +157,16 @@ class YearRangeCPIFetcher:
     return None
 
   def process(self):
+    """
+    Fetches [from_year, to_year] x seriesidlist in as few (concurrent) API requests as the BLS API allows
+      and saves the per-year json & prettyprint files (@see bls_batched_cpi_fetcher_cls.py)
+    """
     start = time.time()
+    seriesids = self.seriesidlist if self.seriesidlist else self.jsonreq.default_seriesidlist
+    self.batched_fetcher = batchf.BatchedCPIFetcher(seriesids, self.from_year, self.to_year)
+    self.batched_fetcher.process()
+    self.response_json_data = self.batched_fetcher.items_per_seriesid_year
+    self.series_jsondumpfiles_saved = self.batched_fetcher.saved_filenames
     end = time.time()
     self.processing_duration = end - start
 
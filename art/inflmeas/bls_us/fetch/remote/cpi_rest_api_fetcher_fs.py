@@ -41,7 +41,7 @@ The webpages that show data for the index seriesid's are:
 import json
 import os
 import prettytable
-import requests
+import lib.netfs.retry_scheduler as retsch
 import settings as sett
 import lib.os.sufix_incrementor as osfs
 # obs: commands/fetch/bls_cpi_api_fetcher_fs.py import this
@@ -145,7 +145,7 @@ def fetch_json_response_w_restapi_reqjsondata(rest_api_req_m_jsondata, p_headers
   print('Json REST API Request:', rest_api_req_m_jsondata)
   # the call below may raise requests.exceptions.ConnectionError
   print('Going to HTTP-post')
-  p = requests.post(BLS_URL, data=rest_api_req_m_jsondata, headers=p_headers)
+  p = retsch.request_with_retry('POST', BLS_URL, data=rest_api_req_m_jsondata, headers=p_headers)
   print(p)
   print('Response: ', p.text)
   response_json_data = json.loads(p.text)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+art/inflmeas/bls_us/store/adhoctests/test_cpi_bulk_loader_cls.py
+  unit-tests for CpiBulkLoader over a temp sqlite db-file (WAL mode needs a file, not :memory:)
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import art.inflmeas.bls_us.store.cpi_bulk_loader_cls as ldr
+
+
+def gen_tuples(seriesid='CUUR0000SA0', year_fr=2000, year_to=2009, delta=0.0):
+  for year in range(year_fr, year_to + 1):
+    for month in range(1, 13):
+      yield seriesid, f'{year}-{month:02d}-01', 100.0 + (year - 2000) + month / 100 + delta
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.conn = sqlite3.connect(os.path.join(self.tmpdir.name, 'test.sqlite'))
+
+  def tearDown(self):
+    self.conn.close()
+    self.tmpdir.cleanup()
+
+  def count_rows(self):
+    return self.conn.execute(f"SELECT count(*) FROM {ldr.BLS_CPI_TABLENAME};").fetchone()[0]
+
+  def test_1_load_in_chunks_within_one_transaction(self):
+    loader = ldr.CpiBulkLoader(conn=self.conn, chunk_size=50)
+    n_changed = loader.load(gen_tuples())
+    self.assertEqual(120, n_changed)
+    self.assertEqual(120, loader.n_rows_read)
+    self.assertEqual(3, loader.n_chunks)
+    self.assertEqual(120, self.count_rows())
+    self.assertFalse(self.conn.in_transaction)
+    self.assertEqual('wal', self.conn.execute('PRAGMA journal_mode;').fetchone()[0])
+    self.assertGreater(loader.rows_per_sec, 0)
+    self.assertIn('rows/sec', str(loader))
+
+  def test_2_reload_changes_only_the_changed_months(self):
+    ldr.CpiBulkLoader(conn=self.conn).load(gen_tuples())
+    sql = f"SELECT modified_at FROM {ldr.BLS_CPI_TABLENAME} WHERE refmonthdate = '2000-01-01';"
+    modified_at_before = self.conn.execute(sql).fetchone()[0]
+    loader = ldr.CpiBulkLoader(conn=self.conn)
+    self.assertEqual(0, loader.load(gen_tuples()))
+    self.assertEqual(modified_at_before, self.conn.execute(sql).fetchone()[0])
+    loader = ldr.CpiBulkLoader(conn=self.conn)
+    revised = [('CUUR0000SA0', '2009-12-01', 999.0), ('CUUR0000SA0', '2010-01-01', 111.0)]
+    self.assertEqual(2, loader.load(revised))
+    sql = f"SELECT acc_index FROM {ldr.BLS_CPI_TABLENAME} WHERE refmonthdate = '2009-12-01';"
+    self.assertEqual(999.0, self.conn.execute(sql).fetchone()[0])
+    self.assertEqual(121, self.count_rows())
+
+  def test_3_a_bad_tuple_rolls_back_the_whole_load(self):
+    tuples = list(gen_tuples(year_to=2000)) + [('CUUR0000SA0', '2001-01-01', 'not a number')]
+    loader = ldr.CpiBulkLoader(conn=self.conn, chunk_size=5)
+    self.assertRaises(ValueError, loader.load, tuples)
+    self.assertEqual(0, self.count_rows())
+    self.assertFalse(self.conn.in_transaction)
+
+  def test_4_other_table_n_index_column(self):
+    loader = ldr.CpiBulkLoader(conn=self.conn, tablename='idxind_monthly_indices', indexcolumn='baselineindex')
+    loader.load([('CUUR0000SA0', '2024-01-01', 308.417)])
+    row = self.conn.execute("SELECT seriesid, refmonthdate, baselineindex FROM idxind_monthly_indices;").fetchone()
+    self.assertEqual(('CUUR0000SA0', '2024-01-01', 308.417), row)
+
+  def test_5_tuples_from_bulk_reader_columns(self):
+    class FakeReader:
+      seriesid = 'SUUR0000SA0'
+      month_ordinals = np.array([2024 * 12, 2024 * 12 + 11], dtype=np.int64)
+      acc_indices = np.array([171.91, 175.5])
+    expected = [('SUUR0000SA0', '2024-01-01', 171.91), ('SUUR0000SA0', '2024-12-01', 175.5)]
+    self.assertEqual(expected, list(ldr.gen_tuples_from_bulk_reader(FakeReader())))
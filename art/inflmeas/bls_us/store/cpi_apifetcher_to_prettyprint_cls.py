@@ -27,6 +27,8 @@ The script cpi_apifetcher_to_prettyprint_cls.py
     as in the example below:
 ---------------------
 Fetching CPI for various years:
+  Example 0 (batched: a few concurrent requests, as many years & series per request as the API allows)
+    commands/fetch/bls_us/cpi_apifetcher_to_prettyprint_cls.py --yearfrom 1913 --year 2025
   Example 1 (defaulting seriesid)
     for i in {2010..2018}; do commands/fetch/bls_us/cpi_apifetcher_to_prettyprint_cls.py --year $i; sleep 3; done
   Example 2 (inputting seriesid)
@@ -48,7 +50,7 @@ import json
 import os
 # import sys
 import commands.fetch.bls_us.cpi_rest_api_fetcher_fs as ftchfs
-import lib.indices.bls_us.report_reqstatus_in_jsondatafiles_cls as statusex
+import lib.indices.bls_us.bls_json_manifest_cls as manif
 import lib.os.sufix_incrementor as osfs
 import settings as sett
 BLS_URL = 'https://api.bls.gov/publicAPI/v1/timeseries/data/'
@@ -62,6 +64,8 @@ parser.add_argument("--seriesid", type=str, default="CUUR0000SA0",
                     help="Series Id")
 parser.add_argument("--year", type=int, default=datetime.date.today().year,
                     help="Series Id")
+parser.add_argument("--yearfrom", type=int, default=None,
+                    help="if given, fetches years [yearfrom, year] in a few batched requests (not one per year)")
 args = parser.parse_args()
 
 
@@ -210,11 +214,12 @@ class Fetcher:
       scrmsg = f"Converting json type {type(json_str)} to {[str, bytes, bytearray]}"
       print(scrmsg)
       json_str = json.dumps(json_str)
-    fd = open(self.json_filepath, 'w')
-    fd.write(json_str)
+    # written atomically & recorded in the bls folder's manifest
+    manifest = manif.BlsJsonManifest(self.bls_cpi_datafolder)
+    manifest.save_response(self.seriesid, self.year, json_str, self.json_filepath)
+    manifest.close()
     scrmsg = f"Save json file [{self.json_filename}]."
     print(scrmsg)
-    fd.close()
 
   def fetch_json_response_w_restapi_reqjsondata(self):
     self.response_json = ftchfs.fetch_json_response_w_restapi_reqjsondata(self.payload_json)
@@ -257,8 +262,13 @@ class Fetcher:
 
   def is_there_a_json_w_request_succeeded_for_year(self):
     self.bool_json_w_request_succeeded_for_year = False
-    stat = statusex.JsonRequestStatusesReader()
-    if stat.has_request_succeeded(self.json_filename):
+    # one indexed query on the manifest (instead of opening & parsing the json file)
+    #   a json file without an entry (eg downloaded before the manifest existed) is recorded first
+    manifest = manif.BlsJsonManifest(self.bls_cpi_datafolder)
+    manifest.sync_file(self.seriesid, self.year, self.json_filepath)
+    succeeded = manifest.has_request_succeeded(self.seriesid, self.year)
+    manifest.close()
+    if succeeded:
       scrmsg = f"request_succeeded {self.json_filename}"
       print(scrmsg)
       self.bool_json_w_request_succeeded_for_year = True
@@ -361,8 +371,20 @@ def get_args():
   return seriesid, year
 
 
+def process_year_range(seriesid, year_fr, year_to):
+  """
+  Writes the same per-year json & prettyprint files as Fetcher, in a few batched requests
+  """
+  import art.inflmeas.bls_us.fetch.remote.bls_batched_cpi_fetcher_cls as batchf
+  fetcher = batchf.BatchedCPIFetcher([seriesid], year_fr, year_to)
+  fetcher.process()
+  print(fetcher)
+
+
 def process():
   seriesid, year = get_args()
+  if args.yearfrom is not None:
+    return process_year_range(seriesid, args.yearfrom, year)
   fetcher = Fetcher(seriesid, year)
   fetcher.process()
   print(fetcher)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+art/inflmeas/bls_us/store/cpi_bulk_loader_cls.py
+  Contains class CpiBulkLoader which streams (seriesid, refmonthdate, index) tuples into the CPI table
+    (default bls_us_indices) via chunked executemany() upserts, all inside one transaction (WAL journal mode).
+
+  An upsert inserts a new month and updates an existing one only if its index value changed
+    (modified_at then being set), so reloading the whole history rewrites nothing that is already there
+    (and the CPI month cache, @see lib/indices/bls_us/bls_cpi_month_array_cache_cls.py, is not invalidated in vain).
+
+  It is shared by the CPI db-inserting scripts in this folder:
+    => insert_cpis_from_textfiles.py (BatchInsertor: all prettyprint year files)
+    => cpi_insert_manually.py (ManInsertor: a few typed-in months)
+    => extract_series_from_text_to_db.py (the older year-range .dat files)
+
+  Example:
+    loader = CpiBulkLoader()
+    loader.load([('CUUR0000SA0', '2024-01-01', 308.417), ('CUUR0000SA0', '2024-02-01', 310.326)])
+    print(loader)  # rows read, rows changed & rows per second
+"""
+import datetime
+import itertools
+import time
+import settings as sett
+BLS_CPI_TABLENAME = 'bls_us_indices'
+BLS_CPI_INDEXCOLUMN = 'acc_index'
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def gen_tuples_from_bulk_reader(reader):
+  """
+  Yields (seriesid, refmonthdate, acc_index) from a loaded BulkCPIPrettyPrintReader's columns (no CPIDatum built)
+  """
+  for month_ordinal, acc_index in zip(reader.month_ordinals.tolist(), reader.acc_indices.tolist()):
+    yield reader.seriesid, f"{month_ordinal // 12:04d}-{month_ordinal % 12 + 1:02d}-01", acc_index
+
+
+class CpiBulkLoader:
+
+  def __init__(
+      self,
+      conn=None,
+      chunk_size: int | None = None,
+      tablename: str | None = None,
+      indexcolumn: str | None = None,
+      wal: bool = True,
+    ):
+    self.conn = conn
+    self.chunk_size = chunk_size
+    self.tablename = tablename or BLS_CPI_TABLENAME
+    self.indexcolumn = indexcolumn or BLS_CPI_INDEXCOLUMN
+    self.wal = wal
+    self.n_rows_read = 0
+    self.n_rows_changed = 0
+    self.n_chunks = 0
+    self.elapsed_in_sec = 0.0
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.chunk_size is None or self.chunk_size < 1:
+      self.chunk_size = DEFAULT_CHUNK_SIZE
+
+  @property
+  def rows_per_sec(self) -> float:
+    return self.n_rows_read / self.elapsed_in_sec if self.elapsed_in_sec > 0 else 0.0
+
+  def create_table_if_not_exists(self, conn):
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {self.tablename} (
+      seriesid varchar(12) NOT NULL,
+      refmonthdate date NOT NULL,
+      {self.indexcolumn} real NOT NULL,
+      created_at datetime,
+      modified_at datetime,
+      PRIMARY KEY (seriesid, refmonthdate)
+    )""")
+
+  @property
+  def sql_upsert(self) -> str:
+    col = self.indexcolumn
+    sql = f"""
+    INSERT INTO {self.tablename} (seriesid, refmonthdate, {col}, created_at, modified_at)
+      VALUES (?, ?, ?, ?, ?)
+      ON CONFLICT (seriesid, refmonthdate) DO UPDATE SET
+        {col} = excluded.{col}, modified_at = excluded.modified_at
+      WHERE
+        {col} IS NOT excluded.{col};
+    """
+    return sql
+
+  def gen_chunks(self, tuples):
+    """
+    Chunks of db rows (the tuples plus created_at & modified_at), refmonthdate as 'yyyy-mm-dd'
+    """
+    now = str(datetime.datetime.now())
+    rows = ((seriesid, str(refmonthdate)[:10], float(index), now, now) for seriesid, refmonthdate, index in tuples)
+    while True:
+      chunk = list(itertools.islice(rows, self.chunk_size))
+      if len(chunk) == 0:
+        return
+      yield chunk
+
+  def load(self, tuples) -> int:
+    """
+    Upserts the tuples (any iterable, consumed chunk by chunk) in one transaction, returning the nº of rows changed
+    """
+    start = time.perf_counter()
+    close_conn = self.conn is None
+    conn = sett.get_sqlite_connection() if self.conn is None else self.conn
+    try:
+      if self.wal:
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute('PRAGMA synchronous=NORMAL;')  # safe with WAL: a crash may lose the last commit, not corrupt
+      self.create_table_if_not_exists(conn)
+      changes_before = conn.total_changes
+      conn.execute('BEGIN;')
+      try:
+        for chunk in self.gen_chunks(tuples):
+          conn.executemany(self.sql_upsert, chunk)
+          self.n_rows_read += len(chunk)
+          self.n_chunks += 1
+        conn.execute('COMMIT;')
+      except Exception:
+        conn.execute('ROLLBACK;')
+        raise
+      self.n_rows_changed += conn.total_changes - changes_before
+    finally:
+      if close_conn:
+        conn.close()
+    self.elapsed_in_sec += time.perf_counter() - start
+    return self.n_rows_changed
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    table = {self.tablename} | chunk size = {self.chunk_size} | chunks = {self.n_chunks}
+    rows read = {self.n_rows_read} | rows inserted or changed = {self.n_rows_changed}
+    elapsed = {self.elapsed_in_sec:.3f}s | {self.rows_per_sec:.0f} rows/sec
+    """
+    return outstr
+
+
+def adhoctest():
+  import sqlite3
+  conn = sqlite3.connect(':memory:')
+  loader = CpiBulkLoader(conn=conn, wal=False)
+  tuples = ((sid, f'{y}-{m:02d}-01', 100.0 + y - 1913 + m / 100) for sid in ('CUUR0000SA0', 'SUUR0000SA0')
+            for y in range(1913, 2026) for m in range(1, 13))
+  loader.load(tuples)
+  print(loader)
+
+
+def process():
+  pass
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
@@ -6,9 +6,8 @@ The webpages for both CUUR0000SA0 & SUUR0000SA0 have both a table and a linear-g
   https://data.bls.gov/timeseries/CUUR0000SA0
   https://data.bls.gov/timeseries/SUUR0000SA0
 """
-import datetime
 import lib.db.db_settings as dbs
-import settings as sett
+import art.inflmeas.bls_us.store.cpi_bulk_loader_cls as ldr
 tablename = 'idxind_monthly_indices'
 
 
@@ -42,42 +41,17 @@ class ManInsertor:
   tablename = dbs.IDXIND_TABLENAME
 
   def __init__(self):
-    self.conn = None
-    self.cursor = None
     self.n_inserted = 0
     self.triples_list = get_triplelist_for_dbinserting()
     self.process()
 
-  def open_connection(self):
-    self.conn = sett.get_sqlite_connection()
-
-  def close_connection(self):
-    self.conn.close()
-
-  def db_insert_row_into_cpis(self, sql, tuplevalues):
-    cursor = self.conn.cursor()
-    db_o = cursor.execute(sql, tuplevalues)
-    print(self.n_inserted+1, 'Inserting', tuplevalues)
-    if db_o:
-      self.n_inserted += 1
-    cursor.close()
-
   def db_insert_triples_list_into_cpis(self):
     if len(self.triples_list) < 1:
       print('No cpi_us info to inserto to db.')
       return
-    self.open_connection()
-    sql = f"""INSERT OR IGNORE INTO `{self.tablename}`
-      (`seriesid`, `refmonthdate`, `baselineindex`, `created_at`) VALUES (?, ?, ?, ?);"""
-    for triple in self.triples_list:
-      seriesid, refmonthdate, rm_idx = triple
-      created_at = datetime.datetime.now()
-      tuplevalues = (seriesid, refmonthdate, rm_idx, created_at)
-      self.db_insert_row_into_cpis(sql, tuplevalues)
-    if self.n_inserted > 0:
-      print('DB Committing', self.n_inserted)
-      self.conn.commit()
-    self.close_connection()
+    loader = ldr.CpiBulkLoader(tablename=self.tablename, indexcolumn='baselineindex')
+    self.n_inserted = loader.load(self.triples_list)
+    print(loader)
 
   def process(self):
     self.db_insert_triples_list_into_cpis()
@@ -3,6 +3,7 @@
 extract_series_from_text_to_db.py
 """
 import settings as cfg
+import art.inflmeas.bls_us.store.cpi_bulk_loader_cls as ldr
 
 
 def gen_filenames():
@@ -45,15 +46,12 @@ def extract_data_from_files(filenames):
 
 
 def insert_into_db(tuplerecords):
-  conn = cfg.get_sqlite_connection()
-  cursor = conn.cursor()
-  for tuplerecord in tuplerecords:
-    # seriesid, strdate, baselineindex = tuplerecord
-    sql = 'INSERT OR IGNORE INTO cpi_indices (seriesid, refmonthdate, baselineindex) values (?, ?, ?);'
-    ins = cursor.execute(sql, tuplerecord)
-    print('Inserting', ins, tuplerecord)
-  print('DB-Committing')
-  conn.commit()
+  """
+  Upserts the (seriesid, strdate, baselineindex) records into the CPI table (bls_us_indices) in one transaction
+  """
+  loader = ldr.CpiBulkLoader()
+  loader.load(tuplerecords)
+  print(loader)
 
 
 def process():
@@ -36,7 +36,8 @@ import settings as sett
 import lib.datefs.refmonths_mod as rmd
 from art.inflmeas.bls_us import SERIESID_LIST
 from art.inflmeas.bls_us import DEFAULT_SERIESID
-import commands.fetch.bls_us.read_cpis_from_prettyprintdb as ppdb
+import art.inflmeas.bls_us.fetch.prettyprint.bulk_cpi_prettyprint_reader_cls as bulkrd
+import art.inflmeas.bls_us.store.cpi_bulk_loader_cls as ldr
 BLS_CPI_TABLENAME = 'bls_us_indices'
 
 
@@ -155,37 +156,29 @@ class Insertor:
 
 
 class BatchInsertor:
+  """
+  Upserts every series' prettyprint year files into the db in one transaction
+    (@see CpiBulkLoader: chunked executemany() instead of one Insertor per month)
+  """
 
-  def __init__(self):
-    self.ppreader = ppdb.CPIPrettyPrintReader()
-    self.n_eff_inserted = 0
-    print(self.ppreader)
-    self.conn = get_conn()
+  def __init__(self, seriesids: list | None = None):
+    self.seriesids = seriesids or SERIESID_LIST
+    self.loader = ldr.CpiBulkLoader(tablename=BLS_CPI_TABLENAME)
     self.n_eff_inserted = 0
 
-  def insert_cpi_data_fr_prettyprintfiles(self):
-    for i, cpidatum in enumerate(self.ppreader.gen_cpidatum_monthly_asc()):
-      n_to_insert = i + 1
-      ins = Insertor(
-        seriesid=cpidatum.seriesid, refmonthdate=cpidatum.refmonthdate, acc_index=cpidatum.acc_index
-      )
-      scrmsg = f"Going to db-insert {n_to_insert}/{self.n_eff_inserted} {cpidatum}"
-      print(scrmsg)
-      scrmsg = "-"*40
-      print(scrmsg)
-      ins.insert(self.conn)
-      if ins.bool_inserted:
-        self.n_eff_inserted += 1
+  def gen_cpi_tuples(self):
+    for seriesid in self.seriesids:
+      reader = bulkrd.BulkCPIPrettyPrintReader(seriesid)
+      reader.load()
+      print(reader)
+      yield from ldr.gen_tuples_from_bulk_reader(reader)
 
-  def commit_at_the_end(self):
-    scrmsg = "commit_at_the_end"
-    print(scrmsg)
-    self.conn.commit()
-    self.conn.close()
+  def insert_cpi_data_fr_prettyprintfiles(self):
+    self.n_eff_inserted = self.loader.load(self.gen_cpi_tuples())
+    print(self.loader)
 
   def process(self):
     self.insert_cpi_data_fr_prettyprintfiles()
-    self.commit_at_the_end()
 
 
 def adhoctest():
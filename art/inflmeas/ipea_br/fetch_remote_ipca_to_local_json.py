@@ -40,6 +40,7 @@ last two:
 """
 import os
 import requests
+import lib.netfs.retry_scheduler as retsch
 import pandas as pd
 import art.inflmeas.ipea_br.folders_n_files_ipea_data as ppdt  # .get_output_filepath
 IPEA_IPCA_URL = "http://ipeadata.gov.br/api/odata4/ValoresSerie(SERCODIGO='PRECOS12_IPCA12')"
@@ -47,7 +48,7 @@ IPEA_IPCA_URL = "http://ipeadata.gov.br/api/odata4/ValoresSerie(SERCODIGO='PRECO
 
 def rest_api_call(api_url):
   """For advanced users. Returns raw Ipeadata API data in the form of a data frame."""
-  response = requests.get(api_url)
+  response = retsch.request_with_retry('GET', api_url)
   if response.status_code == requests.codes.ok:
     json_response = response.json()
     if 'value' in json_response:
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+lib/db/sqlalch/adhoctests/test_sqlalchemy_connection_clsmod.py
+  unit-tests for the process-wide engine registry (one engine per db filepath,
+    pragmas applied on connect & thread-scoped sessions)
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from sqlalchemy import text
+import lib.db.sqlalch.sqlalchemy_connection_clsmod as sqlal
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.dbfilepath = os.path.join(self.tmpdir.name, 'test.sqlite')
+    sqlite3.connect(self.dbfilepath).close()
+
+  def tearDown(self):
+    sqlal.dispose_engines()
+    self.tmpdir.cleanup()
+
+  def test_1_one_engine_per_dbfilepath(self):
+    engine1 = sqlal.get_sa_engine(self.dbfilepath)
+    engine2 = sqlal.SqlAlchemyConnector(self.dbfilepath).get_sa_engine()
+    self.assertIs(engine1, engine2)
+
+  def test_2_pragmas_applied_on_connect(self):
+    session = sqlal.get_sa_session(self.dbfilepath)
+    self.assertEqual('wal', session.execute(text('PRAGMA journal_mode')).scalar())
+    self.assertEqual(1, session.execute(text('PRAGMA synchronous')).scalar())  # 1 is NORMAL
+    self.assertEqual(5000, session.execute(text('PRAGMA busy_timeout')).scalar())
+    session.close()
+
+  def test_3_sessions_are_thread_scoped(self):
+    session1 = sqlal.get_sa_session(self.dbfilepath)
+    session2 = sqlal.SqlAlchemyConnector(self.dbfilepath).get_sa_session()
+    self.assertIs(session1, session2)
+    other_thread_sessions = []
+    thread = threading.Thread(target=lambda: other_thread_sessions.append(sqlal.get_sa_session(self.dbfilepath)))
+    thread.start()
+    thread.join()
+    self.assertIsNot(session1, other_thread_sessions[0])
+    # a closed session is reusable (the connection goes back to the pool meanwhile)
+    session1.close()
+    self.assertEqual(1, session1.execute(text('SELECT 1')).scalar())
+    session1.close()
+
+
+if __name__ == '__main__':
+  unittest.main()
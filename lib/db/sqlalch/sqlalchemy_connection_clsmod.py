@@ -25,38 +25,144 @@ port         = config.DATABASE_DICT[this_db]['PORT']
 databasename = config.DATABASE_DICT[this_db]['DATABASENAME']
 
 engine_line = this_db + '://' + user + ':' + password + '@' + address + '/' + databasename
+
+Engine registry:
+----------------
+  Engines are process-wide, one per (absolute) db filepath, created on first use
+    with the pool settings below and with the sqlite pragmas applied on each new DBAPI connection.
+  Sessions are thread-scoped (scoped_session): a thread calling get_sa_session() more than once
+    gets the same session (closing it returns its connection to the pool; it's reusable afterwards).
+  So, a per-date lookup costs one query instead of an engine construction plus a pool warm-up.
+
+  Module-level shortcuts (no need to instantiate SqlAlchemyConnector):
+    sqlal.get_sa_session()  # the current thread's session for the default db
+    sqlal.get_sa_engine()  # the cached engine for the default db
 """
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
 import settings as sett
+SA_POOL_SIZE = 5
+SA_POOL_MAX_OVERFLOW = 10
+SA_POOL_TIMEOUT_IN_SEC = 30
+SQLITE_PRAGMAS = [
+  'PRAGMA journal_mode=WAL',  # readers do not block the writer (and vice-versa)
+  'PRAGMA synchronous=NORMAL',  # safe under WAL and far fewer fsyncs
+  'PRAGMA foreign_keys=ON',
+  'PRAGMA temp_store=MEMORY',
+  'PRAGMA cache_size=-20000',  # negative means KiB, ie about 20MB of page cache per connection
+  'PRAGMA busy_timeout=5000',  # milliseconds to wait on a lock before raising "database is locked"
+]
+_engines_per_dbfilepath = {}
+_scoped_sessions_per_dbfilepath = {}
+_lock = threading.Lock()
+
+
+def set_sqlite_pragmas_on_connect(dbapi_connection, _connection_record):
+  cursor = dbapi_connection.cursor()
+  for pragma in SQLITE_PRAGMAS:
+    cursor.execute(pragma)
+  cursor.close()
+
+
+def treat_dbfilepath(dbfilepath=None) -> str:
+  if dbfilepath is None or not os.path.isfile(dbfilepath):
+    dbfilepath = sett.get_exchange_rate_sqlite_filepath()
+  return os.path.abspath(dbfilepath)
+
+
+def create_sqlite_engine(dbfilepath):
+  engine_line = 'sqlite:///' + dbfilepath
+  sqlalchemy_engine = create_engine(
+    engine_line,
+    pool_size=SA_POOL_SIZE,
+    max_overflow=SA_POOL_MAX_OVERFLOW,
+    pool_timeout=SA_POOL_TIMEOUT_IN_SEC,
+    # the pool hands a connection to different threads over time (one thread at a time)
+    connect_args={'check_same_thread': False},
+  )
+  event.listen(sqlalchemy_engine, 'connect', set_sqlite_pragmas_on_connect)
+  return sqlalchemy_engine
+
+
+def get_sa_engine(dbfilepath=None):
+  """
+  Returns the process-wide engine for dbfilepath (None means the app's default sqlite file)
+  """
+  dbfilepath = treat_dbfilepath(dbfilepath)
+  with _lock:
+    sqlalchemy_engine = _engines_per_dbfilepath.get(dbfilepath)
+    if sqlalchemy_engine is None:
+      sqlalchemy_engine = create_sqlite_engine(dbfilepath)
+      _engines_per_dbfilepath[dbfilepath] = sqlalchemy_engine
+  return sqlalchemy_engine
+
+
+def get_scoped_session(dbfilepath=None) -> scoped_session:
+  """
+  Returns the process-wide scoped_session (a thread-local session registry) for dbfilepath
+  """
+  dbfilepath = treat_dbfilepath(dbfilepath)
+  sqlalchemy_engine = get_sa_engine(dbfilepath)
+  with _lock:
+    sessionregistry = _scoped_sessions_per_dbfilepath.get(dbfilepath)
+    if sessionregistry is None:
+      sessionregistry = scoped_session(sessionmaker(bind=sqlalchemy_engine, expire_on_commit=False))
+      _scoped_sessions_per_dbfilepath[dbfilepath] = sessionregistry
+  return sessionregistry
+
+
+def get_sa_session(dbfilepath=None):
+  """
+  Returns the current thread's session for dbfilepath
+  """
+  return get_scoped_session(dbfilepath)()
+
+
+def remove_thread_sessions():
+  """
+  Closes & discards the current thread's sessions (e.g. at the end of a worker thread)
+  """
+  with _lock:
+    sessionregistries = list(_scoped_sessions_per_dbfilepath.values())
+  for sessionregistry in sessionregistries:
+    sessionregistry.remove()
+
+
+def dispose_engines():
+  """
+  Disposes all engines (closing their pooled connections) and empties the registry
+  """
+  with _lock:
+    for sessionregistry in _scoped_sessions_per_dbfilepath.values():
+      sessionregistry.remove()
+    for sqlalchemy_engine in _engines_per_dbfilepath.values():
+      sqlalchemy_engine.dispose()
+    _scoped_sessions_per_dbfilepath.clear()
+    _engines_per_dbfilepath.clear()
 
 
 class SqlAlchemyConnector:
+  """
+  Kept for its clients: it now delegates to the process-wide engine registry above
+  """
 
   def __init__(self, datafilepath=None):
     self.sqlitedatafilepath = datafilepath
     self.treat_attrs()
 
   def treat_attrs(self):
-    if self.sqlitedatafilepath is None or not os.path.isfile(self.sqlitedatafilepath):
-      self.sqlitedatafilepath = sett.get_exchange_rate_sqlite_filepath()
+    self.sqlitedatafilepath = treat_dbfilepath(self.sqlitedatafilepath)
 
   def get_sa_engine(self):
-    engine_line = 'sqlite:///' + self.sqlitedatafilepath
-    if engine_line.startswith('mysql'):
-      engine_line = engine_line + '?charset=utf8mb4'
-    sqlalchemy_engine = create_engine(engine_line)
-    return sqlalchemy_engine
+    return get_sa_engine(self.sqlitedatafilepath)
 
   def get_sa_session_handler(self):
-    session = sessionmaker(bind=self.get_sa_engine())
-    return session
+    return get_scoped_session(self.sqlitedatafilepath)
 
   def get_sa_session(self):
-    sessionhandler = self.get_sa_session_handler()
-    session = sessionhandler()
-    return session
+    return get_sa_session(self.sqlitedatafilepath)
 
 
 def adhoc_test():
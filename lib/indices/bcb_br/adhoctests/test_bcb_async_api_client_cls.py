@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/adhoctests/test_bcb_async_api_client_cls.py
+  unit-tests for BcbAsyncCotacaoClient with a fake session standing in for the remote API
+    (it checks the responses are parsed per date & the per-host concurrency bound is kept)
+"""
+import datetime
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+import lib.indices.bcb_br.bcb_async_api_client_cls as asyncli
+
+
+class FakeResponse:
+
+  def __init__(self, status_code, text):
+    self.status_code = status_code
+    self.text = text
+
+
+class FakeSession:
+  """
+  Answers 2020-07-22 as a holiday (empty 'value' list) and the other dates with a quote
+  """
+
+  def __init__(self):
+    self.n_in_flight = 0
+    self.max_in_flight = 0
+    self.lock = threading.Lock()
+
+  def get(self, url, timeout=None):
+    _ = timeout
+    with self.lock:
+      self.n_in_flight += 1
+      self.max_in_flight = max(self.max_in_flight, self.n_in_flight)
+    time.sleep(0.02)
+    with self.lock:
+      self.n_in_flight -= 1
+    if "'7/22/2020'" in url:
+      return FakeResponse(200, json.dumps({'value': []}))
+    payload = {'value': [{'cotacaoCompra': 5.1641, 'cotacaoVenda': 5.1647, 'dataHoraCotacao': '2020-07-23 13:02:43'}]}
+    return FakeResponse(200, json.dumps(payload))
+
+
+class TestCaseAsyncClient(unittest.TestCase):
+
+  def test_fetch_cotacoes_on_dates_sync(self):
+    fake_session = FakeSession()
+    dates = [datetime.date(2020, 7, d) for d in range(1, 31)]
+    with mock.patch.object(asyncli.htpool, 'get_shared_session', return_value=fake_session):
+      client = asyncli.BcbAsyncCotacaoClient(max_concurrency=3)
+      date_n_result_dict = client.fetch_cotacoes_on_dates_sync(dates)
+    self.assertEqual(dates, list(date_n_result_dict.keys()))
+    self.assertEqual(len(dates), client.n_api_being_called)
+    # the semaphore bounds the requests in flight
+    self.assertLessEqual(fake_session.max_in_flight, 3)
+    self.assertGreater(fake_session.max_in_flight, 1)
+    holiday_nt = date_n_result_dict[datetime.date(2020, 7, 22)]
+    self.assertIsNone(holiday_nt.cotacao_compra)
+    self.assertIsNone(holiday_nt.error_msg)
+    nt = date_n_result_dict[datetime.date(2020, 7, 23)]
+    self.assertAlmostEqual(5.1641, nt.cotacao_compra)
+    self.assertAlmostEqual(5.1647, nt.cotacao_venda)
+
+  def test_non_200_status_gives_error_msg(self):
+    client = asyncli.BcbAsyncCotacaoClient()
+    nt = client.make_namedtuple_w_response(datetime.date(2020, 7, 23), 500, '')
+    self.assertIsNotNone(nt.error_msg)
+    self.assertEqual(1, client.n_errors)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/adhoctests/test_bcb_business_calendar_cls.py
+  unit-tests for BcbBusinessCalendar (the rule set, the O(1) previous business day,
+    learning from null-quote db rows and the json persistence)
+"""
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+import lib.indices.bcb_br.bcb_business_calendar_cls as bizcal
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.filepath = os.path.join(self.tmpdir.name, 'cal.json')
+    self.cal = bizcal.BcbBusinessCalendar(horizon_date='2026-12-31', calendar_filepath=self.filepath)
+
+  def tearDown(self):
+    self.tmpdir.cleanup()
+
+  def test_1_easter_n_ruled_hollidays(self):
+    self.assertEqual(datetime.date(2024, 3, 31), bizcal.calc_easter_sunday_in_year(2024))
+    self.assertEqual(datetime.date(2025, 4, 20), bizcal.calc_easter_sunday_in_year(2025))
+    # Carnival, Good Friday, Corpus Christi, Tiradentes & Nov 20 (from 2024 on)
+    for strdate in ['2024-02-12', '2024-02-13', '2024-03-29', '2024-05-30', '2025-04-21', '2024-11-20']:
+      self.assertTrue(self.cal.is_noquote_date(strdate), strdate)
+    self.assertFalse(self.cal.is_noquote_date('2023-11-20'))
+    self.assertFalse(self.cal.is_noquote_date('2024-02-14'))  # Ash Wednesday has quotes
+    self.assertTrue(self.cal.is_noquote_date('2024-02-10'))  # a Saturday
+
+  def test_2_previous_business_day(self):
+    # Ash Wednesday 2024-02-14 -> Friday 2024-02-09 (skips the weekend & Carnival)
+    self.assertEqual(datetime.date(2024, 2, 9), self.cal.previous_business_day('2024-02-14'))
+    self.assertEqual(datetime.date(2024, 2, 9), self.cal.business_day_on_or_before('2024-02-13'))
+    self.assertEqual(datetime.date(2024, 2, 14), self.cal.business_day_on_or_before('2024-02-14'))
+    bdays = list(self.cal.gen_business_days_backwards('2024-02-15', 3))
+    expected = [datetime.date(2024, 2, 15), datetime.date(2024, 2, 14), datetime.date(2024, 2, 9)]
+    self.assertEqual(expected, bdays)
+
+  def test_3_learn_from_db_n_persist(self):
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE currencies_exchangerates (curr_num, curr_den, buypriceint, sellpriceint, refdate)')
+    rows = [
+      ('BRL', 'USD', None, None, '2023-01-25'),  # a municipal holliday in the data: learned
+      ('BRL', 'USD', 52000, 52010, '2023-01-26'),
+      ('BRL', 'USD', 50000, 50010, '2023-06-08'),  # Corpus Christi 2023 having quotes overrides the rule
+      ('USD', 'EUR', None, None, '2023-01-26'),  # another pair: not read
+    ]
+    conn.executemany('INSERT INTO currencies_exchangerates VALUES (?, ?, ?, ?, ?)', rows)
+    self.assertTrue(self.cal.is_noquote_date('2023-06-08'))
+    self.assertEqual(3, self.cal.learn_from_db(conn))
+    self.assertTrue(self.cal.is_noquote_date('2023-01-25'))
+    self.assertFalse(self.cal.is_noquote_date('2023-06-08'))
+    self.assertEqual(datetime.date(2023, 1, 24), self.cal.previous_business_day('2023-01-26'))
+    # the high-water refdate makes the next pass read nothing
+    self.assertEqual(0, self.cal.learn_from_db(conn))
+    self.cal.save()
+    cal2 = bizcal.BcbBusinessCalendar(horizon_date='2026-12-31', calendar_filepath=self.filepath)
+    self.assertTrue(cal2.load())
+    self.assertTrue(cal2.is_noquote_date('2023-01-25'))
+    self.assertFalse(cal2.is_noquote_date('2023-06-08'))
+    self.assertEqual(datetime.date(2023, 6, 8), cal2.db_highwater_refdate)
+
+  def test_4_learn_noquote_date(self):
+    self.assertTrue(self.cal.is_business_day('2025-03-19'))
+    self.assertEqual(datetime.date(2025, 3, 19), self.cal.previous_business_day('2025-03-20'))
+    self.assertTrue(self.cal.learn_noquote_date('2025-03-19'))
+    self.assertFalse(self.cal.learn_noquote_date('2025-03-19'))  # nothing new
+    self.assertEqual(datetime.date(2025, 3, 18), self.cal.previous_business_day('2025-03-20'))
+    # today may not have its PTAX yet: it's not learned as a non-quote day
+    today = datetime.date.today()
+    self.assertFalse(self.cal.learn_noquote_date(today))
+    self.assertNotIn(today, self.cal.learned_noquote_dates)
+
+  def test_5_business_day_ordinals_between(self):
+    ordinals = self.cal.business_day_ordinals_between('2024-02-08', '2024-02-15')
+    expected = [datetime.date(2024, 2, d).toordinal() for d in (8, 9, 14, 15)]  # Carnival on 12 & 13
+    self.assertEqual(expected, ordinals.tolist())
+    # beyond the horizon, days are checked one by one
+    ordinals = self.cal.business_day_ordinals_between('2026-12-30', '2027-01-04')
+    expected = [datetime.date(2026, 12, 30).toordinal(), datetime.date(2026, 12, 31).toordinal(),
+                datetime.date(2027, 1, 4).toordinal()]
+    self.assertEqual(expected, ordinals.tolist())
+
+
+if __name__ == '__main__':
+  unittest.main()
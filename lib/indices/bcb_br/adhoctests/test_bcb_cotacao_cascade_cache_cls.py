@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/adhoctests/test_bcb_cotacao_cascade_cache_cls.py
+  unit-tests for CotacaoCascade: LRU -> db (in-memory sqlite) -> text files (tmp folder) -> a stub API layer
+    (write-back to the upper layers, the per-layer counters, the LRU bound & the remembered misses)
+"""
+import datetime
+import sqlite3
+import tempfile
+import threading
+import unittest
+import lib.indices.bcb_br.bcbparams as bcbparams
+import lib.indices.bcb_br.bcb_cotacao_cascade_cache_cls as cascls
+import adhoctests.fake_clock_cls as fakeclk
+
+
+class StubApiLayer:
+
+  name = 'api'
+
+  def __init__(self, quotes):
+    self.quotes = quotes
+    self.stats = cascls.LayerStats(self.name)
+    self.n_calls = 0
+
+  def get(self, pdate, currency_pair):
+    self.n_calls += 1
+    if pdate not in self.quotes:
+      return None
+    buy, sell = self.quotes[pdate]
+    return bcbparams.namedtuple_bcb_api1(
+      curr_num=currency_pair[0], curr_den=currency_pair[1], cotacao_compra=buy, cotacao_venda=sell,
+      cotacao_datahora='2024-02-09 13:05:00.000', param_date=pdate, error_msg=None, gen_msg='BCB API', exchanger=None
+    )
+
+  def put(self, nt):
+    pass
+
+
+class BlockingApiLayer(StubApiLayer):
+  """
+  A slow API: get() waits until the test releases it
+  """
+
+  def __init__(self, quotes):
+    super().__init__(quotes)
+    self.entered = threading.Event()
+    self.release = threading.Event()
+
+  def get(self, pdate, currency_pair):
+    self.entered.set()
+    self.release.wait(timeout=5)
+    return super().get(pdate, currency_pair)
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.conn = sqlite3.connect(':memory:')
+    self.conn.execute("""CREATE TABLE currencies_exchangerates (
+      id INTEGER PRIMARY KEY, curr_num char(3), curr_den char(3), buypriceint INTEGER, sellpriceint INTEGER,
+      refdate DATE, quotestime TIME, created_at timestamp, updated_at timestamp)""")
+    self.conn.execute("""CREATE UNIQUE INDEX unq_currnum_currden_refdate
+      ON currencies_exchangerates(curr_num, curr_den, refdate)""")
+    self.api = StubApiLayer({
+      datetime.date(2024, 2, 9): (4.9713, 4.9719),
+      datetime.date(2024, 2, 13): (None, None),  # Carnival
+    })
+    self.lru = cascls.LruCotacaoLayer(maxsize=2)
+    self.db = cascls.DbCotacaoLayer(conn=self.conn)
+    self.txt = cascls.TxtCotacaoLayer(rootfolderpath=self.tmpdir.name)
+    self.cascade = cascls.CotacaoCascade(layers=[self.lru, self.db, self.txt, self.api])
+
+  def tearDown(self):
+    self.conn.close()
+    self.tmpdir.cleanup()
+
+  def test_1_api_hit_is_written_back_n_then_served_from_memory(self):
+    pdate = datetime.date(2024, 2, 9)
+    nt = self.cascade.get('2024-02-09')
+    self.assertEqual((4.9713, 4.9719), (nt.cotacao_compra, nt.cotacao_venda))
+    self.assertEqual((1, 1, 1, 1), (self.lru.stats.misses, self.db.stats.misses,
+                                    self.txt.stats.misses, self.api.stats.hits))
+    row = self.conn.execute('SELECT buypriceint, sellpriceint FROM currencies_exchangerates').fetchone()
+    self.assertEqual((49713, 49719), row)
+    self.assertEqual((4.9713, 4.9719), self.txt.get(pdate, ('BRL', 'USD'))[2:4])
+    for _ in range(5):
+      self.cascade.get(pdate)
+    self.assertEqual(5, self.lru.stats.hits)
+    self.assertEqual(1, self.api.n_calls)
+    self.assertEqual(1, self.db.stats.n_lookups)
+
+  def test_2_txt_hit_fills_db_n_lru(self):
+    pdate = datetime.date(2024, 2, 9)
+    self.txt.put(self.api.get(pdate, ('BRL', 'USD')))
+    self.api.n_calls = 0
+    nt = self.cascade.get(pdate)
+    self.assertEqual('Fetched from text file', nt.gen_msg)
+    self.assertEqual(0, self.api.n_calls)
+    self.assertEqual(1, self.db.stats.writes)
+    # a fresh LRU: the db now answers
+    self.lru.clear()
+    self.assertEqual('Fetched from db', self.cascade.get(pdate).gen_msg)
+    self.assertEqual(4.9719, self.cascade.get(pdate).cotacao_venda)
+
+  def test_3_holliday_n_not_found_n_lru_bound(self):
+    nt = self.cascade.get('2024-02-13')
+    self.assertIsNone(nt.cotacao_compra)
+    self.assertEqual({}, self.txt.read_month_quotes(self.txt.make_month_filepath(datetime.date(2024, 2, 13),
+                                                                                 ('BRL', 'USD'))))
+    self.assertEqual(1, self.conn.execute('SELECT count(*) FROM currencies_exchangerates').fetchone()[0])
+    self.assertIsNone(self.cascade.get('2024-02-14'))
+    self.assertEqual(1, self.cascade.n_not_found)
+    self.cascade.get('2024-02-09')
+    self.cascade.get('2024-02-13')
+    self.cascade.get('2024-02-09')
+    self.assertEqual(2, len(self.lru))
+    self.assertIn('hit rate', str(self.cascade))
+
+  def test_4_whole_number_api_price_keeps_its_scale(self):
+    pdate = datetime.date(2024, 2, 14)
+    self.api.quotes[pdate] = (5, 5)  # JSON 5: an int in currency units
+    self.assertEqual(5, self.cascade.get(pdate).cotacao_compra)
+    row = self.conn.execute('SELECT buypriceint, sellpriceint FROM currencies_exchangerates').fetchone()
+    self.assertEqual((50000, 50000), row)
+    self.assertEqual((5.0, 5.0), self.txt.get(pdate, ('BRL', 'USD'))[2:4])
+    self.assertEqual(5.0, self.db.get(pdate, ('BRL', 'USD')).cotacao_venda)
+
+  def test_5_slow_api_call_does_not_hold_up_lru_hits(self):
+    api = BlockingApiLayer({datetime.date(2024, 2, 9): (4.9713, 4.9719), datetime.date(2024, 2, 8): (4.97, 4.98)})
+    cascade = cascls.CotacaoCascade(layers=[cascls.LruCotacaoLayer(), api])
+    api.release.set()
+    cascade.get('2024-02-08')  # into the LRU
+    api.release.clear()
+    slow_results = []
+    slow_thread = threading.Thread(target=lambda: slow_results.append(cascade.get('2024-02-09')))
+    slow_thread.start()
+    self.assertTrue(api.entered.wait(timeout=5))
+    fast_results = []
+    fast_thread = threading.Thread(target=lambda: fast_results.append(cascade.get('2024-02-08')))
+    fast_thread.start()
+    fast_thread.join(timeout=2)
+    finished_while_api_pending = not fast_thread.is_alive()
+    api.release.set()
+    fast_thread.join(timeout=5)
+    self.assertTrue(finished_while_api_pending)
+    self.assertEqual(4.97, fast_results[0].cotacao_compra)
+    slow_thread.join(timeout=5)
+    self.assertEqual(4.9713, slow_results[0].cotacao_compra)
+    self.assertEqual((1, 2), (cascade.layers[0].stats.hits, cascade.layers[0].stats.misses))
+
+  def test_6_second_lookup_of_a_saturday_stays_in_memory(self):
+    self.assertIsNone(self.cascade.get('2024-02-10'))  # a Saturday
+    n_lookups_below = [layer.stats.n_lookups for layer in (self.db, self.txt, self.api)]
+    self.assertEqual([1, 1, 1], n_lookups_below)
+    self.assertIsNone(self.cascade.get('2024-02-10'))
+    self.assertEqual(n_lookups_below, [layer.stats.n_lookups for layer in (self.db, self.txt, self.api)])
+    self.assertEqual(1, self.lru.stats.hits)
+    self.assertEqual(2, self.cascade.n_not_found)
+
+  def test_7_a_miss_that_may_still_come_out_expires(self):
+    clock = fakeclk.FakeClock()
+    lru = cascls.LruCotacaoLayer(miss_ttl_in_sec=60, clock=clock)
+    cascade = cascls.CotacaoCascade(layers=[lru, self.db, self.txt, cascls.ApiCotacaoLayer()])
+    saturday = datetime.date(2024, 2, 10)
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    self.assertIsNone(cascade.get(saturday))  # the API layer rejects both without a call
+    self.assertIsNone(cascade.get(tomorrow))
+    self.assertEqual(2, lru.n_known_misses)
+    clock.now = 61.0
+    cascade.get(saturday)
+    self.assertEqual(2, self.db.stats.n_lookups)  # the Saturday is remembered for the whole run
+    # tomorrow's quote comes out later: its miss has expired & the db is asked again
+    self.db.put(bcbparams.namedtuple_bcb_api1(
+      curr_num='BRL', curr_den='USD', cotacao_compra=5.1, cotacao_venda=5.2, cotacao_datahora=None,
+      param_date=tomorrow, error_msg=None, gen_msg='BCB API', exchanger=None
+    ))
+    self.assertEqual(5.1, cascade.get(tomorrow).cotacao_compra)
+    self.assertEqual(1, lru.n_known_misses)
+
+
+if __name__ == '__main__':
+  unittest.main()
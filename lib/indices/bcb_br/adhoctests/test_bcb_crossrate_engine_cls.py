@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/adhoctests/test_bcb_crossrate_engine_cls.py
+  unit-tests for CrossRateEngine (BCB's type A & B formulas, crosses & alignment on BRL/USD business days)
+"""
+import datetime
+import unittest
+import numpy as np
+import lib.indices.bcb_br.bcb_exchrate_index_cls as exidx
+import lib.indices.bcb_br.bcb_crossrate_engine_cls as xrate
+D1, D2, D3 = datetime.date(2024, 1, 2), datetime.date(2024, 1, 3), datetime.date(2024, 1, 4)
+
+
+def make_index(curr_num, curr_den, quotes):
+  index = exidx.ExchRateIndex(curr_num, curr_den)
+  for pdate, buy, sell in quotes:
+    index.upsert_quote(pdate, buy, sell)
+  return index
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    indices = {
+      ('BRL', 'USD'): make_index('BRL', 'USD', [(D1, 5.0, 5.01), (D2, 5.1, 5.11), (D3, 5.2, 5.21)]),
+      ('USD', 'EUR'): make_index('USD', 'EUR', [(D1, 1.1, 1.11), (D2, 1.2, 1.21), (D3, 1.3, 1.31)]),
+      ('CAD', 'USD'): make_index('CAD', 'USD', [(D1, 1.35, 1.36), (D3, 1.4, 1.41)]),  # D2 lacks a parity
+    }
+    self.indices = indices
+    self.engine = xrate.CrossRateEngine(index_getter=lambda pair: indices[pair])
+
+  def test_1_type_b_euro(self):
+    series = self.engine.derive('BRL', 'EUR')
+    np.testing.assert_allclose([1.1 * 5.0, 1.2 * 5.1, 1.3 * 5.2], series.buy)
+    np.testing.assert_allclose([1.11 * 5.01, 1.21 * 5.11, 1.31 * 5.21], series.sell)
+    inverse = self.engine.derive('EUR', 'BRL')
+    np.testing.assert_allclose(1 / series.sell, inverse.buy)
+    np.testing.assert_allclose(1 / series.buy, inverse.sell)
+
+  def test_2_type_a_n_alignment(self):
+    series = self.engine.derive('BRL', 'CAD', date_fr=D1, date_to=D3)
+    self.assertEqual([D1, D2, D3], xrate.make_dates_from_ordinals(series.ordinals))
+    self.assertAlmostEqual(5.0 / 1.36, series.buy[0])
+    self.assertAlmostEqual(5.01 / 1.35, series.sell[0])
+    self.assertTrue(np.isnan(series.buy[1]))
+    refdate, buy, _ = self.engine.derive_asof('BRL', 'CAD', D2)
+    self.assertEqual(D1, refdate)
+    self.assertAlmostEqual(5.0 / 1.36, buy)
+
+  def test_3_cross_without_brl(self):
+    series = self.engine.derive('CAD', 'EUR', date_fr=D3, date_to=D3)
+    # CAD per EUR: buy = buy BRL/EUR ÷ sell BRL/CAD
+    self.assertAlmostEqual((1.3 * 5.2) / (5.21 / 1.4), series.buy[0])
+    with self.assertRaises(ValueError):
+      self.engine.derive('BRL', 'XYZ')
+
+  def test_4_index_still_grows_n_cache_follows_it(self):
+    self.engine.derive('BRL', 'EUR')
+    d4 = datetime.date(2024, 1, 5)
+    # an upsert after a derivation (no buffer of the index's arrays may still be exported)
+    self.assertTrue(self.indices[('BRL', 'USD')].upsert_quote(d4, 5.3, 5.31))
+    self.assertTrue(self.indices[('USD', 'EUR')].upsert_quote(d4, 1.4, 1.41))
+    series = self.engine.derive('BRL', 'EUR', date_fr=d4)
+    self.assertEqual([d4], xrate.make_dates_from_ordinals(series.ordinals))
+    self.assertAlmostEqual(1.4 * 5.3, series.buy[0])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/adhoctests/test_bcb_exchrate_asof_lookup_fs.py
+  unit-tests for the one-statement as-of datelist lookup over an in-memory sqlite db
+    (json_each & temp-table variants, alignment with the input & holliday rows)
+"""
+import datetime
+import sqlite3
+import unittest
+import lib.indices.bcb_br.bcb_exchrate_asof_lookup_fs as asof
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.conn = sqlite3.connect(':memory:')
+    self.conn.execute("""CREATE TABLE currencies_exchangerates (
+      id INTEGER PRIMARY KEY, curr_num char(3), curr_den char(3), buypriceint INTEGER, sellpriceint INTEGER,
+      refdate DATE, quotestime TIME, created_at timestamp, updated_at timestamp)""")
+    self.conn.execute("""CREATE UNIQUE INDEX unq_currnum_currden_refdate
+      ON currencies_exchangerates(curr_num, curr_den, refdate)""")
+    rows = [
+      ('BRL', 'USD', 49713, 49719, '2024-02-09'),
+      ('BRL', 'USD', None, None, '2024-02-12'),  # Carnival
+      ('BRL', 'USD', None, None, '2024-02-13'),
+      ('BRL', 'USD', 49600, 49610, '2024-02-14'),
+      ('BRL', 'EUR', 53000, 53010, '2024-02-13'),
+    ]
+    self.conn.executemany("INSERT INTO currencies_exchangerates (curr_num, curr_den, buypriceint, sellpriceint, "
+                          "refdate) VALUES (?, ?, ?, ?, ?)", rows)
+
+  def tearDown(self):
+    self.conn.close()
+
+  def check_asof(self, via_temp_table):
+    datelist = ['2024-02-14', '2024-02-13', 'foo', '2024-01-01', datetime.date(2024, 2, 10)]
+    res = asof.lookup_asof_quotes_for_datelist(datelist, conn=self.conn, via_temp_table=via_temp_table)
+    self.assertEqual([True, True, False, False, True], res.found.tolist())
+    d0209, d0214 = datetime.date(2024, 2, 9).toordinal(), datetime.date(2024, 2, 14).toordinal()
+    self.assertEqual([d0214, d0209, 0, 0, d0209], res.refdate_ordinals.tolist())
+    self.assertEqual([49600, 49713, 0, 0, 49713], res.buyints.tolist())
+    self.assertEqual([49610, 49719, 0, 0, 49719], res.sellints.tolist())
+    self.assertEqual(0, res.param_ordinals[2])
+
+  def test_1_asof_via_json_each(self):
+    self.check_asof(via_temp_table=False)
+
+  def test_2_asof_via_temp_table(self):
+    self.check_asof(via_temp_table=True)
+
+  def test_3_holliday_rows_n_dates_without_a_row(self):
+    res = asof.lookup_asof_quotes_for_datelist(['2024-02-13'], conn=self.conn, skip_hollidays=False)
+    self.assertEqual(datetime.date(2024, 2, 13).toordinal(), res.refdate_ordinals[0])
+    self.assertEqual(0, res.buyints[0])
+    missing = asof.find_dates_without_a_row(
+      ['2024-02-08', '2024-02-09', '2024-02-12', '2024-02-15'], conn=self.conn)
+    self.assertEqual([datetime.date(2024, 2, 8), datetime.date(2024, 2, 15)], missing)
+    res = asof.lookup_asof_quotes_for_datelist(['2024-02-14'], currency_pair=('BRL', 'EUR'), conn=self.conn)
+    self.assertEqual(53000, res.buyints[0])
+
+  def test_4_thousands_of_dates(self):
+    day1 = datetime.date(2020, 1, 1)
+    datelist = [day1 + datetime.timedelta(days=i) for i in range(5000)]
+    res = asof.lookup_asof_quotes_for_datelist(datelist, conn=self.conn)
+    self.assertEqual(5000, res.found.size)
+    self.assertEqual(int(res.found.sum()), sum(1 for d in datelist if d >= datetime.date(2024, 2, 9)))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/adhoctests/test_bcb_exchrate_bulk_upsert_cls.py
+  unit-tests for ExchRateBulkUpserter over an in-memory sqlite db
+    (chunked upserts in one transaction & the inserted/updated/unchanged report)
+"""
+import datetime
+import sqlite3
+import unittest
+import lib.indices.bcb_br.bcbparams as bcbparams
+import lib.indices.bcb_br.bcb_exchrate_bulk_upsert_cls as bulkcls
+
+
+def make_nt(pdate, buy, sell, datahora='2024-02-09 13:05:00.000', error_msg=None):
+  return bcbparams.namedtuple_bcb_api1(
+    curr_num='BRL', curr_den='USD', cotacao_compra=buy, cotacao_venda=sell, cotacao_datahora=datahora,
+    param_date=pdate, error_msg=error_msg, gen_msg=None, exchanger=None
+  )
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.conn = sqlite3.connect(':memory:')
+    self.conn.execute("""CREATE TABLE currencies_exchangerates (
+      id INTEGER PRIMARY KEY, curr_num char(3), curr_den char(3), buypriceint INTEGER, sellpriceint INTEGER,
+      refdate DATE, quotestime TIME, created_at timestamp, updated_at timestamp)""")
+    self.conn.execute("""CREATE UNIQUE INDEX unq_currnum_currden_refdate
+      ON currencies_exchangerates(curr_num, curr_den, refdate)""")
+
+  def count_rows(self):
+    return self.conn.execute('SELECT count(*) FROM currencies_exchangerates').fetchone()[0]
+
+  def test_1_insert_update_unchanged(self):
+    day1 = datetime.date(2024, 1, 1)
+    nts = [make_nt(day1 + datetime.timedelta(days=i), 4.9 + i / 100, 4.91 + i / 100) for i in range(7)]
+    nts.append(make_nt(datetime.date(2024, 1, 8), None, None, datahora=None))  # a holliday row
+    nts.append(make_nt(datetime.date(2024, 1, 9), None, None, error_msg='Error: connection'))  # skipped
+    upserter = bulkcls.ExchRateBulkUpserter(conn=self.conn, chunk_size=3)
+    self.assertEqual(8, upserter.upsert(nts))
+    self.assertEqual((8, 0, 0, 1, 3), (upserter.n_inserted, upserter.n_updated, upserter.n_unchanged,
+                                       upserter.n_skipped, upserter.n_chunks))
+    self.assertEqual(8, self.count_rows())
+    buyint, quotestime = self.conn.execute(
+      "SELECT buypriceint, quotestime FROM currencies_exchangerates WHERE refdate='2024-01-02'").fetchone()
+    self.assertEqual((49100, '13:05:00.000000'), (buyint, quotestime))
+    # 2nd pass: one changed quote, the others unchanged
+    nts[1] = make_nt(nts[1].param_date, 4.95, 4.96)
+    upserter = bulkcls.ExchRateBulkUpserter(conn=self.conn, chunk_size=3)
+    self.assertEqual(1, upserter.upsert(nts))
+    self.assertEqual((0, 1, 7), (upserter.n_inserted, upserter.n_updated, upserter.n_unchanged))
+    row = self.conn.execute(
+      "SELECT buypriceint, updated_at FROM currencies_exchangerates WHERE refdate='2024-01-02'").fetchone()
+    self.assertEqual(49500, row[0])
+    self.assertIsNotNone(row[1])
+    self.assertEqual(8, self.count_rows())
+
+  def test_2_failure_rolls_back_the_batch(self):
+    nts = [make_nt(datetime.date(2024, 1, 2), 4.9, 4.91), make_nt(datetime.date(2024, 1, 3), 4.9, 4.91)]
+    upserter = bulkcls.ExchRateBulkUpserter(conn=self.conn, chunk_size=1)
+
+    def gen_nts_then_fail():
+      yield from nts
+      raise RuntimeError('failure in the middle of the batch')
+
+    with self.assertRaises(RuntimeError):
+      upserter.upsert(gen_nts_then_fail())
+    self.assertEqual(0, self.count_rows())
+
+
+if __name__ == '__main__':
+  unittest.main()
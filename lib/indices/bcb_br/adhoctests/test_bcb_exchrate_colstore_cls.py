@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/adhoctests/test_bcb_exchrate_colstore_cls.py
+  unit-tests for ExchRateColumnarStore (regeneration from text files & db, zero-copy mmap views)
+"""
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import lib.indices.bcb_br.bcb_exchrate_colstore_cls as colst
+PRETTYPRINT_TEXT = """+-----+------------+----------+-----------+
+| seq |    date    | buyprice | sellprice |
++-----+------------+----------+-----------+
+|  1  | 2020-07-01 |  5.3    |  5.3006   |
+|  2  | 2020-07-02 |  5.35   |  5.3506   |
++-----+------------+----------+-----------+
+"""
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.storefolder = os.path.join(self.tmpdir.name, 'colstore')
+
+  def tearDown(self):
+    self.tmpdir.cleanup()
+
+  def test_1_regenerate_from_textfiles(self):
+    ppfolder = os.path.join(self.tmpdir.name, 'bcb_indices', '2020 bcb exchange rates')
+    os.makedirs(ppfolder)
+    with open(os.path.join(ppfolder, '2020-07 BRL_USD exchange rates.txt'), 'w') as fd:
+      fd.write(PRETTYPRINT_TEXT)
+    with open(os.path.join(ppfolder, '2020-07 BRL_EUR exchange rates.txt'), 'w') as fd:
+      fd.write(PRETTYPRINT_TEXT.replace('5.3', '6.1'))  # another pair: not read
+    store = colst.ExchRateColumnarStore('BRL', 'USD', self.storefolder)
+    self.assertEqual(2, store.regenerate_from_textfiles(os.path.join(self.tmpdir.name, 'bcb_indices')))
+    with store:
+      self.assertEqual([53000, 53500], store.buyints.tolist())
+      self.assertEqual([53006, 53506], store.sellints.tolist())
+      self.assertEqual(datetime.date(2020, 7, 2).toordinal(), int(store.ordinals[-1]))
+
+  def test_2_regenerate_from_db_n_zero_copy_views(self):
+    conn = sqlite3.connect(':memory:')
+    conn.execute(
+      'CREATE TABLE currencies_exchangerates (curr_num, curr_den, buypriceint, sellpriceint, refdate, updated_at)'
+    )
+    day1 = datetime.date(2005, 1, 3)
+    rows = [('BRL', 'USD', 20000 + i, 20010 + i, str(day1 + datetime.timedelta(days=i))) for i in range(7000)]
+    rows.append(('BRL', 'USD', None, None, '2024-12-25'))  # a holliday row is not stored
+    conn.executemany('INSERT INTO currencies_exchangerates VALUES (?, ?, ?, ?, ?, null)', rows)
+    store = colst.ExchRateColumnarStore('BRL', 'USD', self.storefolder)
+    self.assertEqual(7000, store.regenerate_from_db(conn))
+    with store:
+      self.assertEqual(7000, store.n_rows)
+      for column in (store.ordinals, store.buyints, store.sellints):
+        self.assertFalse(column.flags.owndata)
+        self.assertFalse(column.flags.writeable)
+      self.assertEqual(0, store.buyints.ctypes.data % 8)
+      self.assertTrue(np.all(np.diff(store.ordinals) > 0))
+      sl = store.find_range_slice(day1 + datetime.timedelta(days=10), day1 + datetime.timedelta(days=19))
+      self.assertEqual(10, sl.stop - sl.start)
+      self.assertEqual((day1, 20000, 20010), store.find_asof(day1))
+      self.assertIsNone(store.find_asof(day1 - datetime.timedelta(days=1)))
+
+  def test_3_pair_mismatch_is_refused(self):
+    store = colst.ExchRateColumnarStore('BRL', 'USD', self.storefolder)
+    store.write_rows([])
+    os.rename(store.filepath, os.path.join(self.storefolder, 'BRL_EUR.xrcol'))
+    with self.assertRaises(ValueError):
+      colst.ExchRateColumnarStore('BRL', 'EUR', self.storefolder).open()
+
+  def test_4_stale_file_is_regenerated(self):
+    conn = sqlite3.connect(':memory:')
+    conn.execute(
+      'CREATE TABLE currencies_exchangerates (curr_num, curr_den, buypriceint, sellpriceint, refdate, updated_at)'
+    )
+    conn.execute("INSERT INTO currencies_exchangerates VALUES ('BRL', 'USD', 49600, 49610, '2024-02-09', null)")
+    store = colst.open_colstore_or_regenerate('BRL', 'USD', self.storefolder, conn=conn)
+    self.assertEqual((1, False), (store.n_rows, store.is_stale(conn)))
+    written_at = os.stat(store.filepath).st_mtime_ns
+    store.close()
+    store = colst.open_colstore_or_regenerate('BRL', 'USD', self.storefolder, conn=conn)
+    self.assertEqual(written_at, os.stat(store.filepath).st_mtime_ns)  # up to date: only reopened
+    # a new quote & an updated one
+    conn.execute("INSERT INTO currencies_exchangerates VALUES ('BRL', 'USD', 49700, 49710, '2024-02-14', null)")
+    self.assertTrue(store.is_stale(conn))
+    store.close()
+    store = colst.open_colstore_or_regenerate('BRL', 'USD', self.storefolder, conn=conn)
+    self.assertEqual(2, store.n_rows)
+    conn.execute("UPDATE currencies_exchangerates SET buypriceint = 49601, updated_at = '2024-02-15 10:00' "
+                 "WHERE refdate = '2024-02-09'")
+    self.assertTrue(store.is_stale(conn))
+    store.close()
+    with colst.open_colstore_or_regenerate('BRL', 'USD', self.storefolder, conn=conn) as store:
+      self.assertEqual([49601, 49700], store.buyints.tolist())
+    # a file made from the text files has no db stamp: it's regenerated too
+    store.write_rows([(datetime.date(2024, 2, 9).toordinal(), 1, 1)])
+    with colst.open_colstore_or_regenerate('BRL', 'USD', self.storefolder, conn=conn) as store:
+      self.assertEqual(2, store.n_rows)
+    conn.close()
+
+
+if __name__ == '__main__':
+  unittest.main()
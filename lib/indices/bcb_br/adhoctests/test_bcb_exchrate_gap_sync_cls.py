@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/adhoctests/test_bcb_exchrate_gap_sync_cls.py
+  unit-tests for ExchRateGapSyncer over an in-memory sqlite db with a stub range fetcher
+    (gap detection against the business calendar, range batching & the high-water state file)
+"""
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+import lib.indices.bcb_br.bcbparams as bcbparams
+import lib.indices.bcb_br.bcb_business_calendar_cls as bizcal
+import lib.indices.bcb_br.bcb_exchrate_gap_sync_cls as gapsync
+
+
+def make_nt(pdate, buy=4.9, sell=4.91):
+  return bcbparams.namedtuple_bcb_api1(
+    curr_num='BRL', curr_den='USD', cotacao_compra=buy, cotacao_venda=sell, cotacao_datahora=None,
+    param_date=pdate, error_msg=None, gen_msg=None, exchanger=None
+  )
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.state_filepath = os.path.join(self.tmpdir.name, 'sync_state.json')
+    self.calendar = bizcal.BcbBusinessCalendar(
+      horizon_date='2025-12-31', calendar_filepath=os.path.join(self.tmpdir.name, 'calendar.json')
+    )
+    self.conn = sqlite3.connect(':memory:')
+    self.conn.execute("""CREATE TABLE currencies_exchangerates (
+      id INTEGER PRIMARY KEY, curr_num char(3), curr_den char(3), buypriceint INTEGER, sellpriceint INTEGER,
+      refdate DATE, quotestime TIME, created_at timestamp, updated_at timestamp)""")
+    self.missing = {datetime.date(2024, 1, 10), datetime.date(2024, 1, 11), datetime.date(2024, 1, 30)}
+    pdate = datetime.date(2024, 1, 2)
+    while pdate <= datetime.date(2024, 1, 31):
+      if self.calendar.is_business_day(pdate) and pdate not in self.missing:
+        self.conn.execute(
+          "INSERT INTO currencies_exchangerates (curr_num, curr_den, buypriceint, sellpriceint, refdate) "
+          "VALUES ('BRL', 'USD', 49000, 49100, ?)", (str(pdate),))
+      pdate += datetime.timedelta(days=1)
+    self.fetched_ranges = []
+
+  def tearDown(self):
+    self.conn.close()
+    self.tmpdir.cleanup()
+
+  def make_syncer(self, range_fetcher, **kwargs):
+    syncer = gapsync.ExchRateGapSyncer(
+      business_calendar=self.calendar, range_fetcher=range_fetcher,
+      state_filepath=self.state_filepath, conn=self.conn, **kwargs
+    )
+    syncer.yesterday = datetime.date(2024, 1, 31)
+    return syncer
+
+  def test_1_batch_ordinals_into_ranges(self):
+    d = datetime.date(2024, 1, 1).toordinal()
+    ranges = gapsync.batch_ordinals_into_ranges([d, d + 1, d + 2, d + 40], max_days_bw=15)
+    self.assertEqual(2, len(ranges))
+    self.assertEqual((datetime.date(2024, 1, 1), datetime.date(2024, 1, 3)), ranges[0])
+    self.assertEqual([], gapsync.batch_ordinals_into_ranges([]))
+
+  def test_2_gaps_are_fetched_n_highwater_stops_at_the_open_gap(self):
+    def fetch_only_the_first_range(date_fr, date_to, currency_pair):
+      self.fetched_ranges.append((date_fr, date_to, currency_pair))
+      if date_fr.day == 30:
+        return []  # eg the API was down
+      return [make_nt(d) for d in self.missing if date_fr <= d <= date_to]
+    syncer = self.make_syncer(fetch_only_the_first_range, since='2024-01-02')
+    self.assertEqual(2, syncer.process())
+    self.assertEqual(1, syncer.n_queries)
+    expected = [
+      (datetime.date(2024, 1, 10), datetime.date(2024, 1, 11), ('BRL', 'USD')),
+      (datetime.date(2024, 1, 30), datetime.date(2024, 1, 30), ('BRL', 'USD')),
+    ]
+    self.assertEqual(expected, self.fetched_ranges)
+    self.assertEqual(datetime.date(2024, 1, 29), syncer.get_highwater_date(('BRL', 'USD')))
+    # next run: only the day after the high-water date is scanned & fetched
+    self.fetched_ranges = []
+
+    def fetch_all(date_fr, date_to, currency_pair):
+      self.fetched_ranges.append((date_fr, date_to, currency_pair))
+      return [make_nt(date_fr)]
+    syncer = self.make_syncer(fetch_all)
+    self.assertEqual(datetime.date(2024, 1, 29), syncer.get_highwater_date(('BRL', 'USD')))
+    syncer.process()
+    self.assertEqual([expected[1]], self.fetched_ranges)
+    self.assertEqual(datetime.date(2024, 1, 31), syncer.get_highwater_date(('BRL', 'USD')))
+
+  def test_3_no_gaps_no_fetch_n_a_holliday_is_learned(self):
+    def fetch_hollidays(date_fr, date_to, currency_pair):
+      self.fetched_ranges.append((date_fr, date_to))
+      return [make_nt(d, None, None) for d in self.missing]
+    syncer = self.make_syncer(fetch_hollidays, since='2024-01-02')
+    syncer.process()
+    self.assertTrue(self.calendar.is_noquote_date('2024-01-30'))
+    # a full sync rescans but, with the hollidays now known, finds no gap
+    self.fetched_ranges = []
+    syncer = self.make_syncer(fetch_hollidays, full=True)
+    syncer.process()
+    self.assertEqual([], self.fetched_ranges)
+    self.assertEqual(datetime.date(2024, 1, 31), syncer.get_highwater_date(('BRL', 'USD')))
+
+  def test_4_since_before_the_highwater_date_is_honored(self):
+    def fetch_all(date_fr, date_to, currency_pair):
+      self.fetched_ranges.append((date_fr, date_to))
+      pdates = [d for d in self.missing if date_fr <= d <= date_to]
+      self.conn.executemany(
+        "INSERT INTO currencies_exchangerates (curr_num, curr_den, buypriceint, sellpriceint, refdate) "
+        "VALUES ('BRL', 'USD', 49000, 49100, ?)", [(str(d),) for d in pdates])
+      return [make_nt(d) for d in pdates]
+    syncer = self.make_syncer(fetch_all)
+    syncer.set_highwater_date(('BRL', 'USD'), datetime.date(2024, 1, 20))
+    syncer.save_state()
+    # without since, the open gap on the 10th & 11th (before the high-water date) is not scanned
+    syncer = self.make_syncer(fetch_all)
+    syncer.process()
+    self.assertEqual([(datetime.date(2024, 1, 30), datetime.date(2024, 1, 30))], self.fetched_ranges)
+    # since goes back beyond the high-water date: the scan starts there
+    self.fetched_ranges = []
+    syncer = self.make_syncer(fetch_all, since='2024-01-05')
+    self.assertEqual(datetime.date(2024, 1, 4), syncer.get_scan_highwater_date(('BRL', 'USD')))
+    syncer.process()
+    self.assertEqual([(datetime.date(2024, 1, 10), datetime.date(2024, 1, 11))], self.fetched_ranges)
+    self.assertEqual(datetime.date(2024, 1, 31), syncer.get_highwater_date(('BRL', 'USD')))
+
+
+if __name__ == '__main__':
+  unittest.main()
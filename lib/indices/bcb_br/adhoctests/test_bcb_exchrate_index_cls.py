@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/adhoctests/test_bcb_exchrate_index_cls.py
+  unit-tests for ExchRateIndex over an in-memory sqlite db
+    (exact, as-of & range queries, upserts and the incremental refresh)
+"""
+import datetime
+import sqlite3
+import unittest
+import numpy as np
+import lib.indices.bcb_br.bcb_exchrate_index_cls as exidx
+
+
+def make_conn_w_rows(rows):
+  conn = sqlite3.connect(':memory:')
+  conn.execute("""CREATE TABLE currencies_exchangerates (
+    curr_num, curr_den, buypriceint, sellpriceint, refdate, quotestime, updated_at)""")
+  insert_rows(conn, rows)
+  return conn
+
+
+def insert_rows(conn, rows):
+  conn.executemany('INSERT INTO currencies_exchangerates VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+  conn.commit()
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    rows = [
+      ('BRL', 'USD', 49500, 49510, '2024-02-08', '13:00', '2024-02-08 14:00'),
+      ('BRL', 'USD', 49600, 49610, '2024-02-09', '13:00', '2024-02-09 14:00'),
+      ('BRL', 'USD', None, None, '2024-02-12', None, '2024-02-12 14:00'),  # Carnival: not indexed
+      ('BRL', 'USD', 49700, 49710, '2024-02-14', '13:00', '2024-02-14 14:00'),
+      ('BRL', 'EUR', 53700, 53710, '2024-02-14', '13:00', '2024-02-14 14:00'),  # another pair
+    ]
+    self.conn = make_conn_w_rows(rows)
+    self.index = exidx.ExchRateIndex('BRL', 'USD')
+    self.index.load_from_db(self.conn)
+
+  def test_1_exact_asof_n_range(self):
+    self.assertEqual(3, self.index.size)
+    self.assertEqual(49600, self.index.find_exact('2024-02-09').buypriceint)
+    self.assertIsNone(self.index.find_exact('2024-02-12'))
+    quote = self.index.find_asof('2024-02-13')
+    self.assertEqual(datetime.date(2024, 2, 9), quote.refdate)
+    self.assertEqual(datetime.date(2024, 2, 14), self.index.find_asof('2024-03-01').refdate)
+    self.assertIsNone(self.index.find_asof('2024-01-01'))
+    refdates = [q.refdate for q in self.index.find_range('2024-02-15', '2024-02-09')]
+    self.assertEqual([datetime.date(2024, 2, 9), datetime.date(2024, 2, 14)], refdates)
+    nt = self.index.make_namedtuple_bcb_api1_at(self.index.find_asof_index('2024-02-10'))
+    self.assertEqual((49600, 49610, datetime.date(2024, 2, 9)), (nt.cotacao_compra, nt.cotacao_venda, nt.param_date))
+
+  def test_2_upsert_keeps_order(self):
+    self.assertTrue(self.index.upsert_quote('2024-02-13', 4.97, 4.9706))  # floats are scaled
+    self.assertEqual(49700, self.index.find_exact('2024-02-13').buypriceint)
+    self.assertTrue(self.index.upsert_quote('2024-02-09', 49601, 49611, from_db_int=True))  # replace
+    self.assertEqual(49601, self.index.find_exact('2024-02-09').buypriceint)
+    self.assertFalse(self.index.upsert_quote('2024-02-12', None, None))
+    self.assertEqual(sorted(self.index.ordinals), list(self.index.ordinals))
+    self.assertEqual(4, self.index.size)
+
+  def test_3_incremental_refresh(self):
+    insert_rows(self.conn, [
+      ('BRL', 'USD', 49800, 49810, '2024-02-15', '13:00', '2024-02-15 14:00'),
+      ('BRL', 'USD', 48000, 48010, '2024-01-31', '13:00', '2024-02-15 15:00'),  # an older date written later
+    ])
+    self.conn.execute("UPDATE currencies_exchangerates SET buypriceint=49601, updated_at='2024-02-15 16:00'"
+                      " WHERE refdate='2024-02-09' and curr_den='USD'")
+    self.assertEqual(3, self.index.refresh_from_db(self.conn))
+    self.assertEqual(5, self.index.size)
+    self.assertEqual(49601, self.index.find_exact('2024-02-09').buypriceint)
+    self.assertEqual(datetime.date(2024, 1, 31), self.index.first_date)
+    self.assertEqual(0, self.index.refresh_from_db(self.conn))
+
+  def test_4_the_caller_says_the_price_scale(self):
+    self.assertTrue(self.index.upsert_quote('2024-02-13', 5, 5))  # a whole-number API price (JSON 5)
+    self.assertEqual(50000, self.index.find_exact('2024-02-13').buypriceint)
+    self.assertTrue(self.index.upsert_quote('2024-02-13', np.int64(49985), 50007.0, from_db_int=True))
+    self.assertEqual((49985, 50007), self.index.find_exact('2024-02-13')[1:3])  # not scaled a second time
+    nt = self.index.make_namedtuple_bcb_api1_at(self.index.find_asof_index('2024-02-09'))
+    self.assertTrue(self.index.upsert_namedtuple_bcb_api1(nt, from_db_int=True))
+    self.assertEqual(49600, self.index.find_exact('2024-02-09').buypriceint)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/adhoctests/test_bcb_remote_api_period_cls.py
+  unit-tests for the date-window splitting & the per-day splitting of the period API payload
+    (no API call is issued here, the payload is given as a datamass)
+"""
+import datetime
+import unittest
+import lib.indices.bcb_br.bcb_remote_api_period_cls as periodcls
+
+
+class TestCasePeriodApiCaller(unittest.TestCase):
+
+  def setUp(self):
+    # a week in July 2020: Mon 20 to Sun 26 (pretend Wed 22 was a holiday)
+    self.date_fr = datetime.date(2020, 7, 20)
+    self.date_to = datetime.date(2020, 7, 26)
+    self.values = [
+      {'cotacaoCompra': 5.3416, 'cotacaoVenda': 5.3422, 'dataHoraCotacao': '2020-07-20 13:09:25.466'},
+      {'cotacaoCompra': 5.2962, 'cotacaoVenda': 5.2968, 'dataHoraCotacao': '2020-07-21 13:11:27.312'},
+      {'cotacaoCompra': 5.1641, 'cotacaoVenda': 5.1647, 'dataHoraCotacao': '2020-07-23 13:02:43.561'},
+      {'cotacaoCompra': 5.2167, 'cotacaoVenda': 5.2173, 'dataHoraCotacao': '2020-07-24 13:04:25.142'},
+    ]
+
+  def test_gen_date_windows(self):
+    # t1 a 10-day range with windows of 4 days gives 3 windows (4 + 4 + 2)
+    date_fr, date_to = datetime.date(2020, 1, 1), datetime.date(2020, 1, 10)
+    windows = list(periodcls.gen_date_windows_bw_ini_fim(date_fr, date_to, 4))
+    expected = [
+      (datetime.date(2020, 1, 1), datetime.date(2020, 1, 4)),
+      (datetime.date(2020, 1, 5), datetime.date(2020, 1, 8)),
+      (datetime.date(2020, 1, 9), datetime.date(2020, 1, 10)),
+    ]
+    self.assertEqual(expected, windows)
+    # t2 a decade with the default window (one year) needs about 10 windows (instead of ~2500 day calls)
+    date_fr, date_to = datetime.date(2010, 1, 1), datetime.date(2019, 12, 31)
+    windows = list(periodcls.gen_date_windows_bw_ini_fim(date_fr, date_to))
+    self.assertEqual(10, len(windows))
+    self.assertEqual(date_fr, windows[0][0])
+    self.assertEqual(date_to, windows[-1][1])
+
+  def test_split_values_into_daily_results(self):
+    caller = periodcls.BcbCotacaoPeriodoApiCaller(self.date_fr, self.date_to)
+    caller.split_values_into_daily_results(self.values, self.date_fr, self.date_to)
+    results = caller.results
+    # 5 weekdays: 4 quoted and 1 no-quote (the holiday), the weekend is left out
+    self.assertEqual(5, len(results))
+    self.assertEqual(4, caller.n_quotes)
+    dates = [nt.param_date for nt in results]
+    self.assertEqual([datetime.date(2020, 7, d) for d in [20, 21, 22, 23, 24]], dates)
+    holiday_nt = results[2]
+    self.assertIsNone(holiday_nt.cotacao_compra)
+    self.assertIsNone(holiday_nt.cotacao_venda)
+    nt = results[3]
+    self.assertEqual(('BRL', 'USD'), (nt.curr_num, nt.curr_den))
+    self.assertAlmostEqual(5.1641, nt.cotacao_compra)
+    self.assertAlmostEqual(5.1647, nt.cotacao_venda)
+
+  def test_url_per_currency(self):
+    caller = periodcls.BcbCotacaoPeriodoApiCaller(self.date_fr, self.date_to)
+    url = caller.make_url_for_window(self.date_fr, self.date_to)
+    self.assertIn('CotacaoDolarPeriodo', url)
+    self.assertIn("@dataInicial='7/20/2020'", url)
+    caller = periodcls.BcbCotacaoPeriodoApiCaller(self.date_fr, self.date_to, curr_num='BRL', curr_den='EUR')
+    url = caller.make_url_for_window(self.date_fr, self.date_to)
+    self.assertIn('CotacaoMoedaPeriodoFechamento', url)
+    self.assertIn("@codigoMoeda='EUR'", url)
@@ -11,13 +11,15 @@ import os
 from dateutil.relativedelta import relativedelta
 import settings as sett
 import lib.indices.bcb_br.bcb_remote_api_fin_cls as apicls
+import lib.indices.bcb_br.bcb_remote_api_period_cls as periodcls  # .BcbCotacaoPeriodoApiCaller
+import lib.indices.bcb_br.bcb_exchrate_bulk_upsert_cls as bulkcls  # .ExchRateBulkUpserter
+import lib.indices.bcb_br.bcb_cotacao_cascade_cache_cls as cascls  # .get_cotacao_cascade
+import lib.indices.bcb_br.bcb_exchrate_asof_lookup_fs as asof  # .lookup_asof_quotes_for_datelist
 import lib.db.db_settings as dbs
 import lib.db.sqlalch.sqlalchemy_connection_clsmod as exmod  # .SqlAlchemyConnector
 import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
-import lib.datefs.convert_to_datetime_wo_intr_sep_posorder as cvdt
 # import art.bcb_br.exrate.currency_exchange_rate_model as exmod
 import lib.textfs.logfunctions as logfs  # logfs.log_error_namedtuple
-import lib.indices.bcb_br.bcb_api_db_or_txt_fetch_sqlalch_fs as fetchfs  # .find_db_cotacao_w_date_currnum_currden_session
 _, modlevelogfn = os.path.split(__file__)
 modlevelogfn = str(datetime.date.today()) + '_' + modlevelogfn[:-3] + '.log'
 modlevelogfp = os.path.join(sett.get_datafolder_abspath(), modlevelogfn)
@@ -57,9 +59,11 @@ class CascadeApiDbFileBcbCotacaoDiaFetcher:
      should also cache it to b) and c) mentioned above.
 
   The precedence order for looking up exchange rates is the following:
-    1 - first it looks up DB
+    0 - first it looks up the process-wide LRU (repeated lookups in a long run stay in memory)
+    1 - if it's not found, it looks up DB
     2 - if it's not found, it looks up the data text files
     3 - if it's not found either, it tries to access the remote API
+  A layer's hit is written back to the layers above it (@see bcb_cotacao_cascade_cache_cls.py)
   """
 
   def __init__(
@@ -67,6 +71,7 @@ class CascadeApiDbFileBcbCotacaoDiaFetcher:
       pdate: datetime.date | None = None,
       curr_num: str | None = None,
       curr_den: str | None = None,
+      cascade: cascls.CotacaoCascade | None = None,
     ):
     self.daysdate = pdate
     # if a fetch is successful, datahoracotacao will get the 'datahoracotacao' in json
@@ -75,40 +80,72 @@ class CascadeApiDbFileBcbCotacaoDiaFetcher:
     self.curr_den = curr_den
     self.buyprice = None
     self.sellprice = None
+    self.cascade = cascade
+    self.res_bcb_api1 = None
     self._session = None
+    self.treat_attrs()
 
   @property
   def session(self):
     if self._session is not None:
       return self._session
-    sqlal = exmod.SqlAlchemyConnector()
-    self._session = sqlal.get_sa_session()
+    self._session = exmod.get_sa_session()
     return self._session
 
+  @property
+  def currency_pair(self) -> tuple[str, str]:
+    return self.curr_num, self.curr_den
+
   def treat_attrs(self):
-    pass
+    self.daysdate = cnv.make_date_or_none(self.daysdate)
+    self.curr_num = self.curr_num or sett.CURR_BRL
+    self.curr_den = self.curr_den or sett.CURR_USD
+    if self.cascade is None:
+      self.cascade = cascls.get_cotacao_cascade()
+
+  def _find_in_layer(self, layername: str):
+    for layer in self.cascade.layers:
+      if layer.name == layername:
+        return layer.get(self.daysdate, self.currency_pair)
+    return None
 
   def try_find_cotacaodia_in_txt(self):
-    pass
+    return self._find_in_layer(cascls.TxtCotacaoLayer.name)
 
   def try_fetch_cotacaodia_in_db(self):
-    fetchfs.find_db_cotacao_w_date_currnum_currden_session(self.daysdate, self.curr_num, self.curr_den, self.session)
-    pass
+    return self._find_in_layer(cascls.DbCotacaoLayer.name)
 
   def process(self):
     """
-    1 - first it looks up DB
-    2 - if it's not found, it looks up the data text files
-    3 - if it's not found either, it tries to access the remote API
+    Looks up LRU -> DB -> text files -> API, returning the namedtuple_bcb_api1 found or None
+    """
+    if self.daysdate is None:
+      return None
+    self.res_bcb_api1 = self.cascade.get(self.daysdate, self.currency_pair)
+    if self.res_bcb_api1 is not None:
+      self.buyprice = self.res_bcb_api1.cotacao_compra
+      self.sellprice = self.res_bcb_api1.cotacao_venda
+      self.datahoracotacao = self.res_bcb_api1.cotacao_datahora
+    return self.res_bcb_api1
+
+  def __str__(self):
+    gen_msg = None if self.res_bcb_api1 is None else self.res_bcb_api1.gen_msg
+    outstr = f"""{self.__class__.__name__}
+    date = {self.daysdate} | pair = {self.curr_num}/{self.curr_den}
+    buy = {self.buyprice} | sell = {self.sellprice} | from = {gen_msg}
     """
-    self.try_fetch_cotacaodia_in_db()
+    return outstr
 
 
 class BatchApiDbFileBcbCotacaoDiaFetcher:
 
-  def __init__(self, date_fr, date_to=None, datelist=None):
+  def __init__(self, date_fr, date_to=None, datelist=None, currency_pair=None):
     self.date_fr, self.date_to = date_fr, date_to
     self.datelist = datelist
+    self.currency_pair = currency_pair
+    self._currency_dates = None
+    self.dates_fr_to = None
+    self.asof_result = None
     self.treat_attrs()
 
   def treat_attrs(self):
@@ -130,6 +167,8 @@ class BatchApiDbFileBcbCotacaoDiaFetcher:
       ------------------------------------------------------------------------- 
       """
       raise ValueError(errmsg)
+    self.verify_datelist()
+    self.verify_dates_fr_to()
     if self._currency_dates is None and self.dates_fr_to is None:
       # oh, oh, it's also an error
       errmsg = f"""Error: both parameters: 
@@ -141,14 +180,13 @@ class BatchApiDbFileBcbCotacaoDiaFetcher:
       ------------------------------------------------------------------------- 
       """
       raise ValueError(errmsg)
-    self.verify_datelist()
-    self.verify_dates_fr_to()
 
   def verify_datelist(self):
     if self.datelist is None or len(self.datelist) == 0:
       return
     types_fine = list(map(lambda e: isinstance(e, datetime.date), self.datelist))
     if False not in types_fine:
+      self._currency_dates = list(self.datelist)
       return
     verified_dates = []
     for pdate in self.datelist:
@@ -159,11 +197,12 @@ class BatchApiDbFileBcbCotacaoDiaFetcher:
     self._currency_dates = verified_dates
 
   def verify_dates_fr_to(self):
+    if self.date_fr is None:
+      return
+    self.treat_dates_fr_to()
     if self.date_fr is None:
       return
     date_fr, date_to = self.date_fr, self.date_to
-    date_fr = cnv.make_date_or_none(date_fr)
-    date_to = cnv.make_date_or_none(date_to)
     if date_to < date_fr:
       # swap positions
       tmpdate = date_fr
@@ -209,6 +248,9 @@ class BatchApiDbFileBcbCotacaoDiaFetcher:
   def treat_dates_fr_to(self):
     if self.datelist:
       return
+    self.date_fr = cnv.make_date_or_none(self.date_fr)
+    if self.date_fr is None:
+      return
     self.date_to = cnv.make_date_or_none(self.date_to)
     if self.date_to is None:
       # conventioned
@@ -221,26 +263,14 @@ class BatchApiDbFileBcbCotacaoDiaFetcher:
       self.date_fr = self.date_to
       self.date_to = tmpdate
 
-  def try_find_exchrates_in_db(self):
-    tablename = 'abc'
-    conn = sett.get_sqlite_connection()
-    if self._currency_dates:
-      sql = f"""SELECT curr_num, curr_den FROM {tablename}
-      WHERE currdate IN ? ;
-      """
-      tuplevalues = (self.currency_dates,)
-    else:
-      sql = f"""SELECT curr_num, curr_den, currdate FROM {tablename}
-      WHERE currdate >= ? and currdate <= ?;
-      """
-      date_fr, date_to = self.dates_fr_to
-      tuplevalues = (date_fr, date_to)
-    cursor = conn.cursor()
-    cursor.execute()
-    rows = cursor.fetchall()
-    for row in rows:
-      # instantiate an ExRate object
-      pass
+  def try_find_exchrates_in_db(self) -> asof.AsOfLookupResult:
+    """
+    Looks up all dates (the datelist or the days in date_fr..date_to) in one SQL statement,
+      each date getting the latest quote on or before it (@see bcb_exchrate_asof_lookup_fs.py)
+    """
+    pdates = self._currency_dates if self._currency_dates else self.dates_asc
+    self.asof_result = asof.lookup_asof_quotes_for_datelist(pdates, self.currency_pair)
+    return self.asof_result
 
 
 def dbfetch_nt_bcb_exrate_or_none_w_date_n_currencypair(pdate, currency_pair=None):
@@ -251,8 +281,7 @@ def dbfetch_nt_bcb_exrate_or_none_w_date_n_currencypair(pdate, currency_pair=Non
   if currency_pair is not None:
     curr_num, curr_den = currency_pair
   res_bcb_api1 = None
-  sqlal = exmod.SqlAlchemyConnector()
-  session = sqlal.get_sa_session()
+  session = exmod.get_sa_session()  # the thread's session over the cached engine (@see sqlalchemy_connection_clsmod)
   db_found_exch = session.query(exmod.CurrencyPairExchangeRateOnDate). \
     filter(exmod.CurrencyPairExchangeRateOnDate.refdate == indate). \
     filter(exmod.CurrencyPairExchangeRateOnDate.curr_num == curr_num). \
@@ -284,6 +313,27 @@ def fetch_cotacao_via_the_api_for_date_n_dbsaveit(pdate):
   return put_cotacao_into_db_n_return_namedtuple(namedtuple_res_bcb_api1, pdate)
 
 
+def fetch_cotacoes_via_the_api_for_daterange_n_dbsaveit(date_fr, date_to=None, currency_pair=None):
+  """
+  Fetches a whole date range with one API call per window (@see BcbCotacaoPeriodoApiCaller)
+    and saves its per-day results into the DB in one transaction (@see ExchRateBulkUpserter)
+
+  Returns the list of (db-saved) namedtuple_bcb_api1 results
+  """
+  curr_num, curr_den = (None, None) if currency_pair is None else currency_pair
+  caller = periodcls.BcbCotacaoPeriodoApiCaller(date_fr, date_to, curr_num=curr_num, curr_den=curr_den)
+  results = caller.process()
+  log_msg = str(caller)
+  logger.info(log_msg)
+  print(log_msg)
+  # the USD parities (non-USD currencies only) are stored too, for the cross-rate engine
+  upserter = bulkcls.bulk_upsert_cotacoes(results + caller.parity_results)
+  log_msg = str(upserter)
+  logger.info(log_msg)
+  print(log_msg)
+  return results
+
+
 def dbfetch_bcb_cotdolar_recursive_or_apifallback(pdate, recurse_pass=0):
   """
   First look up local sqlite-db, if not found, fallback to its corresponding API call
@@ -392,35 +442,18 @@ def update_db(namedtuple_res_bcb_api1, db_rec, session):
 
 
 def put_cotacao_into_db_n_return_namedtuple(namedtuple_res_bcb_api1, pdate):
+  """
+  Saves a day's result (an insert or an update of its (curr_num, curr_den, refdate) row)
+    through the plain-sqlite bulk upserter (@see ExchRateBulkUpserter): the orm model this used to go through
+    (exmod.CurrencyPairExchangeRateOnDate) is not in the sqlalchemy connection module
+  """
   param_date = cnv.make_date_or_none(namedtuple_res_bcb_api1.param_date)
   if pdate != param_date:
     errmsg = f"param_date {param_date} is different than pdate {pdate}"
     raise ValueError(errmsg)
-  curr_num = namedtuple_res_bcb_api1.curr_num
-  curr_den = namedtuple_res_bcb_api1.curr_den
-  # indate = param_date  # pdate
-  session = exmod.consa.get_sa_session()
-  db_rec = find_db_cotacao_w_date_currnum_currden_session(pdate, curr_num, curr_den, session)
-  if db_rec:
-    return update_db(namedtuple_res_bcb_api1, db_rec, session)
-  db_found_exch = exmod.CurrencyPairExchangeRateOnDate()
-  session.add(db_found_exch)
-  db_found_exch.curr_num = curr_num
-  db_found_exch.curr_den = curr_den
-  db_found_exch.buyprice = namedtuple_res_bcb_api1.cotacao_compra
-  db_found_exch.sellprice = namedtuple_res_bcb_api1.cotacao_venda
-  # strdate = namedtuple_res_bcb_api1.cotacao_datahora
-  # pdate = intr.convert_strdate_to_date_or_none_w_sep_n_posorder(strdate, '/', 'mdy')
-  db_found_exch.refdate = namedtuple_res_bcb_api1.param_date
-  cot_hora = cvdt.make_datetime_n_get_time_via_split_from_strdt(namedtuple_res_bcb_api1.cotacao_datahora)
-  db_found_exch.quotestime = cot_hora
-  session.commit()
-  log_msg = 'After session.commit() ' + str(db_found_exch)
+  upserter = bulkcls.bulk_upsert_cotacoes([namedtuple_res_bcb_api1])
+  log_msg = 'After the upsert ' + str(upserter)
   logger.info(log_msg)
-  # print(log_msg)
-  # now it's time to set db_found_exch, ie it's been instantiated, in the namedtuple var
-  namedtuple_res_bcb_api1 = add_exchanger_to_res_bcb_api_namedtuple(db_found_exch, namedtuple_res_bcb_api1)
-  session.close()
   return namedtuple_res_bcb_api1
 
 
@@ -437,11 +470,9 @@ def adhoctest_issue_date_by_date(daterangetuple):
   while pdate <= datefim:
     fetcher = CascadeApiDbFileBcbCotacaoDiaFetcher(pdate=pdate)
     fetcher.process()
-    dts = fetcher.currency_dates
-    print('dates', dts)
-    for dt in fetcher.gen_dates_iter():
-      print(dt)
+    print(fetcher)
     pdate += relativedelta(days=1)
+  print(cascls.get_cotacao_cascade())
 
 
 def adhoc_test():
@@ -34,8 +34,7 @@ class DbOrTxtExchangeRateFetcher(exrt.DayCurrExchRate):
     self.date_fr, self.date_to = date_fr, date_to
     self.datelist = datelist
     self.currency_pair = currency_pair
-    sqlal = sqlconn.SqlAlchemyConnector()
-    self.session = sqlal.get_sa_session()
+    self.session = sqlconn.get_sa_session()
 
   def find_db_cotacao_w_date_currnum_currden_session(self, pdate):
     o = find_db_cotacao_w_date_currnum_currden_session(pdate, self.curr_num, self.curr_den, self.session)
@@ -110,7 +109,7 @@ def put_cotacao_into_db_n_return_namedtuple(namedtuple_res_bcb_api1, pdate):
   curr_num = namedtuple_res_bcb_api1.curr_num
   curr_den = namedtuple_res_bcb_api1.curr_den
   # indate = param_date  # pdate
-  session = exmod.consa.get_sa_session()
+  session = sqlconn.get_sa_session()
   db_rec = find_db_cotacao_w_date_currnum_currden_session(pdate, curr_num, curr_den, session)
   if db_rec:
     return update_db(namedtuple_res_bcb_api1, db_rec, session)
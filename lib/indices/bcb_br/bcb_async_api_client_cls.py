@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/bcb_async_api_client_cls.py
+
+  Contains class BcbAsyncCotacaoClient which fetches the CotacaoDolarDia endpoint
+    for many dates concurrently (asyncio), at most N requests at a time per host.
+
+  Its API is:
+    => coroutine: await client.fetch_cotacoes_on_dates(dates)
+    => sync wrapper: client.fetch_cotacoes_on_dates_sync(dates)
+  both returning a dict {date: namedtuple_bcb_api1}
+
+  The requests go through the process-wide keep-alive session (@see lib/netfs/http_session_pool.py)
+    and, because requests is blocking, each one runs in a worker thread (asyncio.to_thread())
+    while the per-host asyncio.Semaphore bounds how many are in flight.
+
+  Connection errors are retried by a RetryScheduler (@see lib/netfs/retry_scheduler.py)
+    whose retry budget is shared by the whole batch.
+
+  The response handling is the same as in BcbCotacaoDiaApiCaller.recurs_call_api_bcb_cotacao_dolar_on_daysdate():
+    a 200-OK with an empty 'value' list means the date has no quotes (weekend or holiday).
+"""
+import asyncio
+import datetime
+import json
+import settings as sett
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+import lib.datefs.introspect_dates as intr
+import lib.indices.bcb_br.bcbparams as bcbparams
+import lib.netfs.http_session_pool as htpool
+import lib.netfs.retry_scheduler as retsch
+namedtuple_bcb_api1 = bcbparams.namedtuple_bcb_api1
+DEFAULT_MAX_CONCURRENCY_PER_HOST = 8
+DEFAULT_RETRY_BUDGET_PER_BATCH = 50
+
+
+class BcbAsyncCotacaoClient:
+
+  def __init__(self, max_concurrency: int | None = None, retry_scheduler: retsch.RetryScheduler | None = None):
+    self.max_concurrency = max_concurrency
+    self.retry_scheduler = retry_scheduler
+    self.curr_num, self.curr_den = sett.CURR_BRL, sett.CURR_USD  # CotacaoDolarDia quotes BRL/USD only
+    self.n_api_being_called = 0
+    self.n_errors = 0
+    self._host_semaphores = {}
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.max_concurrency is None or self.max_concurrency < 1:
+      self.max_concurrency = DEFAULT_MAX_CONCURRENCY_PER_HOST
+    if self.retry_scheduler is None:
+      # one scheduler for the whole batch, so its retry budget is shared by all dates
+      self.retry_scheduler = retsch.RetryScheduler(
+        endpoint=htpool.extract_host_from_url(bcbparams.url_base),
+        budget=retsch.RetryBudget(DEFAULT_RETRY_BUDGET_PER_BATCH),
+      )
+
+  def get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+    host = htpool.extract_host_from_url(url)
+    semaphore = self._host_semaphores.get(host)
+    if semaphore is None:
+      semaphore = asyncio.Semaphore(self.max_concurrency)
+      self._host_semaphores[host] = semaphore
+    return semaphore
+
+  @staticmethod
+  def make_url_for_date(pdate: datetime.date) -> str:
+    mmddyyyy = intr.trans_strdate_from_one_format_to_another_w_sep_n_posorder(
+      pdate, fromsep=None, tosep='/', sourceposorder=None, targetposorder='mdy')
+    return bcbparams.url_base + bcbparams.url_query_interpol % {'mmddyyyy': mmddyyyy}
+
+  def make_namedtuple(self, pdate, buyprice=None, sellprice=None, datahora=None, error_msg=None, gen_msg=None):
+    return namedtuple_bcb_api1(
+      curr_num=self.curr_num, curr_den=self.curr_den,
+      cotacao_compra=buyprice, cotacao_venda=sellprice, cotacao_datahora=datahora,
+      param_date=pdate, error_msg=error_msg, gen_msg=gen_msg, exchanger=None
+    )
+
+  def make_namedtuple_w_response(self, pdate, status_code: int, text: str) -> namedtuple_bcb_api1:
+    if status_code != 200:
+      self.n_errors += 1
+      error_msg = (f'Error: HTTP Connection status received is not "200 OK":'
+                   f' res.status_code {status_code} from the server; pdate = {pdate}')
+      return self.make_namedtuple(pdate, error_msg=error_msg)
+    try:
+      valuedict = json.loads(text)['value'][0]
+    except IndexError:
+      return self.make_namedtuple(pdate, gen_msg=f'BCB API returned day {pdate} with no quotes')
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+      self.n_errors += 1
+      return self.make_namedtuple(pdate, error_msg=f'Error: malformed json payload on date {pdate}: {e}')
+    return self.make_namedtuple(
+      pdate,
+      buyprice=valuedict.get('cotacaoCompra'),
+      sellprice=valuedict.get('cotacaoVenda'),
+      datahora=valuedict.get('dataHoraCotacao'),
+      gen_msg='BCB API'
+    )
+
+  async def fetch_cotacao_on_date(self, pdate: datetime.date) -> namedtuple_bcb_api1:
+    url = self.make_url_for_date(pdate)
+    session = htpool.get_shared_session(url, pool_maxsize=self.max_concurrency)
+    async with self.get_host_semaphore(url):
+      self.n_api_being_called += 1
+      try:
+        res = await self.retry_scheduler.acall(
+          asyncio.to_thread, session.get, url, timeout=htpool.DEFAULT_TIMEOUT_IN_SEC
+        )
+      except retsch.RETRYABLE_EXCEPTIONS as e:
+        self.n_errors += 1
+        return self.make_namedtuple(pdate, error_msg=f'Error: connection failed on date {pdate}: {e}')
+    return self.make_namedtuple_w_response(pdate, res.status_code, res.text)
+
+  async def fetch_cotacoes_on_dates(self, dates) -> dict[datetime.date, namedtuple_bcb_api1]:
+    """
+    Fetches all (valid & unique) dates concurrently, returning a dict {date: namedtuple_bcb_api1}
+    """
+    datelist = sorted(set(filter(lambda d: d is not None, map(cnv.make_date_or_none, dates))))
+    self._host_semaphores = {}  # semaphores are bound to the running event loop
+    results = await asyncio.gather(*[self.fetch_cotacao_on_date(pdate) for pdate in datelist])
+    return dict(zip(datelist, results))
+
+  def fetch_cotacoes_on_dates_sync(self, dates) -> dict[datetime.date, namedtuple_bcb_api1]:
+    """
+    The sync wrapper (for callers that are not running an event loop)
+    """
+    return asyncio.run(self.fetch_cotacoes_on_dates(dates))
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    max_concurrency per host = {self.max_concurrency}
+    api calls = {self.n_api_being_called} | errors = {self.n_errors}
+    """
+    return outstr
+
+
+def adhoctest():
+  dates = ['2020-07-20', '2020-07-21', '2020-07-22', '2020-07-23', '2020-07-24']
+  client = BcbAsyncCotacaoClient(max_concurrency=4)
+  date_n_result_dict = client.fetch_cotacoes_on_dates_sync(dates)
+  for pdate, nt in date_n_result_dict.items():
+    print(pdate, nt.cotacao_compra, nt.cotacao_venda, nt.error_msg, nt.gen_msg)
+  print(client)
+
+
+def process():
+  pass
+
+
+if __name__ == "__main__":
+  """
+  process()
+  """
+  adhoctest()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/bcb_business_calendar_cls.py
+
+  Contains class BcbBusinessCalendar which knows which dates have no PTAX quotes
+    (weekends & hollidays) so that BCBCotacaoFetcher does not probe the DB or the API for them.
+
+  The non-quote days come from two sources:
+    1) a fixed rule set: the national hollidays (fixed-date ones & Easter-based ones,
+       i.e., Carnival Monday & Tuesday, Good Friday and Corpus Christi)
+    2) the days learned from the DB: refdates having only rows with null prices are non-quote days
+       and refdates having a quote override the rule set (if, for example, a rule-holliday had quotes)
+
+  The learned days are persisted into a json file in the data folder, together with
+    the DB "high-water" refdate, so that the next load only reads the newer DB rows.
+
+  In memory, the calendar is a bitset (one bit per day since BASE_DATE) plus,
+    lazily built, an array with each day's previous business day, making
+    previous_business_day() an O(1) lookup.
+
+  Example:
+    cal = get_business_calendar()
+    cal.is_noquote_date('2024-02-13')  # True (Carnival)
+    cal.previous_business_day('2024-02-14')  # 2024-02-09 (Friday before Carnival)
+"""
+import array
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+from dateutil.relativedelta import relativedelta
+import numpy as np
+import settings as sett
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+import lib.indices.bcb_br.bcbparams as bcbparams
+logger = logging.getLogger(__name__)
+BASE_DATE = datetime.date(1994, 7, 1)  # the Real (BRL) started on 1994-07-01
+DEFAULT_HORIZON_IN_YEARS = 2  # the calendar extends this number of years beyond today
+DEFAULT_CALENDAR_FILENAME = 'bcb_business_calendar.json'
+# (month, day) of the national hollidays that fall on fixed dates
+FIXED_BR_HOLLIDAYS_MMDD = [(1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (12, 25)]
+BLACK_CONSCIOUSNESS_DAY_FIRST_YEAR = 2024  # Nov 20 became a national holliday in 2024
+# days relative to Easter Sunday: Carnival Monday & Tuesday, Good Friday and Corpus Christi
+EASTER_BASED_BR_HOLLIDAYS_DAYS_DELTA = [-48, -47, -2, 60]
+_calendar = None
+_lock = threading.Lock()
+
+
+def calc_easter_sunday_in_year(year: int) -> datetime.date:
+  """
+  Calculates Easter Sunday with the anonymous Gregorian algorithm (Meeus/Jones/Butcher)
+  """
+  a = year % 19
+  b, c = divmod(year, 100)
+  d, e = divmod(b, 4)
+  f = (b + 8) // 25
+  g = (b - f + 1) // 3
+  h = (19 * a + b - d - g + 15) % 30
+  i, k = divmod(c, 4)
+  el = (32 + 2 * e + 2 * i - h - k) % 7
+  m = (a + 11 * h + 22 * el) // 451
+  month, day = divmod(h + el - 7 * m + 114, 31)
+  return datetime.date(year, month, day + 1)
+
+
+def gen_br_national_hollidays_in_year(year: int):
+  """
+  Generates (not ordered) the dates in year that are national hollidays by the fixed rule set
+  """
+  for month, day in FIXED_BR_HOLLIDAYS_MMDD:
+    yield datetime.date(year, month, day)
+  if year >= BLACK_CONSCIOUSNESS_DAY_FIRST_YEAR:
+    yield datetime.date(year, 11, 20)
+  easter_sunday = calc_easter_sunday_in_year(year)
+  for n_days in EASTER_BASED_BR_HOLLIDAYS_DAYS_DELTA:
+    yield easter_sunday + datetime.timedelta(days=n_days)
+
+
+def get_default_calendar_filepath():
+  return os.path.join(sett.get_datafolder_abspath(), DEFAULT_CALENDAR_FILENAME)
+
+
+class BcbBusinessCalendar:
+
+  def __init__(self, horizon_date=None, calendar_filepath=None, currency_pair=None):
+    self.base_ordinal = BASE_DATE.toordinal()
+    self.currency_pair = currency_pair  # the pair whose db rows are learned from (default BRL/USD, the PTAX)
+    self.horizon_date = cnv.make_date_or_none(horizon_date)
+    self.calendar_filepath = calendar_filepath
+    self.learned_noquote_dates = set()
+    self.learned_quote_dates = set()
+    self.db_highwater_refdate = None
+    self.n_days = 0
+    self._noquote_bits = bytearray()
+    self._prev_bday_ordinals = None  # built lazily, reset when a date is learned
+    self.treat_attrs()
+    self.apply_rules()
+
+  def treat_attrs(self):
+    if self.horizon_date is None:
+      self.horizon_date = datetime.date.today() + relativedelta(years=DEFAULT_HORIZON_IN_YEARS)
+    if self.calendar_filepath is None:
+      self.calendar_filepath = get_default_calendar_filepath()
+    if self.currency_pair is None:
+      self.currency_pair = (bcbparams.CURR_BRL, bcbparams.CURR_USD)
+    self.n_days = self.horizon_date.toordinal() - self.base_ordinal + 1
+    self._noquote_bits = bytearray((self.n_days + 7) // 8)
+
+  def _idx(self, pdate: datetime.date) -> int | None:
+    idx = pdate.toordinal() - self.base_ordinal
+    return idx if 0 <= idx < self.n_days else None
+
+  def _set_bit(self, idx: int, is_noquote: bool):
+    if is_noquote:
+      self._noquote_bits[idx >> 3] |= 1 << (idx & 7)
+    else:
+      self._noquote_bits[idx >> 3] &= ~(1 << (idx & 7)) & 0xFF
+
+  def _get_bit(self, idx: int) -> bool:
+    return bool(self._noquote_bits[idx >> 3] & (1 << (idx & 7)))
+
+  def apply_rules(self):
+    """
+    Sets the weekend & rule-holliday bits, then the learned dates (which take precedence) on top
+    """
+    for idx in range(self.n_days):
+      if (self.base_ordinal + idx) % 7 in (0, 6):  # date.fromordinal(n).weekday() is (n + 6) % 7
+        self._set_bit(idx, True)
+    for year in range(BASE_DATE.year, self.horizon_date.year + 1):
+      for pdate in gen_br_national_hollidays_in_year(year):
+        idx = self._idx(pdate)
+        if idx is not None:
+          self._set_bit(idx, True)
+    for pdate in self.learned_noquote_dates:
+      self._set_learned(pdate, True)
+    for pdate in self.learned_quote_dates:
+      self._set_learned(pdate, False)
+    self._prev_bday_ordinals = None
+
+  def _set_learned(self, pdate: datetime.date, is_noquote: bool):
+    idx = self._idx(pdate)
+    if idx is None or pdate.weekday() > 4:
+      return
+    self._set_bit(idx, is_noquote)
+
+  def is_noquote_date(self, pdate) -> bool:
+    """
+    True if pdate is a weekend day or a (ruled or learned) holliday
+    """
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None:
+      return False
+    if pdate.weekday() > 4:
+      return True
+    idx = self._idx(pdate)
+    if idx is None:
+      return pdate in self.learned_noquote_dates or pdate in set(gen_br_national_hollidays_in_year(pdate.year))
+    return self._get_bit(idx)
+
+  def is_business_day(self, pdate) -> bool:
+    pdate = cnv.make_date_or_none(pdate)
+    return pdate is not None and not self.is_noquote_date(pdate)
+
+  def business_day_ordinals_between(self, date_ini, date_fim) -> np.ndarray:
+    """
+    Returns (as a sorted int64 array) the ordinals of the business days in [date_ini, date_fim]
+      the bitset part is read at once via np.unpackbits, days beyond it are checked one by one
+    """
+    date_ini, date_fim = cnv.make_date_or_none(date_ini), cnv.make_date_or_none(date_fim)
+    if date_ini is None or date_fim is None or date_ini > date_fim:
+      return np.empty(0, dtype=np.int64)
+    ord_ini = max(date_ini.toordinal(), self.base_ordinal)
+    ord_fim = date_fim.toordinal()
+    ord_bitset_fim = min(ord_fim, self.base_ordinal + self.n_days - 1)
+    ordinals = np.empty(0, dtype=np.int64)
+    if ord_ini <= ord_bitset_fim:
+      bits = np.unpackbits(np.frombuffer(bytes(self._noquote_bits), dtype=np.uint8), bitorder='little')
+      window = bits[ord_ini - self.base_ordinal:ord_bitset_fim - self.base_ordinal + 1]
+      ordinals = np.flatnonzero(window == 0).astype(np.int64) + ord_ini
+    if ord_fim > ord_bitset_fim:
+      ord_from = max(ord_ini, ord_bitset_fim + 1)
+      beyond = [o for o in range(ord_from, ord_fim + 1) if self.is_business_day(datetime.date.fromordinal(o))]
+      ordinals = np.concatenate((ordinals, np.asarray(beyond, dtype=np.int64)))
+    return ordinals
+
+  def build_prev_bday_ordinals(self):
+    """
+    For each day index, stores the ordinal of the latest business day strictly before it (0 if none)
+    """
+    prev_bday_ordinals = array.array('i', bytes(4 * self.n_days))
+    last_bday_ordinal = 0
+    for idx in range(self.n_days):
+      prev_bday_ordinals[idx] = last_bday_ordinal
+      if not self._get_bit(idx):
+        last_bday_ordinal = self.base_ordinal + idx
+    self._prev_bday_ordinals = prev_bday_ordinals
+
+  def previous_business_day(self, pdate) -> datetime.date | None:
+    """
+    Returns the latest business day before pdate (O(1) within the calendar's date range)
+    """
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None:
+      return None
+    idx = self._idx(pdate)
+    if idx is None:
+      # out of the bitset range: walk back day by day (it only happens for dates beyond the horizon)
+      if pdate.toordinal() <= self.base_ordinal:
+        return None
+      pdate = pdate - datetime.timedelta(days=1)
+      while self.is_noquote_date(pdate):
+        pdate = pdate - datetime.timedelta(days=1)
+      return pdate
+    if self._prev_bday_ordinals is None:
+      self.build_prev_bday_ordinals()
+    ordinal = self._prev_bday_ordinals[idx]
+    return datetime.date.fromordinal(ordinal) if ordinal > 0 else None
+
+  def business_day_on_or_before(self, pdate) -> datetime.date | None:
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None:
+      return None
+    if self.is_business_day(pdate):
+      return pdate
+    return self.previous_business_day(pdate)
+
+  def gen_business_days_backwards(self, pdate, n_days: int):
+    """
+    Generates at most n_days business days, the first being pdate itself (if it's a business day)
+    """
+    bday = self.business_day_on_or_before(pdate)
+    n_generated = 0
+    while bday is not None and n_generated < n_days:
+      yield bday
+      n_generated += 1
+      bday = self.previous_business_day(bday)
+
+  def learn_noquote_date(self, pdate) -> bool:
+    """
+    Records pdate as a non-quote day, returning True if that is new info (ie the calendar changed)
+      today & future dates are refused: before the PTAX is published (about 13h) today has no quote yet
+    """
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None or pdate >= datetime.date.today():
+      return False
+    if pdate.weekday() > 4 or pdate in self.learned_noquote_dates:
+      return False
+    self.learned_quote_dates.discard(pdate)
+    was_noquote = self.is_noquote_date(pdate)
+    self.learned_noquote_dates.add(pdate)
+    self._set_learned(pdate, True)
+    if not was_noquote:
+      self._prev_bday_ordinals = None
+    return not was_noquote
+
+  def learn_quote_date(self, pdate) -> bool:
+    """
+    Records pdate as a quote day, returning True if that is new info (e.g. a rule-holliday that had quotes)
+    """
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None or pdate.weekday() > 4:
+      return False
+    self.learned_noquote_dates.discard(pdate)
+    if not self.is_noquote_date(pdate):
+      return False
+    self.learned_quote_dates.add(pdate)
+    self._set_learned(pdate, False)
+    self._prev_bday_ordinals = None
+    return True
+
+  def learn_from_db(self, conn=None) -> int:
+    """
+    Reads the currency pair's refdates newer than the high-water refdate and learns each one as a quote-day
+      (if any of its rows has a price) or a non-quote day (if all its rows have null prices)
+    Returns the number of refdates read
+    """
+    close_conn = conn is None
+    if conn is None:
+      conn = sett.get_sqlite_connection()
+    sql = f"""
+    SELECT refdate, MAX(buypriceint IS NOT NULL) FROM {bcbparams.TABLENAME}
+      WHERE
+        curr_num = ? and curr_den = ? and refdate > ?
+      GROUP BY refdate
+      ORDER BY refdate;
+    """
+    highwater = '' if self.db_highwater_refdate is None else str(self.db_highwater_refdate)
+    try:
+      rows = conn.execute(sql, (*self.currency_pair, highwater)).fetchall()
+    except sqlite3.OperationalError as e:
+      # e.g. the table does not yet exist in a fresh data folder
+      logger.info(f'Business calendar could not read the db: {e}')
+      rows = []
+    finally:
+      if close_conn:
+        conn.close()
+    for strdate, has_quote in rows:
+      pdate = cnv.make_date_or_none(strdate)
+      if pdate is None:
+        continue
+      if has_quote:
+        self.learn_quote_date(pdate)
+      else:
+        self.learn_noquote_date(pdate)
+      self.db_highwater_refdate = pdate
+    return len(rows)
+
+  def as_dict(self) -> dict:
+    return {
+      'db_highwater_refdate': None if self.db_highwater_refdate is None else str(self.db_highwater_refdate),
+      'learned_noquote_dates': sorted(map(str, self.learned_noquote_dates)),
+      'learned_quote_dates': sorted(map(str, self.learned_quote_dates)),
+    }
+
+  def save(self):
+    """
+    Writes the learned dates to a tmp file and renames it over the calendar file (an atomic replace)
+    """
+    tmp_filepath = self.calendar_filepath + '.tmp'
+    with open(tmp_filepath, 'w', encoding='utf-8') as fd:
+      json.dump(self.as_dict(), fd, indent=1)
+    os.replace(tmp_filepath, self.calendar_filepath)
+
+  def load(self) -> bool:
+    """
+    Reads the learned dates from the calendar file, returning False if the file does not exist
+    """
+    if not os.path.isfile(self.calendar_filepath):
+      return False
+    try:
+      with open(self.calendar_filepath, 'r', encoding='utf-8') as fd:
+        caldict = json.load(fd)
+    except (OSError, json.JSONDecodeError) as e:
+      logger.info(f'Business calendar file [{self.calendar_filepath}] could not be read: {e}')
+      return False
+    dates = map(cnv.make_date_or_none, caldict.get('learned_noquote_dates', []))
+    self.learned_noquote_dates = set(filter(lambda d: d is not None, dates))
+    dates = map(cnv.make_date_or_none, caldict.get('learned_quote_dates', []))
+    self.learned_quote_dates = set(filter(lambda d: d is not None, dates))
+    self.db_highwater_refdate = cnv.make_date_or_none(caldict.get('db_highwater_refdate'))
+    self.apply_rules()
+    return True
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    date range = {BASE_DATE} to {self.horizon_date} | file = {self.calendar_filepath}
+    learned non-quote dates = {len(self.learned_noquote_dates)} | learned quote dates = {len(self.learned_quote_dates)}
+    db high-water refdate = {self.db_highwater_refdate}
+    """
+    return outstr
+
+
+def get_business_calendar() -> BcbBusinessCalendar:
+  """
+  Returns the process-wide calendar: loaded from its file, refreshed from the DB & saved back (on first use)
+  """
+  global _calendar
+  with _lock:
+    if _calendar is None:
+      calendar = BcbBusinessCalendar()
+      calendar.load()
+      if calendar.learn_from_db() > 0:
+        calendar.save()
+      _calendar = calendar
+  return _calendar
+
+
+def adhoctest():
+  cal = BcbBusinessCalendar(calendar_filepath=os.devnull)
+  for pdate in ['2024-02-12', '2024-02-13', '2024-02-14', '2024-03-29', '2024-05-30', '2024-11-20']:
+    scrmsg = f"{pdate} noquote={cal.is_noquote_date(pdate)} previous business day={cal.previous_business_day(pdate)}"
+    print(scrmsg)
+
+
+def process():
+  cal = get_business_calendar()
+  print(cal)
+
+
+if __name__ == "__main__":
+  """
+  adhoctest()
+  """
+  process()
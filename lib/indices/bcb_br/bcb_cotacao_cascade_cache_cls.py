@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/bcb_cotacao_cascade_cache_cls.py
+
+  Contains class CotacaoCascade which looks up a day's exchange rate (a namedtuple_bcb_api1)
+    through a sequence of layers, each one slower than the one before it:
+      1 - LruCotacaoLayer: a bounded in-process LRU (repeated lookups in a long run stay here)
+      2 - DbCotacaoLayer: table currencies_exchangerates in the sqlite db
+      3 - TxtCotacaoLayer: the monthly prettyprint text files ('2020-07 BRL_USD exchange rates.txt')
+      4 - ApiCotacaoLayer: the BCB remote API (CotacaoDolarDia, ie BRL/USD only)
+
+  A hit at one layer is written back to the layers above it (eg an API answer goes to the db,
+    to its monthly text file and to the LRU). A holliday (a result with null prices) is a hit too,
+    it's written back to the LRU & db (as a null-price row) but not to the text files (quotes only).
+
+  A full miss (no layer has the day) is remembered too, in a small LRU of misses next to the LRU of hits,
+    so that repeating it doesn't query the db & re-read the text file again:
+      => a day the API can never have (a weekend or a pair other than BRL/USD) is remembered for the whole run
+      => any other miss (eg today or a future date, whose quote may still come out) expires after miss_ttl_in_sec
+
+  Each layer keeps a LayerStats (hits, misses, writes & elapsed time) for the hit-rate report.
+
+  Threads share the cascade: its lock guards only the in-memory layers (the LRU) and the counters,
+    the db, text file & API layers run outside it (a slow API call doesn't hold up the LRU hits of other threads).
+
+  Example:
+    cascade = get_cotacao_cascade()
+    nt = cascade.get('2024-02-09')  # BRL/USD by default
+    print(cascade)  # the per-layer hit/miss/latency counters
+"""
+import collections as coll
+import datetime
+import os
+import threading
+import time
+from prettytable import PrettyTable
+import settings as sett
+import art.inflmeas.bcb_br.classes as pkg  # pkg.EXCHRATE_DBTABLENAME, pkg.DEFAULT_CURR_NUM
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+import lib.indices.bcb_br.bcbparams as bcbparams
+import lib.indices.bcb_br.bcb_exchrate_bulk_upsert_cls as bulkcls  # .bulk_upsert_cotacoes
+import lib.indices.bcb_br.bcb_exchrate_colstore_cls as colstore  # .parse_prettyprint_text_into_rows
+import lib.indices.bcb_br.bcb_exchrate_index_cls as exidx  # .INTPRICE_MULTIPLIER
+namedtuple_bcb_api1 = bcbparams.namedtuple_bcb_api1
+DEFAULT_LRU_MAXSIZE = 4096  # about 16 years of business days for one currency pair
+DEFAULT_MISS_MAXSIZE = 1024
+DEFAULT_MISS_TTL_IN_SEC = 15 * 60
+KNOWN_MISS = object()  # the LRU's answer for a day remembered as not found
+_cascade = None
+_lock = threading.Lock()
+
+
+def make_cotacao_key(pdate: datetime.date, currency_pair: tuple[str, str]) -> tuple[str, str, int]:
+  return currency_pair[0], currency_pair[1], pdate.toordinal()
+
+
+def is_holliday_result(nt) -> bool:
+  return nt.cotacao_compra is None and nt.cotacao_venda is None
+
+
+def make_float_price_from_intprice_or_none(priceint) -> float | None:
+  """
+  A db price (an int, price * 10**4) in currency units: the cascade hands out floats
+  """
+  if priceint is None:
+    return None
+  return int(priceint) / exidx.INTPRICE_MULTIPLIER
+
+
+def make_float_price_or_none(price) -> float | None:
+  """
+  An API or text file price, already in currency units (a whole 5 is 5.0)
+  """
+  if price is None:
+    return None
+  return float(price)
+
+
+class LayerStats:
+
+  def __init__(self, name: str):
+    self.name = name
+    self.hits = 0
+    self.misses = 0
+    self.writes = 0
+    self.elapsed_in_sec = 0.0
+
+  @property
+  def n_lookups(self) -> int:
+    return self.hits + self.misses
+
+  @property
+  def hit_rate(self) -> float:
+    return self.hits / self.n_lookups if self.n_lookups > 0 else 0.0
+
+  @property
+  def mean_latency_in_ms(self) -> float:
+    return 1000 * self.elapsed_in_sec / self.n_lookups if self.n_lookups > 0 else 0.0
+
+  def __str__(self):
+    outstr = (f"{self.name:<4} hits = {self.hits} | misses = {self.misses} | hit rate = {self.hit_rate:.1%}"
+              f" | writes = {self.writes} | mean latency = {self.mean_latency_in_ms:.3f}ms")
+    return outstr
+
+
+class LruCotacaoLayer:
+
+  name = 'lru'
+  in_memory = True  # its get & put run under the cascade's lock
+
+  def __init__(
+      self,
+      maxsize: int | None = None,
+      miss_maxsize: int | None = None,
+      miss_ttl_in_sec: float | None = None,
+      clock=None,
+    ):
+    self.maxsize = maxsize or DEFAULT_LRU_MAXSIZE
+    self.miss_maxsize = miss_maxsize or DEFAULT_MISS_MAXSIZE
+    self.miss_ttl_in_sec = miss_ttl_in_sec or DEFAULT_MISS_TTL_IN_SEC
+    self.clock = clock or time.monotonic
+    self._odict = coll.OrderedDict()
+    self._miss_odict = coll.OrderedDict()  # key -> expires_at (None: never)
+    self.stats = LayerStats(self.name)
+
+  def __len__(self):
+    return len(self._odict)
+
+  @property
+  def n_known_misses(self) -> int:
+    return len(self._miss_odict)
+
+  def get(self, pdate: datetime.date, currency_pair: tuple[str, str]):
+    """
+    Returns the day's namedtuple, KNOWN_MISS for a day remembered as not found or None
+    """
+    key = make_cotacao_key(pdate, currency_pair)
+    nt = self._odict.get(key)
+    if nt is not None:
+      self._odict.move_to_end(key)
+      return nt
+    if key not in self._miss_odict:
+      return None
+    expires_at = self._miss_odict[key]
+    if expires_at is not None and self.clock() >= expires_at:
+      del self._miss_odict[key]
+      return None
+    self._miss_odict.move_to_end(key)
+    return KNOWN_MISS
+
+  def put(self, nt):
+    key = make_cotacao_key(nt.param_date, (nt.curr_num, nt.curr_den))
+    self._miss_odict.pop(key, None)
+    self._odict[key] = nt
+    self._odict.move_to_end(key)
+    while len(self._odict) > self.maxsize:
+      self._odict.popitem(last=False)
+
+  def put_miss(self, pdate: datetime.date, currency_pair: tuple[str, str], is_permanent: bool = False):
+    key = make_cotacao_key(pdate, currency_pair)
+    self._miss_odict[key] = None if is_permanent else self.clock() + self.miss_ttl_in_sec
+    self._miss_odict.move_to_end(key)
+    while len(self._miss_odict) > self.miss_maxsize:
+      self._miss_odict.popitem(last=False)
+
+  def clear(self):
+    self._odict.clear()
+    self._miss_odict.clear()
+
+
+class DbCotacaoLayer:
+
+  name = 'db'
+  tablename = pkg.EXCHRATE_DBTABLENAME
+
+  def __init__(self, conn=None):
+    """
+    conn, if given, is kept open (eg an in-memory db), otherwise each access opens its own connection
+    """
+    self.conn = conn
+    self.stats = LayerStats(self.name)
+
+  def _get_conn(self):
+    return sett.get_sqlite_connection() if self.conn is None else self.conn
+
+  def get(self, pdate: datetime.date, currency_pair: tuple[str, str]):
+    sql = f"""
+    SELECT buypriceint, sellpriceint, quotestime FROM {self.tablename}
+      WHERE
+        curr_num = ? and curr_den = ? and refdate = ?;
+    """
+    conn = self._get_conn()
+    try:
+      row = conn.execute(sql, (currency_pair[0], currency_pair[1], str(pdate))).fetchone()
+    finally:
+      if self.conn is None:
+        conn.close()
+    if row is None:
+      return None
+    buyint, sellint, quotestime = row
+    return namedtuple_bcb_api1(
+      curr_num=currency_pair[0], curr_den=currency_pair[1],
+      cotacao_compra=make_float_price_from_intprice_or_none(buyint),
+      cotacao_venda=make_float_price_from_intprice_or_none(sellint),
+      cotacao_datahora=quotestime, param_date=pdate,
+      error_msg=None, gen_msg='Fetched from db', exchanger=None
+    )
+
+  def put(self, nt):
+    bulkcls.bulk_upsert_cotacoes([nt], conn=self.conn)
+
+
+class TxtCotacaoLayer:
+
+  name = 'txt'
+
+  def __init__(self, rootfolderpath: str | None = None):
+    self.rootfolderpath = rootfolderpath
+    self.stats = LayerStats(self.name)
+    self._lock = threading.Lock()  # a put is a read-modify-write of the monthly file
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.rootfolderpath is None:
+      self.rootfolderpath = colstore.get_default_prettyprint_folderpath()
+
+  def make_month_filepath(self, pdate: datetime.date, currency_pair: tuple[str, str]) -> str:
+    foldername = bcbparams.year_bcb_exchrates_foldername_interpol.format(year=pdate.year)
+    filename = bcbparams.yearmonth_currs_datafilename_interpol.format(
+      yeardashmonth=f"{pdate.year:04}-{pdate.month:02}",
+      currnum_uline_currden=f"{currency_pair[0]}_{currency_pair[1]}",
+    )
+    return os.path.join(self.rootfolderpath, foldername, filename)
+
+  @staticmethod
+  def read_month_quotes(filepath: str) -> dict[datetime.date, tuple[float, float]]:
+    """
+    Returns {date: (buyprice, sellprice)} for the quote lines in a monthly file ({} if it does not exist)
+    """
+    if not os.path.isfile(filepath):
+      return {}
+    with open(filepath, 'r', encoding='utf8') as fd:
+      text = fd.read()
+    quotes = {}
+    for ordinal, buyint, sellint in colstore.parse_prettyprint_text_into_rows(text):
+      quotes[datetime.date.fromordinal(ordinal)] = (
+        buyint / exidx.INTPRICE_MULTIPLIER, sellint / exidx.INTPRICE_MULTIPLIER
+      )
+    return quotes
+
+  @staticmethod
+  def write_month_quotes(filepath: str, quotes: dict[datetime.date, tuple[float, float]]):
+    """
+    Writes the monthly file (as PrettyPrintMonthlyExchangeRatesRWBase does) via a tmp file & an atomic rename
+    """
+    ptab = PrettyTable(['seq', 'date', 'buyprice', 'sellprice'])
+    for seq, pdate in enumerate(sorted(quotes), start=1):
+      buyprice, sellprice = quotes[pdate]
+      ptab.add_row([seq, str(pdate), buyprice, sellprice])
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_filepath = filepath + '.tmp'
+    with open(tmp_filepath, 'w', encoding='utf8') as fd:
+      fd.write(str(ptab))
+    os.replace(tmp_filepath, filepath)
+
+  def get(self, pdate: datetime.date, currency_pair: tuple[str, str]):
+    quotes = self.read_month_quotes(self.make_month_filepath(pdate, currency_pair))
+    prices = quotes.get(pdate)
+    if prices is None:
+      return None
+    return namedtuple_bcb_api1(
+      curr_num=currency_pair[0], curr_den=currency_pair[1],
+      cotacao_compra=prices[0], cotacao_venda=prices[1], cotacao_datahora=None, param_date=pdate,
+      error_msg=None, gen_msg='Fetched from text file', exchanger=None
+    )
+
+  def put(self, nt):
+    if is_holliday_result(nt):
+      return
+    pdate = cnv.make_date_or_none(nt.param_date)
+    filepath = self.make_month_filepath(pdate, (nt.curr_num, nt.curr_den))
+    prices = (make_float_price_or_none(nt.cotacao_compra), make_float_price_or_none(nt.cotacao_venda))
+    with self._lock:
+      quotes = self.read_month_quotes(filepath)
+      if quotes.get(pdate) == prices:
+        return
+      quotes[pdate] = prices
+      self.write_month_quotes(filepath, quotes)
+
+
+class ApiCotacaoLayer:
+  """
+  The last layer: the BCB CotacaoDolarDia endpoint (it has BRL/USD only, other pairs are misses)
+  """
+
+  name = 'api'
+
+  def __init__(self):
+    self.stats = LayerStats(self.name)
+
+  @staticmethod
+  def can_never_have(pdate: datetime.date, currency_pair: tuple[str, str]) -> bool:
+    return currency_pair != (bcbparams.CURR_BRL, bcbparams.CURR_USD) or cnv.is_date_weekend(pdate)
+
+  def get(self, pdate: datetime.date, currency_pair: tuple[str, str]):
+    if self.can_never_have(pdate, currency_pair) or pdate >= datetime.date.today():
+      return None
+    # imported here: the API module (and its requests dependency) is only needed on a full miss
+    import lib.indices.bcb_br.bcb_remote_api_fin_cls as apicls
+    caller = apicls.BcbCotacaoDiaApiCaller(pdate, curr_num=currency_pair[0], curr_den=currency_pair[1])
+    nt = caller.recurs_call_api_bcb_cotacao_dolar_on_daysdate()
+    if nt is None or nt.error_msg is not None:
+      return None
+    return nt._replace(curr_num=currency_pair[0], curr_den=currency_pair[1], param_date=pdate)
+
+  def put(self, nt):
+    pass
+
+
+class CotacaoCascade:
+
+  def __init__(self, layers: list | None = None):
+    """
+    layers are looked up in order, each one has get(pdate, currency_pair), put(nt) & a LayerStats
+    """
+    self.layers = layers
+    self.n_lookups = 0
+    self.n_not_found = 0
+    self._lock = threading.Lock()
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.layers is None:
+      self.layers = [LruCotacaoLayer(), DbCotacaoLayer(), TxtCotacaoLayer(), ApiCotacaoLayer()]
+
+  @staticmethod
+  def is_in_memory(layer) -> bool:
+    return getattr(layer, 'in_memory', False)
+
+  def get_from_layer(self, layer, pdate: datetime.date, currency_pair: tuple[str, str]):
+    """
+    Looks pdate up in one layer (under the lock for an in-memory one only) & counts its hit or miss
+    """
+    start = time.perf_counter()
+    if self.is_in_memory(layer):
+      with self._lock:
+        nt = layer.get(pdate, currency_pair)
+    else:
+      nt = layer.get(pdate, currency_pair)
+    elapsed_in_sec = time.perf_counter() - start
+    with self._lock:
+      layer.stats.elapsed_in_sec += elapsed_in_sec
+      if nt is None:
+        layer.stats.misses += 1
+      else:
+        layer.stats.hits += 1
+    return nt
+
+  def write_back(self, nt, upto: int):
+    """
+    Writes nt into the layers above layer index upto
+    """
+    for layer in reversed(self.layers[:upto]):
+      if self.is_in_memory(layer):
+        with self._lock:
+          layer.put(nt)
+      else:
+        layer.put(nt)
+      with self._lock:
+        layer.stats.writes += 1
+
+  def remember_miss(self, pdate: datetime.date, currency_pair: tuple[str, str]):
+    """
+    Keeps a full miss in the in-memory layers, for the whole run if the last layer can never have the day
+    """
+    can_never_have = getattr(self.layers[-1], 'can_never_have', None)
+    is_permanent = can_never_have is not None and can_never_have(pdate, currency_pair)
+    for layer in self.layers:
+      if self.is_in_memory(layer) and hasattr(layer, 'put_miss'):
+        with self._lock:
+          layer.put_miss(pdate, currency_pair, is_permanent)
+
+  def get(self, pdate, currency_pair: tuple[str, str] | None = None):
+    """
+    Returns the day's namedtuple_bcb_api1 (prices as floats, None for a holliday) or None if no layer has it
+    """
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None:
+      return None
+    if currency_pair is None:
+      currency_pair = (pkg.DEFAULT_CURR_NUM, pkg.DEFAULT_CURR_DEN)
+    with self._lock:
+      self.n_lookups += 1
+    for i, layer in enumerate(self.layers):
+      nt = self.get_from_layer(layer, pdate, currency_pair)
+      if nt is None:
+        continue
+      if nt is KNOWN_MISS:
+        with self._lock:
+          self.n_not_found += 1
+        return None
+      self.write_back(nt, i)
+      return nt
+    with self._lock:
+      self.n_not_found += 1
+    self.remember_miss(pdate, currency_pair)
+    return None
+
+  @property
+  def stats(self) -> dict[str, LayerStats]:
+    return {layer.name: layer.stats for layer in self.layers}
+
+  def __str__(self):
+    layerlines = '\n'.join(f"    {layer.stats}" for layer in self.layers)
+    outstr = f"""{self.__class__.__name__}
+    lookups = {self.n_lookups} | not found = {self.n_not_found}
+{layerlines}
+    """
+    return outstr
+
+
+def get_cotacao_cascade() -> CotacaoCascade:
+  """
+  Returns the process-wide cascade (so that its LRU layer lasts the whole run)
+  """
+  global _cascade
+  with _lock:
+    if _cascade is None:
+      _cascade = CotacaoCascade()
+  return _cascade
+
+
+def adhoctest():
+  cascade = get_cotacao_cascade()
+  for pdate in ['2024-02-09', '2024-02-13', '2024-02-09']:
+    print(pdate, cascade.get(pdate))
+  print(cascade)
+
+
+def process():
+  pass
+
+
+if __name__ == "__main__":
+  """
+  process()
+  """
+  adhoctest()
@@ -27,6 +27,12 @@ import lib.datefs.dategenerators as gendt
 import lib.db.db_settings as dbs
 import settings as sett
 import lib.indices.bcb_br.bcbparams as bcbparams
+import lib.indices.bcb_br.bcb_api_db_or_txt_fetch_cls as fetchfs
+import lib.indices.bcb_br.bcb_async_api_client_cls as asyncli  # .BcbAsyncCotacaoClient
+import lib.indices.bcb_br.bcb_business_calendar_cls as bizcal  # .BcbBusinessCalendar
+import lib.indices.bcb_br.bcb_exchrate_index_cls as exidx  # .ExchRateIndex
+import lib.indices.bcb_br.bcb_exchrate_bulk_upsert_cls as bulkcls  # .ExchRateBulkUpserter
+import lib.indices.bcb_br.bcb_exchrate_asof_lookup_fs as asof  # .find_dates_without_a_row
 namedtuple_bcb_api1 = bcbparams.namedtuple_bcb_api1
 _, modlevelogfn = os.path.split(__file__)
 modlevelogfn_extless = os.path.splitext(modlevelogfn)[0]
@@ -89,13 +95,19 @@ def is_cotacao_in_holliday(namedtuple_cotacao):
     return False
 
 
-def create_dates_stack_for_n_last_days(pdate, dates_stack_size=None):
+def create_dates_stack_for_n_last_days(pdate, dates_stack_size=None, business_calendar=None):
   """
   The 'stack' is a list.
+    If a business_calendar is given, the stack has the last business days only
+    (i.e., weekends & known hollidays do not enter it)
   """
   pdate = cnv.make_date_or_none(pdate)
   if dates_stack_size is None:
     dates_stack_size = DATES_STACK_SIZE
+  if business_calendar is not None:
+    dates_stack = list(business_calendar.gen_business_days_backwards(pdate, dates_stack_size + 1))
+    dates_stack.reverse()  # the reverse() is because pop() takes out the last
+    return dates_stack
   dates_stack = [pdate]
   for i in range(dates_stack_size):
     pdate = pdate - datetime.timedelta(days=1)
@@ -104,6 +116,45 @@ def create_dates_stack_for_n_last_days(pdate, dates_stack_size=None):
   return dates_stack
 
 
+def prefetch_missing_cotacoes_concurrently_n_dbsaveit(dates, currency_pair=None, max_concurrency=None):
+  """
+  Looks up the DB for the (past & non-weekend) dates, all in one query, and fetches the missing ones
+    concurrently via BcbAsyncCotacaoClient, saving them into the DB.
+  This way, BCBCotacaoFetcher objects instantiated afterwards for these dates
+    find their cotacao locally instead of calling the API one date at a time.
+
+  Returns the number of dates fetched from the API
+  """
+  today = datetime.date.today()
+  business_calendar = bizcal.get_business_calendar()
+  candidate_dates = []
+  for pdate in dates:
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None or pdate >= today or business_calendar.is_noquote_date(pdate):
+      continue
+    candidate_dates.append(pdate)
+  missing_dates = asof.find_dates_without_a_row(candidate_dates, currency_pair)
+  if len(missing_dates) == 0:
+    return 0
+  client = asyncli.BcbAsyncCotacaoClient(max_concurrency=max_concurrency)
+  date_n_result_dict = client.fetch_cotacoes_on_dates_sync(missing_dates)
+  n_hollidays_learned = 0
+  for pdate, namedtuple_cotacao in date_n_result_dict.items():
+    if namedtuple_cotacao.error_msg is not None:
+      # leave it to BCBCotacaoFetcher (its day-caller tries it again)
+      logger.info(namedtuple_cotacao.error_msg)
+      continue
+    if is_cotacao_in_holliday(namedtuple_cotacao) and business_calendar.learn_noquote_date(pdate):
+      n_hollidays_learned += 1
+  # the error-results are skipped by the upserter, the others go in one transaction
+  upserter = bulkcls.bulk_upsert_cotacoes(date_n_result_dict.values())
+  logger.info(str(upserter))
+  if n_hollidays_learned > 0:
+    business_calendar.save()
+  logger.info(str(client))
+  return len(date_n_result_dict)
+
+
 def get_random_wait_seconds():
   return random.randint(1, 8)
 
@@ -139,21 +190,41 @@ class BCBCotacaoFetcher:
       -> the datetime connected to the cotacao info also belongs to the received datum
     => if all 5 days (or a config one) do not return a cotacao record, an exception is raised
     TO-DO: the 5 days, at this version, is hardcoded, it may become a config parameter in the future.
+
+  The business calendar (@see bcb_business_calendar_cls.py) keeps the known hollidays
+    (ruled ones & the ones learned from the DB), so the stack only has business days
+    and no DB or API lookup goes out for a known non-quote date.
+    A holliday found via the DB or API is learned into the calendar (and persisted).
+
+  Before the date-stack walk, the in-memory exchange-rate index (@see bcb_exchrate_index_cls.py)
+    is asked for the "as-of" quote, ie the latest one on or before the input date.
+    That is taken if it falls on the business day the walk would reach first,
+    otherwise (the index may lack a recent quote) the walk runs and upserts what it finds.
   """
 
-  def __init__(self, pdate, currency_pair=None):
+  def __init__(self, pdate, currency_pair=None, business_calendar=None, exchrate_index=None):
     self.date = pdate
     self.treat_date()
     self.curr_num, self.curr_den = None, None
     self.treat_currency_pair(currency_pair)
     self.weekend_day_hits = 0
     self.holliday_hits = 0
+    self.business_calendar = business_calendar
+    if self.business_calendar is None:
+      self.business_calendar = bizcal.get_business_calendar()
+    self.exchrate_index = exchrate_index
+    if self.exchrate_index is None:
+      self.exchrate_index = exidx.get_exchrate_index((self.curr_num, self.curr_den))
+    self.index_hits = 0
     self.dates_stack_size = DATES_STACK_SIZE
-    self.dates_stack = create_dates_stack_for_n_last_days(self.date, self.dates_stack_size)
+    self.dates_stack = create_dates_stack_for_n_last_days(
+      self.date, self.dates_stack_size, self.business_calendar
+    )
     self.target_date = None
     self._target_datetime = None
     self._cotacao_venda = None
     self.namedtuple_cotacao = None
+    self.is_cotacao_from_db = False  # a db (or index) namedtuple has int prices, an API one has floats
     self.process()
 
   def treat_currency_pair(self, currency_pair):
@@ -194,27 +265,38 @@ class BCBCotacaoFetcher:
       )
       raise ValueError(error_msg)
 
+  def learn_holliday(self):
+    self.holliday_hits += 1
+    if self.business_calendar.learn_noquote_date(self.target_date):
+      self.business_calendar.save()
+
   def verify_date_n_try_find_its_corresponding_cotacao(self):
     # 1st: look if it's in weekend
     if is_date_a_weekend_day(self.target_date):
       self.weekend_day_hits += 1
       return None
-    # 2nd: look up local database
+    # 2nd: look if it's a known holliday (no DB or API lookup for it)
+    if self.business_calendar.is_noquote_date(self.target_date):
+      self.holliday_hits += 1
+      return None
+    # 3rd: look up local database
     namedtuple_cotacao = fetchfs.dbfetch_nt_bcb_exrate_or_none_w_date_n_currencypair(
       self.target_date
     )
     if namedtuple_cotacao is not None:
       # Holliday hypothesis
       if is_cotacao_in_holliday(namedtuple_cotacao):
-        self.holliday_hits += 1
+        self.learn_holliday()
         return None  # upon returning, it will pop out another date or terminate
+      self.is_cotacao_from_db = True
       return namedtuple_cotacao
     # cotacao is None from db, move on
     namedtuple_cotacao = fetchfs.fetch_cotacao_via_the_api_for_date_n_dbsaveit(self.target_date)
+    self.is_cotacao_from_db = False
     if namedtuple_cotacao is not None:
       # test Holliday hypothesis
       if is_cotacao_in_holliday(namedtuple_cotacao):
-        self.holliday_hits += 1
+        self.learn_holliday()
         return None  # upon returning, it will pop out another date or terminate
       return namedtuple_cotacao
     # connection error
@@ -233,8 +315,24 @@ class BCBCotacaoFetcher:
       return namedtuple_cotacao
     print('All 5 dates were popped out and no cotacao data found.')
 
+  def try_find_cotacao_in_index(self):
+    i = self.exchrate_index.find_asof_index(self.date)
+    if i is None:
+      return None
+    namedtuple_cotacao = self.exchrate_index.make_namedtuple_bcb_api1_at(i)
+    if namedtuple_cotacao.param_date != self.business_calendar.business_day_on_or_before(self.date):
+      return None
+    self.index_hits += 1
+    self.target_date = namedtuple_cotacao.param_date
+    return namedtuple_cotacao
+
   def process(self):
+    self.namedtuple_cotacao = self.try_find_cotacao_in_index()
+    if self.namedtuple_cotacao is not None:
+      self.is_cotacao_from_db = True
+      return
     self.namedtuple_cotacao = self.pop_dates_n_try_find_cotacao()
+    self.exchrate_index.upsert_namedtuple_bcb_api1(self.namedtuple_cotacao, from_db_int=self.is_cotacao_from_db)
 
   def __str__(self):
     outstr = f"""BCBCotacaoFetcher:
@@ -243,6 +341,7 @@ class BCBCotacaoFetcher:
     target datetime: {self.target_datetime}
     weekend_day_hits: {self.weekend_day_hits}
     holliday_hits: {self.holliday_hits}
+    index_hits: {self.index_hits}
     Found entry date if any: {self.target_date}
     dates stack size:  {self.dates_stack_size}
     Found cotacao if any: {self.namedtuple_cotacao}
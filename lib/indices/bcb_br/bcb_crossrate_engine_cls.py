@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/bcb_crossrate_engine_cls.py
+
+  Contains class CrossRateEngine which derives any pair among the currencies
+    with a known BCB type (@see bcbparams.CURRENCY_PARITY_TYPES) from two stored series:
+      => the BRL/USD quotes (the PTAX "cotação" of the dollar)
+      => the currency's USD parity (stored as X/USD for type A or as USD/X for type B)
+  so that a new currency needs only its parity series, not one quote series per pair.
+
+  The BCB formulas (@see the docstring in bcb_remote_api_fin_cls.py), with BRL as the 'moeda corrente':
+    type A (eg CAD):
+      buy BRL/CAD = buy BRL/USD ÷ sell parity USDCAD
+      sell BRL/CAD = sell BRL/USD ÷ buy parity USDCAD
+    type B (eg EUR):
+      buy BRL/EUR = buy parity EURUSD × buy BRL/USD
+      sell BRL/EUR = sell parity EURUSD × sell BRL/USD
+
+  Any other pair num/den (eg EUR/BRL or EUR/CAD) is the ratio of the two BRL quotes:
+      buy num/den = buy BRL/den ÷ sell BRL/num
+      sell num/den = sell BRL/den ÷ buy BRL/num
+    (for num = BRL, BRL/BRL is 1 on both sides, so EUR/BRL is the inverse of BRL/EUR with sides swapped)
+
+  The computation is vectorized: the series come as NumPy arrays copied from the exchange-rate index
+    (@see bcb_exchrate_index_cls.py), the parity is aligned to the BRL/USD business days
+    with np.searchsorted and days without a parity come out as NaN.
+    The derived BRL quotes are cached per currency while the indices they come from don't change
+    (their n_changes counters).
+
+  Example:
+    engine = CrossRateEngine()
+    series = engine.derive('BRL', 'EUR', '2024-01-01', '2024-01-31')
+    series.dates, series.buy, series.sell  # aligned arrays
+"""
+import collections as coll
+import datetime
+import numpy as np
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+import lib.indices.bcb_br.bcbparams as bcbparams
+import lib.indices.bcb_br.bcb_exchrate_index_cls as exidx  # .get_exchrate_index
+CURR_BRL, CURR_USD = bcbparams.CURR_BRL, bcbparams.CURR_USD
+CrossRateSeries = coll.namedtuple('CrossRateSeries', 'curr_num curr_den ordinals buy sell')
+
+
+def make_dates_from_ordinals(ordinals) -> list[datetime.date]:
+  return [datetime.date.fromordinal(int(ordinal)) for ordinal in ordinals]
+
+
+def derive_brl_quote_from_type_a_parity(usdbrl_buy, usdbrl_sell, parity_buy, parity_sell):
+  """
+  Type A: the parity is the currency per USD
+  """
+  return usdbrl_buy / parity_sell, usdbrl_sell / parity_buy
+
+
+def derive_brl_quote_from_type_b_parity(usdbrl_buy, usdbrl_sell, parity_buy, parity_sell):
+  """
+  Type B: the parity is USD per unit of the currency
+  """
+  return parity_buy * usdbrl_buy, parity_sell * usdbrl_sell
+
+
+def cross_brl_quotes(num_buy, num_sell, den_buy, den_sell):
+  """
+  Given BRL/num & BRL/den (buy & sell), returns num/den (buy & sell)
+  """
+  with np.errstate(divide='ignore', invalid='ignore'):
+    return den_buy / num_sell, den_sell / num_buy
+
+
+class CrossRateEngine:
+
+  def __init__(self, index_getter=None):
+    """
+    index_getter(currency_pair) returns an ExchRateIndex, the default is the process-wide exidx.get_exchrate_index
+    """
+    self.index_getter = index_getter or exidx.get_exchrate_index
+    self._brl_quotes_cache = {}
+
+  def get_stored_series(self, curr_num: str, curr_den: str):
+    """
+    Returns (ordinals, buy, sell) as NumPy arrays (prices as floats) for a stored pair
+      the ordinals are copied: a view (np.frombuffer) would keep the index's array from growing
+    """
+    index = self.index_getter((curr_num, curr_den))
+    ordinals = np.array(index.ordinals, dtype=np.int32)
+    buy = np.asarray(index.buyints, dtype=np.float64) / exidx.INTPRICE_MULTIPLIER
+    sell = np.asarray(index.sellints, dtype=np.float64) / exidx.INTPRICE_MULTIPLIER
+    return ordinals, buy, sell
+
+  def make_stamp(self, currency_pairs) -> tuple:
+    """
+    Identifies the state of the indices a derivation reads (a reloaded or refreshed index changes it)
+    """
+    indices = [self.index_getter(pair) for pair in currency_pairs if pair is not None]
+    return tuple((id(index), index.n_changes) for index in indices)
+
+  @staticmethod
+  def align_to_axis(axis_ordinals, ordinals, values):
+    """
+    Returns values placed onto axis_ordinals (NaN where ordinals lacks an axis day)
+    """
+    aligned = np.full(axis_ordinals.shape, np.nan)
+    if ordinals.size == 0:
+      return aligned
+    pos = np.searchsorted(ordinals, axis_ordinals)
+    pos_clipped = np.minimum(pos, ordinals.size - 1)
+    found = ordinals[pos_clipped] == axis_ordinals
+    aligned[found] = values[pos_clipped[found]]
+    return aligned
+
+  def get_brl_quotes(self, curr3letter: str):
+    """
+    Returns (ordinals, buy, sell) of BRL per unit of curr3letter on the BRL/USD business days
+    """
+    parity_currency_pair = None
+    if curr3letter not in (CURR_BRL, CURR_USD):
+      parity_currency_pair = bcbparams.get_usd_parity_currency_pair(curr3letter)
+      if parity_currency_pair is None:
+        errmsg = f"Currency [{curr3letter}] has no known BCB type (A or B) for deriving it from its USD parity."
+        raise ValueError(errmsg)
+    stamp = self.make_stamp([(CURR_BRL, CURR_USD), parity_currency_pair])
+    if curr3letter in self._brl_quotes_cache:
+      cached_stamp, brl_quotes = self._brl_quotes_cache[curr3letter]
+      if cached_stamp == stamp:
+        return brl_quotes
+    axis, usdbrl_buy, usdbrl_sell = self.get_stored_series(CURR_BRL, CURR_USD)
+    if curr3letter == CURR_BRL:
+      ones = np.ones(axis.shape)
+      brl_quotes = axis, ones, ones
+    elif curr3letter == CURR_USD:
+      brl_quotes = axis, usdbrl_buy, usdbrl_sell
+    else:
+      currency_type = bcbparams.CURRENCY_PARITY_TYPES.get(curr3letter)
+      ordinals, parity_buy, parity_sell = self.get_stored_series(*parity_currency_pair)
+      parity_buy = self.align_to_axis(axis, ordinals, parity_buy)
+      parity_sell = self.align_to_axis(axis, ordinals, parity_sell)
+      if currency_type == bcbparams.CURRENCY_TYPE_A:
+        buy, sell = derive_brl_quote_from_type_a_parity(usdbrl_buy, usdbrl_sell, parity_buy, parity_sell)
+      else:
+        buy, sell = derive_brl_quote_from_type_b_parity(usdbrl_buy, usdbrl_sell, parity_buy, parity_sell)
+      brl_quotes = axis, buy, sell
+    self._brl_quotes_cache[curr3letter] = stamp, brl_quotes
+    return brl_quotes
+
+  def derive(self, curr_num: str, curr_den: str, date_fr=None, date_to=None) -> CrossRateSeries:
+    """
+    Derives num/den (the quantity of curr_num per unit of curr_den) over the BRL/USD business days,
+      optionally restricted to [date_fr, date_to]
+    """
+    if curr_num == curr_den:
+      errmsg = f"Currency pair {curr_num}/{curr_den} has the same currency twice."
+      raise ValueError(errmsg)
+    axis, num_buy, num_sell = self.get_brl_quotes(curr_num)
+    _, den_buy, den_sell = self.get_brl_quotes(curr_den)
+    buy, sell = cross_brl_quotes(num_buy, num_sell, den_buy, den_sell)
+    sl = self.find_axis_slice(axis, date_fr, date_to)
+    return CrossRateSeries(curr_num=curr_num, curr_den=curr_den, ordinals=axis[sl], buy=buy[sl], sell=sell[sl])
+
+  @staticmethod
+  def find_axis_slice(axis, date_fr=None, date_to=None) -> slice:
+    date_fr, date_to = cnv.make_date_or_none(date_fr), cnv.make_date_or_none(date_to)
+    i_ini = 0 if date_fr is None else int(np.searchsorted(axis, date_fr.toordinal(), side='left'))
+    i_fim = axis.size if date_to is None else int(np.searchsorted(axis, date_to.toordinal(), side='right'))
+    return slice(i_ini, i_fim)
+
+  def derive_asof(self, curr_num: str, curr_den: str, pdate):
+    """
+    Returns (refdate, buy, sell) for the latest derivable day on or before pdate or None
+    """
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None:
+      return None
+    series = self.derive(curr_num, curr_den, date_to=pdate)
+    valid = ~(np.isnan(series.buy) | np.isnan(series.sell))
+    if not valid.any():
+      return None
+    i = int(np.flatnonzero(valid)[-1])
+    return datetime.date.fromordinal(int(series.ordinals[i])), float(series.buy[i]), float(series.sell[i])
+
+  def clear_cache(self):
+    self._brl_quotes_cache = {}
+
+
+def adhoctest():
+  engine = CrossRateEngine()
+  series = engine.derive('BRL', 'EUR', '2024-01-01', '2024-01-31')
+  for pdate, buy, sell in zip(make_dates_from_ordinals(series.ordinals), series.buy, series.sell):
+    print(pdate, buy, sell)
+
+
+def process():
+  pass
+
+
+if __name__ == "__main__":
+  """
+  process()
+  """
+  adhoctest()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/bcb_exchrate_asof_lookup_fs.py
+  Contains functions for looking up, in one SQL statement, the quotes of a whole datelist
+    (thousands of dates) with as-of semantics: each date gets the latest quote on or before it.
+
+  The datelist goes to sqlite either
+    a) as one json array parameter expanded by json_each() (the default, when sqlite has json1) or
+    b) as the rows of a temporary table (for a sqlite build without json1)
+  and is joined against currencies_exchangerates via a correlated subquery that, for each date,
+    walks the unique index (curr_num, curr_den, refdate) backwards to its first row.
+
+  The result (AsOfLookupResult) has NumPy arrays aligned with the input datelist:
+    => param_ordinals: the input dates (0 for an invalid one)
+    => refdate_ordinals: the dates of the quotes found (0 if none)
+    => buyints & sellints: the prices as in the db (price * 10**4, 0 if none)
+    => found: True where a quote was found
+
+  Example:
+    res = lookup_asof_quotes_for_datelist(['2024-02-13', '2024-02-14'])
+    res.refdate_ordinals  # [2024-02-09's ordinal, 2024-02-14's ordinal] (Carnival on 12 & 13)
+"""
+import collections as coll
+import json
+import numpy as np
+import settings as sett
+import art.inflmeas.bcb_br.classes as pkg  # pkg.EXCHRATE_DBTABLENAME
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+AsOfLookupResult = coll.namedtuple(
+  'AsOfLookupResult', 'param_ordinals refdate_ordinals buyints sellints found'
+)
+TMP_DATELIST_TABLENAME = 'tmp_asof_datelist'
+JULIANDAY_OF_ORDINAL_ZERO = 1721424.5  # julianday('0001-01-01') is 1721425.5 and its ordinal is 1
+
+
+def has_json_each(conn) -> bool:
+  try:
+    conn.execute("SELECT count(*) FROM json_each('[1]')").fetchone()
+    return True
+  except Exception:
+    return False
+
+
+def make_asof_join_sql(datelist_from_clause: str, skip_hollidays: bool) -> str:
+  """
+  datelist_from_clause yields (pos, pdate) rows: the json_each() call or the temp table
+  """
+  holliday_filter = 'and buypriceint IS NOT NULL' if skip_hollidays else ''
+  sql = f"""
+    SELECT p.pos, julianday(q.refdate), q.buypriceint, q.sellpriceint
+      FROM {datelist_from_clause} AS p
+      LEFT JOIN {pkg.EXCHRATE_DBTABLENAME} AS q ON q.id = (
+        SELECT id FROM {pkg.EXCHRATE_DBTABLENAME}
+          WHERE
+            curr_num = ? and curr_den = ? and refdate <= p.pdate {holliday_filter}
+          ORDER BY
+            refdate DESC
+          LIMIT 1
+      )
+      ORDER BY
+        p.pos;
+  """
+  return sql
+
+
+def fetch_rows_via_json_each(conn, strdates, currency_pair, skip_hollidays):
+  from_clause = '(SELECT CAST(key AS INTEGER) AS pos, value AS pdate FROM json_each(?))'
+  sql = make_asof_join_sql(from_clause, skip_hollidays)
+  return conn.execute(sql, (json.dumps(strdates), currency_pair[0], currency_pair[1])).fetchall()
+
+
+def fetch_rows_via_temp_table(conn, strdates, currency_pair, skip_hollidays):
+  conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {TMP_DATELIST_TABLENAME} (pos INTEGER PRIMARY KEY, pdate TEXT);")
+  conn.execute(f"DELETE FROM {TMP_DATELIST_TABLENAME};")
+  conn.executemany(f"INSERT INTO {TMP_DATELIST_TABLENAME} (pos, pdate) VALUES (?, ?);", enumerate(strdates))
+  sql = make_asof_join_sql(TMP_DATELIST_TABLENAME, skip_hollidays)
+  try:
+    return conn.execute(sql, currency_pair).fetchall()
+  finally:
+    conn.execute(f"DELETE FROM {TMP_DATELIST_TABLENAME};")
+
+
+def lookup_asof_quotes_for_datelist(
+    datelist,
+    currency_pair: tuple[str, str] | None = None,
+    conn=None,
+    skip_hollidays: bool = True,
+    via_temp_table: bool | None = None,
+  ) -> AsOfLookupResult:
+  """
+  Returns, aligned with datelist, the latest quote on or before each date (in one SQL statement)
+    skip_hollidays=False lets a null-price row (a holliday) be the as-of row,
+      eg for telling which dates have a row at all (found & refdate == param date)
+    via_temp_table=None picks json_each() if sqlite has it, the temp table otherwise
+  """
+  curr_num, curr_den = (None, None) if currency_pair is None else currency_pair
+  currency_pair = (curr_num or pkg.DEFAULT_CURR_NUM, curr_den or pkg.DEFAULT_CURR_DEN)
+  pdates = [cnv.make_date_or_none(pdate) for pdate in datelist]
+  n = len(pdates)
+  param_ordinals = np.array([0 if pdate is None else pdate.toordinal() for pdate in pdates], dtype=np.int64)
+  refdate_ordinals = np.zeros(n, dtype=np.int64)
+  buyints = np.zeros(n, dtype=np.int64)
+  sellints = np.zeros(n, dtype=np.int64)
+  found = np.zeros(n, dtype=bool)
+  if n == 0:
+    return AsOfLookupResult(param_ordinals, refdate_ordinals, buyints, sellints, found)
+  # an invalid date is sent as '' (no refdate is <= '') so that positions stay aligned
+  strdates = ['' if pdate is None else str(pdate) for pdate in pdates]
+  close_conn = conn is None
+  if conn is None:
+    conn = sett.get_sqlite_connection()
+  try:
+    if via_temp_table is None:
+      via_temp_table = not has_json_each(conn)
+    if via_temp_table:
+      rows = fetch_rows_via_temp_table(conn, strdates, currency_pair, skip_hollidays)
+    else:
+      rows = fetch_rows_via_json_each(conn, strdates, currency_pair, skip_hollidays)
+  finally:
+    if close_conn:
+      conn.close()
+  rows = [row for row in rows if row[1] is not None]
+  if len(rows) > 0:
+    positions, julians, buys, sells = zip(*rows)
+    positions = np.asarray(positions, dtype=np.int64)
+    found[positions] = True
+    refdate_ordinals[positions] = np.rint(np.asarray(julians, dtype=np.float64) - JULIANDAY_OF_ORDINAL_ZERO)
+    # null prices (hollidays, when not skipped) come out as 0
+    buyints[positions] = [0 if b is None else b for b in buys]
+    sellints[positions] = [0 if s is None else s for s in sells]
+  return AsOfLookupResult(param_ordinals, refdate_ordinals, buyints, sellints, found)
+
+
+def find_dates_without_a_row(datelist, currency_pair=None, conn=None) -> list:
+  """
+  Returns the (valid) dates in datelist that have no row (neither a quote nor a holliday row) in one query
+  """
+  pdates = [cnv.make_date_or_none(pdate) for pdate in datelist]
+  pdates = [pdate for pdate in pdates if pdate is not None]
+  res = lookup_asof_quotes_for_datelist(pdates, currency_pair, conn=conn, skip_hollidays=False)
+  has_row = res.found & (res.refdate_ordinals == res.param_ordinals)
+  return [pdate for pdate, is_there in zip(pdates, has_row) if not is_there]
+
+
+def adhoctest():
+  res = lookup_asof_quotes_for_datelist(['2024-02-09', '2024-02-13', '2024-02-14'])
+  print(res)
+
+
+def process():
+  pass
+
+
+if __name__ == "__main__":
+  """
+  process()
+  """
+  adhoctest()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/bcb_exchrate_bulk_upsert_cls.py
+
+  Contains class ExchRateBulkUpserter which writes many namedtuple_bcb_api1 results
+    (as the API callers return them) into table currencies_exchangerates
+    in one transaction, ie with one commit (one fsync) for the whole batch.
+
+  Each chunk of rows is written with one statement:
+    INSERT INTO currencies_exchangerates (...) VALUES (...), (...), ...
+      ON CONFLICT (curr_num, curr_den, refdate) DO UPDATE SET ...
+      WHERE <some value differs>
+  (the conflict target is the unique index unq_currnum_currden_refdate,
+    @see lib/db/alter_table_currencies_exchangerates.py)
+
+  Before each chunk, the existing rows for its refdates are read (one SELECT)
+    so that the report tells inserted, updated and unchanged counts apart.
+
+  Example:
+    upserter = ExchRateBulkUpserter()
+    upserter.upsert(caller.process())  # eg the results of BcbCotacaoPeriodoApiCaller
+    print(upserter)  # inserted = 250 | updated = 0 | unchanged = 0 ...
+"""
+import datetime
+import time
+import settings as sett
+import art.inflmeas.bcb_br.classes as pkg  # pkg.EXCHRATE_DBTABLENAME
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+import lib.datefs.convert_to_datetime_wo_intr_sep_posorder as cvdt
+import lib.indices.bcb_br.bcb_exchrate_index_cls as exidx  # .convert_floatprice_to_int_or_none
+DEFAULT_CHUNK_SIZE = 500  # 500 rows x 7 values stay well below sqlite's bound-variable limit
+UPSERT_FIELDNAMES = ['curr_num', 'curr_den', 'buypriceint', 'sellpriceint', 'refdate', 'quotestime', 'created_at']
+
+
+def make_strtime_or_none(cotacao_datahora) -> str | None:
+  """
+  Formats the quote time the way SqlAlchemy's Time column stores it (HH:MM:SS.ffffff)
+  """
+  if isinstance(cotacao_datahora, datetime.time):
+    quotestime = cotacao_datahora
+  else:
+    quotestime = cvdt.make_datetime_n_get_time_via_split_from_strdt(cotacao_datahora)
+  return None if quotestime is None else quotestime.strftime('%H:%M:%S.%f')
+
+
+class ExchRateBulkUpserter:
+
+  tablename = pkg.EXCHRATE_DBTABLENAME
+
+  def __init__(self, conn=None, chunk_size: int | None = None):
+    self.conn = conn
+    self.chunk_size = chunk_size
+    self.n_inserted = 0
+    self.n_updated = 0
+    self.n_unchanged = 0
+    self.n_skipped = 0
+    self.n_chunks = 0
+    self.elapsed_in_sec = 0.0
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.chunk_size is None or self.chunk_size < 1:
+      self.chunk_size = DEFAULT_CHUNK_SIZE
+
+  @property
+  def n_written(self) -> int:
+    return self.n_inserted + self.n_updated
+
+  def make_row_or_none(self, namedtuple_cotacao, created_at: str) -> tuple | None:
+    """
+    Converts a namedtuple_bcb_api1 (API prices, in currency units) to a db row (prices as ints) or None if it cannot be written
+      (an error-result or one without a valid date); hollidays (null prices) are written as the day-caller does
+    """
+    if namedtuple_cotacao is None or namedtuple_cotacao.error_msg is not None:
+      return None
+    refdate = cnv.make_date_or_none(namedtuple_cotacao.param_date)
+    if refdate is None or namedtuple_cotacao.curr_num is None or namedtuple_cotacao.curr_den is None:
+      return None
+    return (
+      namedtuple_cotacao.curr_num, namedtuple_cotacao.curr_den,
+      exidx.convert_floatprice_to_int_or_none(namedtuple_cotacao.cotacao_compra),
+      exidx.convert_floatprice_to_int_or_none(namedtuple_cotacao.cotacao_venda),
+      str(refdate), make_strtime_or_none(namedtuple_cotacao.cotacao_datahora), created_at,
+    )
+
+  def fetch_existing_values_for_chunk(self, rows: list[tuple]) -> dict:
+    """
+    Returns {(curr_num, curr_den, refdate): (buypriceint, sellpriceint, quotestime)} for the chunk's keys
+    """
+    keys = [(row[0], row[1], row[4]) for row in rows]
+    placeholders = ', '.join(['(?, ?, ?)'] * len(keys))
+    sql = f"""
+    SELECT curr_num, curr_den, refdate, buypriceint, sellpriceint, quotestime FROM {self.tablename}
+      WHERE (curr_num, curr_den, refdate) IN (VALUES {placeholders});
+    """
+    tuplevalues = tuple(value for key in keys for value in key)
+    existing = {}
+    for curr_num, curr_den, refdate, buyint, sellint, quotestime in self.conn.execute(sql, tuplevalues):
+      existing[(curr_num, curr_den, str(refdate))] = (buyint, sellint, quotestime)
+    return existing
+
+  def make_upsert_sql_for_n_rows(self, n_rows: int) -> str:
+    placeholders = ', '.join(['(' + ', '.join(['?'] * len(UPSERT_FIELDNAMES)) + ')'] * n_rows)
+    sql = f"""
+    INSERT INTO {self.tablename} ({', '.join(UPSERT_FIELDNAMES)})
+      VALUES {placeholders}
+      ON CONFLICT (curr_num, curr_den, refdate) DO UPDATE SET
+        buypriceint = excluded.buypriceint,
+        sellpriceint = excluded.sellpriceint,
+        quotestime = excluded.quotestime,
+        updated_at = excluded.created_at
+      WHERE
+        buypriceint IS NOT excluded.buypriceint or
+        sellpriceint IS NOT excluded.sellpriceint or
+        quotestime IS NOT excluded.quotestime;
+    """
+    return sql
+
+  def upsert_chunk(self, rows: list[tuple]):
+    # a key repeated inside the chunk: the last one wins (a statement cannot update the same row twice)
+    rows = list({(row[0], row[1], row[4]): row for row in rows}.values())
+    existing = self.fetch_existing_values_for_chunk(rows)
+    rows_to_write = []
+    for row in rows:
+      values = existing.get((row[0], row[1], row[4]))
+      if values is None:
+        self.n_inserted += 1
+      elif values == (row[2], row[3], row[5]):
+        self.n_unchanged += 1
+        continue
+      else:
+        self.n_updated += 1
+      rows_to_write.append(row)
+    if len(rows_to_write) == 0:
+      return
+    sql = self.make_upsert_sql_for_n_rows(len(rows_to_write))
+    self.conn.execute(sql, tuple(value for row in rows_to_write for value in row))
+
+  def upsert(self, namedtuple_cotacoes) -> int:
+    """
+    Writes the iterable of namedtuple_bcb_api1 in one transaction, returning the number of rows written
+      (inserted plus updated); if anything fails, the whole batch is rolled back
+    """
+    start = time.perf_counter()
+    close_conn = self.conn is None
+    if self.conn is None:
+      self.conn = sett.get_sqlite_connection()
+    created_at = str(datetime.datetime.now())
+    n_written_before = self.n_written
+    try:
+      chunk = []
+      for namedtuple_cotacao in namedtuple_cotacoes:
+        row = self.make_row_or_none(namedtuple_cotacao, created_at)
+        if row is None:
+          self.n_skipped += 1
+          continue
+        chunk.append(row)
+        if len(chunk) == self.chunk_size:
+          self.upsert_chunk(chunk)
+          self.n_chunks += 1
+          chunk = []
+      if len(chunk) > 0:
+        self.upsert_chunk(chunk)
+        self.n_chunks += 1
+      self.conn.commit()
+    except Exception:
+      self.conn.rollback()
+      raise
+    finally:
+      if close_conn:
+        self.conn.close()
+        self.conn = None
+      self.elapsed_in_sec += time.perf_counter() - start
+    return self.n_written - n_written_before
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    inserted = {self.n_inserted} | updated = {self.n_updated} | unchanged = {self.n_unchanged}
+    skipped (errors or invalid) = {self.n_skipped} | chunks = {self.n_chunks} of at most {self.chunk_size}
+    elapsed = {self.elapsed_in_sec:.3f}s
+    """
+    return outstr
+
+
+def bulk_upsert_cotacoes(namedtuple_cotacoes, conn=None, chunk_size=None) -> ExchRateBulkUpserter:
+  upserter = ExchRateBulkUpserter(conn=conn, chunk_size=chunk_size)
+  upserter.upsert(namedtuple_cotacoes)
+  return upserter
+
+
+def adhoctest():
+  pass
+
+
+def process():
+  pass
+
+
+if __name__ == "__main__":
+  """
+  process()
+  """
+  adhoctest()
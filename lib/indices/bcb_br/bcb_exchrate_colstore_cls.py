@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/bcb_exchrate_colstore_cls.py
+
+  Contains class ExchRateColumnarStore: a binary, columnar & memory-mapped file per currency pair
+    that sits alongside the monthly prettyprint text files
+    (eg '2020-07 BRL_USD exchange rates.txt', @see PrettyPrintMonthlyExchangeRatesRWBase)
+    so that a multi-year read is one mmap instead of opening & parsing hundreds of text files.
+
+  File layout (little-endian), eg 'BRL_USD.xrcol' in folder '<datafolder>/bcb_colstore':
+    => an 80-byte header: magic (8 bytes) | curr_num (3) | curr_den (3) | version (1)
+         | n_decplaces of the int prices (1) | n_rows (uint32) | written-at timestamp (int64)
+         | db stamp (48, the pair's row count, max refdate & max updated_at in the db when it was written)
+         | padding (4)
+    => column 1: n_rows int32 date ordinals (date.toordinal()), ascending
+    => (padding up to an 8-byte boundary)
+    => column 2: n_rows int64 buy prices (price * 10**n_decplaces, as in the db's buypriceint)
+    => column 3: n_rows int64 sell prices
+  Days without quotes (hollidays with null prices) are not stored.
+
+  Reading returns zero-copy NumPy views over the mmap (no parsing, no copying):
+    with ExchRateColumnarStore('BRL', 'USD') as store:
+      store.ordinals, store.buyints, store.sellints  # np.ndarray views
+      store.find_range_slice('2005-01-01', '2024-12-31')
+
+  The file is (re)generated on demand from the db (regenerate_from_db())
+    or from the prettyprint text files (regenerate_from_textfiles()); writing is atomic (tmp file + rename).
+  A file whose db stamp differs from the db's current one is stale (is_stale()):
+    open_colstore_or_regenerate() regenerates it before handing it out (a file made from text files has no stamp).
+"""
+import datetime
+import mmap
+import os
+import re
+import struct
+import time
+import numpy as np
+import settings as sett
+import art.inflmeas.bcb_br.classes as pkg  # pkg.EXCHRATE_DBTABLENAME, pkg.n_decplaces_for_div_intprices
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+import lib.indices.bcb_br.bcbparams as bcbparams
+COLSTORE_MAGIC = b'XRCOLS\x00\x01'
+COLSTORE_VERSION = 2
+COLSTORE_DB_STAMP_SIZE = 48
+COLSTORE_HEADER = struct.Struct(f'<8s3s3sBBIq{COLSTORE_DB_STAMP_SIZE}s4x')  # 80 bytes
+COLSTORE_FILE_EXTENSION = '.xrcol'
+DEFAULT_COLSTORE_FOLDERNAME = 'bcb_colstore'
+DEFAULT_PRETTYPRINT_FOLDERNAME = 'bcb_indices'  # the same as PrettyPrintMonthlyExchangeRatesRWBase's
+INTPRICE_MULTIPLIER = 10 ** pkg.n_decplaces_for_div_intprices
+# a prettyprint line is like: | 1 | 2020-07-01 | 5.3 | 5.31 |
+re_prettyprint_quote_line = re.compile(
+  r"^\|?\s*\d+\s*\|\s*(?P<date>\d{4}-\d{2}-\d{2})\s*\|\s*(?P<buy>\d+(?:\.\d+)?)\s*\|\s*(?P<sell>\d+(?:\.\d+)?)\s*\|",
+  re.MULTILINE
+)
+
+
+def get_default_colstore_folderpath():
+  return os.path.join(sett.get_datafolder_abspath(), DEFAULT_COLSTORE_FOLDERNAME)
+
+
+def get_default_prettyprint_folderpath():
+  return os.path.join(sett.get_datafolder_abspath(), DEFAULT_PRETTYPRINT_FOLDERNAME)
+
+
+def calc_column_offsets(n_rows: int) -> tuple[int, int, int]:
+  """
+  Returns the byte offsets of the 3 columns (the int64 ones start at an 8-byte boundary)
+  """
+  ordinals_offset = COLSTORE_HEADER.size
+  buy_offset = ordinals_offset + 4 * n_rows
+  buy_offset += (-buy_offset) % 8
+  sell_offset = buy_offset + 8 * n_rows
+  return ordinals_offset, buy_offset, sell_offset
+
+
+def parse_prettyprint_text_into_rows(text: str) -> list[tuple[int, int, int]]:
+  """
+  Returns [(ordinal, buyint, sellint), ...] for the quote lines in a prettyprint file's text
+  """
+  rows = []
+  for match in re_prettyprint_quote_line.finditer(text):
+    pdate = cnv.make_date_or_none(match.group('date'))
+    if pdate is None:
+      continue
+    rows.append((
+      pdate.toordinal(),
+      round(float(match.group('buy')) * INTPRICE_MULTIPLIER),
+      round(float(match.group('sell')) * INTPRICE_MULTIPLIER),
+    ))
+  return rows
+
+
+class ExchRateColumnarStore:
+
+  tablename = pkg.EXCHRATE_DBTABLENAME
+
+  def __init__(self, curr_num: str | None = None, curr_den: str | None = None, folderpath: str | None = None):
+    self.curr_num = curr_num or pkg.DEFAULT_CURR_NUM
+    self.curr_den = curr_den or pkg.DEFAULT_CURR_DEN
+    self.folderpath = folderpath
+    self.n_rows = 0
+    self.written_at = None
+    self.db_stamp = ''
+    self.ordinals = np.empty(0, dtype='<i4')
+    self.buyints = np.empty(0, dtype='<i8')
+    self.sellints = np.empty(0, dtype='<i8')
+    self._fd = None
+    self._mmap = None
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.folderpath is None:
+      self.folderpath = get_default_colstore_folderpath()
+
+  @property
+  def currnum_uline_currden(self) -> str:
+    return f"{self.curr_num}_{self.curr_den}"
+
+  @property
+  def filepath(self) -> str:
+    return os.path.join(self.folderpath, self.currnum_uline_currden + COLSTORE_FILE_EXTENSION)
+
+  @property
+  def is_open(self) -> bool:
+    return self._mmap is not None
+
+  def write_columns(self, ordinals, buyints, sellints, db_stamp: str = '') -> int:
+    """
+    Writes the 3 columns (sorted by date, a date repeated keeps its last row) atomically,
+      returning the number of rows written
+    """
+    ordinals = np.asarray(ordinals, dtype='<i4')
+    buyints, sellints = np.asarray(buyints, dtype='<i8'), np.asarray(sellints, dtype='<i8')
+    # np.unique over the reversed array keeps the last occurrence of each date
+    _, rev_idx = np.unique(ordinals[::-1], return_index=True)
+    idx = ordinals.size - 1 - rev_idx
+    ordinals, buyints, sellints = ordinals[idx], buyints[idx], sellints[idx]
+    n_rows = int(ordinals.size)
+    ordinals_offset, buy_offset, sell_offset = calc_column_offsets(n_rows)
+    header = COLSTORE_HEADER.pack(
+      COLSTORE_MAGIC, self.curr_num.encode('ascii'), self.curr_den.encode('ascii'),
+      COLSTORE_VERSION, pkg.n_decplaces_for_div_intprices, n_rows, int(time.time()), db_stamp.encode('ascii'),
+    )
+    was_open = self.is_open
+    self.close()
+    os.makedirs(self.folderpath, exist_ok=True)
+    tmp_filepath = self.filepath + '.tmp'
+    with open(tmp_filepath, 'wb') as fd:
+      fd.write(header)
+      fd.write(ordinals.tobytes())
+      fd.write(b'\x00' * (buy_offset - ordinals_offset - 4 * n_rows))
+      fd.write(buyints.tobytes())
+      fd.write(sellints.tobytes())
+    os.replace(tmp_filepath, self.filepath)
+    if was_open:
+      self.open()
+    return n_rows
+
+  def open(self):
+    """
+    Maps the file (read-only) and sets the zero-copy column views
+    """
+    self.close()
+    self._fd = open(self.filepath, 'rb')
+    if os.fstat(self._fd.fileno()).st_size < COLSTORE_HEADER.size:
+      self.close()
+      errmsg = f"Columnar store [{self.filepath}] is shorter than its header. Please regenerate it."
+      raise ValueError(errmsg)
+    self._mmap = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, curr_num, curr_den, version, n_decplaces, n_rows, written_at, db_stamp = COLSTORE_HEADER.unpack_from(
+      self._mmap, 0
+    )
+    if magic != COLSTORE_MAGIC or version != COLSTORE_VERSION:
+      self.close()
+      errmsg = f"File [{self.filepath}] is not a (version {COLSTORE_VERSION}) exchange rate columnar store."
+      raise ValueError(errmsg)
+    if (curr_num.decode(), curr_den.decode()) != (self.curr_num, self.curr_den):
+      self.close()
+      errmsg = f"File [{self.filepath}] stores {curr_num.decode()}/{curr_den.decode()}, not {self.curr_num}/{self.curr_den}."
+      raise ValueError(errmsg)
+    if n_decplaces != pkg.n_decplaces_for_div_intprices:
+      self.close()
+      errmsg = f"File [{self.filepath}] has prices with {n_decplaces} decimal places. Please regenerate it."
+      raise ValueError(errmsg)
+    ordinals_offset, buy_offset, sell_offset = calc_column_offsets(n_rows)
+    self.n_rows = n_rows
+    self.written_at = datetime.datetime.fromtimestamp(written_at)
+    self.db_stamp = db_stamp.rstrip(b'\x00').decode('ascii')
+    self.ordinals = np.frombuffer(self._mmap, dtype='<i4', count=n_rows, offset=ordinals_offset)
+    self.buyints = np.frombuffer(self._mmap, dtype='<i8', count=n_rows, offset=buy_offset)
+    self.sellints = np.frombuffer(self._mmap, dtype='<i8', count=n_rows, offset=sell_offset)
+    return self
+
+  def close(self):
+    self.ordinals = np.empty(0, dtype='<i4')
+    self.buyints = np.empty(0, dtype='<i8')
+    self.sellints = np.empty(0, dtype='<i8')
+    self.n_rows = 0
+    self.db_stamp = ''
+    if self._mmap is not None:
+      try:
+        self._mmap.close()
+      except BufferError:
+        # a caller still holds a view: the map is released when that view goes away
+        pass
+      self._mmap = None
+    if self._fd is not None:
+      self._fd.close()
+      self._fd = None
+
+  def __enter__(self):
+    return self.open()
+
+  def __exit__(self, exc_type, exc_val, exc_tb):
+    self.close()
+
+  def read_db_stamp(self, conn=None) -> str:
+    """
+    The pair's row count, max refdate & max updated_at in the db: any insert, update or delete changes it
+    """
+    close_conn = conn is None
+    if conn is None:
+      conn = sett.get_sqlite_connection()
+    sql = f"""
+    SELECT count(*), max(refdate), max(updated_at) FROM {self.tablename}
+      WHERE
+        curr_num = ? and curr_den = ?;
+    """
+    try:
+      n_rows, max_refdate, max_updated_at = conn.execute(sql, (self.curr_num, self.curr_den)).fetchone()
+    finally:
+      if close_conn:
+        conn.close()
+    return f"{n_rows}|{max_refdate or ''}|{max_updated_at or ''}"[:COLSTORE_DB_STAMP_SIZE]
+
+  def is_stale(self, conn=None) -> bool:
+    """
+    Whether the (open) file no longer matches the db (or was not made from it)
+    """
+    return self.db_stamp == '' or self.db_stamp != self.read_db_stamp(conn)
+
+  def regenerate_from_db(self, conn=None) -> int:
+    close_conn = conn is None
+    if conn is None:
+      conn = sett.get_sqlite_connection()
+    sql = f"""
+    SELECT refdate, buypriceint, sellpriceint FROM {self.tablename}
+      WHERE
+        curr_num = ? and curr_den = ? and
+        buypriceint IS NOT NULL and sellpriceint IS NOT NULL
+      ORDER BY
+        refdate;
+    """
+    try:
+      # the stamp is read first: a row written in between makes the file stale (it's regenerated), not wrong
+      db_stamp = self.read_db_stamp(conn)
+      rows = conn.execute(sql, (self.curr_num, self.curr_den)).fetchall()
+    finally:
+      if close_conn:
+        conn.close()
+    dates = map(lambda row: cnv.make_date_or_none(row[0]), rows)
+    rows = [(pdate.toordinal(), row[1], row[2]) for pdate, row in zip(dates, rows) if pdate is not None]
+    return self.write_rows(rows, db_stamp)
+
+  def regenerate_from_textfiles(self, rootfolderpath: str | None = None) -> int:
+    """
+    Parses the pair's monthly prettyprint files found (recursively) under rootfolderpath
+    """
+    if rootfolderpath is None:
+      rootfolderpath = get_default_prettyprint_folderpath()
+    rows = []
+    for dirpath, _, filenames in os.walk(rootfolderpath):
+      for filename in filenames:
+        match = bcbparams.yearmonth_currs_datafilename_recmpl.match(filename)
+        if match is None or match.group('currnum_ul_currden') != self.currnum_uline_currden:
+          continue
+        with open(os.path.join(dirpath, filename), 'r', encoding='utf8') as fd:
+          rows += parse_prettyprint_text_into_rows(fd.read())
+    return self.write_rows(rows)
+
+  def write_rows(self, rows: list[tuple[int, int, int]], db_stamp: str = '') -> int:
+    if len(rows) == 0:
+      return self.write_columns([], [], [], db_stamp)
+    ordinals, buyints, sellints = zip(*sorted(rows, key=lambda row: row[0]))
+    return self.write_columns(ordinals, buyints, sellints, db_stamp)
+
+  def find_range_slice(self, date_fr=None, date_to=None) -> slice:
+    date_fr, date_to = cnv.make_date_or_none(date_fr), cnv.make_date_or_none(date_to)
+    i_ini = 0 if date_fr is None else int(np.searchsorted(self.ordinals, date_fr.toordinal(), side='left'))
+    i_fim = self.n_rows if date_to is None else int(np.searchsorted(self.ordinals, date_to.toordinal(), side='right'))
+    return slice(i_ini, i_fim)
+
+  def find_asof(self, pdate) -> tuple[datetime.date, int, int] | None:
+    """
+    Returns (refdate, buyint, sellint) of the latest quote on or before pdate or None
+    """
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None:
+      return None
+    i = int(np.searchsorted(self.ordinals, pdate.toordinal(), side='right')) - 1
+    if i < 0:
+      return None
+    return datetime.date.fromordinal(int(self.ordinals[i])), int(self.buyints[i]), int(self.sellints[i])
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    {self.curr_num}/{self.curr_den} | file = {self.filepath}
+    rows = {self.n_rows} | written at = {self.written_at} | db stamp = [{self.db_stamp}]
+    """
+    return outstr
+
+
+def open_colstore_or_regenerate(curr_num=None, curr_den=None, folderpath=None, conn=None) -> ExchRateColumnarStore:
+  """
+  Opens the pair's store, (re)generating it from the db first if the file is missing, unreadable or stale
+  """
+  store = ExchRateColumnarStore(curr_num, curr_den, folderpath)
+  try:
+    if not store.open().is_stale(conn):
+      return store
+  except (OSError, ValueError):
+    pass
+  store.close()
+  store.regenerate_from_db(conn)
+  return store.open()
+
+
+def adhoctest():
+  start = time.perf_counter()
+  store = open_colstore_or_regenerate('BRL', 'USD')
+  elapsed = time.perf_counter() - start
+  print(store)
+  scrmsg = f"opened in {elapsed * 1000:.3f}ms | asof 2024-02-13 = {store.find_asof('2024-02-13')}"
+  print(scrmsg)
+  store.close()
+
+
+def process():
+  pass
+
+
+if __name__ == "__main__":
+  """
+  process()
+  """
+  adhoctest()
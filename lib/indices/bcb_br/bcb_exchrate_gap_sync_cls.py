@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/bcb_exchrate_gap_sync_cls.py
+
+  Contains class ExchRateGapSyncer which brings table currencies_exchangerates up to date
+    by fetching only its gaps, ie the business days (@see bcb_business_calendar_cls.py)
+    that have no row (neither a quote nor a null-price holliday row) for a currency pair.
+
+  The steps are:
+    1) one SQL pass reads the refdates of all pairs after the lowest high-water date
+       (or the whole table in a full sync)
+    2) per pair, the missing business days come from a set difference (np.setdiff1d)
+       between the calendar's business days and the stored refdates
+    3) the gaps are batched into date ranges (gaps closer than MAX_DAYS_BW_GAPS_IN_A_RANGE
+       are merged) and each range is fetched with the period API (one call per year-window)
+       and saved in one transaction (@see fetch_cotacoes_via_the_api_for_daterange_n_dbsaveit())
+    4) the high-water date (all business days up to it are stored) is recorded per pair
+       in a json file in the data folder
+
+  So a nightly run costs one query plus one small fetch (yesterday's quote).
+
+  Example:
+    syncer = ExchRateGapSyncer()
+    syncer.process()
+    print(syncer)
+"""
+import datetime
+import json
+import logging
+import os
+import numpy as np
+import settings as sett
+import art.inflmeas.bcb_br.classes as pkg  # pkg.EXCHRATE_DBTABLENAME
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+import lib.indices.bcb_br.bcb_business_calendar_cls as bizcal
+logger = logging.getLogger(__name__)
+DEFAULT_SYNC_STATE_FILENAME = 'bcb_exchrate_sync_state.json'
+DEFAULT_DAYS_BACK_FOR_A_NEW_PAIR = 30  # a pair without rows starts being synced from (today - this)
+MAX_DAYS_BW_GAPS_IN_A_RANGE = 15  # closer gaps go into the same API range (one call instead of two)
+
+
+def get_default_sync_state_filepath():
+  return os.path.join(sett.get_datafolder_abspath(), DEFAULT_SYNC_STATE_FILENAME)
+
+
+def batch_ordinals_into_ranges(ordinals, max_days_bw=None) -> list[tuple[datetime.date, datetime.date]]:
+  """
+  Batches sorted date ordinals into (date_ini, date_fim) ranges,
+    a range is broken where two consecutive ordinals are more than max_days_bw apart
+  Example:
+    [d1, d2, d3, d40] with max_days_bw=15 gives [(d1, d3), (d40, d40)]
+  """
+  if max_days_bw is None:
+    max_days_bw = MAX_DAYS_BW_GAPS_IN_A_RANGE
+  ordinals = np.asarray(ordinals, dtype=np.int64)
+  if ordinals.size == 0:
+    return []
+  breaks = np.flatnonzero(np.diff(ordinals) > max_days_bw)
+  starts = np.concatenate(([0], breaks + 1))
+  ends = np.concatenate((breaks, [ordinals.size - 1]))
+  return [
+    (datetime.date.fromordinal(int(ordinals[i])), datetime.date.fromordinal(int(ordinals[j])))
+    for i, j in zip(starts, ends)
+  ]
+
+
+class ExchRateGapSyncer:
+
+  tablename = pkg.EXCHRATE_DBTABLENAME
+
+  def __init__(
+      self,
+      currency_pairs: list[tuple[str, str]] | None = None,
+      full: bool = False,
+      since=None,
+      business_calendar: bizcal.BcbBusinessCalendar | None = None,
+      range_fetcher=None,
+      state_filepath: str | None = None,
+      conn=None,
+    ):
+    """
+      full=True rescans the whole history (otherwise only the days after each pair's high-water date)
+      since: the date the scan starts from when there is no high-water date (or in a full sync)
+        and the earliest one otherwise (the scan starts at min(since, the day after the high-water date))
+        (without it, the scan starts from the pair's first row or, for a pair with no rows,
+         DEFAULT_DAYS_BACK_FOR_A_NEW_PAIR days back)
+      range_fetcher(date_fr, date_to, currency_pair) returns the fetched namedtuple_bcb_api1 list
+        (it defaults to the period API fetch that also saves into the db)
+    """
+    self.currency_pairs = currency_pairs
+    self.full = full
+    self.since = cnv.make_date_or_none(since)
+    self.business_calendar = business_calendar
+    self.range_fetcher = range_fetcher
+    self.state_filepath = state_filepath
+    self.conn = conn
+    self.yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    self.state = {}
+    self.pair_n_gaps_dict = {}
+    self.pair_n_ranges_dict = {}
+    self.n_queries = 0
+    self.n_ranges_fetched = 0
+    self.n_days_fetched = 0
+    self.error_msgs = []
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.currency_pairs is None:
+      self.currency_pairs = [(pkg.DEFAULT_CURR_NUM, pkg.DEFAULT_CURR_DEN)]
+    self.currency_pairs = [tuple(pair) for pair in self.currency_pairs]
+    if self.business_calendar is None:
+      self.business_calendar = bizcal.get_business_calendar()
+    if self.range_fetcher is None:
+      self.range_fetcher = fetch_n_dbsave_range_via_period_api
+    if self.state_filepath is None:
+      self.state_filepath = get_default_sync_state_filepath()
+    self.load_state()
+
+  @staticmethod
+  def make_pairkey(currency_pair) -> str:
+    return f"{currency_pair[0]}_{currency_pair[1]}"
+
+  def load_state(self):
+    if not os.path.isfile(self.state_filepath):
+      self.state = {}
+      return
+    try:
+      with open(self.state_filepath, 'r', encoding='utf-8') as fd:
+        self.state = json.load(fd)
+    except (OSError, json.JSONDecodeError) as e:
+      logger.info(f'Sync state file [{self.state_filepath}] could not be read: {e}')
+      self.state = {}
+
+  def save_state(self):
+    tmp_filepath = self.state_filepath + '.tmp'
+    with open(tmp_filepath, 'w', encoding='utf-8') as fd:
+      json.dump(self.state, fd, indent=1)
+    os.replace(tmp_filepath, self.state_filepath)
+
+  def get_highwater_date(self, currency_pair) -> datetime.date | None:
+    pairstate = self.state.get(self.make_pairkey(currency_pair), {})
+    return cnv.make_date_or_none(pairstate.get('highwater_date'))
+
+  def set_highwater_date(self, currency_pair, highwater_date: datetime.date | None):
+    pairkey = self.make_pairkey(currency_pair)
+    pairstate = self.state.get(pairkey, {})
+    if highwater_date is not None:
+      pairstate['highwater_date'] = str(highwater_date)
+    pairstate['synced_at'] = str(datetime.datetime.now())
+    self.state[pairkey] = pairstate
+
+  def get_scan_highwater_date(self, currency_pair) -> datetime.date | None:
+    """
+    The date after which the pair is scanned for gaps (None, ie from the start, in a full sync)
+      a since on or before the high-water date moves it back to the day before since
+    """
+    highwater = None if self.full else self.get_highwater_date(currency_pair)
+    if highwater is not None and self.since is not None and self.since <= highwater:
+      highwater = self.since - datetime.timedelta(days=1)
+    return highwater
+
+  def read_refdate_ordinals_per_pair(self) -> dict[tuple[str, str], np.ndarray]:
+    """
+    The one SQL pass: reads the refdates (quotes & holliday rows) of all pairs after the lowest high-water date
+    """
+    highwaters = [self.get_scan_highwater_date(pair) for pair in self.currency_pairs]
+    lowest_highwater = None if None in highwaters else min(highwaters)
+    close_conn = self.conn is None
+    conn = sett.get_sqlite_connection() if self.conn is None else self.conn
+    sql = f"""
+    SELECT curr_num, curr_den, refdate FROM {self.tablename}
+      WHERE refdate > ?
+      ORDER BY curr_num, curr_den, refdate;
+    """
+    try:
+      rows = conn.execute(sql, ('' if lowest_highwater is None else str(lowest_highwater),)).fetchall()
+    finally:
+      if close_conn:
+        conn.close()
+    self.n_queries += 1
+    pair_n_ordinals = {pair: [] for pair in self.currency_pairs}
+    for curr_num, curr_den, strdate in rows:
+      ordinals = pair_n_ordinals.get((curr_num, curr_den))
+      pdate = cnv.make_date_or_none(strdate)
+      if ordinals is None or pdate is None:
+        continue
+      ordinals.append(pdate.toordinal())
+    return {pair: np.unique(np.asarray(ordinals, dtype=np.int64)) for pair, ordinals in pair_n_ordinals.items()}
+
+  def find_gap_ordinals(self, currency_pair, stored_ordinals: np.ndarray) -> np.ndarray:
+    """
+    Returns the business days, from the sync start to yesterday, that have no row for the pair
+    """
+    highwater = self.get_scan_highwater_date(currency_pair)
+    if highwater is not None:
+      date_ini = highwater + datetime.timedelta(days=1)
+    elif self.since is not None:
+      date_ini = self.since
+    elif stored_ordinals.size > 0:
+      date_ini = datetime.date.fromordinal(int(stored_ordinals[0]))
+    else:
+      date_ini = self.yesterday - datetime.timedelta(days=DEFAULT_DAYS_BACK_FOR_A_NEW_PAIR)
+    bday_ordinals = self.business_calendar.business_day_ordinals_between(date_ini, self.yesterday)
+    return np.setdiff1d(bday_ordinals, stored_ordinals, assume_unique=True)
+
+  def sync_pair(self, currency_pair, stored_ordinals: np.ndarray):
+    gap_ordinals = self.find_gap_ordinals(currency_pair, stored_ordinals)
+    ranges = batch_ordinals_into_ranges(gap_ordinals)
+    self.pair_n_gaps_dict[currency_pair] = gap_ordinals.size
+    self.pair_n_ranges_dict[currency_pair] = ranges
+    unresolved_ordinals = set(int(o) for o in gap_ordinals)
+    for date_ini, date_fim in ranges:
+      results = self.range_fetcher(date_ini, date_fim, currency_pair) or []
+      self.n_ranges_fetched += 1
+      for nt in results:
+        pdate = cnv.make_date_or_none(nt.param_date)
+        if pdate is None or nt.error_msg is not None:
+          continue
+        self.n_days_fetched += 1
+        unresolved_ordinals.discard(pdate.toordinal())
+        if nt.cotacao_compra is None:
+          self.business_calendar.learn_noquote_date(pdate)
+    if unresolved_ordinals:
+      # the high-water date stops right before the first gap still open
+      first_unresolved = datetime.date.fromordinal(min(unresolved_ordinals))
+      highwater = first_unresolved - datetime.timedelta(days=1)
+      self.error_msgs.append(f"{currency_pair}: {len(unresolved_ordinals)} gap days still open from {first_unresolved}")
+    else:
+      highwater = self.yesterday
+    previous_highwater = self.get_highwater_date(currency_pair)
+    if previous_highwater is not None and highwater < previous_highwater:
+      highwater = previous_highwater
+    self.set_highwater_date(currency_pair, highwater)
+
+  def process(self):
+    pair_n_ordinals = self.read_refdate_ordinals_per_pair()
+    for currency_pair in self.currency_pairs:
+      self.sync_pair(currency_pair, pair_n_ordinals[currency_pair])
+    self.save_state()
+    self.business_calendar.save()
+    return self.n_days_fetched
+
+  def __str__(self):
+    pairlines = '\n'.join(
+      f"    {pair[0]}/{pair[1]}: gap days = {self.pair_n_gaps_dict.get(pair, 0)}"
+      f" | ranges = {self.pair_n_ranges_dict.get(pair, [])}"
+      f" | high-water = {self.state.get(self.make_pairkey(pair), {}).get('highwater_date')}"
+      for pair in self.currency_pairs
+    )
+    outstr = f"""{self.__class__.__name__} (full={self.full})
+{pairlines}
+    queries = {self.n_queries} | ranges fetched = {self.n_ranges_fetched} | days fetched = {self.n_days_fetched}
+    errors = {self.error_msgs}
+    """
+    return outstr
+
+
+def fetch_n_dbsave_range_via_period_api(date_fr, date_to, currency_pair):
+  # imported here: the fetch module sets up its (file) logging at import time
+  import lib.indices.bcb_br.bcb_api_db_or_txt_fetch_cls as fetchcls
+  return fetchcls.fetch_cotacoes_via_the_api_for_daterange_n_dbsaveit(date_fr, date_to, currency_pair)
+
+
+def adhoctest():
+  pass
+
+
+def process():
+  syncer = ExchRateGapSyncer()
+  syncer.process()
+  print(syncer)
+
+
+if __name__ == "__main__":
+  """
+  adhoctest()
+  """
+  process()
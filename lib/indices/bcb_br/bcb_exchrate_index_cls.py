@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/bcb_exchrate_index_cls.py
+
+  Contains class ExchRateIndex which keeps, in memory and per currency pair, the quotes
+    of table currencies_exchangerates as parallel sorted arrays:
+      => refdate ordinals (date.toordinal())
+      => buy prices as int (the db's buypriceint, ie price * 10**4)
+      => sell prices as int (the db's sellpriceint)
+      => quote times (the db's quotestime, a list parallel to the arrays above)
+
+  Queries are bisect-based (O(log n)):
+    => find_exact(pdate): the quote on pdate or None
+    => find_asof(pdate): the latest quote on or before pdate or None
+    => find_range(date_fr, date_to): the quotes in [date_fr, date_to]
+
+  Rows with null prices (hollidays) are not indexed (@see bcb_business_calendar_cls.py for them).
+
+  The index is loaded once (load_from_db()) and then kept current either
+    a) by refresh_from_db() which reads only the rows with a refdate or an updated_at
+       above the index's high-water marks or
+    b) by upsert_quote() for a quote just written into the db
+
+  Example:
+    idx = get_exchrate_index(('BRL', 'USD'))
+    quote = idx.find_asof('2024-02-13')  # an ExchRateQuote on 2024-02-09 (Carnival falls on 12 & 13)
+"""
+import array
+import bisect
+import collections as coll
+import datetime
+import threading
+import settings as sett
+import art.inflmeas.bcb_br.classes as pkg  # pkg.EXCHRATE_DBTABLENAME, pkg.n_decplaces_for_div_intprices
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+import lib.indices.bcb_br.bcbparams as bcbparams
+namedtuple_bcb_api1 = bcbparams.namedtuple_bcb_api1
+ExchRateQuote = coll.namedtuple('ExchRateQuote', 'refdate buypriceint sellpriceint quotestime')
+INTPRICE_MULTIPLIER = 10 ** pkg.n_decplaces_for_div_intprices
+_indices_per_currpair = {}
+_lock = threading.Lock()
+
+
+def convert_intprice_or_none(priceint) -> int | None:
+  """
+  A db price (buypriceint or sellpriceint, ie already price * 10**4) as an int: it's not scaled again
+    (whatever its type, eg a numpy int64 or a 49985.0 read back as a float)
+  """
+  if priceint is None:
+    return None
+  try:
+    return int(priceint)
+  except (TypeError, ValueError):
+    return None
+
+
+def convert_floatprice_to_int_or_none(price) -> int | None:
+  """
+  An API or text file price (in currency units, eg 4.9985 or even a whole 5) scaled to the db's int
+  """
+  if price is None:
+    return None
+  try:
+    return round(float(price) * INTPRICE_MULTIPLIER)
+  except (TypeError, ValueError):
+    return None
+
+
+def convert_price_to_int_or_none(price, from_db_int: bool = False) -> int | None:
+  """
+  The caller says which scale the price is in: from_db_int (already scaled) or else an API float
+  """
+  if from_db_int:
+    return convert_intprice_or_none(price)
+  return convert_floatprice_to_int_or_none(price)
+
+
+class ExchRateIndex:
+
+  tablename = pkg.EXCHRATE_DBTABLENAME
+
+  def __init__(self, curr_num: str | None = None, curr_den: str | None = None):
+    self.curr_num = curr_num or pkg.DEFAULT_CURR_NUM
+    self.curr_den = curr_den or pkg.DEFAULT_CURR_DEN
+    self.ordinals = array.array('i')
+    self.buyints = array.array('q')
+    self.sellints = array.array('q')
+    self.quotestimes = []
+    self.highwater_refdate = None
+    self.highwater_updated_at = None
+    self.n_loads = 0
+    self.n_refreshes = 0
+    self.n_changes = 0  # bumped by every change to the arrays, so that derived data knows when it's stale
+
+  @property
+  def currency_pair(self) -> tuple[str, str]:
+    return self.curr_num, self.curr_den
+
+  @property
+  def size(self) -> int:
+    return len(self.ordinals)
+
+  @property
+  def first_date(self) -> datetime.date | None:
+    return datetime.date.fromordinal(self.ordinals[0]) if self.size > 0 else None
+
+  @property
+  def last_date(self) -> datetime.date | None:
+    return datetime.date.fromordinal(self.ordinals[-1]) if self.size > 0 else None
+
+  def make_quote_at(self, i: int) -> ExchRateQuote:
+    return ExchRateQuote(
+      refdate=datetime.date.fromordinal(self.ordinals[i]),
+      buypriceint=self.buyints[i], sellpriceint=self.sellints[i], quotestime=self.quotestimes[i],
+    )
+
+  def make_namedtuple_bcb_api1_at(self, i: int) -> namedtuple_bcb_api1:
+    """
+    The same namedtuple the db-fetch function returns (prices as ints), so callers may use either
+    """
+    quote = self.make_quote_at(i)
+    return namedtuple_bcb_api1(
+      curr_num=self.curr_num, curr_den=self.curr_den,
+      cotacao_compra=quote.buypriceint, cotacao_venda=quote.sellpriceint,
+      cotacao_datahora=quote.quotestime, param_date=quote.refdate,
+      error_msg=None, gen_msg='Fetched from index', exchanger=None
+    )
+
+  def clear(self):
+    self.ordinals = array.array('i')
+    self.buyints = array.array('q')
+    self.sellints = array.array('q')
+    self.quotestimes = []
+    self.highwater_refdate = None
+    self.highwater_updated_at = None
+    self.n_changes += 1
+
+  def upsert_quote(self, pdate, buyprice, sellprice, quotestime=None, from_db_int: bool = False) -> bool:
+    """
+    Inserts (keeping the arrays sorted) or replaces the quote on pdate
+      buyprice & sellprice are API prices (in currency units) unless from_db_int (the db's ints, already scaled)
+      Returns False (nothing done) if pdate is invalid or the prices are null (a holliday)
+    """
+    pdate = cnv.make_date_or_none(pdate)
+    buyint = convert_price_to_int_or_none(buyprice, from_db_int)
+    sellint = convert_price_to_int_or_none(sellprice, from_db_int)
+    if pdate is None or buyint is None or sellint is None:
+      return False
+    ordinal = pdate.toordinal()
+    i = bisect.bisect_left(self.ordinals, ordinal)
+    self.n_changes += 1
+    if i < self.size and self.ordinals[i] == ordinal:
+      self.buyints[i], self.sellints[i], self.quotestimes[i] = buyint, sellint, quotestime
+      return True
+    if i == self.size:
+      # the common case: quotes come in date order
+      self.ordinals.append(ordinal)
+      self.buyints.append(buyint)
+      self.sellints.append(sellint)
+      self.quotestimes.append(quotestime)
+    else:
+      self.ordinals.insert(i, ordinal)
+      self.buyints.insert(i, buyint)
+      self.sellints.insert(i, sellint)
+      self.quotestimes.insert(i, quotestime)
+    return True
+
+  def remove_quote(self, pdate) -> bool:
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None:
+      return False
+    ordinal = pdate.toordinal()
+    i = bisect.bisect_left(self.ordinals, ordinal)
+    if i == self.size or self.ordinals[i] != ordinal:
+      return False
+    del self.ordinals[i], self.buyints[i], self.sellints[i], self.quotestimes[i]
+    self.n_changes += 1
+    return True
+
+  def upsert_namedtuple_bcb_api1(self, namedtuple_cotacao, from_db_int: bool = False) -> bool:
+    """
+    from_db_int says the namedtuple's prices are the db's ints (eg one made from a db row), else API floats
+    """
+    if namedtuple_cotacao is None or namedtuple_cotacao.error_msg is not None:
+      return False
+    return self.upsert_quote(
+      namedtuple_cotacao.param_date, namedtuple_cotacao.cotacao_compra,
+      namedtuple_cotacao.cotacao_venda, namedtuple_cotacao.cotacao_datahora, from_db_int=from_db_int
+    )
+
+  def _read_rows(self, conn, incremental: bool):
+    sql = f"""
+    SELECT refdate, buypriceint, sellpriceint, quotestime, updated_at FROM {self.tablename}
+      WHERE
+        curr_num = ? and curr_den = ?"""
+    tuplevalues = (self.curr_num, self.curr_den)
+    if incremental:
+      sql += """ and
+        (refdate > ? or COALESCE(updated_at, '') > ?)"""
+      highwater_refdate = '' if self.highwater_refdate is None else str(self.highwater_refdate)
+      highwater_updated_at = '' if self.highwater_updated_at is None else str(self.highwater_updated_at)
+      tuplevalues += (highwater_refdate, highwater_updated_at)
+    sql += """
+      ORDER BY
+        refdate;
+    """
+    return conn.execute(sql, tuplevalues).fetchall()
+
+  def _apply_rows(self, rows) -> int:
+    n_applied = 0
+    for strdate, buyint, sellint, quotestime, updated_at in rows:
+      pdate = cnv.make_date_or_none(strdate)
+      if pdate is None:
+        continue
+      if buyint is None or sellint is None:
+        # a row updated to null prices leaves the index
+        self.remove_quote(pdate)
+      elif self.upsert_quote(pdate, buyint, sellint, quotestime, from_db_int=True):
+        n_applied += 1
+      if self.highwater_refdate is None or pdate > self.highwater_refdate:
+        self.highwater_refdate = pdate
+      if updated_at is not None and (self.highwater_updated_at is None or str(updated_at) > self.highwater_updated_at):
+        self.highwater_updated_at = str(updated_at)
+    return n_applied
+
+  def load_from_db(self, conn=None) -> int:
+    """
+    (Re)loads the whole currency pair from the db, returning the number of quotes indexed
+    """
+    close_conn = conn is None
+    if conn is None:
+      conn = sett.get_sqlite_connection()
+    try:
+      rows = self._read_rows(conn, incremental=False)
+    finally:
+      if close_conn:
+        conn.close()
+    self.clear()
+    self.n_loads += 1
+    return self._apply_rows(rows)
+
+  def refresh_from_db(self, conn=None) -> int:
+    """
+    Reads only the rows beyond the high-water marks, returning the number of quotes upserted
+    """
+    if self.n_loads == 0:
+      return self.load_from_db(conn)
+    close_conn = conn is None
+    if conn is None:
+      conn = sett.get_sqlite_connection()
+    try:
+      rows = self._read_rows(conn, incremental=True)
+    finally:
+      if close_conn:
+        conn.close()
+    self.n_refreshes += 1
+    return self._apply_rows(rows)
+
+  def find_exact(self, pdate) -> ExchRateQuote | None:
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None:
+      return None
+    ordinal = pdate.toordinal()
+    i = bisect.bisect_left(self.ordinals, ordinal)
+    if i < self.size and self.ordinals[i] == ordinal:
+      return self.make_quote_at(i)
+    return None
+
+  def find_asof_index(self, pdate) -> int | None:
+    pdate = cnv.make_date_or_none(pdate)
+    if pdate is None:
+      return None
+    i = bisect.bisect_right(self.ordinals, pdate.toordinal()) - 1
+    return i if i >= 0 else None
+
+  def find_asof(self, pdate) -> ExchRateQuote | None:
+    """
+    Returns the latest quote on or before pdate
+    """
+    i = self.find_asof_index(pdate)
+    return None if i is None else self.make_quote_at(i)
+
+  def find_range_slice(self, date_fr, date_to) -> slice:
+    """
+    Returns the slice (over the parallel arrays) of the quotes in [date_fr, date_to]
+    """
+    date_fr, date_to = cnv.make_date_or_none(date_fr), cnv.make_date_or_none(date_to)
+    if date_fr is None or date_to is None:
+      return slice(0, 0)
+    date_fr, date_to = cnv.swap_dates_if_first_is_greater_than_second(date_fr, date_to)
+    i_ini = bisect.bisect_left(self.ordinals, date_fr.toordinal())
+    i_fim = bisect.bisect_right(self.ordinals, date_to.toordinal())
+    return slice(i_ini, i_fim)
+
+  def find_range(self, date_fr, date_to) -> list[ExchRateQuote]:
+    sl = self.find_range_slice(date_fr, date_to)
+    return [self.make_quote_at(i) for i in range(sl.start, sl.stop)]
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    currency pair = {self.curr_num}/{self.curr_den} | quotes = {self.size}
+    date range = {self.first_date} to {self.last_date}
+    high-water refdate = {self.highwater_refdate} | high-water updated_at = {self.highwater_updated_at}
+    loads = {self.n_loads} | refreshes = {self.n_refreshes}
+    """
+    return outstr
+
+
+def get_exchrate_index(currency_pair: tuple[str, str] | None = None, refresh: bool = False) -> ExchRateIndex:
+  """
+  Returns the process-wide index for currency_pair (loading it from the db on first use)
+    refresh=True reads the db rows written since the last load/refresh
+  """
+  curr_num, curr_den = (None, None) if currency_pair is None else currency_pair
+  curr_num, curr_den = curr_num or pkg.DEFAULT_CURR_NUM, curr_den or pkg.DEFAULT_CURR_DEN
+  with _lock:
+    index = _indices_per_currpair.get((curr_num, curr_den))
+    if index is None:
+      index = ExchRateIndex(curr_num, curr_den)
+      index.load_from_db()
+      _indices_per_currpair[(curr_num, curr_den)] = index
+    elif refresh:
+      index.refresh_from_db()
+  return index
+
+
+def adhoctest():
+  index = get_exchrate_index()
+  print(index)
+  for pdate in ['2024-02-09', '2024-02-13', '2024-02-14']:
+    scrmsg = f"{pdate} exact={index.find_exact(pdate)} asof={index.find_asof(pdate)}"
+    print(scrmsg)
+
+
+def process():
+  pass
+
+
+if __name__ == "__main__":
+  """
+  process()
+  """
+  adhoctest()
@@ -59,13 +59,12 @@ import datetime
 import json
 import os
 from prettytable import PrettyTable
-import requests
 import settings as sett
-import time
 import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
 import lib.datefs.introspect_dates as intr
 from art.inflmeas.bcb_br.fetch.prettyprint.fetch_exchrate_fr_dates_in_textfile import REGISTERED_CURRENCIES_3LETTER
 import lib.indices.bcb_br.bcbparams as bcbparams
+import lib.netfs.retry_scheduler as retsch
 # import fs.datefs.convert_to_datetime_wo_intr_sep_posorder as cvdt
 url_base = bcbparams.url_base
 url_query_interpol = bcbparams.url_query_interpol
@@ -84,6 +83,7 @@ class BcbCotacaoDiaApiCaller:
       pdate: datetime.date | None = None,
       curr_num: str | None = None,
       curr_den: str | None = None,
+      retry_scheduler: retsch.RetryScheduler | None = None,
     ):
     self.daysdate = pdate
     # if a fetch is successful, datahoracotacao will get the 'datahoracotacao' in json
@@ -98,9 +98,12 @@ class BcbCotacaoDiaApiCaller:
     self.n_of_connection_errors_raised = 0
     self.n_method_calls = 0
     self.n_api_being_called = 0
+    self.retry_scheduler = retry_scheduler
     self.treat_attrs()
 
   def treat_attrs(self):
+    if self.retry_scheduler is None:
+      self.retry_scheduler = retsch.make_scheduler_for_url(url_base, max_tries=self.MAX_BCB_COTACAODIA_API_CONN_TRIES)
     self.daysdate = cnv.make_date_or_none(self.daysdate)
     if self.curr_num is None or self.curr_num not in REGISTERED_CURRENCIES_3LETTER:
       self.curr_num = sett.CURR_BRL
@@ -111,26 +114,13 @@ class BcbCotacaoDiaApiCaller:
   def nt_bcb_api_result(self) -> namedtuple_bcb_api1:
     _res_bcb_api = namedtuple_bcb_api1(
       curr_num=self.curr_num, curr_den=self.curr_den,
-      cotacao_compra=self.buyprice, cotacao_venda=self.buyprice, cotacao_datahora=self.datahoracotacao,
+      cotacao_compra=self.buyprice, cotacao_venda=self.sellprice, cotacao_datahora=self.datahoracotacao,
       param_date=self.daysdate,
       error_msg=self.error_msg, gen_msg=self.gen_msg,
       exchanger=self.exchanger
     )
     return _res_bcb_api
 
-  def if_conn_max_tries_is_reached_fillin_attrs_n_return_true(self, givendate) -> bool:
-    """
-    """
-    if self.n_of_connection_errors_raised > self.MAX_BCB_COTACAODIA_API_CONN_TRIES:
-      self.error_msg = (
-          'Finishing connection attempts: connection_error_raised > 10 (n_conn_errs=%d)'
-          % self.n_of_connection_errors_raised
-      )
-      # raise requests.exceptions.ConnectionError(self.error_msg)
-      self.error_msg = 'Given date [%s] is None' % str(givendate)
-      return True
-    return False
-
   @property
   def days_mmddyyyy_date(self) -> str:
     """
@@ -178,6 +168,12 @@ class BcbCotacaoDiaApiCaller:
       i.e., the empty list, if, on the other hand, there is data,
       we're interested in the element-0 which is a dict (in Python terms).
 
+  * Connection retries:
+    connection errors (and 429/5xx statuses) are retried in a loop by self.retry_scheduler
+      (@see lib/netfs/retry_scheduler.py) with capped exponential backoff & jitter,
+      and its per-endpoint circuit breaker makes the calls fail fast if the API is down.
+    (The method keeps its 'recurs_' name for its callers, though it does not recurse anymore.)
+
   * Time backward recursion:
     On weekdays or holidays, there is no exchange info.
       Because of that, the functions looks up
@@ -194,9 +190,6 @@ class BcbCotacaoDiaApiCaller:
 
     """
     self.n_method_calls += 1
-    # this is the max-limit of tries condition to end of the recursion
-    if self.if_conn_max_tries_is_reached_fillin_attrs_n_return_true:
-      return self.nt_bcb_api_result
     scrmsg = "-"*40
     print(scrmsg)
     url = url_base + url_query_interpol % {'mmddyyyy': self.days_mmddyyyy_date}
@@ -206,21 +199,13 @@ class BcbCotacaoDiaApiCaller:
     scrmsg = "-"*40
     print(scrmsg)
     try:
-      res = requests.get(url)
-    except requests.exceptions.ConnectionError:
+      # connection errors are retried (iteratively) by the scheduler with backoff & jitter
+      res = retsch.request_with_retry('GET', url, scheduler=self.retry_scheduler)
+    except retsch.RETRYABLE_EXCEPTIONS as e:
       self.n_of_connection_errors_raised += 1
-      wait_in_sec = 3 + self.n_of_connection_errors_raised
-      scrmsg = "-+-" * 10
-      print(scrmsg)
-      recurse_msg = f'api_n={self.n_api_being_called}/meth_n={self.n_method_calls} | '
-      recurse_msg += '[ConnectionError raised on recurse] acc times=%d :: wait %d seconds' \
-                     % (self.n_of_connection_errors_raised + 1, wait_in_sec)
-      print(recurse_msg)
-      scrmsg = "-+-" * 10
-      print(scrmsg)
-      time.sleep(wait_in_sec)
-      # recurse on for a new try
-      return self.recurs_call_api_bcb_cotacao_dolar_on_daysdate()
+      self.error_msg = f'Finishing connection attempts on date {self.daysdate}: {e}'
+      print(self.error_msg)
+      return self.nt_bcb_api_result
     # check if status code received is not "200 OK"
     if res.status_code != 200:
       scrmsg = "-+-" * 10
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bcb_br/bcb_remote_api_period_cls.py
+
+  Contains class BcbCotacaoPeriodoApiCaller which fetches a whole date window
+    of PTAX quotes with one API call (instead of one call per day as
+    BcbCotacaoDiaApiCaller.recurs_call_api_bcb_cotacao_dolar_on_daysdate() does)
+
+The endpoints used are:
+
+  => for USD (the BRL/USD pair):
+  https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/odata/CotacaoDolarPeriodo
+    (dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)
+    ?@dataInicial='07-01-2020'&@dataFinalCotacao='07-31-2020'&$top=10000&$format=json
+
+  => for the other currencies (e.g. the BRL/EUR pair):
+  https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/odata/CotacaoMoedaPeriodoFechamento
+    (codigoMoeda=@codigoMoeda,dataInicialCotacao=@dataInicialCotacao,dataFinalCotacao=@dataFinalCotacao)
+    ?@codigoMoeda='EUR'&@dataInicialCotacao='07-01-2020'&@dataFinalCotacao='07-31-2020'&$top=10000&$format=json
+
+Both return a 'value' list with one dict per quoted day, e.g.:
+  {'cotacaoCompra': 5.1641, 'cotacaoVenda': 5.1647, 'dataHoraCotacao': '2020-07-23 13:02:43.561'}
+  The second one also brings the USD parity ('paridadeCompra' & 'paridadeVenda'), which is kept
+  in parity_results (eg as pair USD/EUR for the type-B euro, @see bcbparams.CURRENCY_PARITY_TYPES)
+  so that the cross-rate engine (@see bcb_crossrate_engine_cls.py) can derive the other pairs from it.
+
+The window's 'value' list is split into per-day namedtuple_bcb_api1 results, i.e., the same
+  namedtuple that the day-caller returns, so that the DB/prettyprint caching path can be reused.
+  Weekdays (in the past) that do not come in the response are holidays: they are also
+  returned with None prices, the same way the day-caller returns them.
+"""
+import datetime
+import json
+from dateutil.relativedelta import relativedelta
+import settings as sett
+import lib.datefs.convert_to_date_wo_intr_sep_posorder as cnv
+import lib.datefs.convert_to_datetime_wo_intr_sep_posorder as cvdt
+import lib.datefs.introspect_dates as intr
+import lib.indices.bcb_br.bcbparams as bcbparams
+import lib.netfs.retry_scheduler as retsch
+namedtuple_bcb_api1 = bcbparams.namedtuple_bcb_api1
+REGISTERED_CURRENCIES_3LETTER = bcbparams.REGISTERED_CURRENCIES_3LETTER
+MAX_BCB_COTACAODIA_API_CONN_TRIES = bcbparams.MAX_BCB_COTACAODIA_API_CONN_TRIES
+MAX_BCB_PERIOD_API_DAYS_PER_CALL = bcbparams.MAX_BCB_PERIOD_API_DAYS_PER_CALL
+MAX_BCB_PERIOD_API_TOP = bcbparams.MAX_BCB_PERIOD_API_TOP
+
+
+def gen_date_windows_bw_ini_fim(date_fr, date_to, max_days_per_window=None):
+  """
+  Generates (window_ini, window_fim) date tuples that cover [date_fr, date_to]
+    each window having at most max_days_per_window days
+  """
+  if max_days_per_window is None or max_days_per_window < 1:
+    max_days_per_window = MAX_BCB_PERIOD_API_DAYS_PER_CALL
+  window_ini = date_fr
+  while window_ini <= date_to:
+    window_fim = window_ini + relativedelta(days=max_days_per_window - 1)
+    window_fim = date_to if window_fim > date_to else window_fim
+    yield window_ini, window_fim
+    window_ini = window_fim + relativedelta(days=1)
+
+
+class BcbCotacaoPeriodoApiCaller:
+
+  MAX_BCB_COTACAODIA_API_CONN_TRIES = MAX_BCB_COTACAODIA_API_CONN_TRIES
+
+  def __init__(
+      self,
+      date_fr: datetime.date | str,
+      date_to: datetime.date | str | None = None,
+      curr_num: str | None = None,
+      curr_den: str | None = None,
+      max_days_per_window: int | None = None,
+      retry_scheduler: retsch.RetryScheduler | None = None,
+    ):
+    self.date_fr, self.date_to = date_fr, date_to
+    self.curr_num = curr_num
+    self.curr_den = curr_den
+    self.max_days_per_window = max_days_per_window
+    self.today = datetime.date.today()
+    self.date_n_result_dict = {}
+    self.date_n_parity_dict = {}
+    self.error_msgs = []
+    self.n_of_connection_errors_raised = 0
+    self.n_api_being_called = 0
+    self.n_windows = 0
+    self.retry_scheduler = retry_scheduler
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    self.treat_dates()
+    self.treat_currencies()
+    if self.max_days_per_window is None or self.max_days_per_window < 1:
+      self.max_days_per_window = MAX_BCB_PERIOD_API_DAYS_PER_CALL
+    if self.retry_scheduler is None:
+      self.retry_scheduler = retsch.make_scheduler_for_url(
+        bcbparams.url_base_period_usd, max_tries=self.MAX_BCB_COTACAODIA_API_CONN_TRIES
+      )
+
+  def treat_dates(self):
+    self.date_fr = cnv.make_date_or_none(self.date_fr)
+    if self.date_fr is None:
+      errmsg = f"Data Error: date_fr [{self.date_fr}] is not a valid date for the period API call. Halting."
+      raise ValueError(errmsg)
+    self.date_to = cnv.make_date_or_today_forbid_future(self.date_to)
+    self.date_fr, self.date_to = cnv.swap_dates_if_first_is_greater_than_second(self.date_fr, self.date_to)
+
+  def treat_currencies(self):
+    if self.curr_num is None or self.curr_num not in REGISTERED_CURRENCIES_3LETTER:
+      self.curr_num = sett.CURR_BRL
+    if self.curr_den is None or self.curr_den not in REGISTERED_CURRENCIES_3LETTER:
+      self.curr_den = sett.CURR_USD
+    if self.curr_num == self.curr_den:
+      errmsg = f"Data Error: currency pair {self.curr_num}/{self.curr_den} has the same currency twice. Halting."
+      raise ValueError(errmsg)
+
+  @property
+  def foreign_currency(self) -> str:
+    """
+    The API quotes BRL (the 'moeda corrente') per unit of a foreign currency
+    """
+    return self.curr_den if self.curr_num == sett.CURR_BRL else self.curr_num
+
+  @property
+  def results(self) -> list[namedtuple_bcb_api1]:
+    return [self.date_n_result_dict[pdate] for pdate in sorted(self.date_n_result_dict)]
+
+  @property
+  def parity_results(self) -> list[namedtuple_bcb_api1]:
+    return [self.date_n_parity_dict[pdate] for pdate in sorted(self.date_n_parity_dict)]
+
+  @property
+  def n_quotes(self) -> int:
+    return len(list(filter(lambda nt: nt.cotacao_compra is not None, self.date_n_result_dict.values())))
+
+  @staticmethod
+  def make_mmddyyyy_str(pdate) -> str:
+    return intr.trans_strdate_from_one_format_to_another_w_sep_n_posorder(
+      pdate, fromsep=None, tosep='/', sourceposorder=None, targetposorder='mdy')
+
+  def make_url_for_window(self, window_ini, window_fim) -> str:
+    interpoldict = {
+      'mmddyyyy_ini': self.make_mmddyyyy_str(window_ini),
+      'mmddyyyy_fim': self.make_mmddyyyy_str(window_fim),
+      'top': MAX_BCB_PERIOD_API_TOP,
+    }
+    if self.foreign_currency == sett.CURR_USD:
+      return bcbparams.url_base_period_usd + bcbparams.url_query_period_usd_interpol % interpoldict
+    interpoldict['codigomoeda'] = self.foreign_currency
+    return bcbparams.url_base_period_moeda + bcbparams.url_query_period_moeda_interpol % interpoldict
+
+  def call_api_for_window(self, window_ini, window_fim) -> list[dict] | None:
+    """
+    Issues the API call for a window, returning its 'value' list (or None if the call failed)
+      Connection errors are retried by self.retry_scheduler (@see lib/netfs/retry_scheduler.py)
+    """
+    url = self.make_url_for_window(window_ini, window_fim)
+    self.n_api_being_called += 1
+    scrmsg = f"{self.n_api_being_called} => Issuing: [{url}]"
+    print(scrmsg)
+    try:
+      res = retsch.request_with_retry('GET', url, scheduler=self.retry_scheduler)
+    except retsch.RETRYABLE_EXCEPTIONS as e:
+      self.n_of_connection_errors_raised += 1
+      error_msg = f"Window {window_ini} to {window_fim}: finishing connection attempts: {e}"
+      print(error_msg)
+      self.error_msgs.append(error_msg)
+      return None
+    if res.status_code != 200:
+      error_msg = (f'Error: HTTP Connection status received is not "200 OK": res.status_code {res.status_code}'
+                   f' from the server; window = {window_ini} to {window_fim}')
+      print(error_msg)
+      self.error_msgs.append(error_msg)
+      return None
+    try:
+      resdict = json.loads(res.text)
+      return resdict['value']
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+      error_msg = f"Error: malformed json payload for window {window_ini} to {window_fim}: {e}"
+      print(error_msg)
+      self.error_msgs.append(error_msg)
+    return None
+
+  def make_namedtuple_w_valuedict(self, valuedict: dict) -> namedtuple_bcb_api1 | None:
+    strdatetime = valuedict.get('dataHoraCotacao')
+    quote_dt = cvdt.make_datetime_w_formatfields_or_none(strdatetime)
+    quote_date = cvdt.convert_datetime_to_date_or_none(quote_dt)
+    if quote_date is None:
+      return None
+    return namedtuple_bcb_api1(
+      curr_num=self.curr_num, curr_den=self.curr_den,
+      cotacao_compra=valuedict.get('cotacaoCompra'), cotacao_venda=valuedict.get('cotacaoVenda'),
+      cotacao_datahora=strdatetime, param_date=quote_date,
+      error_msg=None, gen_msg='BCB API (period)', exchanger=None
+    )
+
+  def make_parity_namedtuple_or_none(self, valuedict: dict, quote_nt: namedtuple_bcb_api1):
+    """
+    Returns the foreign currency's USD parity on the quote's date (None if the payload has no parity)
+    """
+    parity_currency_pair = bcbparams.get_usd_parity_currency_pair(self.foreign_currency)
+    buyparity, sellparity = valuedict.get('paridadeCompra'), valuedict.get('paridadeVenda')
+    if parity_currency_pair is None or buyparity is None or sellparity is None:
+      return None
+    curr_num, curr_den = parity_currency_pair
+    return quote_nt._replace(
+      curr_num=curr_num, curr_den=curr_den, cotacao_compra=buyparity, cotacao_venda=sellparity,
+      gen_msg='BCB API (period parity)'
+    )
+
+  def make_noquote_namedtuple_w_date(self, pdate: datetime.date) -> namedtuple_bcb_api1:
+    return namedtuple_bcb_api1(
+      curr_num=self.curr_num, curr_den=self.curr_den,
+      cotacao_compra=None, cotacao_venda=None, cotacao_datahora=None, param_date=pdate,
+      error_msg=None, gen_msg=f'BCB API returned day {pdate} with no quotes', exchanger=None
+    )
+
+  def split_values_into_daily_results(self, values: list[dict], window_ini, window_fim):
+    """
+    Puts one result per day into self.date_n_result_dict
+      a) the quoted days come from the 'value' list (if a day repeats, the latest datetime is kept)
+      b) past weekdays missing in the 'value' list are holidays and get a no-quote result
+    """
+    window_dict = {}
+    for valuedict in values:
+      nt = self.make_namedtuple_w_valuedict(valuedict)
+      if nt is None or not (window_ini <= nt.param_date <= window_fim):
+        continue
+      previous_nt = window_dict.get(nt.param_date)
+      if previous_nt is not None and str(previous_nt.cotacao_datahora) > str(nt.cotacao_datahora):
+        continue
+      window_dict[nt.param_date] = nt
+      parity_nt = self.make_parity_namedtuple_or_none(valuedict, nt)
+      if parity_nt is not None:
+        self.date_n_parity_dict[nt.param_date] = parity_nt
+    pdate = window_ini
+    while pdate <= window_fim and pdate < self.today:
+      if pdate not in window_dict and not cnv.is_date_weekend(pdate):
+        window_dict[pdate] = self.make_noquote_namedtuple_w_date(pdate)
+      pdate = pdate + relativedelta(days=1)
+    self.date_n_result_dict.update(window_dict)
+
+  def process(self) -> list[namedtuple_bcb_api1]:
+    for window_ini, window_fim in gen_date_windows_bw_ini_fim(self.date_fr, self.date_to, self.max_days_per_window):
+      self.n_windows += 1
+      values = self.call_api_for_window(window_ini, window_fim)
+      if values is None:
+        # failed windows are not split (otherwise its weekdays would be taken as holidays)
+        continue
+      self.split_values_into_daily_results(values, window_ini, window_fim)
+    return self.results
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    currency pair = {self.curr_num}/{self.curr_den}
+    date range = {self.date_fr} to {self.date_to}
+    windows = {self.n_windows} | api calls = {self.n_api_being_called}
+    days returned = {len(self.date_n_result_dict)} | days with quotes = {self.n_quotes}
+    errors = {self.error_msgs}
+    """
+    return outstr
+
+
+def adhoctest():
+  date_fr, date_to = '2020-07-01', '2020-07-31'
+  caller = BcbCotacaoPeriodoApiCaller(date_fr=date_fr, date_to=date_to)
+  for nt in caller.process():
+    print(nt.param_date, nt.cotacao_compra, nt.cotacao_venda, nt.gen_msg)
+  print(caller)
+
+
+def process():
+  pass
+
+
+if __name__ == "__main__":
+  """
+  process()
+  """
+  adhoctest()
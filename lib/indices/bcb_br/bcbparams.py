@@ -11,6 +11,21 @@ url_base = 'https://olinda.bcb.gov.br/olinda/servico/PTAX/' \
 url_query_interpol = "?@dataCotacao='%(mmddyyyy)s'&$top=100&$format=json"
 MAX_BCB_COTACAODIA_API_MAX_PREVIOUSDAY_CALLS = 8
 MAX_BCB_COTACAODIA_API_CONN_TRIES = 10
+# the period endpoints: USD has its own (CotacaoDolarPeriodo), the others go via CotacaoMoedaPeriodoFechamento
+url_base_period_usd = 'https://olinda.bcb.gov.br/olinda/servico/PTAX/' \
+                      'versao/v1/odata/CotacaoDolarPeriodo(dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)'
+url_query_period_usd_interpol = (
+  "?@dataInicial='%(mmddyyyy_ini)s'&@dataFinalCotacao='%(mmddyyyy_fim)s'&$top=%(top)d&$format=json"
+)
+url_base_period_moeda = 'https://olinda.bcb.gov.br/olinda/servico/PTAX/' \
+                        'versao/v1/odata/CotacaoMoedaPeriodoFechamento(codigoMoeda=@codigoMoeda,' \
+                        'dataInicialCotacao=@dataInicialCotacao,dataFinalCotacao=@dataFinalCotacao)'
+url_query_period_moeda_interpol = (
+  "?@codigoMoeda='%(codigomoeda)s'&@dataInicialCotacao='%(mmddyyyy_ini)s'"
+  "&@dataFinalCotacao='%(mmddyyyy_fim)s'&$top=%(top)d&$format=json"
+)
+MAX_BCB_PERIOD_API_DAYS_PER_CALL = 366  # one year-window per request (about 250 quotes)
+MAX_BCB_PERIOD_API_TOP = 10000  # the OData $top, well above the number of quotes in a window
 namedtuple_bcb_api1 = coll.namedtuple(
   'BCBAPI1DataStr',
   'curr_num curr_den cotacao_compra cotacao_venda cotacao_datahora param_date error_msg gen_msg exchanger'
@@ -29,6 +44,30 @@ CURR_BRL = 'BRL'
 DEFAULT_CURRENCY_TO = CURR_BRL
 CURR_EUR = 'EUR'
 REGISTERED_CURRENCIES_3LETTER = [CURR_BRL, CURR_USD, CURR_EUR]
+# BCB's currency types (@see the docstring in bcb_remote_api_fin_cls.py) for the USD parities:
+#   type A: the parity is the quantity of the currency per 1 USD (it's stored as pair curr/USD, eg CAD/USD)
+#   type B: the parity is the quantity of USD per 1 unit of the currency (it's stored as pair USD/curr, eg USD/EUR)
+CURRENCY_TYPE_A, CURRENCY_TYPE_B = 'A', 'B'
+CURRENCY_PARITY_TYPES = {
+  CURR_EUR: CURRENCY_TYPE_B,
+  'GBP': CURRENCY_TYPE_B,
+  'AUD': CURRENCY_TYPE_B,
+  'CAD': CURRENCY_TYPE_A,
+  'CHF': CURRENCY_TYPE_A,
+  'JPY': CURRENCY_TYPE_A,
+}
+
+
+def get_usd_parity_currency_pair(curr3letter: str) -> tuple[str, str] | None:
+  """
+  Returns the (curr_num, curr_den) under which a currency's USD parity is stored or None if its type is unknown
+  """
+  currency_type = CURRENCY_PARITY_TYPES.get(curr3letter)
+  if currency_type == CURRENCY_TYPE_A:
+    return curr3letter, CURR_USD
+  if currency_type == CURRENCY_TYPE_B:
+    return CURR_USD, curr3letter
+  return None
 
 
 def adhoctest():
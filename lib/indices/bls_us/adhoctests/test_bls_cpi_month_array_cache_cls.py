@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bls_us/adhoctests/test_bls_cpi_month_array_cache_cls.py
+  unit-tests for CpiMonthArrayCache over an in-memory sqlite db (the recheck clock is faked)
+"""
+import datetime
+import sqlite3
+import unittest
+import numpy as np
+import lib.indices.bls_us.bls_cpi_month_array_cache_cls as cpicache
+import adhoctests.fake_clock_cls as fakeclk
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.conn = sqlite3.connect(':memory:')
+    self.conn.execute("""CREATE TABLE bls_us_indices (
+      seriesid varchar(12) NOT NULL, refmonthdate date NOT NULL, acc_index real NOT NULL,
+      created_at datetime, modified_at datetime, PRIMARY KEY (seriesid, refmonthdate))""")
+    rows = [('CUUR0000SA0', f'2024-{m:02d}-01', 300.0 + m, '2024-12-20 10:00:00') for m in range(1, 13)]
+    rows.remove(rows[5])  # no June
+    rows.append(('SUUR0000SA0', '2024-01-01', 170.5, '2024-12-20 10:00:00'))
+    self.conn.executemany(
+      "INSERT INTO bls_us_indices (seriesid, refmonthdate, acc_index, modified_at) VALUES (?, ?, ?, ?)", rows)
+    self.clock = fakeclk.FakeClock()
+    self.cache = cpicache.CpiMonthArrayCache(recheck_interval_in_sec=60, conn=self.conn, clock=self.clock)
+
+  def tearDown(self):
+    self.conn.close()
+
+  def test_1_month_ordinals(self):
+    ordinals = cpicache.to_month_ordinals(['2024-01-31', datetime.date(2024, 12, 1), None, '2024-02'])
+    self.assertEqual([2024 * 12, 2024 * 12 + 11, -1, 2024 * 12 + 1], ordinals.tolist())
+    self.assertEqual([5], cpicache.to_month_ordinals([5]).tolist())
+
+  def test_2_cpi_at_n_m_minus_2(self):
+    cpis = self.cache.cpi_at(['2024-01-15', '2024-06-01', '2024-12-31', '2025-01-01', '2023-12-01'])
+    np.testing.assert_array_equal([301.0, np.nan, 312.0, np.nan, np.nan], cpis)
+    cpis = self.cache.cpi_m_minus_n([datetime.date(2024, 3, 10), '2025-02-01', None], 2)
+    np.testing.assert_array_equal([301.0, 312.0, np.nan], cpis)
+    self.assertEqual(170.5, self.cache.cpi_at(['2024-01-01'], seriesid='SUUR0000SA0')[0])
+
+  def test_3_no_queries_after_warmup_n_reload_on_modified_at(self):
+    self.cache.cpi_at(['2024-01-01'])
+    n_queries = self.cache.n_queries
+    dates = np.array(['2024-03-01'] * 10000, dtype='datetime64[D]') + np.arange(10000) % 250
+    cpis = self.cache.cpi_m_minus_n(dates, 2)
+    self.assertEqual(10000, cpis.size)
+    self.assertEqual(n_queries, self.cache.n_queries)
+    # a new month is inserted: seen after the recheck interval
+    self.conn.execute(
+      "INSERT INTO bls_us_indices (seriesid, refmonthdate, acc_index, modified_at) "
+      "VALUES ('CUUR0000SA0', '2025-01-01', 313.0, '2025-02-12 10:00:00')")
+    self.assertTrue(np.isnan(self.cache.cpi_at(['2025-01-01'])[0]))
+    self.clock.now = 61.0
+    self.assertEqual(313.0, self.cache.cpi_at(['2025-01-01'])[0])
+    self.assertEqual(2, self.cache.n_loads)
+    # unchanged stamp: rechecked but not reloaded
+    self.clock.now = 122.0
+    self.cache.cpi_at(['2025-01-01'])
+    self.assertEqual(2, self.cache.n_loads)
+
+
+if __name__ == '__main__':
+  unittest.main()
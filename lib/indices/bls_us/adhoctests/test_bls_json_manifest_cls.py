@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bls_us/adhoctests/test_bls_json_manifest_cls.py
+  unit-tests for BlsJsonManifest over json response files written to a temp folder
+"""
+import json
+import os
+import tempfile
+import unittest
+import lib.indices.bls_us.bls_json_manifest_cls as manif
+
+
+def make_response(seriesid, year, n_months=12, status=manif.REQUEST_SUCCEEDED):
+  data = [{'year': str(year), 'period': f'M{m:02d}', 'value': '300.0', 'footnotes': [{}]} for m in range(n_months, 0, -1)]
+  return {'status': status, 'message': [], 'Results': {'series': [{'seriesID': seriesid, 'data': data}]}}
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.manifest = manif.BlsJsonManifest(self.tmpdir.name)
+
+  def tearDown(self):
+    self.manifest.close()
+    self.tmpdir.cleanup()
+
+  def test_1_save_response_records_the_entry(self):
+    entry = self.manifest.save_response('CUUR0000SA0', 2024, make_response('CUUR0000SA0', 2024))
+    self.assertEqual(os.path.join(self.tmpdir.name, '2024 CUUR0000SA0 prettyprint.json'), entry.filepath)
+    self.assertEqual(os.path.getsize(entry.filepath), entry.size)
+    self.assertEqual(12, entry.n_months)
+    self.assertEqual(40, len(entry.content_hash))
+    self.assertEqual(entry, self.manifest.get_entry('CUUR0000SA0', 2024))
+    self.assertTrue(self.manifest.has_request_succeeded('CUUR0000SA0', 2024))
+    self.assertFalse(self.manifest.has_request_succeeded('CUUR0000SA0', 2023))
+    self.assertFalse(os.path.exists(entry.filepath + '.tmp'))
+
+  def test_2_years_to_refetch(self):
+    self.manifest.save_response('CUUR0000SA0', 2022, make_response('CUUR0000SA0', 2022))
+    self.manifest.save_response('CUUR0000SA0', 2023, make_response('CUUR0000SA0', 2023, status='REQUEST_NOT_PROCESSED'))
+    self.manifest.save_response('CUUR0000SA0', 2024, make_response('CUUR0000SA0', 2024, n_months=5))
+    self.manifest.save_response('SUUR0000SA0', 2021, make_response('SUUR0000SA0', 2021))
+    self.assertEqual([2021, 2023, 2024], self.manifest.find_years_to_refetch('CUUR0000SA0', 2021, 2024))
+    statuses = self.manifest.get_statuses_per_year('CUUR0000SA0')
+    self.assertEqual({2022: 'REQUEST_SUCCEEDED', 2023: 'REQUEST_NOT_PROCESSED', 2024: 'REQUEST_SUCCEEDED'}, statuses)
+
+  def test_3_sync_with_folder_reads_only_new_or_changed_files(self):
+    for year in (2020, 2021):
+      with open(os.path.join(self.tmpdir.name, f'{year} CUUR0000SA0 prettyprint.json'), 'w') as fd:
+        json.dump(make_response('CUUR0000SA0', year), fd)
+    with open(os.path.join(self.tmpdir.name, 'notes.txt'), 'w') as fd:
+      fd.write('not a response file')
+    self.assertEqual(2, self.manifest.sync_with_folder())
+    self.assertEqual(0, self.manifest.sync_with_folder())
+    # a changed file is re-read, a removed one is dropped
+    with open(os.path.join(self.tmpdir.name, '2021 CUUR0000SA0 prettyprint.json'), 'w') as fd:
+      fd.write('{"status": "REQUEST_NOT_PROCESSED"}')
+    os.remove(os.path.join(self.tmpdir.name, '2020 CUUR0000SA0 prettyprint.json'))
+    self.assertEqual(1, self.manifest.sync_with_folder())
+    self.assertEqual({2021: 'REQUEST_NOT_PROCESSED'}, self.manifest.get_statuses_per_year('CUUR0000SA0'))
+
+  def test_4_sync_file_records_a_file_without_entry(self):
+    # a json downloaded before the manifest existed: no entry, yet its request succeeded
+    with open(self.manifest.get_json_filepath('CUUR0000SA0', 2019), 'w') as fd:
+      json.dump(make_response('CUUR0000SA0', 2019), fd)
+    self.assertFalse(self.manifest.has_request_succeeded('CUUR0000SA0', 2019))
+    entry = self.manifest.sync_file('CUUR0000SA0', 2019)
+    self.assertEqual(12, entry.n_months)
+    self.assertTrue(self.manifest.has_request_succeeded('CUUR0000SA0', 2019))
+    self.assertEqual(entry, self.manifest.sync_file('CUUR0000SA0', 2019))  # unchanged: not re-read
+    self.assertIsNone(self.manifest.sync_file('CUUR0000SA0', 2018))
+
+
+if __name__ == '__main__':
+  unittest.main()
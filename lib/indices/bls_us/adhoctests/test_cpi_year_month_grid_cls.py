@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bls_us/adhoctests/test_cpi_year_month_grid_cls.py
+  unit-tests for the year x month CPI grid (its variations & its disk cache) over an in-memory table
+"""
+import math
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import lib.indices.bls_us.cpi_year_month_grid_cls as cpigrid
+
+
+def make_conn(rows):
+  conn = sqlite3.connect(':memory:')
+  conn.execute(f"""
+  CREATE TABLE {cpigrid.CpiYearMonthGrid.tablename} (
+    seriesid varchar(12) NOT NULL, refmonthdate date NOT NULL, acc_index real NOT NULL,
+    created_at datetime, modified_at datetime, PRIMARY KEY (seriesid, refmonthdate)
+  )""")
+  sql = f"INSERT INTO {cpigrid.CpiYearMonthGrid.tablename} VALUES (?, ?, ?, '2024-01-01', ?);"
+  conn.executemany(sql, rows)
+  return conn
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    # from 2022-11 to 2024-01, index 100 rising 1 a month, for CUUR0000SA0 (plus one row of another series)
+    self.rows = [('CUUR0000SA0', f'{2022 + (10 + i) // 12}-{(10 + i) % 12 + 1:02d}-01', 100.0 + i, 'm1')
+                 for i in range(15)]
+    self.rows.append(('SUUR0000SA0', '2023-01-01', 50.0, 'm1'))
+    self.conn = make_conn(self.rows)
+
+  def tearDown(self):
+    self.conn.close()
+    self.tmpdir.cleanup()
+
+  def test_1_grid_is_years_by_months(self):
+    ordinals = np.array([2023 * 12 + 11, 2024 * 12])
+    grid = cpigrid.make_year_month_grid(ordinals, [306.746, 308.417])
+    self.assertEqual([2023, 2024], grid.index.tolist())
+    self.assertEqual('jan', grid.columns[0])
+    self.assertEqual((2, 12), grid.shape)
+    self.assertEqual(306.746, grid.loc[2023, 'dec'])
+    self.assertEqual(308.417, grid.loc[2024, 'jan'])
+    self.assertTrue(math.isnan(grid.loc[2024, 'feb']))
+
+  def test_2_variation_grids(self):
+    gridmaker = cpigrid.CpiYearMonthGrid('CUUR0000SA0', conn=self.conn, use_cache=False)
+    gridmaker.load()
+    mom, yoy = gridmaker.mom_grid, gridmaker.yoy_grid
+    self.assertAlmostEqual(113.0 / 112.0 - 1, mom.loc[2023, 'dec'])
+    self.assertAlmostEqual(114.0 / 113.0 - 1, mom.loc[2024, 'jan'])  # january against the previous december
+    self.assertTrue(math.isnan(mom.loc[2022, 'nov']))
+    self.assertAlmostEqual(112.0 / 100.0 - 1, yoy.loc[2023, 'nov'])
+    self.assertTrue(math.isnan(yoy.loc[2023, 'oct']))  # no 2022-10
+    self.assertEqual(2, gridmaker.n_queries)
+
+  def test_3_disk_cache_keyed_by_stamp(self):
+    kwargs = {'conn': self.conn, 'cache_folderpath': self.tmpdir.name}
+    first = cpigrid.CpiYearMonthGrid('CUUR0000SA0', **kwargs)
+    first.load()
+    self.assertFalse(first.from_cache)
+    second = cpigrid.CpiYearMonthGrid('CUUR0000SA0', **kwargs)
+    second.load()
+    self.assertTrue(second.from_cache)
+    self.assertEqual(1, second.n_queries)  # the stamp query only
+    self.assertTrue(first.grid.equals(second.grid))
+    self.conn.execute(
+      f"UPDATE {cpigrid.CpiYearMonthGrid.tablename} SET acc_index = 999, modified_at = 'm2' "
+      f"WHERE refmonthdate = '2024-01-01';"
+    )
+    third = cpigrid.CpiYearMonthGrid('CUUR0000SA0', **kwargs)
+    third.load()
+    self.assertFalse(third.from_cache)
+    self.assertEqual(999.0, third.grid.loc[2024, 'jan'])
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bls_us/bls_cpi_month_array_cache_cls.py
+  Contains class CpiMonthArrayCache which keeps, in memory and per seriesid, the CPI series of table bls_us_indices
+    as one float64 array indexed by month: values[year*12 + month - 1 - base] (NaN for a month without an index)
+
+  So that the CPI lookups of a whole budget (eg 10k prices, each one needing its M-2 CPI) are array indexing:
+    => cpi_at(months): the CPI on each month (months as month ordinals, dates or date strings)
+    => cpi_m_minus_n(dates, n): the CPI on each date's month minus n (the M-2 convention is n=2)
+  both vectorized, returning a float64 array aligned with the input (NaN where there's no CPI).
+
+  A series is loaded with one SELECT on first use. Its "stamp" (max(modified_at) & count of rows)
+    is rechecked at most every recheck_interval_in_sec and, if changed (eg new months inserted), the series reloads.
+    So, after the warm-up, lookups issue no query until the recheck interval elapses.
+
+  Example:
+    cache = get_cpi_cache()
+    cache.cpi_m_minus_n(['2024-03-15', '2025-01-02'], 2)  # array([CPI(2024-01), CPI(2024-11)])
+"""
+import threading
+import time
+import numpy as np
+import settings as sett
+BLS_CPI_TABLENAME = 'bls_us_indices'
+DEFAULT_SERIESID = 'CUUR0000SA0'
+DEFAULT_RECHECK_INTERVAL_IN_SEC = 60.0
+EPOCH_MONTH_ORDINAL = 1970 * 12  # datetime64[M] counts months from 1970-01
+_cache = None
+_lock = threading.Lock()
+
+
+def to_month_ordinals(months) -> np.ndarray:
+  """
+  Returns year*12 + month - 1 for each element (-1 for an invalid one)
+    months may be ints (taken as month ordinals already), dates, datetimes, 'yyyy-mm-dd' strings or datetime64's
+  """
+  arr = np.asarray(months)
+  if arr.dtype.kind in 'iu':
+    return arr.astype(np.int64)
+  if arr.dtype.kind != 'M':
+    arr = np.asarray([None if m is None else str(m)[:10] for m in arr.ravel()], dtype='datetime64[D]').reshape(arr.shape)
+  arr = arr.astype('datetime64[M]')
+  isnat = np.isnat(arr)
+  ordinals = arr.astype(np.int64) + EPOCH_MONTH_ORDINAL
+  ordinals[isnat] = -1
+  return ordinals
+
+
+class CpiSeriesArray:
+
+  def __init__(self, seriesid: str, refmonthdates=(), indices=(), stamp=None):
+    self.seriesid = seriesid
+    self.stamp = stamp
+    ordinals = to_month_ordinals(list(refmonthdates)) if len(refmonthdates) > 0 else np.empty(0, dtype=np.int64)
+    self.base = int(ordinals.min()) if ordinals.size > 0 else 0
+    self.values = np.full(int(ordinals.max()) - self.base + 1 if ordinals.size > 0 else 0, np.nan)
+    self.values[ordinals - self.base] = np.asarray(indices, dtype=np.float64)
+
+  @property
+  def size(self) -> int:
+    return self.values.size
+
+  def cpi_at_ordinals(self, ordinals: np.ndarray) -> np.ndarray:
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    inrange = (ordinals >= self.base) & (ordinals < self.base + self.size)
+    out = np.full(ordinals.shape, np.nan)
+    out[inrange] = self.values[ordinals[inrange] - self.base]
+    return out
+
+  def __str__(self):
+    outstr = f"{self.__class__.__name__}({self.seriesid}, base={self.base}, months={self.size}, stamp={self.stamp})"
+    return outstr
+
+
+class CpiMonthArrayCache:
+
+  tablename = BLS_CPI_TABLENAME
+
+  def __init__(self, recheck_interval_in_sec: float | None = None, conn=None, clock=None):
+    self.recheck_interval_in_sec = recheck_interval_in_sec
+    self.conn = conn
+    self.clock = clock or time.monotonic
+    self.n_queries = 0
+    self.n_loads = 0
+    self._series_per_id = {}
+    self._checked_at_per_id = {}
+    self._lock = threading.Lock()
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.recheck_interval_in_sec is None or self.recheck_interval_in_sec < 0:
+      self.recheck_interval_in_sec = DEFAULT_RECHECK_INTERVAL_IN_SEC
+
+  def _execute_fetchall(self, sql, tuplevalues):
+    self.n_queries += 1
+    conn = sett.get_sqlite_connection() if self.conn is None else self.conn
+    try:
+      return conn.execute(sql, tuplevalues).fetchall()
+    finally:
+      if self.conn is None:
+        conn.close()
+
+  def fetch_stamp(self, seriesid: str) -> tuple:
+    sql = f"SELECT max(modified_at), count(*) FROM {self.tablename} WHERE seriesid = ?;"
+    return tuple(self._execute_fetchall(sql, (seriesid,))[0])
+
+  def load_series(self, seriesid: str, stamp=None) -> CpiSeriesArray:
+    sql = f"SELECT refmonthdate, acc_index FROM {self.tablename} WHERE seriesid = ? ORDER BY refmonthdate;"
+    rows = self._execute_fetchall(sql, (seriesid,))
+    self.n_loads += 1
+    refmonthdates, indices = zip(*rows) if len(rows) > 0 else ((), ())
+    return CpiSeriesArray(seriesid, refmonthdates, indices, stamp)
+
+  def invalidate(self, seriesid: str | None = None):
+    with self._lock:
+      if seriesid is None:
+        self._series_per_id.clear()
+        self._checked_at_per_id.clear()
+      else:
+        self._series_per_id.pop(seriesid, None)
+        self._checked_at_per_id.pop(seriesid, None)
+
+  def get_series(self, seriesid: str | None = None) -> CpiSeriesArray:
+    """
+    Returns the series' array, (re)loading it if absent or if its stamp changed (checked at most every interval)
+    """
+    seriesid = seriesid or DEFAULT_SERIESID
+    with self._lock:
+      series = self._series_per_id.get(seriesid)
+      now = self.clock()
+      checked_at = self._checked_at_per_id.get(seriesid)
+      if series is not None and checked_at is not None and now - checked_at < self.recheck_interval_in_sec:
+        return series
+      stamp = self.fetch_stamp(seriesid)
+      if series is None or series.stamp != stamp:
+        series = self.load_series(seriesid, stamp)
+        self._series_per_id[seriesid] = series
+      self._checked_at_per_id[seriesid] = now
+      return series
+
+  def cpi_at(self, months, seriesid: str | None = None) -> np.ndarray:
+    """
+    The CPI on each month (NaN where the series has none)
+    """
+    return self.get_series(seriesid).cpi_at_ordinals(to_month_ordinals(months))
+
+  def cpi_m_minus_n(self, dates, n: int = 2, seriesid: str | None = None) -> np.ndarray:
+    """
+    The CPI on each date's month minus n (eg n=2, the M-2 convention: a date in March takes January's CPI)
+    """
+    ordinals = to_month_ordinals(dates)
+    shifted = np.where(ordinals < 0, -1, ordinals - n)  # an invalid date stays invalid
+    return self.get_series(seriesid).cpi_at_ordinals(shifted)
+
+  def __str__(self):
+    series_strs = ', '.join(str(series) for series in self._series_per_id.values())
+    outstr = f"""{self.__class__.__name__}
+    recheck interval = {self.recheck_interval_in_sec}s | queries = {self.n_queries} | loads = {self.n_loads}
+    series = [{series_strs}]
+    """
+    return outstr
+
+
+def get_cpi_cache() -> CpiMonthArrayCache:
+  """
+  Returns the process-wide cache (so that a series is loaded once per run)
+  """
+  global _cache
+  with _lock:
+    if _cache is None:
+      _cache = CpiMonthArrayCache()
+  return _cache
+
+
+def adhoctest():
+  cache = get_cpi_cache()
+  print(cache.cpi_m_minus_n(['2024-03-15', '2025-01-02'], 2))
+  print(cache)
+
+
+def process():
+  pass
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bls_us/bls_json_manifest_cls.py
+  Contains class BlsJsonManifest: an index of the BLS json response files (eg "2011 CUUR0000SA0 prettyprint.json")
+    kept as a small sqlite table (in a sidecar db-file inside the bls_cpi_data folder) keyed by (seriesid, year).
+
+  Each entry holds the file's path, size, mtime, content hash (sha1), its BLS request status
+    (eg REQUEST_SUCCEEDED or REQUEST_NOT_PROCESSED) and how many months (M01..M12) its data has.
+
+  The entry is upserted (in one transaction) whenever a response file is saved (@see save_response()),
+    so that the status reports & the "what to refetch" decisions are one indexed query
+    instead of listing the folder and opening & parsing every json file.
+
+  The manifest may be (re)built from the files already in the folder with sync_with_folder(),
+    which only re-reads the files whose size or mtime differ from their entry.
+
+  Example:
+    manifest = BlsJsonManifest()
+    manifest.find_years_to_refetch('CUUR0000SA0', 1913, 2025)  # eg [2025] (the current year is incomplete)
+"""
+import collections as coll
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import settings as sett
+DEFAULT_BLS_CPI_FOLDERNAME = 'bls_cpi_data'
+MANIFEST_DB_FILENAME = 'bls_json_manifest.sqlite'
+MANIFEST_TABLENAME = 'bls_json_manifest'
+REQUEST_SUCCEEDED = 'REQUEST_SUCCEEDED'
+json_filename_interpol = "{year} {seriesid} prettyprint.json"
+cmpld_json_filename_pattern = re.compile(r'^(\d{4}) ([A-Z0-9]+?) prettyprint\.json$')
+ManifestEntry = coll.namedtuple(
+  'ManifestEntry', 'seriesid year filepath size mtime content_hash status n_months updated_at'
+)
+
+
+def extract_status_n_n_months_from_json_content(content: bytes) -> tuple[str | None, int]:
+  """
+  Returns the response's status & its count of distinct months M01..M12 (None & 0 if not a BLS json)
+  """
+  try:
+    pdict = json.loads(content)
+    status = pdict.get('status')
+    months = set()
+    for series in pdict.get('Results', {}).get('series', []):
+      months.update(item['period'] for item in series.get('data', []) if 'M01' <= item.get('period', '') <= 'M12')
+    return status, len(months)
+  except (ValueError, AttributeError, TypeError, KeyError):
+    return None, 0
+
+
+class BlsJsonManifest:
+
+  tablename = MANIFEST_TABLENAME
+
+  def __init__(self, folderpath: str | None = None, conn=None):
+    self.folderpath = folderpath
+    self.conn = conn
+    self.treat_attrs()
+    self.create_table_if_not_exists()
+
+  def treat_attrs(self):
+    if self.folderpath is None:
+      self.folderpath = os.path.join(sett.get_datafolder_abspath(), DEFAULT_BLS_CPI_FOLDERNAME)
+    if self.conn is None:
+      os.makedirs(self.folderpath, exist_ok=True)
+      self.conn = sqlite3.connect(os.path.join(self.folderpath, MANIFEST_DB_FILENAME))
+
+  def create_table_if_not_exists(self):
+    with self.conn:
+      self.conn.execute(f"""
+      CREATE TABLE IF NOT EXISTS {self.tablename} (
+        seriesid varchar(12) NOT NULL,
+        year INTEGER NOT NULL,
+        filepath TEXT NOT NULL,
+        size INTEGER,
+        mtime REAL,
+        content_hash char(40),
+        status TEXT,
+        n_months INTEGER,
+        updated_at datetime,
+        PRIMARY KEY (seriesid, year)
+      )""")
+
+  def get_json_filepath(self, seriesid: str, year: int) -> str:
+    return os.path.join(self.folderpath, json_filename_interpol.format(year=year, seriesid=seriesid))
+
+  def record_file(self, seriesid: str, year: int, filepath: str, content: bytes | None = None) -> ManifestEntry:
+    """
+    Upserts the entry for a saved file (content, if not given, is read from the file)
+    """
+    if content is None:
+      with open(filepath, 'rb') as fd:
+        content = fd.read()
+    stat = os.stat(filepath)
+    status, n_months = extract_status_n_n_months_from_json_content(content)
+    entry = ManifestEntry(
+      seriesid=seriesid, year=int(year), filepath=filepath, size=stat.st_size, mtime=stat.st_mtime,
+      content_hash=hashlib.sha1(content).hexdigest(), status=status, n_months=n_months,
+      updated_at=str(datetime.datetime.now()),
+    )
+    fieldnames = ', '.join(ManifestEntry._fields)
+    questionmarks = ', '.join('?' * len(ManifestEntry._fields))
+    with self.conn:
+      self.conn.execute(f"INSERT OR REPLACE INTO {self.tablename} ({fieldnames}) VALUES ({questionmarks});", entry)
+    return entry
+
+  def save_response(self, seriesid: str, year: int, response, filepath: str | None = None) -> ManifestEntry:
+    """
+    Writes the response (a dict or json text) atomically (tmp file + os.replace()) then records it
+    """
+    filepath = filepath or self.get_json_filepath(seriesid, year)
+    text = response if isinstance(response, str) else json.dumps(response)
+    content = text.encode()
+    tmp_filepath = filepath + '.tmp'
+    with open(tmp_filepath, 'wb') as fd:
+      fd.write(content)
+    os.replace(tmp_filepath, filepath)
+    return self.record_file(seriesid, year, filepath, content)
+
+  def get_entry(self, seriesid: str, year: int) -> ManifestEntry | None:
+    sql = f"SELECT {', '.join(ManifestEntry._fields)} FROM {self.tablename} WHERE seriesid = ? and year = ?;"
+    row = self.conn.execute(sql, (seriesid, int(year))).fetchone()
+    return None if row is None else ManifestEntry(*row)
+
+  def sync_file(self, seriesid: str, year: int, filepath: str | None = None) -> ManifestEntry | None:
+    """
+    The entry of one year's json file, (re)recorded first if the file has no entry or changed since
+      (a folder populated before the manifest existed has files without entries); None if there's no file
+    """
+    entry = self.get_entry(seriesid, year)
+    if entry is not None and not self.is_entry_stale(entry):
+      return entry
+    filepath = self.get_json_filepath(seriesid, year) if filepath is None else filepath
+    if not os.path.isfile(filepath):
+      return None
+    return self.record_file(seriesid, year, filepath)
+
+  def has_request_succeeded(self, seriesid: str, year: int) -> bool:
+    entry = self.get_entry(seriesid, year)
+    return entry is not None and entry.status == REQUEST_SUCCEEDED
+
+  def get_statuses_per_year(self, seriesid: str) -> dict[int, str]:
+    sql = f"SELECT year, status FROM {self.tablename} WHERE seriesid = ? ORDER BY year;"
+    return dict(self.conn.execute(sql, (seriesid,)).fetchall())
+
+  def find_years_to_refetch(self, seriesid: str, year_fr: int, year_to: int) -> list[int]:
+    """
+    The years in [year_fr, year_to] without a succeeded response having all 12 months
+    """
+    sql = f"""
+    SELECT year FROM {self.tablename}
+      WHERE
+        seriesid = ? and year BETWEEN ? and ? and status = ? and n_months = 12;
+    """
+    complete_years = {row[0] for row in self.conn.execute(sql, (seriesid, year_fr, year_to, REQUEST_SUCCEEDED))}
+    return [year for year in range(year_fr, year_to + 1) if year not in complete_years]
+
+  def is_entry_stale(self, entry: ManifestEntry) -> bool:
+    """
+    Whether the file changed (or disappeared) since the entry was recorded
+    """
+    try:
+      stat = os.stat(entry.filepath)
+    except OSError:
+      return True
+    return stat.st_size != entry.size or stat.st_mtime != entry.mtime
+
+  def sync_with_folder(self) -> int:
+    """
+    Records the json files that are new or changed (by size or mtime) & drops the entries of removed files
+      returns the number of files (re)read
+    """
+    sql = f"SELECT {', '.join(ManifestEntry._fields)} FROM {self.tablename};"
+    entries = {(e.seriesid, e.year): e for e in map(ManifestEntry._make, self.conn.execute(sql).fetchall())}
+    n_read = 0
+    seen = set()
+    for filename in sorted(os.listdir(self.folderpath)):
+      match = cmpld_json_filename_pattern.match(filename)
+      if match is None:
+        continue
+      key = (match.group(2), int(match.group(1)))
+      seen.add(key)
+      entry = entries.get(key)
+      if entry is None or self.is_entry_stale(entry):
+        self.record_file(key[0], key[1], os.path.join(self.folderpath, filename))
+        n_read += 1
+    removed = [key for key in entries if key not in seen]
+    with self.conn:
+      self.conn.executemany(f"DELETE FROM {self.tablename} WHERE seriesid = ? and year = ?;", removed)
+    return n_read
+
+  def close(self):
+    self.conn.close()
+
+  def __str__(self):
+    sql = f"SELECT seriesid, status, count(*) FROM {self.tablename} GROUP BY seriesid, status ORDER BY seriesid;"
+    counts = self.conn.execute(sql).fetchall()
+    outstr = f"""{self.__class__.__name__}
+    folder = [{self.folderpath}]
+    (seriesid, status, nº of years) = {counts}
+    """
+    return outstr
+
+
+def adhoctest():
+  manifest = BlsJsonManifest()
+  print('n files (re)read', manifest.sync_with_folder())
+  print(manifest)
+
+
+def process():
+  pass
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+lib/indices/bls_us/cpi_year_month_grid_cls.py
+  Contains class CpiYearMonthGrid which tabulates a CPI series into a year-row month-column DataFrame
+
+   ys/ ms | jan | feb | mar  (...)
+  --------|-----|-----|----
+  year y1 |     |     |
+  --------|-----|-----|----
+  year y2 |     |     |
+
+  The series is read from table bls_us_indices (its acc_index), the same CPI source the monetary correction
+    reads (@see CpiMonthArrayCache in bls_cpi_month_array_cache_cls.py), so the grid shows the CPIs
+    the factors are computed with.
+
+  The whole series comes from one SELECT (refmonthdate, acc_index) into NumPy arrays,
+    which are scattered into the (n_years, 12) grid by month ordinal (year*12 + month - 1)
+    ie no per-year query nor per-row dict.
+
+  Optionally, two variation grids with the same shape are derived from it (vectorized):
+    => mom_grid: month-over-month variation, cpi(m) / cpi(m-1) - 1 (january against the previous december)
+    => yoy_grid: 12-month variation, cpi(m) / cpi(m-12) - 1
+
+  The grids are cached on disk (a .npz file in the data folder's cache subfolder) keyed by the series'
+    stamp (max(modified_at) & count of rows), so that, while the table doesn't change,
+    a rerun issues only the stamp query.
+
+  Example:
+    gridmaker = CpiYearMonthGrid('CUUR0000SA0')
+    gridmaker.load()
+    gridmaker.grid.loc[2024, 'jan']  # 308.417
+"""
+import os
+import numpy as np
+import pandas as pd
+import settings as sett
+import lib.datefs.years_date_functions as dtfs
+import lib.indices.bls_us.bls_cpi_month_array_cache_cls as cpicache  # .BLS_CPI_TABLENAME
+DEFAULT_SERIESID = 'CUUR0000SA0'
+CACHE_FOLDERNAME = 'cache'
+EPOCH_MONTH_ORDINAL = 1970 * 12  # datetime64[M] counts months from 1970-01
+
+
+def convert_refmonthdates_to_ordinals(refmonthdates) -> np.ndarray:
+  """
+  'yyyy-mm-dd' strings (or dates) to year*12 + month - 1, all in one numpy conversion
+  """
+  if len(refmonthdates) == 0:
+    return np.empty(0, dtype=np.int64)
+  months = np.asarray([str(d)[:10] for d in refmonthdates], dtype='datetime64[D]').astype('datetime64[M]')
+  return months.astype(np.int64) + EPOCH_MONTH_ORDINAL
+
+
+def make_year_month_grid(ordinals, values, year_fr: int | None = None, year_to: int | None = None) -> pd.DataFrame:
+  """
+  Scatters the values into a (years x 12 months) DataFrame (NaN for a month without value)
+    years default to the ones spanned by ordinals
+  """
+  ordinals = np.asarray(ordinals, dtype=np.int64)
+  values = np.asarray(values, dtype=np.float64)
+  if year_fr is None:
+    year_fr = int(ordinals.min() // 12) if ordinals.size > 0 else 0
+  if year_to is None:
+    year_to = int(ordinals.max() // 12) if ordinals.size > 0 else year_fr - 1
+  n_years = max(year_to - year_fr + 1, 0)
+  arr = np.full(n_years * 12, np.nan)
+  positions = ordinals - year_fr * 12
+  inrange = (positions >= 0) & (positions < arr.size)
+  arr[positions[inrange]] = values[inrange]
+  return pd.DataFrame(
+    arr.reshape(n_years, 12),
+    index=pd.Index(range(year_fr, year_to + 1), name='year'),
+    columns=dtfs.make_allmonths_englishlower3letter_list(),
+  )
+
+
+def make_mom_grid(grid: pd.DataFrame) -> pd.DataFrame:
+  """
+  Month-over-month variation: the grid flattened into the monthly sequence, divided by itself shifted one month
+  """
+  flat = grid.to_numpy().ravel()
+  mom = np.full(flat.shape, np.nan)
+  mom[1:] = flat[1:] / flat[:-1] - 1
+  return pd.DataFrame(mom.reshape(grid.shape), index=grid.index, columns=grid.columns)
+
+
+def make_yoy_grid(grid: pd.DataFrame) -> pd.DataFrame:
+  """
+  12-month variation: each row divided by the row above (same month, previous year)
+  """
+  arr = grid.to_numpy()
+  yoy = np.full(arr.shape, np.nan)
+  yoy[1:] = arr[1:] / arr[:-1] - 1
+  return pd.DataFrame(yoy, index=grid.index, columns=grid.columns)
+
+
+class CpiYearMonthGrid:
+
+  tablename = cpicache.BLS_CPI_TABLENAME
+  indexcolname = 'acc_index'
+
+  def __init__(
+      self,
+      seriesid: str | None = None,
+      conn=None,
+      cache_folderpath: str | None = None,
+      use_cache: bool = True,
+    ):
+    self.seriesid = seriesid
+    self.conn = conn
+    self.cache_folderpath = cache_folderpath
+    self.use_cache = use_cache
+    self.stamp = None
+    self.grid = None
+    self.n_queries = 0
+    self.from_cache = False
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.seriesid is None:
+      self.seriesid = DEFAULT_SERIESID
+    if self.cache_folderpath is None:
+      self.cache_folderpath = os.path.join(sett.get_datafolder_abspath(), CACHE_FOLDERNAME)
+
+  @property
+  def cache_filepath(self) -> str:
+    return os.path.join(self.cache_folderpath, f"cpi year-month grid {self.tablename} {self.seriesid}.npz")
+
+  @property
+  def startyear(self) -> int | None:
+    return None if self.grid is None or self.grid.empty else int(self.grid.index[0])
+
+  @property
+  def endyear(self) -> int | None:
+    return None if self.grid is None or self.grid.empty else int(self.grid.index[-1])
+
+  @property
+  def mom_grid(self) -> pd.DataFrame:
+    return make_mom_grid(self.grid)
+
+  @property
+  def yoy_grid(self) -> pd.DataFrame:
+    return make_yoy_grid(self.grid)
+
+  def _execute_fetchall(self, sql, tuplevalues):
+    self.n_queries += 1
+    conn = sett.get_sqlite_connection() if self.conn is None else self.conn
+    try:
+      return conn.execute(sql, tuplevalues).fetchall()
+    finally:
+      if self.conn is None:
+        conn.close()
+
+  def fetch_stamp(self) -> tuple[str, str]:
+    sql = f"SELECT max(modified_at), count(*) FROM {self.tablename} WHERE seriesid = ?;"
+    modified_at, count = self._execute_fetchall(sql, (self.seriesid,))[0]
+    return str(modified_at), str(count)
+
+  def fetch_ordinals_n_indices(self) -> tuple[np.ndarray, np.ndarray]:
+    sql = f"SELECT refmonthdate, {self.indexcolname} FROM {self.tablename} WHERE seriesid = ?;"
+    rows = self._execute_fetchall(sql, (self.seriesid,))
+    refmonthdates, indices = zip(*rows) if len(rows) > 0 else ((), ())
+    return convert_refmonthdates_to_ordinals(refmonthdates), np.asarray(indices, dtype=np.float64)
+
+  def read_cache(self) -> pd.DataFrame | None:
+    """
+    The cached grid if its stamp is the current one (None otherwise)
+    """
+    try:
+      with np.load(self.cache_filepath, allow_pickle=False) as npz:
+        if tuple(npz['stamp'].tolist()) != self.stamp:
+          return None
+        years, values = npz['years'], npz['values']
+    except (OSError, KeyError, ValueError):
+      return None
+    return pd.DataFrame(
+      values, index=pd.Index(years.tolist(), name='year'), columns=dtfs.make_allmonths_englishlower3letter_list()
+    )
+
+  def write_cache(self):
+    os.makedirs(self.cache_folderpath, exist_ok=True)
+    tmp_filepath = self.cache_filepath + '.tmp.npz'
+    np.savez(
+      tmp_filepath, stamp=np.array(self.stamp), years=self.grid.index.to_numpy(dtype=np.int64),
+      values=self.grid.to_numpy()
+    )
+    os.replace(tmp_filepath, self.cache_filepath)
+
+  def load(self) -> pd.DataFrame:
+    self.stamp = self.fetch_stamp()
+    self.grid = self.read_cache() if self.use_cache else None
+    self.from_cache = self.grid is not None
+    if self.grid is None:
+      self.grid = make_year_month_grid(*self.fetch_ordinals_n_indices())
+      if self.use_cache:
+        self.write_cache()
+    return self.grid
+
+  def slice_years(self, year_fr: int | None = None, year_to: int | None = None) -> pd.DataFrame:
+    return self.grid.loc[year_fr:year_to]
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    seriesid = {self.seriesid} | table = {self.tablename} | years = [{self.startyear}, {self.endyear}]
+    stamp = {self.stamp} | from cache = {self.from_cache} | queries = {self.n_queries}
+    cache file = [{self.cache_filepath}]
+    """
+    return outstr
+
+
+def adhoctest():
+  ordinals = np.array([2023 * 12 + 10, 2023 * 12 + 11, 2024 * 12])
+  grid = make_year_month_grid(ordinals, [307.051, 306.746, 308.417])
+  print(grid.to_string())
+  print(make_mom_grid(grid).to_string())
+
+
+def process():
+  gridmaker = CpiYearMonthGrid()
+  gridmaker.load()
+  print(gridmaker)
+  print(gridmaker.grid.to_string())
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
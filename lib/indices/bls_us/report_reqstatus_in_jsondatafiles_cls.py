@@ -8,6 +8,9 @@ This module contains class JsonRequestStatusesReader that aims to find the "requ
     REQUEST_SUCCEEDED
     REQUEST_NOT_PROCESSED
 
+  The statuses are read from the folder's manifest (@see bls_json_manifest_cls.py),
+    which is first synced with the folder (only new or changed json files are opened).
+
 ---------------------
 
 """
@@ -16,6 +19,7 @@ import os
 import json
 import re
 import settings as sett
+import lib.indices.bls_us.bls_json_manifest_cls as manif
 from commands.fetch.bls_us.read_cpis_from_db_fs import DEFAULT_SERIESID
 from commands.fetch.bls_us.read_cpis_from_db_fs import KNOWN_SERIESID
 DEFAULT_BLS_DATA_FOLDERNAME = 'bls_cpi_data'
@@ -36,6 +40,7 @@ class JsonRequestStatusesReader:
     self.n_files = 0
     self.seriesid = seriesid
     self.years = []
+    self._statuses_per_year = None
     self.treat_attrs()
 
   def treat_attrs(self):
@@ -76,13 +81,20 @@ class JsonRequestStatusesReader:
     pdict = json.loads(jsontext)
     return pdict
 
+  @property
+  def statuses_per_year(self) -> dict:
+    """
+    {year: status} for the seriesid, in one query on the (just synced) manifest
+    """
+    if self._statuses_per_year is None:
+      manifest = manif.BlsJsonManifest(self.bls_datafolderpath)
+      manifest.sync_with_folder()
+      self._statuses_per_year = manifest.get_statuses_per_year(self.seriesid)
+      manifest.close()
+    return self._statuses_per_year
+
   def extract_statuscode_from_json_by_year(self, year):
-    pdict = self.get_dict_fr_jsonfile_on_year(year)
-    try:
-      status = pdict['status']
-      return status
-    except KeyError:
-      return None
+    return self.statuses_per_year.get(int(year))
 
   def has_request_succeeded(self, filename):
     match = self.prettyprint_filename_recmpld.search(filename)
@@ -111,20 +123,7 @@ class JsonRequestStatusesReader:
       print(scrmsg)
 
   def get_all_years_for_the_seriesid_in_datafolder(self) -> list:
-    filenames = os.listdir(self.bls_datafolderpath)
-    self.years = []
-    for fn in filenames:
-      match = self.prettyprint_filename_recmpld.search(fn)
-      year = None if match is None else match.group(1)
-      seriesid = None if match is None else match.group(2)
-      if seriesid is None or seriesid != self.seriesid:
-        continue
-      try:
-        int_year = int(year)
-        self.years.append(int_year)
-      except ValueError:
-        continue
-    self.years.sort()
+    self.years = sorted(self.statuses_per_year.keys())
     return self.years
 
   def verify_statuscode_in_bls_datafolder(self):
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+lib/netfs/adhoctests/test_rate_limiter.py
+  unit-tests for SlidingWindowRateLimiter (clock & sleep are faked, so no real waiting happens)
+"""
+import unittest
+import lib.netfs.rate_limiter as ratelim
+import adhoctests.fake_clock_cls as fakeclk
+
+
+class TestCase(unittest.TestCase):
+
+  def test_1_calls_within_the_limit_do_not_wait(self):
+    clock = fakeclk.FakeClock()
+    limiter = ratelim.SlidingWindowRateLimiter(max_calls=3, window_in_sec=10, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+      limiter.acquire()
+    self.assertEqual([], clock.sleeps)
+    self.assertEqual(3, limiter.n_acquired)
+
+  def test_2_an_extra_call_waits_for_the_oldest_to_leave_the_window(self):
+    clock = fakeclk.FakeClock()
+    limiter = ratelim.SlidingWindowRateLimiter(max_calls=2, window_in_sec=10, clock=clock, sleep=clock.sleep)
+    limiter.acquire()
+    clock.now = 4.0
+    limiter.acquire()
+    limiter.acquire()  # the first call (at 0) leaves the window at 10
+    self.assertEqual([6.0], clock.sleeps)
+    self.assertEqual(10.0, clock.now)
+    limiter.acquire()  # the second call (at 4) leaves the window at 14
+    self.assertEqual([6.0, 4.0], clock.sleeps)
+    self.assertEqual(10.0, limiter.total_wait_in_sec)
+
+  def test_3_defaults(self):
+    limiter = ratelim.SlidingWindowRateLimiter(max_calls=0)
+    self.assertEqual(ratelim.DEFAULT_MAX_CALLS, limiter.max_calls)
+    self.assertEqual(ratelim.DEFAULT_WINDOW_IN_SEC, limiter.window_in_sec)
+
+
+if __name__ == '__main__':
+  unittest.main()
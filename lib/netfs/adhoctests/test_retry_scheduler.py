@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+lib/netfs/adhoctests/test_retry_scheduler.py
+  unit-tests for RetryScheduler, CircuitBreaker & RetryBudget
+    (sleep & clock are faked, so no real waiting happens)
+"""
+import asyncio
+import random
+import unittest
+import requests
+import lib.netfs.retry_scheduler as retsch
+import adhoctests.fake_clock_cls as fakeclk
+
+
+class FakeResponse:
+
+  def __init__(self, status_code):
+    self.status_code = status_code
+
+
+class FlakyCallable:
+  """
+  Raises ConnectionError (or returns a failing response) n_failures times then returns 200
+  """
+
+  def __init__(self, n_failures, failing_status=None):
+    self.n_failures = n_failures
+    self.failing_status = failing_status
+    self.n_calls = 0
+
+  def __call__(self):
+    self.n_calls += 1
+    if self.n_calls <= self.n_failures:
+      if self.failing_status is not None:
+        return FakeResponse(self.failing_status)
+      raise requests.exceptions.ConnectionError('fake connection error')
+    return FakeResponse(200)
+
+
+class TestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.waits = []
+    self.clock = fakeclk.FakeClock()
+
+  def make_scheduler(self, max_tries=5, budget=None, failure_threshold=100):
+    breaker = retsch.CircuitBreaker('test', failure_threshold=failure_threshold,
+                                    reset_timeout_in_sec=60, clock=self.clock)
+    return retsch.RetryScheduler(
+      endpoint='test', max_tries=max_tries, base_wait_in_sec=0.5, max_wait_in_sec=2.0,
+      budget=budget, breaker=breaker, sleep=self.waits.append, rng=random.Random(1),
+    )
+
+  def test_1_retries_until_success(self):
+    scheduler = self.make_scheduler()
+    func = FlakyCallable(n_failures=3)
+    res = scheduler.call(func)
+    self.assertEqual(200, res.status_code)
+    self.assertEqual(4, func.n_calls)
+    self.assertEqual(3, scheduler.n_retries)
+    self.assertEqual(3, len(self.waits))
+    self.assertEqual(retsch.CircuitBreaker.CLOSED, scheduler.breaker.state)
+
+  def test_2_gives_up_after_max_tries(self):
+    scheduler = self.make_scheduler(max_tries=3)
+    func = FlakyCallable(n_failures=10)
+    with self.assertRaises(requests.exceptions.ConnectionError):
+      scheduler.call(func)
+    self.assertEqual(3, func.n_calls)
+    # the failing status is returned (not raised) when tries are over
+    func = FlakyCallable(n_failures=10, failing_status=503)
+    res = scheduler.call(func)
+    self.assertEqual(503, res.status_code)
+    self.assertEqual(3, func.n_calls)
+
+  def test_3_waits_are_capped(self):
+    scheduler = self.make_scheduler()
+    for n_retry in range(10):
+      wait_in_sec = scheduler.compute_wait_in_sec(n_retry)
+      self.assertTrue(0 <= wait_in_sec <= 2.0)
+    self.assertTrue(scheduler.compute_wait_in_sec(0) <= 0.5)
+
+  def test_4_circuit_opens_fails_fast_n_half_opens(self):
+    scheduler = self.make_scheduler(max_tries=2, failure_threshold=2)
+    func = FlakyCallable(n_failures=100)
+    with self.assertRaises(requests.exceptions.ConnectionError):
+      scheduler.call(func)
+    self.assertEqual(retsch.CircuitBreaker.OPEN, scheduler.breaker.state)
+    n_calls_before = func.n_calls
+    with self.assertRaises(retsch.CircuitOpenError):
+      scheduler.call(func)
+    self.assertEqual(n_calls_before, func.n_calls)
+    # after the reset timeout, one probe goes through and closes the circuit on success
+    self.clock.now = 61.0
+    res = scheduler.call(FlakyCallable(n_failures=0))
+    self.assertEqual(200, res.status_code)
+    self.assertEqual(retsch.CircuitBreaker.CLOSED, scheduler.breaker.state)
+
+  def test_5_shared_budget_stops_retries(self):
+    budget = retsch.RetryBudget(max_retries=2)
+    scheduler = self.make_scheduler(max_tries=5, budget=budget)
+    func = FlakyCallable(n_failures=100)
+    with self.assertRaises(requests.exceptions.ConnectionError):
+      scheduler.call(func)
+    self.assertEqual(3, func.n_calls)
+    self.assertTrue(budget.is_exhausted)
+    # with the budget spent, the next call is tried once only
+    func = FlakyCallable(n_failures=100)
+    with self.assertRaises(requests.exceptions.ConnectionError):
+      scheduler.call(func)
+    self.assertEqual(1, func.n_calls)
+
+  def test_6_non_retryable_probe_error_reopens_the_circuit(self):
+    scheduler = self.make_scheduler(max_tries=2, failure_threshold=2)
+    with self.assertRaises(requests.exceptions.ConnectionError):
+      scheduler.call(FlakyCallable(n_failures=100))
+    self.clock.now = 61.0
+
+    def raise_chunked_encoding_error():
+      raise requests.exceptions.ChunkedEncodingError('fake broken chunk')
+    with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+      scheduler.call(raise_chunked_encoding_error)
+    # the failed probe is recorded: open again (not stuck half-open) and half-opening after the timeout
+    self.assertEqual(retsch.CircuitBreaker.OPEN, scheduler.breaker.state)
+    self.clock.now = 122.0
+    res = scheduler.call(FlakyCallable(n_failures=0))
+    self.assertEqual(200, res.status_code)
+    self.assertEqual(retsch.CircuitBreaker.CLOSED, scheduler.breaker.state)
+
+  def test_7_cancelled_acall_is_not_an_upstream_failure(self):
+    scheduler = self.make_scheduler(max_tries=2, failure_threshold=1)
+
+    async def hang():
+      await asyncio.sleep(3600)
+
+    async def cancel_an_acall():
+      task = asyncio.ensure_future(scheduler.acall(hang))
+      await asyncio.sleep(0)
+      task.cancel()
+      with self.assertRaises(asyncio.CancelledError):
+        await task
+    asyncio.run(cancel_an_acall())
+    self.assertEqual(retsch.CircuitBreaker.CLOSED, scheduler.breaker.state)
+    self.assertEqual(0, scheduler.breaker.n_consecutive_failures)
+    # a cancelled half-open probe is given back: the next call probes (and closes the circuit)
+    scheduler.breaker.record_failure()
+    self.clock.now = 61.0
+    asyncio.run(cancel_an_acall())
+    self.assertEqual(retsch.CircuitBreaker.OPEN, scheduler.breaker.state)
+    res = scheduler.call(FlakyCallable(n_failures=0))
+    self.assertEqual(200, res.status_code)
+    self.assertEqual(retsch.CircuitBreaker.CLOSED, scheduler.breaker.state)
+
+
+if __name__ == '__main__':
+  unittest.main()
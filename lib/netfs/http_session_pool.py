@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+lib/netfs/http_session_pool.py
+  Keeps one requests.Session per host (process-wide) so that the remote API callers
+    reuse keep-alive connections instead of opening a new one for each requests.get()
+
+To use it, clients may import:
+  import lib.netfs.http_session_pool as htpool  # htpool.get_shared_session(url)
+  res = htpool.get_shared_session(url).get(url, timeout=htpool.DEFAULT_TIMEOUT_IN_SEC)
+
+Notice:
+  requests.Session is used here for plain GET/POST calls from a few threads at most
+    (@see the asyncio client in lib/indices/bcb_br/bcb_async_api_client_cls.py),
+    the adapter's pool size is set so that those threads do not wait for a connection.
+"""
+import threading
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+DEFAULT_POOL_MAXSIZE = 16  # connections kept alive per host
+DEFAULT_TIMEOUT_IN_SEC = 30
+_sessions_per_host = {}
+_lock = threading.Lock()
+
+
+def extract_host_from_url(url: str) -> str:
+  return urllib.parse.urlsplit(url).netloc
+
+
+def make_session(pool_maxsize: int | None = None) -> requests.Session:
+  if pool_maxsize is None or pool_maxsize < 1:
+    pool_maxsize = DEFAULT_POOL_MAXSIZE
+  session = requests.Session()
+  adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+  session.mount('https://', adapter)
+  session.mount('http://', adapter)
+  return session
+
+
+def get_shared_session(url: str | None = None, pool_maxsize: int | None = None) -> requests.Session:
+  """
+  Returns the process-wide session for the url's host (creating it on first use)
+  """
+  host = '' if url is None else extract_host_from_url(url)
+  with _lock:
+    session = _sessions_per_host.get(host)
+    if session is None:
+      session = make_session(pool_maxsize)
+      _sessions_per_host[host] = session
+  return session
+
+
+def close_shared_sessions():
+  with _lock:
+    for session in _sessions_per_host.values():
+      session.close()
+    _sessions_per_host.clear()
+
+
+def adhoctest():
+  url = 'https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/odata/'
+  s1 = get_shared_session(url)
+  s2 = get_shared_session(url)
+  scrmsg = f"host = {extract_host_from_url(url)} | same session = {s1 is s2}"
+  print(scrmsg)
+
+
+def process():
+  pass
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+lib/netfs/rate_limiter.py
+  Contains class SlidingWindowRateLimiter: at most max_calls calls in any window of window_in_sec seconds,
+    shared by the threads of a batch (eg the BLS API's "50 requests per 10 seconds")
+
+  acquire() blocks (sleeping) until a call may go, the others are let through right away,
+    so a thread pool issuing the calls is paced by the limiter, not by its number of workers.
+
+To use it, clients may import:
+  import lib.netfs.rate_limiter as ratelim
+  limiter = ratelim.SlidingWindowRateLimiter(max_calls=50, window_in_sec=10)
+  limiter.acquire()  # then issue the call
+"""
+import collections
+import threading
+import time
+DEFAULT_MAX_CALLS = 50
+DEFAULT_WINDOW_IN_SEC = 10.0
+
+
+class SlidingWindowRateLimiter:
+
+  def __init__(self, max_calls: int | None = None, window_in_sec: float | None = None, clock=None, sleep=None):
+    self.max_calls = max_calls
+    self.window_in_sec = window_in_sec
+    self.clock = clock or time.monotonic
+    self.sleep = sleep or time.sleep
+    self.n_acquired = 0
+    self.total_wait_in_sec = 0.0
+    self._call_times = collections.deque()
+    self._lock = threading.Lock()
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if self.max_calls is None or self.max_calls < 1:
+      self.max_calls = DEFAULT_MAX_CALLS
+    if self.window_in_sec is None or self.window_in_sec < 0:
+      self.window_in_sec = DEFAULT_WINDOW_IN_SEC
+
+  def _try_acquire(self) -> float:
+    """
+    Takes a slot (returning 0) or returns how long to wait for the oldest call to leave the window
+    """
+    with self._lock:
+      now = self.clock()
+      while len(self._call_times) > 0 and now - self._call_times[0] >= self.window_in_sec:
+        self._call_times.popleft()
+      if len(self._call_times) < self.max_calls:
+        self._call_times.append(now)
+        self.n_acquired += 1
+        return 0.0
+      return self.window_in_sec - (now - self._call_times[0])
+
+  def acquire(self):
+    while True:
+      wait_in_sec = self._try_acquire()
+      if wait_in_sec <= 0:
+        return
+      self.total_wait_in_sec += wait_in_sec
+      self.sleep(wait_in_sec)
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    max {self.max_calls} calls per {self.window_in_sec}s | acquired = {self.n_acquired}
+    total wait = {self.total_wait_in_sec:.2f}s
+    """
+    return outstr
+
+
+def adhoctest():
+  limiter = SlidingWindowRateLimiter(max_calls=2, window_in_sec=1)
+  for _ in range(5):
+    limiter.acquire()
+  print(limiter)
+
+
+def process():
+  pass
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
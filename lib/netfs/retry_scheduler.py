@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+lib/netfs/retry_scheduler.py
+  Contains the retry component used by the remote API fetchers (BCB, BLS, IPEA, CEP):
+
+  => class RetryScheduler: retries a call in a loop (no recursion) waiting, between tries,
+       a capped exponential backoff with "full jitter", i.e., a random wait in
+       [0, min(max_wait, base_wait * 2 ** n_retry)]
+  => class CircuitBreaker: one per endpoint (host), it "opens" after failure_threshold
+       consecutive failures so that a dead upstream fails fast (CircuitOpenError)
+       for reset_timeout_in_sec, then lets one probe call through ("half-open")
+  => class RetryBudget: a number of retries shared by a whole batch,
+       once spent, calls are tried once and not retried
+
+To use it, clients may import:
+  import lib.netfs.retry_scheduler as retsch  # retsch.request_with_retry('GET', url)
+
+Notice:
+  CircuitOpenError subclasses requests.exceptions.ConnectionError so that
+    callers already catching ConnectionError also handle the fail-fast case.
+"""
+import asyncio
+import random
+import threading
+import time
+import requests
+import lib.netfs.http_session_pool as htpool
+RETRYABLE_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+DEFAULT_MAX_TRIES = 5
+DEFAULT_BASE_WAIT_IN_SEC = 0.5
+DEFAULT_MAX_WAIT_IN_SEC = 8.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT_IN_SEC = 60.0
+_breakers_per_endpoint = {}
+_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+  pass
+
+
+class CircuitBreaker:
+
+  CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+  def __init__(self, endpoint='', failure_threshold=None, reset_timeout_in_sec=None, clock=None):
+    self.endpoint = endpoint
+    self.failure_threshold = failure_threshold or DEFAULT_FAILURE_THRESHOLD
+    self.reset_timeout_in_sec = reset_timeout_in_sec or DEFAULT_RESET_TIMEOUT_IN_SEC
+    self.clock = clock or time.monotonic
+    self.state = self.CLOSED
+    self.n_consecutive_failures = 0
+    self.opened_at = None
+    self._lock = threading.Lock()
+
+  def allow_request(self) -> bool:
+    with self._lock:
+      if self.state == self.CLOSED:
+        return True
+      if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout_in_sec:
+        # let one probe call through
+        self.state = self.HALF_OPEN
+        return True
+      return False
+
+  def record_success(self):
+    with self._lock:
+      self.state = self.CLOSED
+      self.n_consecutive_failures = 0
+      self.opened_at = None
+
+  def record_failure(self):
+    with self._lock:
+      self.n_consecutive_failures += 1
+      if self.state == self.HALF_OPEN or self.n_consecutive_failures >= self.failure_threshold:
+        self.state = self.OPEN
+        self.opened_at = self.clock()
+
+  def release_probe(self):
+    """
+    Gives back a half-open probe that ended without an answer (cancelled or interrupted):
+      no failure is recorded and the next call may probe at once
+    """
+    with self._lock:
+      if self.state == self.HALF_OPEN:
+        self.state = self.OPEN
+
+  def __str__(self):
+    outstr = f"<CircuitBreaker endpoint={self.endpoint} state={self.state} fails={self.n_consecutive_failures}>"
+    return outstr
+
+
+class RetryBudget:
+  """
+  max_retries is the number of retries (not counting first tries) for all calls sharing it
+    None means an unbounded budget
+  """
+
+  def __init__(self, max_retries: int | None = None):
+    self.max_retries = max_retries
+    self.n_retries_spent = 0
+    self._lock = threading.Lock()
+
+  def try_spend(self) -> bool:
+    with self._lock:
+      if self.max_retries is not None and self.n_retries_spent >= self.max_retries:
+        return False
+      self.n_retries_spent += 1
+      return True
+
+  @property
+  def is_exhausted(self) -> bool:
+    return self.max_retries is not None and self.n_retries_spent >= self.max_retries
+
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+  """
+  Returns the process-wide CircuitBreaker for an endpoint (creating it on first use)
+  """
+  with _lock:
+    breaker = _breakers_per_endpoint.get(endpoint)
+    if breaker is None:
+      breaker = CircuitBreaker(endpoint)
+      _breakers_per_endpoint[endpoint] = breaker
+  return breaker
+
+
+class RetryScheduler:
+
+  def __init__(
+      self,
+      endpoint: str = '',
+      max_tries: int | None = None,
+      base_wait_in_sec: float | None = None,
+      max_wait_in_sec: float | None = None,
+      budget: RetryBudget | None = None,
+      breaker: CircuitBreaker | None = None,
+      sleep=None,
+      rng: random.Random | None = None,
+    ):
+    self.endpoint = endpoint
+    self.max_tries = max_tries or DEFAULT_MAX_TRIES
+    self.base_wait_in_sec = DEFAULT_BASE_WAIT_IN_SEC if base_wait_in_sec is None else base_wait_in_sec
+    self.max_wait_in_sec = DEFAULT_MAX_WAIT_IN_SEC if max_wait_in_sec is None else max_wait_in_sec
+    self.budget = budget or RetryBudget()
+    self.breaker = breaker or get_circuit_breaker(endpoint)
+    self.sleep = sleep or time.sleep
+    self.rng = rng or random.Random()
+    self.n_calls = 0
+    self.n_tries = 0
+    self.n_retries = 0
+    self.total_wait_in_sec = 0.0
+
+  def compute_wait_in_sec(self, n_retry: int) -> float:
+    """
+    Capped exponential backoff with full jitter (n_retry starts at 0)
+    """
+    cap = min(self.max_wait_in_sec, self.base_wait_in_sec * (2 ** n_retry))
+    return self.rng.uniform(0, cap)
+
+  @staticmethod
+  def is_retryable_response(res) -> bool:
+    return getattr(res, 'status_code', None) in RETRYABLE_STATUS_CODES
+
+  def _before_try(self):
+    if not self.breaker.allow_request():
+      errmsg = f"Circuit open for endpoint [{self.endpoint}]: failing fast without calling it"
+      raise CircuitOpenError(errmsg)
+    self.n_tries += 1
+
+  def _after_try_n_get_wait(self, n_tries_in_call: int, failed: bool) -> float | None:
+    """
+    Returns the wait before the next try or None if there should be no next try
+    """
+    if not failed:
+      self.breaker.record_success()
+      return None
+    self.breaker.record_failure()
+    if n_tries_in_call >= self.max_tries or not self.budget.try_spend():
+      return None
+    wait_in_sec = self.compute_wait_in_sec(n_tries_in_call - 1)
+    self.n_retries += 1
+    self.total_wait_in_sec += wait_in_sec
+    return wait_in_sec
+
+  def call(self, func, *args, **kwargs):
+    """
+    Calls func(*args, **kwargs) retrying it on RETRYABLE_EXCEPTIONS & RETRYABLE_STATUS_CODES
+      When tries (or the budget) are over, it either re-raises the last exception
+      or returns the last (non-ok) response for the caller to treat its status code
+    """
+    self.n_calls += 1
+    n_tries_in_call = 0
+    while True:
+      self._before_try()
+      n_tries_in_call += 1
+      last_exc, res = None, None
+      try:
+        res = func(*args, **kwargs)
+        failed = self.is_retryable_response(res)
+      except RETRYABLE_EXCEPTIONS as e:
+        last_exc, failed = e, True
+      except Exception:
+        # a non-retryable error still ends the try: a half-open breaker must not wait forever for its probe
+        self.breaker.record_failure()
+        raise
+      except BaseException:
+        # cancelled or interrupted (eg a batch being cancelled): not an upstream failure
+        self.breaker.release_probe()
+        raise
+      wait_in_sec = self._after_try_n_get_wait(n_tries_in_call, failed)
+      if wait_in_sec is None:
+        if last_exc is not None:
+          raise last_exc
+        return res
+      self.sleep(wait_in_sec)
+
+  async def acall(self, coro_func, *args, **kwargs):
+    """
+    The coroutine counterpart of call(), it waits via asyncio.sleep() so other tasks run meanwhile
+    """
+    self.n_calls += 1
+    n_tries_in_call = 0
+    while True:
+      self._before_try()
+      n_tries_in_call += 1
+      last_exc, res = None, None
+      try:
+        res = await coro_func(*args, **kwargs)
+        failed = self.is_retryable_response(res)
+      except RETRYABLE_EXCEPTIONS as e:
+        last_exc, failed = e, True
+      except Exception:
+        # a non-retryable error still ends the try: a half-open breaker must not wait forever for its probe
+        self.breaker.record_failure()
+        raise
+      except BaseException:
+        # cancelled or interrupted (eg a batch being cancelled): not an upstream failure
+        self.breaker.release_probe()
+        raise
+      wait_in_sec = self._after_try_n_get_wait(n_tries_in_call, failed)
+      if wait_in_sec is None:
+        if last_exc is not None:
+          raise last_exc
+        return res
+      await asyncio.sleep(wait_in_sec)
+
+  def __str__(self):
+    outstr = f"""{self.__class__.__name__}
+    endpoint = {self.endpoint} | {self.breaker}
+    calls = {self.n_calls} | tries = {self.n_tries} | retries = {self.n_retries}
+    total wait = {self.total_wait_in_sec:.2f}s
+    """
+    return outstr
+
+
+def make_scheduler_for_url(url: str, budget: RetryBudget | None = None, max_tries: int | None = None):
+  return RetryScheduler(endpoint=htpool.extract_host_from_url(url), budget=budget, max_tries=max_tries)
+
+
+def request_with_retry(method: str, url: str, scheduler: RetryScheduler | None = None, **kwargs):
+  """
+  Issues method (GET, POST...) on url via the shared keep-alive session under a RetryScheduler
+    (a scheduler for the url's host is made if none is given)
+  """
+  if scheduler is None:
+    scheduler = make_scheduler_for_url(url)
+  kwargs.setdefault('timeout', htpool.DEFAULT_TIMEOUT_IN_SEC)
+  session = htpool.get_shared_session(url)
+  return scheduler.call(session.request, method, url, **kwargs)
+
+
+def adhoctest():
+  scheduler = RetryScheduler(endpoint='adhoctest')
+  for n_retry in range(8):
+    scrmsg = f"retry {n_retry} => wait {scheduler.compute_wait_in_sec(n_retry):.3f}s"
+    print(scrmsg)
+
+
+def process():
+  pass
+
+
+if __name__ == '__main__':
+  """
+  process()
+  """
+  adhoctest()
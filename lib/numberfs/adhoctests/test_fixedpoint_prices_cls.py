@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+lib/numberfs/adhoctests/test_fixedpoint_prices_cls.py
+  unit-tests for FixedPointPrices (int64 values plus a decimal scale)
+"""
+import unittest
+import numpy as np
+import lib.numberfs.fixedpoint_prices_cls as fxp
+
+
+class TestCase(unittest.TestCase):
+
+  def test_1_edges_n_nulls(self):
+    prices = fxp.FixedPointPrices.from_ints([49713, 49600, None])
+    self.assertEqual([49713, 49600, None], prices.to_ints_or_none())
+    floats = prices.to_floats()
+    self.assertEqual([4.9713, 4.96], floats[:2].tolist())
+    self.assertTrue(np.isnan(floats[2]))
+    self.assertEqual(4.9713, prices[0])
+    self.assertIsNone(prices[2])
+    self.assertTrue(prices.equals(fxp.FixedPointPrices.from_floats([4.9713, 4.96, None])))
+    sl = prices[0:2]
+    self.assertTrue(np.shares_memory(sl.values, prices.values))
+
+  def test_2_arithmetic_stays_exact(self):
+    a = fxp.FixedPointPrices.from_floats([0.1] * 1000)
+    self.assertEqual(1000000, int(a.values.sum()))  # 1000 * 0.1 is 100 exactly (at scale 4)
+    b = fxp.FixedPointPrices.from_floats([0.2] * 1000)
+    self.assertTrue((a + b).equals(fxp.FixedPointPrices.from_floats([0.3] * 1000)))
+    self.assertEqual([0.1], (b - a)[0:1].to_floats().tolist())
+    factor = fxp.FixedPointPrices.from_floats([1.05], scale=8)
+    self.assertEqual([52199], (fxp.FixedPointPrices.from_ints([49713]) * factor).values.tolist())  # 5.219865
+    self.assertEqual([99426], (fxp.FixedPointPrices.from_ints([49713]) * 2).values.tolist())
+    self.assertEqual(4, (fxp.FixedPointPrices.from_ints([49713]) + a[0:1]).scale)
+
+  def test_3_division_n_inversion(self):
+    brl_usd = fxp.FixedPointPrices.from_ints([49713, 0, None])
+    usd_brl = brl_usd.invert(scale=8)
+    self.assertEqual(20115463, usd_brl.values[0])  # 1/4.9713 = 0.201154627...
+    self.assertEqual([False, True, True], usd_brl.isnull.tolist())
+    ratio = fxp.FixedPointPrices.from_ints([99426, 10000, 10000]) / brl_usd
+    self.assertEqual(20000, ratio.values[0])
+    self.assertEqual([False, True, True], ratio.isnull.tolist())
+    self.assertEqual([-3], fxp.div_round_half_away(np.array([-5]), 2).tolist())
+
+  def test_4_argmin_argmax_skip_nulls(self):
+    prices = fxp.FixedPointPrices.from_ints([None, 49713, 48000, 51000, None])
+    self.assertEqual((2, 3), (prices.argmin(), prices.argmax()))
+    self.assertIsNone(fxp.FixedPointPrices.from_ints([None]).argmin())
+    with self.assertRaises(ValueError):
+      fxp.FixedPointPrices([1], scale=20)
+
+  def test_5_largest_scale_stays_exact_or_raises(self):
+    scale = fxp.MAX_SCALE
+    brl_usd = fxp.FixedPointPrices.from_floats([4.9713, 99.5], scale=scale)
+    factor = fxp.FixedPointPrices.from_floats([1.05, 1.05], scale=scale)
+    self.assertEqual([521986500, 10447500000], (brl_usd * factor).values.tolist())
+    self.assertEqual([497130000, 9950000000], ((brl_usd * factor) / factor).values.tolist())
+    self.assertEqual(20115463, brl_usd.invert().values[0])
+    rescaled = fxp.FixedPointPrices.from_ints([49713, 995000]).rescale(scale)
+    self.assertEqual([4.9713, 99.5], rescaled.to_floats().tolist())
+    # 5000 * 5000 * 10**16 does not fit in int64: an error, not a wrapped-around price
+    big = fxp.FixedPointPrices.from_floats([5000.0], scale=scale)
+    with self.assertRaises(OverflowError):
+      _ = big * big
+    with self.assertRaises(OverflowError):
+      _ = big / fxp.FixedPointPrices.from_floats([2.0], scale=scale)  # 5000 * 10**8 * 10**8 on the way
+    with self.assertRaises(OverflowError):
+      fxp.FixedPointPrices.from_floats([1e12], scale=scale)
+    with self.assertRaises(ValueError):
+      fxp.FixedPointPrices([1], scale=scale + 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
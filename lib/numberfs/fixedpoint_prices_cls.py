@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+lib/numberfs/fixedpoint_prices_cls.py
+  Contains class FixedPointPrices: an int64 NumPy array of values plus a decimal scale
+    (value / 10**scale is the price), the way the db keeps buypriceint & sellpriceint
+    (scale 4, @see n_decplaces_for_div_intprices in art/inflmeas/bcb_br/classes).
+
+  The arithmetic is vectorized and integer-only (rounding half away from zero),
+    so that a long batch (eg monetary corrections over thousands of prices) does not
+    allocate a float per row nor drift by float rounding. Floats appear only at the edges:
+      => from_floats(): API/text-file prices coming in
+      => to_floats(): prices going out to a report, a DataFrame or a chart
+
+  Null prices (eg the hollidays' rows) are kept in a boolean mask (isnull) and propagate
+    through the operations (a null operand gives a null result, as does a division by zero).
+
+  A product of two scaled values is about price_a * price_b * 10**(2 * scale), so the scale is capped
+    at MAX_SCALE (8: prices up to the hundreds still multiply within int64) and a product or a rescale
+    that would not fit in int64 raises OverflowError instead of silently wrapping around.
+
+  Example:
+    buys = FixedPointPrices.from_ints([49713, 49600, None])  # scale 4: 4.9713, 4.96, null
+    usd_per_brl = buys.invert()  # 1/n, eg for the flipped pair USD/BRL
+    buys.to_floats()  # array([4.9713, 4.96, nan])
+"""
+import numpy as np
+DEFAULT_SCALE = 4  # the db's prices: int(price * 10**4)
+MAX_SCALE = 8  # a product at scale 8 is price_a * price_b * 10**16, int64 tops at about 9.2 * 10**18
+INT64_MAX = np.iinfo(np.int64).max
+
+
+def multiply_or_raise(a, b) -> np.ndarray:
+  """
+  The int64 elementwise product a * b, raising OverflowError where it would not fit in int64
+  """
+  a = np.asarray(a, dtype=np.int64)
+  b = np.asarray(b, dtype=np.int64)
+  abs_b = np.abs(b)
+  if np.any(np.abs(a) > INT64_MAX // np.where(abs_b == 0, 1, abs_b)):
+    errmsg = "Fixed-point product overflows int64. Please use a lower scale."
+    raise OverflowError(errmsg)
+  return a * b
+
+
+def round_floats_to_int64_or_raise(scaled: np.ndarray) -> np.ndarray:
+  """
+  Rounds (half away from zero) scaled floats to int64, raising OverflowError if one does not fit
+  """
+  rounded = np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)
+  if np.any(np.abs(np.nan_to_num(rounded)) >= float(INT64_MAX)):
+    errmsg = "Fixed-point value overflows int64. Please use a lower scale."
+    raise OverflowError(errmsg)
+  return rounded.astype(np.int64)
+
+
+def div_round_half_away(num: np.ndarray, den) -> np.ndarray:
+  """
+  Integer division rounding half away from zero (as the decimal rounding of the prices in the db)
+    den must be nonzero where the result is used
+  """
+  num = np.asarray(num, dtype=np.int64)
+  den = np.asarray(den, dtype=np.int64)
+  safe_den = np.where(den == 0, 1, den)
+  sign = np.where((num < 0) ^ (safe_den < 0), -1, 1)
+  abs_num, abs_den = np.abs(num), np.abs(safe_den)
+  if np.any(abs_num > (INT64_MAX - abs_den) // 2):
+    errmsg = "Fixed-point division overflows int64 (when rounding). Please use a lower scale."
+    raise OverflowError(errmsg)
+  return sign * ((2 * abs_num + abs_den) // (2 * abs_den))
+
+
+class FixedPointPrices:
+
+  def __init__(self, values, scale: int | None = None, isnull=None):
+    """
+    values are the int64 scaled prices (kept as given, no copy if already an int64 array)
+    """
+    self.values = np.asarray(values, dtype=np.int64)
+    self.scale = DEFAULT_SCALE if scale is None else int(scale)
+    self.isnull = np.zeros(self.values.shape, dtype=bool) if isnull is None else np.asarray(isnull, dtype=bool)
+    self.treat_attrs()
+
+  def treat_attrs(self):
+    if not 0 <= self.scale <= MAX_SCALE:
+      errmsg = f"Fixed-point scale {self.scale} is out of the range [0, {MAX_SCALE}]."
+      raise ValueError(errmsg)
+    if self.isnull.shape != self.values.shape:
+      errmsg = f"Fixed-point null mask shape {self.isnull.shape} differs from the values' {self.values.shape}."
+      raise ValueError(errmsg)
+
+  @classmethod
+  def from_ints(cls, ints, scale: int | None = None) -> 'FixedPointPrices':
+    """
+    From already scaled ints (eg the db's buypriceint column), None meaning null
+    """
+    if isinstance(ints, np.ndarray) and ints.dtype != object:
+      return cls(ints, scale)
+    objs = np.asarray(list(ints), dtype=object)
+    isnull = np.equal(objs, None)
+    return cls(np.where(isnull, 0, objs).astype(np.int64), scale, isnull)
+
+  @classmethod
+  def from_floats(cls, floats, scale: int | None = None) -> 'FixedPointPrices':
+    """
+    From float prices (eg the API's), None or NaN meaning null
+    """
+    scale = DEFAULT_SCALE if scale is None else scale
+    if not isinstance(floats, np.ndarray):
+      floats = [np.nan if f is None else f for f in floats]
+    floats = np.asarray(floats, dtype=np.float64)
+    isnull = np.isnan(floats)
+    scaled = np.where(isnull, 0.0, floats) * 10 ** scale
+    # round half away from zero, as div_round_half_away does for ints
+    return cls(round_floats_to_int64_or_raise(scaled), scale, isnull)
+
+  @property
+  def multiplier(self) -> int:
+    return 10 ** self.scale
+
+  def __len__(self):
+    return self.values.size
+
+  def __getitem__(self, key):
+    """
+    An int gives the float price (or None), a slice or an index array gives a FixedPointPrices
+      (a slice's values & mask are views, not copies)
+    """
+    if isinstance(key, (int, np.integer)):
+      return None if self.isnull[key] else int(self.values[key]) / self.multiplier
+    return FixedPointPrices(self.values[key], self.scale, self.isnull[key])
+
+  def to_floats(self) -> np.ndarray:
+    floats = self.values / self.multiplier
+    floats[self.isnull] = np.nan
+    return floats
+
+  def to_ints_or_none(self) -> list:
+    return [None if isnull else value for value, isnull in zip(self.values.tolist(), self.isnull.tolist())]
+
+  def rescale(self, scale: int) -> 'FixedPointPrices':
+    if scale == self.scale:
+      return self
+    if scale > self.scale:
+      values = multiply_or_raise(self.values, 10 ** (scale - self.scale))
+    else:
+      values = div_round_half_away(self.values, 10 ** (self.scale - scale))
+    return FixedPointPrices(values, scale, self.isnull)
+
+  def _align(self, other: 'FixedPointPrices'):
+    scale = max(self.scale, other.scale)
+    return self.rescale(scale), other.rescale(scale), scale
+
+  def __add__(self, other):
+    if not isinstance(other, FixedPointPrices):
+      other = FixedPointPrices.from_floats(np.full(self.values.shape, other, dtype=np.float64), self.scale)
+    a, b, scale = self._align(other)
+    return FixedPointPrices(a.values + b.values, scale, a.isnull | b.isnull)
+
+  def __sub__(self, other):
+    if not isinstance(other, FixedPointPrices):
+      other = FixedPointPrices.from_floats(np.full(self.values.shape, other, dtype=np.float64), self.scale)
+    a, b, scale = self._align(other)
+    return FixedPointPrices(a.values - b.values, scale, a.isnull | b.isnull)
+
+  def __neg__(self):
+    return FixedPointPrices(-self.values, self.scale, self.isnull)
+
+  def __mul__(self, other):
+    """
+    By an int (exact), by a float (rounded) or by another FixedPointPrices (the result keeps self's scale)
+    """
+    if isinstance(other, (int, np.integer)):
+      return FixedPointPrices(multiply_or_raise(self.values, int(other)), self.scale, self.isnull)
+    if isinstance(other, FixedPointPrices):
+      values = div_round_half_away(multiply_or_raise(self.values, other.values), other.multiplier)
+      return FixedPointPrices(values, self.scale, self.isnull | other.isnull)
+    scaled = self.values * np.asarray(other, dtype=np.float64)
+    isnan = np.isnan(scaled)
+    values = round_floats_to_int64_or_raise(np.where(isnan, 0.0, scaled))
+    return FixedPointPrices(values, self.scale, self.isnull | isnan)
+
+  __rmul__ = __mul__
+
+  def __truediv__(self, other):
+    """
+    By an int or by another FixedPointPrices (the result keeps self's scale), a zero divisor gives a null
+    """
+    if isinstance(other, (int, np.integer)):
+      other = FixedPointPrices(np.full(self.values.shape, int(other), dtype=np.int64), 0)
+    if not isinstance(other, FixedPointPrices):
+      return self * (1.0 / np.asarray(other, dtype=np.float64))
+    iszero = other.values == 0
+    values = div_round_half_away(multiply_or_raise(self.values, other.multiplier), other.values)
+    return FixedPointPrices(np.where(iszero, 0, values), self.scale, self.isnull | other.isnull | iszero)
+
+  def invert(self, scale: int | None = None) -> 'FixedPointPrices':
+    """
+    Returns 1/n (eg BRL/USD into USD/BRL) at scale (default self's), a zero price gives a null
+    """
+    scale = self.scale if scale is None else scale
+    if not 0 <= scale <= MAX_SCALE:
+      errmsg = f"Fixed-point scale {scale} is out of the range [0, {MAX_SCALE}]."
+      raise ValueError(errmsg)
+    iszero = self.values == 0
+    values = div_round_half_away(np.full(self.values.shape, 10 ** (scale + self.scale), dtype=np.int64), self.values)
+    return FixedPointPrices(np.where(iszero, 0, values), scale, self.isnull | iszero)
+
+  def argmin(self) -> int | None:
+    if self.isnull.all():
+      return None
+    return int(np.argmin(np.where(self.isnull, np.iinfo(np.int64).max, self.values)))
+
+  def argmax(self) -> int | None:
+    if self.isnull.all():
+      return None
+    return int(np.argmax(np.where(self.isnull, np.iinfo(np.int64).min, self.values)))
+
+  def equals(self, other: 'FixedPointPrices') -> bool:
+    if len(self) != len(other):
+      return False
+    a, b, _ = self._align(other)
+    return bool(np.array_equal(a.isnull, b.isnull) and np.array_equal(a.values[~a.isnull], b.values[~b.isnull]))
+
+  def __repr__(self):
+    outstr = f"{self.__class__.__name__}(n={len(self)}, scale={self.scale}, nulls={int(self.isnull.sum())})"
+    return outstr
+
+
+def adhoctest():
+  buys = FixedPointPrices.from_ints([49713, 49600, None])
+  print(buys, buys.to_floats(), buys.invert().to_floats())
+
+
+def process():
+  pass
+
+
+if __name__ == "__main__":
+  """
+  process()
+  """
+  adhoctest()
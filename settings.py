@@ -13,6 +13,8 @@ import os
 import sqlite3
 import local_settings as ls
 CEPABERTO_API_TOKEN = ls.CEPABERTO_API_TOKEN
+# optional: with a (free) BLS registration key, the BLS API v2 takes 50 series & 20 years per request
+BLS_API_REGISTRATIONKEY = getattr(ls, 'BLS_API_REGISTRATIONKEY', None)
 # the conditional assignment below is to avoid TypeError from abspath() in case
 # ls.DATA_FOLDERPATH is None; however, if it does not exist there (in local_settings.py)
 # AttributeError comes up anyway (so, because local_settings is not in repo, please add it during install)